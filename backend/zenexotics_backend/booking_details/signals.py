@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from booking_pets.models import BookingPets
+from core.cost_recomputation import current_recomputation
 from .models import BookingDetails
 from decimal import Decimal
 import logging
@@ -12,6 +13,12 @@ def update_occurrence_rates(sender, instance, created, **kwargs):
     """
     Signal handler to update the BookingOccurrence calculated cost when BookingDetails changes
     """
+    # Within a deferred recomputation scope the cost is recomputed once, when the scope ends
+    recomputation = current_recomputation()
+    if recomputation:
+        recomputation.occurrence_changed(instance.booking_occurrence)
+        return
+
     occurrence = instance.booking_occurrence
     
     # Get the calculated cost from booking details
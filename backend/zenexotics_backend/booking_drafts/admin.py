@@ -1,18 +1,24 @@
 from django.contrib import admin
-from .models import BookingDraft
+from .models import BookingDraft, BookingDraftChange
 
 @admin.register(BookingDraft)
 class BookingDraftAdmin(admin.ModelAdmin):
-    list_display = ('draft_id', 'booking', 'last_modified_by', 'status', 'created_at', 'updated_at')
+    list_display = ('draft_id', 'booking', 'last_modified_by', 'status', 'version', 'created_at', 'updated_at')
     list_filter = ('status', 'last_modified_by', 'created_at')
     search_fields = ('booking__client__user__email', 'booking__professional__user__email')
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
         ('Basic Information', {
-            'fields': ('booking', 'draft_data', 'last_modified_by', 'status')
+            'fields': ('booking', 'draft_data', 'last_modified_by', 'status', 'version')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+@admin.register(BookingDraftChange)
+class BookingDraftChangeAdmin(admin.ModelAdmin):
+    list_display = ('draft', 'version', 'changed_by', 'sections', 'created_at')
+    search_fields = ('draft__draft_id',)
+    readonly_fields = ('created_at',)
@@ -0,0 +1,287 @@
+"""
+Versioned, patch-based writes of booking drafts.
+
+Every draft view used to finish with draft.save(), which rewrote the whole
+draft_data document (a recurring draft's occurrences included) even when one
+pet changed, and which silently overwrote whatever another tab or device had
+saved in between. save_draft() instead:
+
+    draft.draft_data = draft_data
+    change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
+
+* diffs the new draft_data against what was loaded into JSON-patch style
+  operations (add, replace and remove on paths such as /occurrences/3/rates),
+* applies them in the database with jsonb_set, jsonb_insert and #-, in an
+  UPDATE that only matches the version that was loaded, so a write that lost
+  a race raises DraftVersionConflict instead of overwriting,
+* records the touched sections and paths in a BookingDraftChange row, and
+* returns a DraftChange with the new version and just the changed sections,
+  which the views send back instead of the whole document.
+
+The operations are always derived on the server from the draft_data a view
+built, so occurrences stay priced and the cost summary consistent; clients
+never send raw patches.
+"""
+from dataclasses import dataclass, field
+import json
+import logging
+
+from django.contrib.postgres.fields import ArrayField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Func, JSONField, TextField, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from booking_drafts.models import BookingDraft, BookingDraftChange
+from core.pricing_fingerprint import FINGERPRINT_SECTIONS, pricing_components, pricing_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Beyond this many fine-grained operations a write is coarsened to whole sections
+MAX_PATCH_OPERATIONS = 50
+
+# Change log entries kept per draft
+MAX_DRAFT_CHANGES = 50
+
+# Columns written alongside draft_data
+DRAFT_FIELDS = ('booking_id', 'original_status', 'last_modified_by', 'status', 'client_id', 'professional_id')
+
+
+class DraftVersionConflict(Exception):
+    """The draft was saved by someone else since it was loaded."""
+
+    def __init__(self, draft_id, expected_version, current_version):
+        self.draft_id = draft_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+        super().__init__(
+            f"Draft {draft_id} is at version {current_version}, not {expected_version}"
+        )
+
+
+@dataclass
+class DraftChange:
+    """The outcome of save_draft(): the new version and what changed."""
+    version: int
+    changed_sections: dict = field(default_factory=dict)
+    removed_sections: list = field(default_factory=list)
+    operations: list = field(default_factory=list)
+
+
+def _escape(token):
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def format_path(tokens):
+    """('occurrences', 3, 'rates') -> '/occurrences/3/rates'"""
+    return ''.join(f'/{_escape(token)}' for token in tokens)
+
+
+def parse_path(path):
+    """'/occurrences/3/rates' -> ['occurrences', '3', 'rates']"""
+    return [_unescape(token) for token in path.split('/')[1:]] if path else []
+
+
+def normalize_draft_data(draft_data):
+    """draft_data as the database stores it: plain dicts and lists, string keys, JSON scalars."""
+    return json.loads(json.dumps(draft_data, cls=DjangoJSONEncoder))
+
+
+def diff_draft_data(old, new, path=()):
+    """
+    JSON-patch style operations turning old into new. Dicts are diffed by
+    key and lists by position: changed elements are replaced, extra ones
+    appended ('/-') and missing ones removed from the end.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        operations = []
+        for key in old:
+            if key not in new:
+                operations.append({'op': 'remove', 'path': format_path(path + (key,))})
+        for key, value in new.items():
+            if key not in old:
+                operations.append({'op': 'add', 'path': format_path(path + (key,)), 'value': value})
+            elif old[key] != value:
+                operations.extend(diff_draft_data(old[key], value, path + (key,)))
+        return operations
+
+    if isinstance(old, list) and isinstance(new, list) and path:
+        operations = []
+        for index in range(min(len(old), len(new))):
+            if old[index] != new[index]:
+                operations.extend(diff_draft_data(old[index], new[index], path + (index,)))
+        for value in new[len(old):]:
+            operations.append({'op': 'add', 'path': format_path(path + ('-',)), 'value': value})
+        for index in range(len(old) - 1, len(new) - 1, -1):
+            operations.append({'op': 'remove', 'path': format_path(path + (index,))})
+        return operations
+
+    if old == new and type(old) is type(new):
+        return []
+    return [{'op': 'replace', 'path': format_path(path), 'value': new}]
+
+
+def apply_draft_patch(draft_data, operations):
+    """Apply operations from diff_draft_data() to a copy of draft_data."""
+    result = json.loads(json.dumps(draft_data, cls=DjangoJSONEncoder))
+    for operation in operations:
+        tokens = parse_path(operation['path'])
+        if not tokens:
+            result = operation['value']
+            continue
+        parent = result
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if operation['op'] == 'remove':
+            del parent[int(last) if isinstance(parent, list) else last]
+        elif isinstance(parent, list):
+            if last == '-':
+                parent.append(operation['value'])
+            else:
+                parent[int(last)] = operation['value']
+        else:
+            parent[last] = operation['value']
+    return result
+
+
+def _section_operations(old, new):
+    """One add, replace or remove per changed top-level key."""
+    operations = [{'op': 'remove', 'path': format_path((key,))} for key in old if key not in new]
+    operations.extend(
+        {'op': 'replace' if key in old else 'add', 'path': format_path((key,)), 'value': value}
+        for key, value in new.items()
+        if key not in old or old[key] != value
+    )
+    return operations
+
+
+def build_operations(old, new):
+    """The operations save_draft() writes, coarsened when there are too many to apply one by one."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [{'op': 'replace', 'path': '', 'value': new}]
+    operations = diff_draft_data(old, new)
+    if len(operations) > MAX_PATCH_OPERATIONS:
+        operations = _section_operations(old, new)
+    if len(operations) > MAX_PATCH_OPERATIONS:
+        operations = [{'op': 'replace', 'path': '', 'value': new}]
+    return operations
+
+
+def _text_array(tokens):
+    return Value(list(tokens), output_field=ArrayField(TextField()))
+
+
+def _jsonb(value):
+    return Cast(Value(json.dumps(value, cls=DjangoJSONEncoder)), JSONField())
+
+
+def patch_expression(operations):
+    """A draft_data expression applying the operations in the UPDATE itself."""
+    expression = F('draft_data')
+    for operation in operations:
+        tokens = parse_path(operation['path'])
+        if not tokens:
+            expression = _jsonb(operation['value'])
+        elif operation['op'] == 'remove':
+            expression = Func(
+                expression, _text_array(tokens),
+                template='(%(expressions)s)', arg_joiner=' #- ', output_field=JSONField()
+            )
+        elif tokens[-1] == '-':
+            # Append: insert after the last element (also works on an empty array)
+            expression = Func(
+                expression, _text_array(tokens[:-1] + ['-1']), _jsonb(operation['value']), Value(True),
+                function='jsonb_insert', output_field=JSONField()
+            )
+        else:
+            expression = Func(
+                expression, _text_array(tokens), _jsonb(operation['value']), Value(True),
+                function='jsonb_set', output_field=JSONField()
+            )
+    return expression
+
+
+def _record_change(draft, version, changed_by, sections, operations):
+    BookingDraftChange.objects.create(
+        draft=draft,
+        version=version,
+        changed_by=changed_by,
+        sections=sections,
+        operations=[[operation['op'], operation['path']] for operation in operations]
+    )
+    stale = BookingDraftChange.objects.filter(draft=draft, version__lte=version - MAX_DRAFT_CHANGES)
+    stale.delete()
+
+
+def save_draft(draft, changed_by=None, expected_version=None):
+    """
+    Write the draft's changes since it was loaded as a patch. Raises
+    DraftVersionConflict if expected_version (the version the client last
+    saw), or the version that was loaded, is no longer current.
+    """
+    new_data = normalize_draft_data(draft.draft_data)
+
+    if draft._state.adding:
+        draft.draft_data = new_data
+        draft.save()
+        _record_change(draft, draft.version, changed_by, sorted(new_data), build_operations({}, new_data))
+        return DraftChange(version=draft.version, changed_sections=dict(new_data))
+
+    loaded_version = getattr(draft, '_loaded_version', None)
+    if loaded_version is None:
+        draft.refresh_from_db(fields=['version'])
+        loaded_version = draft.version
+    if expected_version is not None and int(expected_version) != loaded_version:
+        raise DraftVersionConflict(draft.draft_id, int(expected_version), loaded_version)
+
+    old_data = getattr(draft, '_loaded_draft_data', None)
+    operations = build_operations(old_data, new_data)
+    sections = sorted({parse_path(operation['path'])[0] for operation in operations if operation['path']})
+    if any(not operation['path'] for operation in operations):
+        sections = sorted(set(new_data) | set(old_data or {}))
+    new_version = loaded_version + 1
+    updated_at = timezone.now()
+
+    draft.sync_participants()
+
+    # The fingerprint only needs recomputing when a priced section changed
+    if not draft.pricing_fingerprint or set(sections) & set(FINGERPRINT_SECTIONS):
+        draft.pricing_fingerprint = pricing_fingerprint(pricing_components(new_data))
+
+    with transaction.atomic():
+        updated = BookingDraft.objects.filter(draft_id=draft.draft_id, version=loaded_version).update(
+            draft_data=patch_expression(operations),
+            version=new_version,
+            updated_at=updated_at,
+            pricing_fingerprint=draft.pricing_fingerprint,
+            **{name: getattr(draft, name) for name in DRAFT_FIELDS}
+        )
+        if not updated:
+            current_version = BookingDraft.objects.filter(
+                draft_id=draft.draft_id
+            ).values_list('version', flat=True).first()
+            raise DraftVersionConflict(draft.draft_id, loaded_version, current_version)
+
+        _record_change(draft, new_version, changed_by, sections, operations)
+
+    draft.version = new_version
+    draft.updated_at = updated_at
+    draft.draft_data = new_data
+    draft.remember_loaded_state()
+
+    logger.info(
+        f"MBA5390 - Saved draft {draft.draft_id} v{new_version}: "
+        f"{len(operations)} operations on {', '.join(sections) or 'nothing'}"
+    )
+    return DraftChange(
+        version=new_version,
+        changed_sections={section: new_data[section] for section in sections if section in new_data},
+        removed_sections=[section for section in sections if section not in new_data],
+        operations=operations
+    )
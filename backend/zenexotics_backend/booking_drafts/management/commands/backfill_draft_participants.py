@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from booking_drafts.models import BookingDraft
+from booking_drafts.participants import backfill_participants
+from clients.models import Client
+from professionals.models import Professional
+
+
+class Command(BaseCommand):
+    help = 'Set the indexed client and professional columns of booking drafts from their draft_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Drafts loaded and updated per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        updated = backfill_participants(BookingDraft, Client, Professional, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated participants on {updated} of {BookingDraft.objects.count()} drafts"
+        ))
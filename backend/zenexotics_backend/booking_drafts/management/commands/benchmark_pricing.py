@@ -0,0 +1,75 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.pricing import PricingInterval, PricingSnapshot, price_intervals
+import logging
+import statistics
+import time as timer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batch pricing of draft occurrences (core.pricing) against schedule size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Numbers of occurrences to price (default: 10 100 1000 10000)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Runs to time per size (default: 5)'
+        )
+        parser.add_argument(
+            '--pets',
+            type=int,
+            default=3,
+            help='Number of pets on the booking (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        snapshot = PricingSnapshot(
+            service_name='Dog Walking',
+            unit_of_time='1 Hour',
+            base_rate=Decimal('25.00'),
+            additional_animal_rate=Decimal('5.00'),
+            applies_after=1,
+            holiday_rate=Decimal('10.00'),
+            additional_rates=[('Medication', 'Oral medication', Decimal('3.50'))]
+        )
+        # Two durations alternate, as in a schedule with a long and a short visit
+        visits = [(time(9, 0), time(10, 0)), (time(14, 0), time(16, 30))]
+
+        # The per-batch summary line would otherwise be logged for every run
+        logging.getLogger('core.pricing').setLevel(logging.WARNING)
+
+        self.stdout.write(f"{'occurrences':>12} {'total (ms)':>12} {'per occurrence (us)':>20} {'queries':>8}")
+        self.stdout.write("-" * 56)
+
+        for size in options['sizes']:
+            start_date = date(2025, 1, 6)
+            intervals = []
+            for index in range(size):
+                start_time, end_time = visits[index % len(visits)]
+                day = start_date + timedelta(days=index // len(visits))
+                intervals.append(PricingInterval(day, day, start_time, end_time))
+
+            times = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['runs']):
+                    start = timer.perf_counter()
+                    price_intervals(snapshot, intervals, options['pets'])
+                    times.append((timer.perf_counter() - start) * 1000)
+
+            total_ms = statistics.median(times)
+            self.stdout.write(
+                f"{size:>12} {total_ms:>12.2f} {total_ms * 1000 / size:>20.2f} {len(queries):>8}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete (median per run)"))
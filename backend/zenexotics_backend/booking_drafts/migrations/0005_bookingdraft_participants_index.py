@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:04
+
+from django.db import migrations, models
+import django.db.models.fields.json
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_drafts', '0004_alter_bookingdraft_booking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingdraft',
+            index=models.Index(django.db.models.fields.json.KeyTransform('professional_id', 'draft_data'), django.db.models.fields.json.KeyTransform('client_id', 'draft_data'), condition=models.Q(('status', 'IN_PROGRESS')), name='booking_draft_participants_idx'),
+        ),
+    ]
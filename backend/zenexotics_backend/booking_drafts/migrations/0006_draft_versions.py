@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking_drafts', '0005_bookingdraft_participants_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingdraft',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='BookingDraftChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('sections', models.JSONField(default=list)),
+                ('operations', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='booking_drafts.bookingdraft')),
+            ],
+            options={
+                'db_table': 'booking_draft_changes',
+                'ordering': ['-version'],
+                'unique_together': {('draft', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+from core.pricing_fingerprint import pricing_components, pricing_fingerprint
+
+
+def backfill_pricing_fingerprints(apps, schema_editor):
+    BookingDraft = apps.get_model('booking_drafts', 'BookingDraft')
+    drafts = list(BookingDraft.objects.only('draft_id', 'draft_data'))
+    for draft in drafts:
+        draft.pricing_fingerprint = pricing_fingerprint(pricing_components(draft.draft_data))
+    BookingDraft.objects.bulk_update(drafts, ['pricing_fingerprint'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_drafts', '0006_draft_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingdraft',
+            name='pricing_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(backfill_pricing_fingerprints, reverse_code=migrations.RunPython.noop),
+    ]
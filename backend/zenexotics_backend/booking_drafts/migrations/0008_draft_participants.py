@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from booking_drafts.participants import backfill_participants
+
+
+def backfill_draft_participants(apps, schema_editor):
+    backfill_participants(
+        apps.get_model('booking_drafts', 'BookingDraft'),
+        apps.get_model('clients', 'Client'),
+        apps.get_model('professionals', 'Professional')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0007_client_marked_noreply_as_not_spam'),
+        ('professionals', '0006_professionalsearchdocument_animal_type_phrases_and_more'),
+        ('booking_drafts', '0007_pricing_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookingdraft',
+            name='booking_draft_participants_idx',
+        ),
+        migrations.AddField(
+            model_name='bookingdraft',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_drafts', to='clients.client'),
+        ),
+        migrations.AddField(
+            model_name='bookingdraft',
+            name='professional',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_drafts', to='professionals.professional'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingdraft',
+            index=models.Index(fields=['professional', 'client', 'status'], name='booking_draft_pro_client_idx'),
+        ),
+        migrations.RunPython(backfill_draft_participants, reverse_code=migrations.RunPython.noop),
+    ]
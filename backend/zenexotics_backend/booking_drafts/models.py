@@ -1,5 +1,12 @@
+import copy
+
+from django.conf import settings
 from django.db import models
 
+from booking_drafts.participants import existing_participant_id
+from core.pricing_fingerprint import pricing_components, pricing_fingerprint
+
+
 class BookingDraft(models.Model):
     MODIFIER_CHOICES = [
         ('PROFESSIONAL', 'Professional'),
@@ -14,12 +21,57 @@ class BookingDraft(models.Model):
 
     draft_id = models.AutoField(primary_key=True)
     booking = models.ForeignKey('bookings.Booking', on_delete=models.CASCADE, related_name='drafts', null=True, blank=True)
+    # Copies of draft_data's client_id and professional_id, indexed for participant lookups
+    client = models.ForeignKey('clients.Client', on_delete=models.SET_NULL, related_name='booking_drafts', null=True, blank=True)
+    professional = models.ForeignKey('professionals.Professional', on_delete=models.SET_NULL, related_name='booking_drafts', null=True, blank=True)
     draft_data = models.JSONField()  # Using Django's built-in JSONField
     original_status = models.CharField(max_length=100, null=True)  # Store original booking status
     last_modified_by = models.CharField(max_length=50, choices=MODIFIER_CHOICES)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every write; clients send it back so stale edits are rejected (see draft_store)
+    version = models.PositiveIntegerField(default=1)
+    # Hash of the draft's service, pets and occurrence rates; compared with the booking's
+    pricing_fingerprint = models.CharField(max_length=64, blank=True, default='')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_state()
+        return instance
+
+    def remember_loaded_state(self):
+        """Snapshot what is stored, so draft_store can write only what changed since."""
+        # Deferred fields stay unloaded; draft_store then writes the whole document
+        self._loaded_version = self.__dict__.get('version')
+        self._loaded_draft_data = copy.deepcopy(self.__dict__.get('draft_data'))
+
+    def sync_participants(self):
+        """
+        Copy client_id and professional_id from draft_data to their columns.
+        Ids that no longer exist are stored as null, as backfill_participants() does.
+        """
+        draft_data = self.draft_data if isinstance(self.draft_data, dict) else {}
+        self.client_id = existing_participant_id(
+            self._meta.get_field('client').related_model, draft_data.get('client_id'), self.client_id
+        )
+        self.professional_id = existing_participant_id(
+            self._meta.get_field('professional').related_model, draft_data.get('professional_id'), self.professional_id
+        )
+
+    def save(self, *args, **kwargs):
+        self.pricing_fingerprint = pricing_fingerprint(pricing_components(self.draft_data))
+        self.sync_participants()
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'version', 'pricing_fingerprint', 'client', 'professional'
+                }
+        super().save(*args, **kwargs)
+        self.remember_loaded_state()
 
     def __str__(self):
         if self.booking is None:
@@ -29,3 +81,25 @@ class BookingDraft(models.Model):
     class Meta:
         db_table = 'booking_drafts'
         ordering = ['-updated_at']
+        indexes = [
+            # In-progress draft lookup by participants (find_conversation_draft, CreateBookingView)
+            models.Index(fields=['professional', 'client', 'status'], name='booking_draft_pro_client_idx'),
+        ]
+
+
+class BookingDraftChange(models.Model):
+    """One versioned write to a draft: which sections changed and the patch paths applied."""
+    draft = models.ForeignKey(BookingDraft, on_delete=models.CASCADE, related_name='changes')
+    version = models.PositiveIntegerField()
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    sections = models.JSONField(default=list)  # Top-level draft_data keys the write touched
+    operations = models.JSONField(default=list)  # [op, path] pairs; values are not kept
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Draft {self.draft_id} v{self.version}: {', '.join(self.sections)}"
+
+    class Meta:
+        db_table = 'booking_draft_changes'
+        ordering = ['-version']
+        unique_together = ('draft', 'version')
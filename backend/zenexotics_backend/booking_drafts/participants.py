@@ -0,0 +1,78 @@
+"""
+The client and professional columns of BookingDraft.
+
+A draft's participants are recorded in draft_data (client_id and
+professional_id) and copied to indexed foreign keys on every save, so
+drafts are looked up by participant with an index probe rather than by
+JSON key lookups over every in-progress draft. Drafts written before the
+columns existed are filled in by backfill_participants(), run from the
+migration that adds them and from the backfill_draft_participants command.
+"""
+
+
+def participant_id(value):
+    """A client or professional id from draft_data, or None if it isn't one."""
+    if value in (None, '') or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def existing_participant_id(model, value, current_id=None):
+    """
+    participant_id(value) if model has a row with that primary key, else
+    None, so a draft pointing at a removed client or professional saves
+    with a null column. current_id, the id already in the column, is
+    known to exist and is not looked up again.
+    """
+    candidate_id = participant_id(value)
+    if candidate_id is None or candidate_id == current_id:
+        return candidate_id
+    return candidate_id if model.objects.filter(pk=candidate_id).exists() else None
+
+
+def backfill_participants(draft_model, client_model, professional_model, batch_size=500):
+    """
+    Set every draft's client and professional from its draft_data. Ids that
+    no longer exist are left null. Returns the number of drafts updated.
+    Takes the models so migrations can pass their historical ones.
+    """
+    updated = 0
+    drafts = draft_model.objects.only('draft_id', 'draft_data', 'client_id', 'professional_id').order_by('draft_id')
+    batch = []
+    for draft in drafts.iterator(chunk_size=batch_size):
+        batch.append(draft)
+        if len(batch) == batch_size:
+            updated += _backfill_batch(draft_model, client_model, professional_model, batch)
+            batch = []
+    if batch:
+        updated += _backfill_batch(draft_model, client_model, professional_model, batch)
+    return updated
+
+
+def _backfill_batch(draft_model, client_model, professional_model, drafts):
+    wanted = {}
+    for draft in drafts:
+        draft_data = draft.draft_data if isinstance(draft.draft_data, dict) else {}
+        wanted[draft.pk] = (participant_id(draft_data.get('client_id')), participant_id(draft_data.get('professional_id')))
+
+    client_ids = set(client_model.objects.filter(
+        id__in={client_id for client_id, _ in wanted.values() if client_id}
+    ).values_list('id', flat=True))
+    professional_ids = set(professional_model.objects.filter(
+        professional_id__in={professional_id for _, professional_id in wanted.values() if professional_id}
+    ).values_list('professional_id', flat=True))
+
+    changed = []
+    for draft in drafts:
+        client_id, professional_id = wanted[draft.pk]
+        client_id = client_id if client_id in client_ids else None
+        professional_id = professional_id if professional_id in professional_ids else None
+        if (draft.client_id, draft.professional_id) != (client_id, professional_id):
+            draft.client_id, draft.professional_id = client_id, professional_id
+            changed.append(draft)
+
+    draft_model.objects.bulk_update(changed, ['client', 'professional'])
+    return len(changed)
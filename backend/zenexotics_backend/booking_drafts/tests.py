@@ -1,3 +1,471 @@
-from django.test import TestCase
+from collections import OrderedDict
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from booking_drafts.draft_store import (
+    MAX_PATCH_OPERATIONS, DraftVersionConflict, apply_draft_patch, build_operations, diff_draft_data, save_draft
+)
+from booking_drafts.models import BookingDraft
+from bookings.constants import BookingStates
+from bookings.models import Booking
+from clients.models import Client
+from core.pricing import PricingInterval, PricingSnapshot, price_intervals
+from core.recurrence import RecurrenceLimitExceeded, RecurrenceRule, expand_recurrence
+from professionals.models import Professional
+from service_rates.models import ServiceRate
+from services.models import Service
+from users.models import User
+
+
+class PriceIntervalsTests(APITestCase):
+    """Batch pricing returns calculate_occurrence_rates()'s breakdown for every interval."""
+
+    def setUp(self):
+        self.snapshot = PricingSnapshot(
+            service_name='Dog Walking',
+            unit_of_time='1 Hour',
+            base_rate=Decimal('20.00'),
+            additional_animal_rate=Decimal('5.00'),
+            applies_after=1,
+            holiday_rate=Decimal('10.00'),
+            additional_rates=[('Medication', None, Decimal('3.50'))]
+        )
+
+    def test_breakdown(self):
+        day = date(2025, 3, 3)
+        results = price_intervals(self.snapshot, [
+            PricingInterval(day, day, time(9, 0), time(10, 30)),
+            PricingInterval(day, day + timedelta(days=1), time(22, 0), time(1, 0)),
+        ], num_pets=3)
+
+        self.assertEqual(results[0]['multiple'], 1.5)
+        self.assertEqual(Decimal(results[0]['base_total']), Decimal('30'))
+        self.assertEqual(Decimal(results[0]['calculated_cost']), Decimal('43.50'))
+        self.assertEqual(results[0]['rates'], OrderedDict([
+            ('base_rate', '20.00'),
+            ('additional_animal_rate', '5.00'),
+            ('additional_animal_rate_total', '10.00'),
+            ('additional_animal_rate_applies', 2),
+            ('applies_after', 1),
+            ('unit_of_time', '1 Hour'),
+            ('holiday_rate', '10.00'),
+            ('holiday_days', 0),
+            ('additional_rates', [OrderedDict([('title', 'Medication'), ('description', ''), ('amount', '3.50')])])
+        ]))
+        # Spans midnight
+        self.assertEqual(results[1]['multiple'], 3.0)
+        self.assertEqual(Decimal(results[1]['calculated_cost']), Decimal('73.50'))
+
+    def test_per_visit_and_single_pet(self):
+        self.snapshot.unit_of_time = 'Per Visit'
+        day = date(2025, 3, 3)
+        [result] = price_intervals(self.snapshot, [PricingInterval(day, day, time(9, 0), time(17, 0))], num_pets=1)
+
+        self.assertEqual(result['multiple'], 1.0)
+        self.assertEqual(result['calculated_cost'], '23.50')
+        self.assertEqual(result['rates']['additional_animal_rate_applies'], 0)
+
+
+def walk_recurring_dates(start_date, end_date, days_of_week, frequency):
+    """The day-by-day walk the recurring draft view used before core.recurrence."""
+    current_date = start_date
+    recurring_dates = []
+    week_count = 0
+    while current_date <= end_date:
+        if current_date.weekday() in days_of_week and not (frequency == 'bi-weekly' and week_count % 2 != 0):
+            recurring_dates.append(current_date)
+        current_date += timedelta(days=1)
+        if current_date.weekday() == 0:
+            week_count += 1
+    return recurring_dates
+
+
+class RecurrenceRuleTests(SimpleTestCase):
+    """Recurring schedules are expanded arithmetically and lazily."""
+
+    def test_weekly_and_bi_weekly_match_day_walk(self):
+        for start_offset in range(7):
+            start_date = date(2025, 3, 3) + timedelta(days=start_offset)
+            for length in (0, 1, 6, 13, 20, 90, 400):
+                end_date = start_date + timedelta(days=length)
+                for days_of_week in ([0], [6], [1, 3, 5], list(range(7)), []):
+                    for frequency in ('weekly', 'bi-weekly'):
+                        expected = walk_recurring_dates(start_date, end_date, days_of_week, frequency)
+                        rule = RecurrenceRule(start_date, end_date, days_of_week, frequency)
+                        self.assertEqual(list(rule.dates()), expected)
+                        self.assertEqual(rule.count(), len(expected))
+
+    def test_monthly(self):
+        # Wednesday 12 March 2025 is in the month's second week
+        rule = RecurrenceRule(date(2025, 3, 12), date(2025, 6, 30), [2, 3], 'monthly')
+        self.assertEqual(list(rule.dates()), [
+            date(2025, 3, 12), date(2025, 3, 13),
+            date(2025, 4, 9), date(2025, 4, 10),
+            date(2025, 5, 8), date(2025, 5, 14),
+            date(2025, 6, 11), date(2025, 6, 12),
+        ])
+        self.assertEqual(rule.count(), 8)
+
+        # A start date in the fifth week repeats on the month's last selected day
+        rule = RecurrenceRule(date(2025, 1, 29), date(2025, 3, 31), [2], 'monthly')
+        self.assertEqual(list(rule.dates()), [date(2025, 1, 29), date(2025, 2, 26), date(2025, 3, 26)])
+
+    def test_monthly_count_matches_dates(self):
+        for start_date in (date(2024, 1, 1), date(2024, 2, 29), date(2025, 3, 12), date(2025, 5, 31)):
+            for length in (0, 5, 27, 31, 62, 400):
+                end_date = start_date + timedelta(days=length)
+                for days_of_week in ([0], [6], [1, 3, 5], list(range(7)), []):
+                    rule = RecurrenceRule(start_date, end_date, days_of_week, 'monthly')
+                    self.assertEqual(rule.count(), len(list(rule.dates())))
+
+    def test_monthly_count_over_the_whole_calendar(self):
+        rule = RecurrenceRule(date(1, 1, 1), date(9999, 11, 30), list(range(7)), 'monthly')
+        # Every month of every year but December 9999, seven dates each
+        self.assertEqual(rule.count(), (9999 * 12 - 1) * 7)
+        with self.assertRaises(RecurrenceLimitExceeded):
+            expand_recurrence(rule)
+
+    def test_preview_and_limit(self):
+        rule = RecurrenceRule(date(2025, 1, 1), date(2035, 12, 31), list(range(7)), 'weekly')
+        self.assertEqual(rule.preview(3), [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)])
+        self.assertEqual(rule.count(), 4017)
+
+        with self.assertRaises(RecurrenceLimitExceeded):
+            expand_recurrence(rule)
+        self.assertEqual(len(list(expand_recurrence(rule, max_count=None))), 4017)
+
+    def test_invalid_rules(self):
+        for args in (
+            (date(2025, 3, 2), date(2025, 3, 1), [0], 'weekly'),
+            (date(2025, 3, 1), date(2025, 3, 2), [7], 'weekly'),
+            (date(2025, 3, 1), date(2025, 3, 2), ['1'], 'weekly'),
+            (date(2025, 3, 1), date(2025, 3, 2), [0], 'daily'),
+        ):
+            with self.assertRaises(ValueError):
+                RecurrenceRule(*args)
+
+
+class DraftPatchTests(SimpleTestCase):
+    """Draft edits are diffed into JSON-patch style operations that reproduce the new draft."""
+
+    old = {
+        'status': 'Pending',
+        'pets': [{'name': 'Rex'}, {'name': 'Fido'}],
+        'occurrences': [{'start_date': '2025-03-03', 'rates': {'base_rate': '20.00'}}] * 3,
+        'notes_from_pro': 'Bring treats',
+        'cost_summary': {'subtotal': 60.0},
+    }
+
+    def assertRoundTrip(self, old, new, operations):
+        self.assertEqual(apply_draft_patch(old, operations), new)
+
+    def test_diff(self):
+        new = {
+            'status': 'Pending',
+            'pets': [{'name': 'Rex'}],
+            'occurrences': [
+                {'start_date': '2025-03-03', 'rates': {'base_rate': '25.00'}},
+                {'start_date': '2025-03-03', 'rates': {'base_rate': '20.00'}},
+                {'start_date': '2025-03-03', 'rates': {'base_rate': '20.00'}},
+                {'start_date': '2025-03-10', 'rates': {'base_rate': '20.00'}},
+            ],
+            'cost_summary': {'subtotal': 90.0},
+            'conversation_id': 7,
+        }
+        operations = diff_draft_data(self.old, new)
+        self.assertEqual(operations, [
+            {'op': 'remove', 'path': '/notes_from_pro'},
+            {'op': 'remove', 'path': '/pets/1'},
+            {'op': 'replace', 'path': '/occurrences/0/rates/base_rate', 'value': '25.00'},
+            {'op': 'add', 'path': '/occurrences/-', 'value': new['occurrences'][3]},
+            {'op': 'replace', 'path': '/cost_summary/subtotal', 'value': 90.0},
+            {'op': 'add', 'path': '/conversation_id', 'value': 7},
+        ])
+        self.assertRoundTrip(self.old, new, operations)
+        self.assertEqual(diff_draft_data(self.old, self.old), [])
+
+    def test_large_edits_are_coarsened_to_sections(self):
+        new = dict(self.old, occurrences=[
+            {'start_date': f'2025-04-{day:02d}', 'rates': {'base_rate': '20.00'}} for day in range(1, 29)
+        ] * 2)
+        operations = build_operations(self.old, new)
+        self.assertLessEqual(len(operations), MAX_PATCH_OPERATIONS)
+        self.assertEqual(operations, [{'op': 'replace', 'path': '/occurrences', 'value': new['occurrences']}])
+        self.assertRoundTrip(self.old, new, operations)
+
+    def test_escaped_keys(self):
+        new = dict(self.old, service_details={'a/b~c': 1})
+        self.assertRoundTrip(self.old, new, build_operations(self.old, new))
+
+
+class UpdateBookingDraftRecurringViewTests(APITestCase):
+    """Recurring drafts are priced in one pass: the query count does not grow with the schedule."""
+
+    def setUp(self):
+        self.pro_user = User.objects.create_user(email='pro@example.com', password='testpass123', name='Pro')
+        self.professional = Professional.objects.create(user=self.pro_user)
+        client = Client.objects.get(
+            user=User.objects.create_user(email='client@example.com', password='testpass123', name='Client')
+        )
+        self.service = Service.objects.create(
+            professional=self.professional,
+            service_name='Dog Walking',
+            description='Walks around the block',
+            animal_types={'Dogs': 'Domestic'},
+            base_rate=Decimal('20.00'),
+            additional_animal_rate=Decimal('5.00'),
+            holiday_rate=Decimal('10.00'),
+            unit_of_time='1 Hour',
+            moderation_status='APPROVED'
+        )
+        ServiceRate.objects.create(service=self.service, title='Medication', description='', rate=Decimal('3.50'))
+        booking = Booking.objects.create(
+            client=client,
+            professional=self.professional,
+            service_id=self.service,
+            status=BookingStates.PENDING_INITIAL_PROFESSIONAL_CHANGES
+        )
+        self.draft = BookingDraft.objects.create(
+            booking=booking,
+            draft_data={
+                'service_details': {'service_type': 'Dog Walking', 'service_id': self.service.service_id},
+                'pets': [{'name': 'Rex'}, {'name': 'Fido'}]
+            },
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+
+    def post_schedule(self, end_date, expected_status=200):
+        self.client.force_authenticate(user=self.pro_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/booking_drafts/v1/update-recurring/{self.draft.draft_id}/', {
+                'startDate': '2025-03-03',
+                'endDate': end_date,
+                'daysOfWeek': [0, 2, 4],
+                'frequency': 'weekly',
+                'startTime': '09:00',
+                'endTime': '10:00'
+            }, format='json')
+        self.assertEqual(response.status_code, expected_status)
+        return response.json().get('draft_data'), len(queries)
+
+    def test_query_count_is_constant(self):
+        short_data, short_queries = self.post_schedule('2025-03-09')
+        long_data, long_queries = self.post_schedule('2025-06-29')
+
+        self.assertEqual(len(short_data['occurrences']), 3)
+        self.assertEqual(len(long_data['occurrences']), 51)
+        self.assertEqual(short_queries, long_queries)
+
+        occurrence = long_data['occurrences'][0]
+        self.assertEqual(occurrence['start_date'], '2025-03-03')
+        self.assertEqual(Decimal(occurrence['calculated_cost']), Decimal('28.50'))
+        self.assertEqual(occurrence['rates']['additional_animal_rate_applies'], 1)
+
+    def test_schedule_past_occurrence_limit_is_rejected(self):
+        self.post_schedule('2035-03-03', expected_status=400)
+
+        self.draft.refresh_from_db()
+        self.assertNotIn('occurrences', self.draft.draft_data)
+
+    def test_preview(self):
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.post('/api/booking_drafts/v1/recurring-preview/', {
+            'startDate': '2025-03-03',
+            'endDate': '2035-03-03',
+            'daysOfWeek': [0, 2, 4],
+            'frequency': 'bi-weekly',
+            'limit': 4
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dates'], ['2025-03-03', '2025-03-05', '2025-03-07', '2025-03-17'])
+        self.assertEqual(response.json()['total_count'], 783)
+        self.assertTrue(response.json()['exceeds_max_occurrences'])
+
+        response = self.client.post('/api/booking_drafts/v1/recurring-preview/', {'startDate': '2025-03-03'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_preview_far_future_end_date_is_rejected(self):
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.post('/api/booking_drafts/v1/recurring-preview/', {
+            'startDate': '9999-12-01',
+            'endDate': '9999-12-31',
+            'daysOfWeek': [0, 6],
+            'frequency': 'weekly'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_preview_counts_long_monthly_range(self):
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.post('/api/booking_drafts/v1/recurring-preview/', {
+            'startDate': '0001-01-01',
+            'endDate': '9999-12-31',
+            'daysOfWeek': [0],
+            'frequency': 'monthly',
+            'limit': 1
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dates'], ['0001-01-01'])
+        self.assertEqual(response.json()['total_count'], 9999 * 12)
+        self.assertTrue(response.json()['exceeds_max_occurrences'])
+
+    def test_stale_version_is_rejected(self):
+        self.post_schedule('2025-03-09')
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.version, 2)
+
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.post(f'/api/booking_drafts/v1/update-recurring/{self.draft.draft_id}/', {
+            'startDate': '2025-03-03',
+            'endDate': '2025-03-16',
+            'daysOfWeek': [0],
+            'frequency': 'weekly',
+            'startTime': '09:00',
+            'endTime': '10:00'
+        }, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['current_version'], 2)
+
+        response = self.client.post(
+            f'/api/booking_drafts/v1/update-recurring/{self.draft.draft_id}/?changes_only=true', {
+                'startDate': '2025-03-03',
+                'endDate': '2025-03-16',
+                'daysOfWeek': [0],
+                'frequency': 'weekly',
+                'startTime': '09:00',
+                'endTime': '10:00',
+                'draft_version': 2
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], 3)
+        self.assertEqual(response['ETag'], '"3"')
+        self.assertNotIn('draft_data', response.json())
+        self.assertIn('occurrences', response.json()['changed_sections'])
+        self.assertNotIn('pets', response.json()['changed_sections'])
+
+
+class SaveDraftTests(APITestCase):
+    """Drafts are written as versioned patches with a change log."""
+
+    def setUp(self):
+        self.pro_user = User.objects.create_user(email='pro@example.com', password='testpass123', name='Pro')
+        self.draft = BookingDraft.objects.create(
+            draft_data={
+                'status': 'Pending',
+                'pets': [{'name': 'Rex'}],
+                'occurrences': [{'start_date': '2025-03-03', 'calculated_cost': '20.00'}] * 20
+            },
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+
+    def test_writes_only_the_changes(self):
+        draft = BookingDraft.objects.get(pk=self.draft.pk)
+        draft.draft_data['pets'].append({'name': 'Fido'})
+        draft.draft_data['occurrences'][4]['calculated_cost'] = '25.00'
+        draft.status = 'FINALIZED'
+
+        with CaptureQueriesContext(connection) as queries:
+            change = save_draft(draft, changed_by=self.pro_user, expected_version=1)
+        update = next(query['sql'] for query in queries if query['sql'].startswith('UPDATE "booking_drafts"'))
+        self.assertNotIn('2025-03-03', update)
+
+        self.assertEqual(change.version, 2)
+        self.assertEqual(change.changed_sections, {
+            'pets': [{'name': 'Rex'}, {'name': 'Fido'}],
+            'occurrences': draft.draft_data['occurrences']
+        })
+
+        stored = BookingDraft.objects.get(pk=self.draft.pk)
+        self.assertEqual(stored.draft_data, draft.draft_data)
+        self.assertEqual(stored.version, 2)
+        self.assertEqual(stored.status, 'FINALIZED')
+
+        [entry] = stored.changes.all()
+        self.assertEqual((entry.version, entry.changed_by, entry.sections), (2, self.pro_user, ['occurrences', 'pets']))
+        self.assertEqual(entry.operations, [['add', '/pets/-'], ['replace', '/occurrences/4/calculated_cost']])
+
+    def test_lost_update_is_a_conflict(self):
+        first = BookingDraft.objects.get(pk=self.draft.pk)
+        second = BookingDraft.objects.get(pk=self.draft.pk)
+        first.draft_data['notes_from_pro'] = 'Bring treats'
+        save_draft(first)
+
+        second.draft_data['pets'] = []
+        with self.assertRaises(DraftVersionConflict) as conflict:
+            save_draft(second)
+        self.assertEqual(conflict.exception.current_version, 2)
+        with self.assertRaises(DraftVersionConflict):
+            save_draft(first, expected_version=1)
+
+        stored = BookingDraft.objects.get(pk=self.draft.pk)
+        self.assertEqual(stored.draft_data['pets'], [{'name': 'Rex'}])
+        self.assertEqual(stored.draft_data['notes_from_pro'], 'Bring treats')
+
+
+class DraftParticipantsTests(APITestCase):
+    """A draft's client and professional columns follow its draft_data."""
+
+    def setUp(self):
+        self.professional = Professional.objects.create(
+            user=User.objects.create_user(email='pro@example.com', password='testpass123', name='Pro')
+        )
+        self.booking_client = Client.objects.get(
+            user=User.objects.create_user(email='client@example.com', password='testpass123', name='Client')
+        )
+        self.draft_data = {'client_id': self.booking_client.id, 'professional_id': self.professional.professional_id}
+
+    def test_kept_in_sync(self):
+        draft = BookingDraft.objects.create(draft_data=self.draft_data, last_modified_by='PROFESSIONAL', status='IN_PROGRESS')
+        self.assertEqual((draft.client, draft.professional), (self.booking_client, self.professional))
+
+        draft = BookingDraft.objects.get(pk=draft.pk)
+        del draft.draft_data['client_id']
+        save_draft(draft)
+        stored = BookingDraft.objects.get(pk=draft.pk)
+        self.assertEqual((stored.client_id, stored.professional_id), (None, self.professional.professional_id))
+
+    def test_removed_participant_is_stored_as_null(self):
+        draft = BookingDraft.objects.create(
+            draft_data=dict(self.draft_data, client_id=999999), last_modified_by='PROFESSIONAL', status='IN_PROGRESS'
+        )
+        self.assertEqual((draft.client_id, draft.professional_id), (None, self.professional.professional_id))
+
+        # The client is removed while the draft still names it
+        draft.draft_data['client_id'] = self.booking_client.id
+        draft.save()
+        self.booking_client.delete()
+        draft = BookingDraft.objects.get(pk=draft.pk)
+        draft.draft_data['notes_from_pro'] = 'Still editable'
+        save_draft(draft)
+
+        stored = BookingDraft.objects.get(pk=draft.pk)
+        self.assertEqual((stored.client_id, stored.version), (None, 3))
+
+    def test_backfill(self):
+        # bulk_create skips save(), as rows written before the columns existed
+        BookingDraft.objects.bulk_create([
+            BookingDraft(draft_data=self.draft_data, last_modified_by='PROFESSIONAL', status='IN_PROGRESS'),
+            BookingDraft(draft_data=dict(self.draft_data, client_id=999999), last_modified_by='PROFESSIONAL', status='IN_PROGRESS'),
+            BookingDraft(draft_data={'client_id': 'abc'}, last_modified_by='PROFESSIONAL', status='IN_PROGRESS'),
+        ])
+
+        call_command('backfill_draft_participants', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(BookingDraft.objects.order_by('draft_id').values_list('client_id', 'professional_id')),
+            [
+                (self.booking_client.id, self.professional.professional_id),
+                (None, self.professional.professional_id),
+                (None, None),
+            ]
+        )
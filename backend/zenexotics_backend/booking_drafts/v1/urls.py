@@ -7,6 +7,8 @@ from .views import (
     UpdateBookingRatesView,
     UpdateBookingDraftMultipleDaysView,
     UpdateBookingDraftRecurringView,
+    RecurringPreviewView,
+    DraftChangesView,
     GetBookingDraftDatesAndTimesView,
     CreateDraftFromBookingView,
     UpdateNotesFromProView,
@@ -21,6 +23,8 @@ urlpatterns = [
     path('update-rates/<str:draft_id>/', UpdateBookingRatesView.as_view(), name='update-booking-rates'),
     path('update-multiple-days/<str:draft_id>/', UpdateBookingDraftMultipleDaysView.as_view(), name='update-multiple-days'),
     path('update-recurring/<str:draft_id>/', UpdateBookingDraftRecurringView.as_view(), name='update-recurring'),
+    path('recurring-preview/', RecurringPreviewView.as_view(), name='recurring-preview'),
+    path('<int:draft_id>/changes/', DraftChangesView.as_view(), name='draft-changes'),
     path('<int:draft_id>/dates_and_times/', GetBookingDraftDatesAndTimesView.as_view(), name='get_booking_draft_dates_and_times'),
     path('create-from-booking/<int:booking_id>/', CreateDraftFromBookingView.as_view(), name='create-draft-from-booking'),
     path('update-notes-from-pro/', UpdateNotesFromProView.as_view(), name='update-notes-from-pro'),
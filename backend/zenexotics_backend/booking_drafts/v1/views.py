@@ -9,6 +9,7 @@ from django.shortcuts import get_object_or_404
 from bookings.models import Booking, BookingStates
 from booking_pets.models import BookingPets
 from booking_drafts.models import BookingDraft
+from booking_drafts.draft_store import DraftVersionConflict, save_draft
 from pets.models import Pet
 from professionals.models import Professional
 from clients.models import Client
@@ -20,11 +21,20 @@ from decimal import Decimal
 from collections import OrderedDict
 import json
 from rest_framework.renderers import JSONRenderer
-from datetime import datetime, date, time, timedelta
+from datetime import datetime, date, time
 from interaction_logs.models import InteractionLog
 from engagement_logs.models import EngagementLog
 from error_logs.models import ErrorLog
-from core.time_utils import convert_to_utc, get_formatted_times
+from core.time_utils import convert_to_utc, get_formatted_times, get_user_time_settings
+from core.pricing import PricingInterval, PricingSnapshot, price_intervals
+from core.recurrence import MAX_RECURRING_OCCURRENCES, RecurrenceRule, expand_recurrence
+from core.pricing_fingerprint import (
+    booking_pricing_components,
+    diff_pricing_components,
+    pricing_components,
+    pricing_fingerprint,
+    store_booking_fingerprint
+)
 from users.models import UserSettings
 from user_addresses.models import Address, AddressType
 from core.constants import STATE_TAX_RATES
@@ -63,6 +73,38 @@ def ordered_dict_hook(dct):
         return OrderedDict(dct['items'])
     return dct
 
+def expected_draft_version(request):
+    """The draft version the client last saw, from If-Match or draft_version; None if not sent."""
+    version = request.headers.get('If-Match') or request.data.get('draft_version')
+    if version in (None, ''):
+        return None
+    try:
+        return int(str(version).strip('W/"'))
+    except ValueError:
+        return None
+
+def draft_conflict_response(conflict):
+    """409 for a draft saved by someone else since the client loaded it."""
+    logger.info(f"MBA5390 - Rejected stale draft write: {conflict}")
+    return Response({
+        'error': 'This booking draft was changed by someone else. Reload it and try again.',
+        'current_version': conflict.current_version
+    }, status=status.HTTP_409_CONFLICT)
+
+def draft_response(request, response_data, draft_change, status_code=status.HTTP_200_OK):
+    """
+    A draft view's response with the new version and the changed sections.
+    With ?changes_only=true the full draft_data is left out.
+    """
+    response_data['version'] = draft_change.version
+    response_data['changed_sections'] = draft_change.changed_sections
+    response_data['removed_sections'] = draft_change.removed_sections
+    if request.query_params.get('changes_only') == 'true':
+        response_data.pop('draft_data', None)
+    response = Response(response_data, status=status_code)
+    response['ETag'] = f'"{draft_change.version}"'
+    return response
+
 def serialize_rates(rates):
     """Safely serialize rates, handling cases where rates don't exist"""
     try:
@@ -191,76 +233,17 @@ def pets_are_different(current_pets, new_pets):
     
     return current_set != new_set
 
-def has_changes_from_original(booking, draft_data):
-    """Compare all fields between booking and draft data to determine if there are any changes"""
-    try:
-        # Compare service details
-        if booking.service_id and 'service_details' in draft_data:
-            if booking.service_id.service_name != draft_data['service_details']['service_type']:
-                logger.info(f"Service changed from {booking.service_id.service_name} to {draft_data['service_details']['service_type']}")
-                return True
-
-        # Compare pets
-        current_pets = set([
-            (bp.pet.pet_id, bp.pet.name, bp.pet.species, bp.pet.breed)
-            for bp in booking.booking_pets.select_related('pet').all()
-        ])
-        draft_pets = set([
-            (pet['pet_id'], pet['name'], pet['species'], pet['breed'])
-            for pet in draft_data.get('pets', [])
-        ])
-        if current_pets != draft_pets:
-            logger.info("Pets have changed")
-            return True
-
-        # Always check for rate differences in occurrences
-        if 'occurrences' in draft_data:
-            for draft_occ in draft_data['occurrences']:
-                # Get the corresponding booking occurrence and its details
-                try:
-                    occurrence = BookingOccurrence.objects.get(
-                        occurrence_id=draft_occ['occurrence_id'],
-                        booking=booking
-                    )
-                    booking_details = occurrence.booking_details.first()
-                    
-                    if booking_details:
-                        # Compare rates - convert everything to Decimal for accurate comparison
-                        original_base_rate = Decimal(str(booking_details.base_rate))
-                        original_additional_rate = Decimal(str(booking_details.additional_pet_rate))
-                        original_holiday_rate = Decimal(str(booking_details.holiday_rate))
-                        original_applies_after = int(booking_details.applies_after)
-
-                        # Clean the draft values by removing '$' and whitespace
-                        draft_base_rate = Decimal(str(draft_occ['rates']['base_rate']).replace('$', '').strip())
-                        draft_additional_rate = Decimal(str(draft_occ['rates']['additional_animal_rate']).replace('$', '').strip())
-                        draft_holiday_rate = Decimal(str(draft_occ['rates']['holiday_rate']).replace('$', '').strip())
-                        draft_applies_after = int(str(draft_occ['rates']['applies_after']))
-
-                        # Log the comparison
-                        logger.info(f"Comparing rates for occurrence {draft_occ['occurrence_id']}:")
-                        logger.info(f"Original - Base: {original_base_rate}, Additional: {original_additional_rate}, Holiday: {original_holiday_rate}, Applies After: {original_applies_after}")
-                        logger.info(f"Draft - Base: {draft_base_rate}, Additional: {draft_additional_rate}, Holiday: {draft_holiday_rate}, Applies After: {draft_applies_after}")
-
-                        # Compare the values
-                        if (original_base_rate != draft_base_rate or
-                            original_additional_rate != draft_additional_rate or
-                            original_holiday_rate != draft_holiday_rate or
-                            original_applies_after != draft_applies_after):
-                            logger.info("Rates have changed")
-                            logger.info(f"Base rate changed: {original_base_rate} != {draft_base_rate}")
-                            logger.info(f"Additional rate changed: {original_additional_rate} != {draft_additional_rate}")
-                            logger.info(f"Holiday rate changed: {original_holiday_rate} != {draft_holiday_rate}")
-                            logger.info(f"Applies after changed: {original_applies_after} != {draft_applies_after}")
-                            return True
-                except BookingOccurrence.DoesNotExist:
-                    logger.warning(f"Occurrence {draft_occ['occurrence_id']} not found")
-                    continue
-
-        return False
-    except Exception as e:
-        logger.error(f"Error comparing booking with draft: {e}")
-        return True  # Default to True if comparison fails
+def has_changes_from_original(booking, draft):
+    """
+    Whether a draft changes its booking's service, pets or occurrence rates.
+    Compares the two pricing fingerprints; the booking's is computed and
+    stored first if it is missing (bookings written before fingerprints, or
+    changed outside a draft since).
+    """
+    if not booking.pricing_fingerprint:
+        store_booking_fingerprint(booking)
+    draft_fingerprint = draft.pricing_fingerprint or pricing_fingerprint(pricing_components(draft.draft_data))
+    return booking.pricing_fingerprint != draft_fingerprint
 
 def update_draft_with_service(booking, service_id=None, occurrence_services=None):
     """
@@ -388,7 +371,7 @@ def update_draft_with_service(booking, service_id=None, occurrence_services=None
         
         # Save draft
         draft.draft_data = draft_data
-        draft.save()
+        save_draft(draft)
         
         return draft_data
         
@@ -614,6 +597,10 @@ class UpdateBookingPetsView(APIView):
                     self.start_time = start_time
                     self.end_time = end_time
             
+            # Service rates and the client's time settings are loaded once for all occurrences
+            pricing_snapshot = PricingSnapshot.from_service(service)
+            time_settings = get_user_time_settings(booking.client.user.id)
+
             # Process each occurrence
             for occurrence_data in existing_occurrences:
                 try:
@@ -634,14 +621,15 @@ class UpdateBookingPetsView(APIView):
                     )
 
                     # Calculate rates using the new service
-                    rate_data = calculate_occurrence_rates(temp_occurrence, service, num_pets)
+                    rate_data = price_intervals(pricing_snapshot, [temp_occurrence], num_pets)[0]
                     if not rate_data:
                         raise Exception(f"Failed to calculate rates for occurrence {occurrence_data['occurrence_id']}")
 
                     # Get formatted times
                     formatted_times = get_formatted_times(
                         occurrence=temp_occurrence,
-                        user_id=booking.client.user.id
+                        user_id=booking.client.user.id,
+                        time_settings=time_settings
                     )
 
                     # Create occurrence data preserving dates and times but with new rates
@@ -837,6 +825,10 @@ class UpdateServiceTypeView(APIView):
                     self.start_time = start_time
                     self.end_time = end_time
             
+            # Service rates and the client's time settings are loaded once for all occurrences
+            pricing_snapshot = PricingSnapshot.from_service(service)
+            time_settings = get_user_time_settings(booking.client.user.id)
+
             # Process each occurrence
             for occurrence_data in existing_occurrences:
                 try:
@@ -857,14 +849,15 @@ class UpdateServiceTypeView(APIView):
                     )
 
                     # Calculate rates using the new service
-                    rate_data = calculate_occurrence_rates(temp_occurrence, service, num_pets)
+                    rate_data = price_intervals(pricing_snapshot, [temp_occurrence], num_pets)[0]
                     if not rate_data:
                         raise Exception(f"Failed to calculate rates for occurrence {occurrence_data['occurrence_id']}")
 
                     # Get formatted times
                     formatted_times = get_formatted_times(
                         occurrence=temp_occurrence,
-                        user_id=booking.client.user.id
+                        user_id=booking.client.user.id,
+                        time_settings=time_settings
                     )
 
                     # Create occurrence data preserving dates and times but with new rates
@@ -924,15 +917,17 @@ class UpdateServiceTypeView(APIView):
 
             # Save updated draft data
             draft.draft_data = draft_data
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             logger.info(f"MBA9999 - Successfully updated booking draft for booking {booking_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'booking_status': draft_data['status'],
                 'draft_data': draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA9999 - Error in UpdateServiceTypeView: {str(e)}")
             logger.error(f"MBA9999 - Full traceback: {traceback.format_exc()}")
@@ -1096,14 +1091,16 @@ class UpdateBookingOccurrencesView(APIView):
 
             # Save the draft
             draft.draft_data = draft_data
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             logger.info(f"MBA1644 - Successfully updated booking draft for booking {booking_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA1644 - Error in UpdateBookingOccurrencesView: {str(e)}")
             logger.error(f"MBA1644 - Full error traceback: {traceback.format_exc()}")
@@ -1321,7 +1318,7 @@ class UpdateBookingDraftPetsAndServicesView(APIView):
                 draft.draft_data['status'] = BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES
 
             # Save the draft
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             # Log the interaction
             InteractionLog.objects.create(
@@ -1339,11 +1336,13 @@ class UpdateBookingDraftPetsAndServicesView(APIView):
             )
 
             logger.info(f"MBA12345 - Successfully updated booking draft {draft_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft.draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA12345 - Error in UpdateBookingDraftPetsAndServicesView: {str(e)}")
             logger.error(f"MBA12345 - Full error traceback: {traceback.format_exc()}")
@@ -1660,7 +1659,7 @@ class UpdateBookingDraftTimeAndDateView(APIView):
                 draft.draft_data['status'] = BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES
 
             # Save the draft
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             # Log the interaction
             InteractionLog.objects.create(
@@ -1675,11 +1674,13 @@ class UpdateBookingDraftTimeAndDateView(APIView):
             )
 
             logger.info(f"MBA1234 - Successfully updated booking draft {draft_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft.draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA1234 - Error in UpdateBookingDraftTimeAndDateView: {str(e)}")
             logger.error(f"MBA1234 - Full error traceback: {traceback.format_exc()}")
@@ -1917,7 +1918,7 @@ class UpdateBookingRatesView(APIView):
                 draft.draft_data['status'] = BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES
             
             # Save the draft
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
             
             # Log the interaction
             InteractionLog.objects.create(
@@ -1936,11 +1937,13 @@ class UpdateBookingRatesView(APIView):
             )
             
             logger.info(f"MBA98765 - Successfully updated booking rates for draft {draft_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft.draft_data
-            })
+            }, draft_change)
             
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA98765 - Error updating booking rates: {str(e)}")
             logger.error(f"MBA98765 - Full error traceback: {traceback.format_exc()}")
@@ -2131,6 +2134,9 @@ class UpdateBookingDraftMultipleDaysView(APIView):
             existing_occurrences = draft.draft_data.get('occurrences', [])
             logger.info(f"MBA5321 - Found {len(existing_occurrences)} existing occurrences")
 
+            # Service rates are loaded once and every date is priced against them
+            pricing_snapshot = PricingSnapshot.from_service(service)
+
             # Parse incoming dates and compare with existing
             new_occurrences = []
             occurrence_counter = 0
@@ -2238,7 +2244,7 @@ class UpdateBookingDraftMultipleDaysView(APIView):
                         temp_occurrence.end_time = end_time_obj
                         
                         # Calculate new rates data
-                        rate_data = calculate_occurrence_rates(temp_occurrence, service, num_pets)
+                        rate_data = price_intervals(pricing_snapshot, [temp_occurrence], num_pets)[0]
                         
                         if rate_data:
                             # Update the matching occurrence with new base rates but preserve user's additional_rates
@@ -2291,7 +2297,7 @@ class UpdateBookingDraftMultipleDaysView(APIView):
                     temp_occurrence.end_time = end_time_obj
                     
                     # Calculate new occurrence data
-                    rate_data = calculate_occurrence_rates(temp_occurrence, service, num_pets)
+                    rate_data = price_intervals(pricing_snapshot, [temp_occurrence], num_pets)[0]
                     
                     if rate_data:
                         # CRITICAL FIX: For new occurrences, always include all service additional rates
@@ -2493,14 +2499,16 @@ class UpdateBookingDraftMultipleDaysView(APIView):
                 logger.info(f"MBA5321 - Final additional rates after restoring user choices: {updated_additional_rates}")
 
             # Save the updated draft
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             logger.info(f"MBA5321 - Successfully updated draft {draft_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft.draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA5321 - Error in UpdateBookingDraftMultipleDaysView: {str(e)}")
             logger.error(f"MBA5321 - Full traceback: {traceback.format_exc()}")
@@ -2565,60 +2573,38 @@ class UpdateBookingDraftRecurringView(APIView):
             start_time = datetime.strptime(recurring_data['startTime'], '%H:%M').time()
             end_time = datetime.strptime(recurring_data['endTime'], '%H:%M').time()
 
-            # Generate all dates between start and end that match the days of week
-            current_date = start_date
-            recurring_dates = []
-            week_count = 0
-
-            while current_date <= end_date:
-                # Check if this date's day of week is selected
-                if current_date.weekday() in days_of_week:
-                    # For bi-weekly, only include if it's an even week number
-                    if frequency == 'bi-weekly' and week_count % 2 != 0:
-                        current_date += timedelta(days=1)
-                        continue
-
-                    recurring_dates.append(current_date)
-
-                current_date += timedelta(days=1)
-                if current_date.weekday() == 0:  # Monday
-                    week_count += 1
+            # Expand the schedule arithmetically; rules past the occurrence limit are rejected up front
+            try:
+                recurring_dates = expand_recurrence(RecurrenceRule(start_date, end_date, days_of_week, frequency))
+            except ValueError as e:
+                logger.error(f"MBA5asdt3f4321 - Invalid recurring schedule: {str(e)}")
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Process each recurring date
+            # Price every date in one pass against a single snapshot of the service
             processed_occurrences = []
-            for date_obj in recurring_dates:
-                try:
-                    # Create temporary occurrence for rate calculation
-                    class TempOccurrence:
-                        def __init__(self, start_date, end_date, start_time, end_time):
-                            self.start_date = start_date
-                            self.end_date = end_date
-                            self.start_time = start_time
-                            self.end_time = end_time
-
-                    temp_occurrence = TempOccurrence(
-                        start_date=date_obj,
-                        end_date=date_obj,
-                        start_time=start_time,
-                        end_time=end_time
-                    )
+            try:
+                intervals = [
+                    PricingInterval(start_date=date_obj, end_date=date_obj, start_time=start_time, end_time=end_time)
+                    for date_obj in recurring_dates
+                ]
+                rate_data_list = price_intervals(PricingSnapshot.from_service(service), intervals, num_pets)
 
-                    # Calculate rates
-                    rate_data = calculate_occurrence_rates(temp_occurrence, service, num_pets)
-                    if not rate_data:
-                        raise Exception(f"Failed to calculate rates for date {date_obj}")
+                # Time settings are loaded once for the whole schedule
+                client_user_id = draft.booking.client.user.id if draft.booking else None
+                time_settings = get_user_time_settings(client_user_id)
 
-                    # Get formatted times
+                for interval, rate_data in zip(intervals, rate_data_list):
                     formatted_times = get_formatted_times(
-                        occurrence=temp_occurrence,
-                        user_id=draft.booking.client.user.id if draft.booking else None
+                        occurrence=interval,
+                        user_id=client_user_id,
+                        time_settings=time_settings
                     )
 
                     # Create occurrence data
                     occurrence = OrderedDict([
                         ('occurrence_id', f"draft_{int(datetime.now().timestamp() * 1000)}_{str(uuid.uuid4())[:8]}"),
-                        ('start_date', date_obj.isoformat()),
-                        ('end_date', date_obj.isoformat()),
+                        ('start_date', interval.start_date.isoformat()),
+                        ('end_date', interval.end_date.isoformat()),
                         ('start_time', start_time.strftime('%H:%M')),
                         ('end_time', end_time.strftime('%H:%M')),
                         ('calculated_cost', rate_data['calculated_cost']),
@@ -2633,12 +2619,12 @@ class UpdateBookingDraftRecurringView(APIView):
 
                     processed_occurrences.append(occurrence)
 
-                except Exception as e:
-                    logger.error(f"MBA5asdt3f4321 - Error processing recurring date: {str(e)}")
-                    return Response(
-                        {"error": f"Error processing recurring date: {str(e)}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            except Exception as e:
+                logger.error(f"MBA5asdt3f4321 - Error processing recurring date: {str(e)}")
+                return Response(
+                    {"error": f"Error processing recurring date: {str(e)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             # Calculate subtotal from all occurrences
             subtotal = Decimal('0')
@@ -2743,14 +2729,16 @@ class UpdateBookingDraftRecurringView(APIView):
 
             # Save the draft
             draft.draft_data = draft_data
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
 
             logger.info(f"MBA5asdt3f4321 - Successfully updated booking draft {draft_id}")
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'draft_data': draft_data
-            })
+            }, draft_change)
 
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA5asdt3f4321 - Error in UpdateBookingDraftRecurringView: {str(e)}")
             logger.error(f"MBA5asdt3f4321 - Full error traceback: {traceback.format_exc()}")
@@ -2759,6 +2747,76 @@ class UpdateBookingDraftRecurringView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class RecurringPreviewView(APIView):
+    """
+    Preview a recurring schedule before applying it to a draft: the first
+    dates and the total number of occurrences, without expanding the rest.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+
+    DEFAULT_PREVIEW_LIMIT = 10
+    MAX_PREVIEW_LIMIT = 100
+
+    def post(self, request):
+        try:
+            limit = min(int(request.data.get('limit', self.DEFAULT_PREVIEW_LIMIT)), self.MAX_PREVIEW_LIMIT)
+            if limit < 1:
+                raise ValueError("limit must be a positive integer")
+            rule = RecurrenceRule(
+                datetime.strptime(request.data['startDate'], '%Y-%m-%d').date(),
+                datetime.strptime(request.data['endDate'], '%Y-%m-%d').date(),
+                request.data['daysOfWeek'],
+                request.data['frequency']
+            )
+            # Dates near the end of the calendar overflow while being counted
+            total_count = rule.count()
+            dates = rule.preview(limit)
+        except KeyError as e:
+            return Response({"error": f"Missing required field: {e.args[0]}"}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError, OverflowError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'dates': [date_obj.isoformat() for date_obj in dates],
+            'total_count': total_count,
+            'max_occurrences': MAX_RECURRING_OCCURRENCES,
+            'exceeds_max_occurrences': total_count > MAX_RECURRING_OCCURRENCES
+        })
+
+class DraftChangesView(APIView):
+    """
+    What a draft changes relative to its booking. The fingerprints are
+    compared first; both sides are only loaded and diffed when they differ.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+
+    def get(self, request, draft_id):
+        draft = get_object_or_404(
+            BookingDraft.objects.select_related('booking__professional', 'booking__client'), draft_id=draft_id
+        )
+        booking = draft.booking
+        if booking is None:
+            return Response({"error": "Draft has no booking to compare with"}, status=status.HTTP_404_NOT_FOUND)
+        if booking.professional.user_id != request.user.id and booking.client.user_id != request.user.id:
+            return Response({"error": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+
+        has_changes = has_changes_from_original(booking, draft)
+        changes = {}
+        if has_changes:
+            changes = diff_pricing_components(
+                booking_pricing_components(booking),
+                pricing_components(draft.draft_data)
+            )
+
+        return Response({
+            'has_changes': has_changes,
+            'booking_fingerprint': booking.pricing_fingerprint,
+            'draft_fingerprint': draft.pricing_fingerprint,
+            'changes': changes
+        })
+
 class GetBookingDraftDatesAndTimesView(APIView):
     permission_classes = [IsAuthenticated]
     renderer_classes = [JSONRenderer]
@@ -2805,6 +2863,7 @@ class GetBookingDraftDatesAndTimesView(APIView):
                 "date_range_type": "multiple-days",  # Default
                 "booking_type": "one-time",          # Default
                 "date_range": None,
+                "version": draft.version,            # Sent back as If-Match on the next edit
             }
             
             # Check if we have occurrences in the draft data
@@ -3205,7 +3264,7 @@ class CreateDraftFromBookingView(APIView):
             
             # Save the draft
             draft.draft_data = draft_data
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
             
             logger.info(f"MBA6428: Successfully created draft from booking {booking_id}")
             logger.info(f"MBA6428: Draft ID: {draft.draft_id}")
@@ -3217,8 +3276,10 @@ class CreateDraftFromBookingView(APIView):
                 'draft_data': draft_data
             }
             
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            return draft_response(request, response_data, draft_change, status_code=status.HTTP_201_CREATED)
             
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA6428: Error creating draft from booking: {str(e)}")
             logger.error(f"MBA6428: Traceback: {traceback.format_exc()}")
@@ -3270,16 +3331,18 @@ class UpdateNotesFromProView(APIView):
                 draft.draft_data = {}
             
             draft.draft_data['notes_from_pro'] = notes_from_pro
-            draft.save()
+            draft_change = save_draft(draft, changed_by=request.user, expected_version=expected_draft_version(request))
             
             logger.info(f"MBA88888 - Successfully updated notes for draft {draft.draft_id}")
             
-            return Response({
+            return draft_response(request, {
                 'status': 'success',
                 'message': 'Notes updated successfully',
                 'notes_from_pro': notes_from_pro
-            }, status=status.HTTP_200_OK)
+            }, draft_change)
             
+        except DraftVersionConflict as e:
+            return draft_conflict_response(e)
         except Exception as e:
             logger.error(f"MBA88888 - Error updating notes: {str(e)}")
             logger.error(f"MBA88888 - Traceback: {traceback.format_exc()}")
@@ -3,6 +3,7 @@ from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from core.cost_recomputation import current_recomputation
 import logging
 import json
 
@@ -99,6 +100,12 @@ def update_occurrence_calculated_cost(sender, instance, created, **kwargs):
     """
     Signal handler to update the BookingOccurrence calculated cost when rates change
     """
+    # Within a deferred recomputation scope the cost is recomputed once, when the scope ends
+    recomputation = current_recomputation()
+    if recomputation:
+        recomputation.occurrence_changed(instance.occurrence)
+        return
+
     occurrence = instance.occurrence
     
     # Get the total from occurrence rates
@@ -4,9 +4,36 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 import logging
 from core.tax_utils import calculate_taxes
+from core.cost_recomputation import current_recomputation
 
 logger = logging.getLogger(__name__)
 
+CENTS = Decimal('0.01')
+
+
+def summary_taxes(subtotal, client_platform_fee, tax_percentage, professional_user):
+    """
+    Taxes on a booking summary's amounts in the professional's state (see
+    core.tax_utils), falling back to the legacy tax_percentage on error.
+    """
+    try:
+        return calculate_taxes(subtotal=subtotal, platform_fee=client_platform_fee, user=professional_user)
+    except Exception as e:
+        logger.error(f"Error calculating taxes: {str(e)}")
+        return (subtotal * tax_percentage / Decimal('100.00')).quantize(CENTS)
+
+
+def summary_totals(subtotal, client_platform_fee, pro_platform_fee, taxes):
+    """
+    (total_client_cost, total_sitter_payout) for a booking summary's amounts.
+    Used by BookingSummary and by the booking list rows (bookings/booking_list.py).
+    """
+    return (
+        (subtotal + client_platform_fee + taxes).quantize(CENTS),
+        (subtotal - pro_platform_fee).quantize(CENTS),
+    )
+
+
 class BookingSummary(models.Model):
     summary_id = models.AutoField(primary_key=True)
     booking = models.OneToOneField('bookings.Booking', on_delete=models.CASCADE)
@@ -97,40 +124,36 @@ class BookingSummary(models.Model):
         Calculate taxes based on the professional's state and tax rules.
         Uses the core.tax_utils functions to determine the correct tax amount.
         """
-        try:
-            # Get professional from the booking
-            professional = self.booking.professional
-            
-            # Calculate taxes using the core utility
-            tax_amount = calculate_taxes(
-                subtotal=self.subtotal,
-                platform_fee=self.client_platform_fee,
-                user=professional.user
-            )
-            
-            logger.info(f"Calculated taxes for booking {self.booking.booking_id}: ${tax_amount}")
-            return tax_amount
-        except Exception as e:
-            logger.error(f"Error calculating taxes: {str(e)}")
-            # Fallback to legacy calculation
-            return self.calculate_tax()
+        tax_amount = summary_taxes(
+            self.subtotal,
+            self.client_platform_fee,
+            self.tax_percentage,
+            self.booking.professional.user
+        )
+        logger.info(f"Calculated taxes for booking {self.booking.booking_id}: ${tax_amount}")
+        return tax_amount
 
     @property
     def total_client_cost(self):
         """Calculate total cost for the client including fees and taxes"""
-        taxes = self.taxes
-        return (self.subtotal + self.client_platform_fee + taxes).quantize(Decimal('0.01'))
+        return summary_totals(self.subtotal, self.client_platform_fee, self.pro_platform_fee, self.taxes)[0]
 
     @property
     def total_sitter_payout(self):
         """Calculate total payout for the sitter (subtotal minus platform fee)"""
-        return (self.subtotal - self.pro_platform_fee).quantize(Decimal('0.01'))
+        return summary_totals(self.subtotal, self.client_platform_fee, self.pro_platform_fee, Decimal('0.00'))[1]
 
 @receiver([post_save], sender='booking_occurrences.BookingOccurrence')
 def update_booking_summary(sender, instance, **kwargs):
     """
     Signal handler to update the booking summary when an occurrence's calculated cost changes
     """
+    # Within a deferred recomputation scope the summary is recomputed once, when the scope ends
+    recomputation = current_recomputation()
+    if recomputation:
+        recomputation.booking_changed(instance.booking_id)
+        return
+
     try:
         # Use the centralized service to update the booking summary
         from .services import BookingSummaryService
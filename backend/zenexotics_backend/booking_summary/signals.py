@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from booking_occurrence_rates.models import BookingOccurrenceRate
+from core.cost_recomputation import current_recomputation
 from .services import BookingSummaryService
 
 @receiver(post_save, sender=BookingOccurrenceRate)
@@ -9,6 +10,12 @@ def update_booking_summary(sender, instance, created, **kwargs):
     Signal handler to update booking summary when a booking occurrence rate is saved.
     Uses the centralized BookingSummaryService to ensure consistent calculations.
     """
+    # Within a deferred recomputation scope the summary is recomputed once, when the scope ends
+    recomputation = current_recomputation()
+    if recomputation:
+        recomputation.booking_changed(instance.occurrence.booking_id)
+        return
+
     booking = instance.occurrence.booking
     
     # Use the service to recalculate the summary
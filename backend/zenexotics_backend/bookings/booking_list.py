@@ -0,0 +1,208 @@
+"""
+Booking list queries for the bookings tab.
+
+Bookings are listed as lean values() rows rather than serialized model
+instances: names, service, first occurrence and totals come from joins and
+correlated subqueries in a single query, and for the professional list the
+status of the booking's latest draft is merged in the same query. A second
+query loads the professionals' users, whose state decides the taxes in the
+totals. Lists are keyset-paginated on (created_at, booking_id), newest first.
+"""
+import base64
+import binascii
+from datetime import date, datetime
+
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.fields.json import KeyTextTransform
+
+from booking_drafts.models import BookingDraft
+from booking_occurrences.models import BookingOccurrence
+from booking_summary.models import summary_taxes, summary_totals
+from users.models import User
+from .constants import BookingStates
+from .models import Booking
+
+BOOKING_PAGE_SIZE = 20
+MAX_BOOKING_PAGE_SIZE = 100
+
+ROLES = ('professional', 'client')
+
+# Status filters offered by the bookings tab, by booking status
+STATUS_GROUPS = {
+    'pending': (
+        BookingStates.PENDING_INITIAL_PROFESSIONAL_CHANGES,
+        BookingStates.PENDING_PROFESSIONAL_CHANGES,
+        BookingStates.PENDING_CLIENT_APPROVAL,
+    ),
+    'confirmed': (
+        BookingStates.CONFIRMED,
+        BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES,
+        BookingStates.CONFIRMED_PENDING_CLIENT_APPROVAL,
+    ),
+    'completed': (BookingStates.COMPLETED,),
+    'cancelled': (BookingStates.CANCELLED, BookingStates.DENIED),
+}
+
+
+def _first_occurrence(field):
+    return Subquery(
+        BookingOccurrence.objects.filter(booking=OuterRef('pk')).order_by('start_date', 'start_time').values(field)[:1]
+    )
+
+
+def _latest_draft_status():
+    return Subquery(
+        BookingDraft.objects.filter(booking=OuterRef('pk')).order_by('-updated_at').annotate(
+            draft_status=KeyTextTransform('status', 'draft_data')
+        ).values('draft_status')[:1]
+    )
+
+
+def status_filter(status):
+    """Q for a status filter: a STATUS_GROUPS name or a booking status; raises ValueError otherwise."""
+    if status in STATUS_GROUPS:
+        return Q(status__in=STATUS_GROUPS[status])
+    if status in BookingStates.DISPLAY_STATES:
+        return Q(status=status)
+    raise ValueError(f"Invalid status filter: {status}")
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format") from e
+
+
+def filter_bookings(user, role, status=None, start_date=None, end_date=None):
+    """
+    The user's bookings in role ('professional' or 'client'), optionally
+    limited to a status filter (matched against the booking's own status,
+    not a draft's) and to bookings with an occurrence in the
+    [start_date, end_date] range.
+    """
+    bookings = Booking.objects.filter(**{f'{role}__user': user})
+    if status and status != 'all':
+        bookings = bookings.filter(status_filter(status))
+    if start_date or end_date:
+        occurrences = BookingOccurrence.objects.filter(booking=OuterRef('pk'))
+        if start_date:
+            occurrences = occurrences.filter(end_date__gte=start_date)
+        if end_date:
+            occurrences = occurrences.filter(start_date__lte=end_date)
+        bookings = bookings.filter(Exists(occurrences))
+    return bookings
+
+
+def encode_booking_cursor(row):
+    """Opaque cursor for a booking row (a dict from get_booking_rows)."""
+    raw = f"{row['created_at'].isoformat()}|{row['booking_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_booking_cursor(cursor):
+    """Decode a booking cursor into (created_at, booking_id); raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, booking_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except (UnicodeError, TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid booking cursor: {cursor}") from e
+
+
+def get_booking_rows(bookings, role, limit=None, cursor=None):
+    """
+    Booking list rows for a queryset from filter_bookings(), newest first.
+    In the professional list the latest draft's status replaces the
+    booking's. With a cursor only rows after it are returned. Each row
+    carries its professional's user, for format_booking_row()'s taxes.
+    """
+    if cursor is not None:
+        created_at, booking_id = cursor
+        bookings = bookings.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, booking_id__lt=booking_id)
+        )
+    bookings = bookings.annotate(
+        first_start_date=_first_occurrence('start_date'),
+        first_start_time=_first_occurrence('start_time'),
+    )
+    fields = [
+        'booking_id',
+        'status',
+        'created_at',
+        'client__user__name',
+        'professional__user__name',
+        'professional__user_id',
+        'service_id__service_name',
+        'bookingsummary__subtotal',
+        'bookingsummary__client_platform_fee',
+        'bookingsummary__pro_platform_fee',
+        'bookingsummary__tax_percentage',
+        'first_start_date',
+        'first_start_time',
+    ]
+    if role == 'professional':
+        bookings = bookings.annotate(draft_status=_latest_draft_status())
+        fields.append('draft_status')
+
+    rows = bookings.order_by('-created_at', '-booking_id').values(*fields)
+    if limit is not None:
+        rows = rows[:limit]
+    rows = list(rows)
+
+    # Load the related profiles core.tax_utils.get_user_state may read
+    professional_users = User.objects.select_related('professional_profile', 'client_profile').in_bulk(
+        {row['professional__user_id'] for row in rows}
+    )
+    for row in rows:
+        row['professional_user'] = professional_users.get(row['professional__user_id'])
+    return rows
+
+
+def format_booking_row(row):
+    """The booking list item for a row, in the shape BookingListSerializer produced."""
+    subtotal = row['bookingsummary__subtotal']
+    if subtotal is None:
+        total_client_cost = total_sitter_payout = 0.00
+    else:
+        # The same totals as BookingSummary.total_client_cost and total_sitter_payout
+        client_platform_fee = row['bookingsummary__client_platform_fee']
+        taxes = summary_taxes(
+            subtotal, client_platform_fee, row['bookingsummary__tax_percentage'], row['professional_user']
+        )
+        total_client_cost, total_sitter_payout = (
+            float(total) for total in summary_totals(
+                subtotal, client_platform_fee, row['bookingsummary__pro_platform_fee'], taxes
+            )
+        )
+    return {
+        'booking_id': row['booking_id'],
+        'client_name': row['client__user__name'],
+        'professional_name': row['professional__user__name'],
+        'service_name': row['service_id__service_name'],
+        'start_date': row['first_start_date'],
+        'start_time': row['first_start_time'],
+        'total_client_cost': total_client_cost,
+        'total_sitter_payout': total_sitter_payout,
+        'status': row.get('draft_status') or row['status'],
+    }
+
+
+def get_booking_counts(user):
+    """
+    Booking counts per role and status filter, for tab badges:
+    {'professional': {'all': n, 'pending': n, ...}, 'client': {...}}.
+    One grouped query per role.
+    """
+    counts = {}
+    for role in ROLES:
+        by_status = dict(
+            Booking.objects.filter(**{f'{role}__user': user}).order_by().values_list('status').annotate(
+                count=Count('booking_id')
+            )
+        )
+        role_counts = {'all': sum(by_status.values())}
+        for group, statuses in STATUS_GROUPS.items():
+            role_counts[group] = sum(by_status.get(booking_status, 0) for booking_status in statuses)
+        counts[role] = role_counts
+    return counts
@@ -0,0 +1,123 @@
+"""
+Bulk materialization of a draft's occurrences into booking rows.
+
+A booking created from a draft gets one BookingOccurrence per draft
+occurrence, each with a BookingDetails row and, when the occurrence has
+additional rates, a BookingOccurrenceRate row. Saving those one at a time
+runs each row's signal chain (details created on occurrence save, costs
+recomputed on details and rate saves, the summary re-summed on occurrence
+save), so a long recurring draft cost hundreds of round trips.
+
+create_occurrences_from_draft() builds every row in memory and inserts them
+with one bulk_create per table. The details are priced with the draft's
+multiple, as the save-by-save path priced them (see calculate_draft_rate()),
+and bulk_create sends no signals, so the caller computes the booking's
+summary once afterwards.
+"""
+from datetime import datetime
+from decimal import Decimal
+import logging
+
+from booking_details.models import BookingDetails
+from booking_occurrence_rates.models import BookingOccurrenceRate
+from booking_occurrences.models import BookingOccurrence
+
+logger = logging.getLogger(__name__)
+
+
+def _additional_rates_total(rates):
+    total = Decimal('0.00')
+    for rate in rates:
+        amount_str = str(rate.get('amount', '0')).replace('$', '').strip()
+        try:
+            total += Decimal(amount_str)
+        except Exception as e:
+            logger.error(f"MBA66777 Error parsing amount '{amount_str}': {str(e)}")
+    return total
+
+
+def calculate_draft_rate(booking_details, pet_count):
+    """
+    The details' rate for a draft occurrence: the base rate plus the
+    additional pet rate for each pet beyond applies_after, both times the
+    draft's multiple.
+    """
+    calculated_rate = booking_details.base_rate * booking_details.multiple
+    if booking_details.additional_pet_rate and pet_count > booking_details.applies_after:
+        additional_pets = pet_count - booking_details.applies_after
+        calculated_rate += booking_details.additional_pet_rate * additional_pets * booking_details.multiple
+    return calculated_rate.quantize(Decimal('0.01'))
+
+
+def create_occurrences_from_draft(booking, draft_data, pet_count):
+    """
+    Create the booking's occurrences, details and additional rates from
+    draft_data['occurrences'] in three inserts. Returns the occurrences,
+    with primary keys, in draft order.
+    """
+    nights = int(draft_data.get('nights', 0))
+
+    occurrences = []
+    details_rows = []
+    rate_rows = []
+    for occurrence_data in draft_data.get('occurrences', []):
+        occurrence = BookingOccurrence(
+            booking=booking,
+            start_date=datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date(),
+            end_date=datetime.strptime(occurrence_data['end_date'], '%Y-%m-%d').date(),
+            start_time=datetime.strptime(occurrence_data['start_time'], '%H:%M').time(),
+            end_time=datetime.strptime(occurrence_data['end_time'], '%H:%M').time(),
+            created_by='PROFESSIONAL',
+            last_modified_by='PROFESSIONAL',
+            status='PENDING'
+        )
+
+        # Unit of time from the occurrence, then its rates, defaulting to per visit
+        rates = occurrence_data.get('rates', {})
+        unit_of_time = occurrence_data.get('unit_of_time') or rates.get('unit_of_time') or 'Per Visit'
+
+        booking_details = BookingDetails(
+            booking_occurrence=occurrence,
+            num_pets=pet_count,
+            base_rate=Decimal(str(rates.get('base_rate', 0))),
+            additional_pet_rate=Decimal(str(rates.get('additional_animal_rate', 0))),
+            applies_after=int(rates.get('applies_after', 1)),
+            holiday_rate=Decimal(str(rates.get('holiday_rate', 0))),
+            unit_of_time=unit_of_time,
+            nights=nights
+        )
+        # The draft's multiple prices the base rate and the additional pets alike
+        booking_details.multiple = Decimal(str(occurrence_data.get('multiple', 1))).quantize(Decimal('0.00001'))
+        booking_details.calculated_rate = calculate_draft_rate(booking_details, pet_count)
+
+        additional_rates = [
+            {
+                'title': rate.get('title'),
+                'amount': str(rate.get('amount')),
+                'description': rate.get('description', 'Additional rate')
+            }
+            for rate in rates.get('additional_rates', [])
+        ]
+        if additional_rates:
+            rate_rows.append(BookingOccurrenceRate(occurrence=occurrence, rates=additional_rates))
+
+        # The draft's cost when it has one; otherwise the details rate plus the additional rates
+        draft_calculated_cost = occurrence_data.get('calculated_cost')
+        if draft_calculated_cost:
+            total_cost = Decimal(str(draft_calculated_cost))
+        else:
+            total_cost = booking_details.calculated_rate + _additional_rates_total(additional_rates)
+        occurrence.calculated_cost = total_cost.quantize(Decimal('0.01'))
+
+        occurrences.append(occurrence)
+        details_rows.append(booking_details)
+
+    BookingOccurrence.objects.bulk_create(occurrences)
+    BookingDetails.objects.bulk_create(details_rows)
+    BookingOccurrenceRate.objects.bulk_create(rate_rows)
+
+    logger.info(
+        f"MBA66777 Created {len(occurrences)} occurrences with {len(rate_rows)} additional rate rows "
+        f"for booking {booking.booking_id}"
+    )
+    return occurrences
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='pricing_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -26,6 +26,8 @@ class Booking(models.Model):
     pro_agreed_tos = models.BooleanField(default=False)
     client_agreed_tos = models.BooleanField(default=False)
     notes_from_pro = models.TextField(blank=True, null=True, help_text="Notes from the professional to the client for this booking")
+    # Hash of the booking's service, pets and occurrence rates (core/pricing_fingerprint.py)
+    pricing_fingerprint = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -35,3 +37,8 @@ class Booking(models.Model):
     class Meta:
         db_table = 'bookings'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of each side's booking list (bookings/booking_list.py)
+            models.Index(fields=['professional', '-created_at', '-booking_id'], name='booking_professional_list_idx'),
+            models.Index(fields=['client', '-created_at', '-booking_id'], name='booking_client_list_idx'),
+        ]
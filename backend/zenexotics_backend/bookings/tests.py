@@ -1,3 +1,523 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from booking_drafts.models import BookingDraft
+from booking_details.models import BookingDetails
+from booking_occurrence_rates.models import BookingOccurrenceRate
+from booking_occurrences.models import BookingOccurrence
+from booking_summary.models import BookingSummary
+from bookings.constants import BookingStates
+from bookings.models import Booking
+from clients.models import Client
+from conversations.v1.views import find_or_create_conversation
+from core.api_test_helpers import QueryCountTestMixin
+from core.pricing_fingerprint import booking_pricing_components, pricing_fingerprint
+from core.cost_recomputation import deferred_cost_recomputation
+from pets.models import Pet
+from professionals.models import Professional
+from services.models import Service
+from users.models import User
+
+
+class ConnectionsViewTests(QueryCountTestMixin, APITestCase):
+    """Connections are built from grouped queries and paginated and filtered server-side."""
+
+    url = '/api/bookings/v1/connections/'
+
+    def setUp(self):
+        self.user = self.create_user()
+        self.professional = Professional.objects.create(user=self.user)
+
+    def create_client(self, name=None, invited=True):
+        client = Client.objects.get(user=self.create_user(name))
+        if invited:
+            client.invited_by = self.professional
+            client.save()
+        return client
+
+    def create_booking(self, client, booking_status, ended_days_ago=None):
+        booking = Booking.objects.create(client=client, professional=self.professional, status=booking_status)
+        if ended_days_ago is not None:
+            end_date = timezone.now().date() - timedelta(days=ended_days_ago)
+            BookingOccurrence.objects.bulk_create([BookingOccurrence(
+                booking=booking,
+                start_date=end_date,
+                end_date=end_date,
+                start_time=time(9, 0),
+                end_time=time(10, 0),
+                created_by='PROFESSIONAL',
+                last_modified_by='PROFESSIONAL'
+            )])
+        return booking
+
+    def create_populated_clients(self, count):
+        for _ in range(count):
+            client = self.create_client()
+            self.create_booking(client, BookingStates.CONFIRMED)
+            self.create_booking(client, BookingStates.COMPLETED, ended_days_ago=3)
+            Pet.objects.create(owner=client.user, name='Rex', species='Dog')
+            find_or_create_conversation(self.user, client.user, 'professional')
+
+    def test_query_count_is_constant(self):
+        data = self.assertQueryCountIsConstant(self.create_populated_clients)
+
+        self.assertEqual(data['total_count'], 12)
+        self.assertEqual(len(data['connections']), 12)
+
+    def test_connection_data(self):
+        client = self.create_client(name='Alice')
+        self.create_booking(client, BookingStates.CONFIRMED)
+        Pet.objects.create(owner=client.user, name='Rex', species='Dog')
+        conversation, _ = find_or_create_conversation(self.user, client.user, 'professional')
+        # A conversation where the professional is the client is not the connection's conversation
+        find_or_create_conversation(self.user, client.user, 'client')
+        # Booked with another professional only: not a connection
+        other_professional = Professional.objects.create(user=self.create_user())
+        Booking.objects.create(
+            client=self.create_client(invited=False),
+            professional=other_professional,
+            status=BookingStates.CONFIRMED
+        )
+
+        data, _ = self.fetch()
+
+        self.assertEqual(data['total_count'], 1)
+        connection_data = data['connections'][0]
+        self.assertEqual(connection_data['id'], client.user.id)
+        self.assertEqual(connection_data['client_id'], client.id)
+        self.assertEqual(connection_data['name'], 'Alice')
+        self.assertEqual(connection_data['active_bookings_count'], 1)
+        self.assertEqual(connection_data['has_past_booking'], 0)
+        self.assertEqual(connection_data['conversation_id'], conversation.conversation_id)
+        self.assertEqual([pet['name'] for pet in connection_data['pets']], ['Rex'])
+
+    def test_filters_and_search(self):
+        active = self.create_client(name='Active Client', invited=False)
+        self.create_booking(active, BookingStates.CONFIRMED)
+        past = self.create_client(name='Past Client', invited=False)
+        self.create_booking(past, BookingStates.COMPLETED, ended_days_ago=3)
+        # Completed, but its occurrence has not ended yet
+        upcoming = self.create_client(name='Upcoming Client', invited=False)
+        self.create_booking(upcoming, BookingStates.COMPLETED, ended_days_ago=-3)
+        invited = self.create_client(name='Invited Client')
+        Pet.objects.create(owner=invited.user, name='Shelly', species='Turtle')
+
+        def names(**params):
+            data, _ = self.fetch(**params)
+            return [connection_data['name'] for connection_data in data['connections']]
+
+        self.assertEqual(names(), ['Active Client', 'Invited Client', 'Past Client', 'Upcoming Client'])
+        self.assertEqual(names(filter='active_bookings'), ['Active Client'])
+        self.assertEqual(names(filter='past_bookings'), ['Past Client'])
+        self.assertEqual(names(filter='no_bookings'), ['Invited Client', 'Upcoming Client'])
+        self.assertEqual(names(search='past'), ['Past Client'])
+        self.assertEqual(names(search='turtle'), ['Invited Client'])
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url, {'filter': 'unknown'}).status_code, 400)
+
+    def test_pagination(self):
+        for index in range(5):
+            self.create_client(name=f'Client {index}')
+
+        data, _ = self.fetch(page=2, page_size=2)
+        self.assertEqual([connection_data['name'] for connection_data in data['connections']], ['Client 2', 'Client 3'])
+        self.assertEqual(data['total_count'], 5)
+        self.assertEqual(data['total_pages'], 3)
+        self.assertTrue(data['has_next'])
+        self.assertTrue(data['has_previous'])
+
+        # Past the end returns the last page
+        data, _ = self.fetch(page=9, page_size=2)
+        self.assertEqual(data['current_page'], 3)
+        self.assertEqual(len(data['connections']), 1)
+
+
+class BookingListViewTests(QueryCountTestMixin, APITestCase):
+    """The booking list is a lean, filtered, cursor-paginated projection."""
+
+    url = '/api/bookings/v1/'
+
+    def setUp(self):
+        self.user = self.create_user(name='Pro')
+        self.professional = Professional.objects.create(user=self.user)
+        self.booking_client = Client.objects.get(user=self.create_user(name='Client'))
+
+    def create_booking(self, booking_status=BookingStates.CONFIRMED, start_date=None):
+        booking = Booking.objects.create(
+            client=self.booking_client,
+            professional=self.professional,
+            status=booking_status
+        )
+        if start_date is not None:
+            BookingOccurrence.objects.bulk_create([
+                BookingOccurrence(
+                    booking=booking,
+                    start_date=start_date + timedelta(days=offset),
+                    end_date=start_date + timedelta(days=offset),
+                    start_time=time(9 + offset, 0),
+                    end_time=time(10 + offset, 0),
+                    created_by='PROFESSIONAL',
+                    last_modified_by='PROFESSIONAL'
+                )
+                for offset in (1, 0)
+            ])
+        return booking
+
+    def create_bookings(self, count):
+        for _ in range(count):
+            self.create_booking(start_date=timezone.now().date())
+
+    def test_rows_and_draft_status(self):
+        start_date = timezone.now().date()
+        booking = self.create_booking(start_date=start_date)
+        BookingDraft.objects.create(
+            booking=booking,
+            draft_data={'status': BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES},
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+        BookingSummary.objects.update_or_create(booking=booking, defaults={
+            'subtotal': Decimal('100.00'),
+            'client_platform_fee': Decimal('15.00'),
+            'pro_platform_fee': Decimal('10.00')
+        })
+
+        data, _ = self.fetch()
+        row = data['bookings']['professional_bookings'][0]
+        self.assertEqual(row['booking_id'], booking.booking_id)
+        self.assertEqual(row['client_name'], 'Client')
+        self.assertEqual(row['professional_name'], 'Pro')
+        self.assertEqual(row['start_date'], start_date.isoformat())
+        self.assertEqual(row['start_time'], '09:00:00')
+        self.assertEqual(row['total_client_cost'], float(BookingSummary.objects.get(booking=booking).total_client_cost))
+        self.assertEqual(row['total_sitter_payout'], 90.0)
+        self.assertEqual(row['status'], BookingStates.CONFIRMED_PENDING_PROFESSIONAL_CHANGES)
+        self.assertEqual(data['bookings']['client_bookings'], [])
+
+        # The client sees the booking's own status
+        data, _ = self.fetch(user=self.booking_client.user)
+        self.assertEqual(data['bookings']['client_bookings'][0]['status'], BookingStates.CONFIRMED)
+
+    def test_totals_include_the_same_taxes_as_the_summary(self):
+        booking = self.create_booking(start_date=timezone.now().date())
+        BookingSummary.objects.update_or_create(booking=booking, defaults={
+            'subtotal': Decimal('100.00'),
+            'client_platform_fee': Decimal('15.00'),
+            'pro_platform_fee': Decimal('10.00')
+        })
+        summary = BookingSummary.objects.get(booking=booking)
+
+        with mock.patch('core.tax_utils.get_user_state', return_value='AR'):
+            data, _ = self.fetch()
+            expected_cost = float(summary.total_client_cost)
+
+        row = data['bookings']['professional_bookings'][0]
+        # 6.5% of subtotal and fee
+        self.assertEqual(expected_cost, 122.48)
+        self.assertEqual(row['total_client_cost'], expected_cost)
+        self.assertEqual(row['total_sitter_payout'], float(summary.total_sitter_payout))
+
+    def test_query_count_is_constant(self):
+        data = self.assertQueryCountIsConstant(self.create_bookings)
+        self.assertEqual(len(data['bookings']['professional_bookings']), 12)
+
+    def test_cursor_pagination_walks_every_booking_once(self):
+        bookings = [self.create_booking() for _ in range(5)]
+        # Two bookings share a creation time to exercise the id tiebreak
+        Booking.objects.filter(pk__in=[bookings[0].pk, bookings[1].pk]).update(created_at=bookings[0].created_at)
+
+        seen = []
+        params = {'role': 'professional', 'page_size': 2}
+        while True:
+            data, _ = self.fetch(**params)
+            seen.extend(row['booking_id'] for row in data['bookings'])
+            if not data['has_more']:
+                self.assertIsNone(data['next_cursor'])
+                break
+            params['cursor'] = data['next_cursor']
+
+        self.assertEqual(seen, [booking.booking_id for booking in reversed(bookings)])
+
+    def test_status_and_date_filters(self):
+        today = timezone.now().date()
+        confirmed = self.create_booking(BookingStates.CONFIRMED, start_date=today)
+        pending = self.create_booking(BookingStates.PENDING_CLIENT_APPROVAL, start_date=today + timedelta(days=30))
+
+        def ids(**params):
+            data, _ = self.fetch(role='professional', **params)
+            return [row['booking_id'] for row in data['bookings']]
+
+        self.assertEqual(ids(status='pending'), [pending.booking_id])
+        self.assertEqual(ids(status=BookingStates.CONFIRMED), [confirmed.booking_id])
+        self.assertEqual(ids(start_date=(today + timedelta(days=1)).isoformat()), [pending.booking_id, confirmed.booking_id])
+        self.assertEqual(ids(start_date=(today + timedelta(days=2)).isoformat()), [pending.booking_id])
+        self.assertEqual(ids(end_date=today.isoformat()), [confirmed.booking_id])
+
+        self.client.force_authenticate(user=self.user)
+        for params in ({'status': 'unknown'}, {'start_date': 'soon'}, {'role': 'admin'}, {'role': 'client', 'cursor': 'x'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_counts(self):
+        self.create_booking(BookingStates.CONFIRMED)
+        self.create_booking(BookingStates.CONFIRMED_PENDING_CLIENT_APPROVAL)
+        self.create_booking(BookingStates.PENDING_PROFESSIONAL_CHANGES)
+        self.create_booking(BookingStates.COMPLETED)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/bookings/v1/counts/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['professional'],
+            {'all': 4, 'pending': 1, 'confirmed': 2, 'completed': 1, 'cancelled': 0}
+        )
+        self.assertEqual(response.json()['client']['all'], 0)
+
+
+class CreateFromDraftTests(APITestCase):
+    """Creating a booking from a draft writes its rows in bulk and computes costs once."""
+
+    url = '/api/bookings/v1/create-from-draft/'
+
+    def setUp(self):
+        self.pro_user = User.objects.create_user(email='pro@example.com', password='testpass123', name='Pro')
+        self.professional = Professional.objects.create(user=self.pro_user)
+        self.client_user = User.objects.create_user(email='client@example.com', password='testpass123', name='Client')
+        self.booking_client = Client.objects.get(user=self.client_user)
+        self.service = Service.objects.create(
+            professional=self.professional,
+            service_name='Dog Walking',
+            description='Walks around the block',
+            animal_types={'Dogs': 'Domestic'},
+            base_rate=Decimal('20.00'),
+            additional_animal_rate=Decimal('5.00'),
+            holiday_rate=Decimal('10.00'),
+            unit_of_time='1 Hour',
+            moderation_status='APPROVED'
+        )
+        self.pet = Pet.objects.create(owner=self.client_user, name='Rex', species='Dog')
+
+    def draft_data(self, conversation, occurrence_count):
+        start_date = timezone.now().date() + timedelta(days=1)
+        return {
+            'conversation_id': conversation.conversation_id,
+            'client_id': self.booking_client.id,
+            'service_details': {'service_id': self.service.service_id, 'service_type': 'Dog Walking'},
+            'pets': [{'pet_id': self.pet.pet_id, 'name': 'Rex'}],
+            'occurrences': [
+                {
+                    'start_date': (start_date + timedelta(days=index)).isoformat(),
+                    'end_date': (start_date + timedelta(days=index)).isoformat(),
+                    'start_time': '09:00',
+                    'end_time': '10:00',
+                    'calculated_cost': '23.50',
+                    'multiple': 1.0,
+                    'rates': {
+                        'base_rate': '20.00',
+                        'additional_animal_rate': '5.00',
+                        'applies_after': 1,
+                        'holiday_rate': '10.00',
+                        'unit_of_time': '1 Hour',
+                        'additional_rates': [{'title': 'Medication', 'description': '', 'amount': '3.50'}]
+                    }
+                }
+                for index in range(occurrence_count)
+            ],
+            'cost_summary': {'client_platform_fee_percentage': 15, 'pro_platform_fee_percentage': 15}
+        }
+
+    def create_from_draft(self, occurrence_count, booking=None):
+        conversation, _ = find_or_create_conversation(self.pro_user, self.client_user, 'professional')
+        BookingDraft.objects.create(
+            booking=booking,
+            draft_data=self.draft_data(conversation, occurrence_count),
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+
+        self.client.force_authenticate(user=self.pro_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'conversation_id': conversation.conversation_id,
+                'terms_of_service_agreed_by_pro': True
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return Booking.objects.get(booking_id=response.json()['booking_id']), queries
+
+    def test_fifty_occurrences(self):
+        self.create_from_draft(1)
+        _, single_queries = self.create_from_draft(1)
+        booking, queries = self.create_from_draft(50)
+
+        # Occurrences, details and rates are bulk inserted and the summary computed once
+        self.assertEqual(len(queries), len(single_queries))
+
+        self.assertEqual(booking.occurrences.count(), 50)
+        self.assertEqual(
+            set(booking.occurrences.values_list('calculated_cost', flat=True)),
+            {Decimal('23.50')}
+        )
+        details = BookingDetails.objects.filter(booking_occurrence__booking=booking)
+        self.assertEqual(details.count(), 50)
+        self.assertEqual(
+            set(details.values_list('num_pets', 'multiple', 'calculated_rate', 'unit_of_time')),
+            {(1, Decimal('1.00000'), Decimal('20.00'), '1 Hour')}
+        )
+        occurrence_rates = BookingOccurrenceRate.objects.filter(occurrence__booking=booking)
+        self.assertEqual(occurrence_rates.count(), 50)
+        self.assertEqual(
+            occurrence_rates.first().rates,
+            [{'title': 'Medication', 'amount': '3.50', 'description': ''}]
+        )
+        self.assertEqual(booking.booking_pets.count(), 1)
+
+        summary = BookingSummary.objects.get(booking=booking)
+        self.assertEqual(summary.subtotal, Decimal('1175.00'))
+        self.assertEqual(summary.client_platform_fee, Decimal('176.25'))
+
+    def test_additional_pets_priced_with_draft_multiple(self):
+        conversation, _ = find_or_create_conversation(self.pro_user, self.client_user, 'professional')
+        second_pet = Pet.objects.create(owner=self.client_user, name='Max', species='Dog')
+        draft_data = self.draft_data(conversation, 1)
+        draft_data['pets'].append({'pet_id': second_pet.pet_id, 'name': 'Max'})
+        occurrence_data = draft_data['occurrences'][0]
+        occurrence_data.update({'end_time': '11:00', 'multiple': 2.0})
+        # No draft cost: the occurrence falls back to the details rate plus additional rates
+        del occurrence_data['calculated_cost']
+        BookingDraft.objects.create(draft_data=draft_data, last_modified_by='PROFESSIONAL', status='IN_PROGRESS')
+
+        self.client.force_authenticate(user=self.pro_user)
+        response = self.client.post(self.url, {
+            'conversation_id': conversation.conversation_id,
+            'terms_of_service_agreed_by_pro': True
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        booking = Booking.objects.get(booking_id=response.json()['booking_id'])
+        details = BookingDetails.objects.get(booking_occurrence__booking=booking)
+        # 2 hours at $20 plus one additional pet at $5 for each of those hours
+        self.assertEqual(details.multiple, Decimal('2.00000'))
+        self.assertEqual(details.calculated_rate, Decimal('50.00'))
+        self.assertEqual(booking.occurrences.get().calculated_cost, Decimal('53.50'))
+
+    def test_update_replaces_occurrences(self):
+        booking, _ = self.create_from_draft(5)
+        old_occurrence_ids = list(booking.occurrences.values_list('occurrence_id', flat=True))
+
+        updated, _ = self.create_from_draft(3, booking=booking)
+
+        self.assertEqual(updated.booking_id, booking.booking_id)
+        self.assertEqual(updated.occurrences.count(), 3)
+        self.assertFalse(BookingOccurrence.objects.filter(occurrence_id__in=old_occurrence_ids).exists())
+        self.assertEqual(BookingDetails.objects.filter(booking_occurrence__booking=booking).count(), 3)
+        self.assertEqual(booking.booking_pets.count(), 1)
+        self.assertEqual(BookingSummary.objects.get(booking=booking).subtotal, Decimal('70.50'))
+
+    def test_pricing_fingerprint(self):
+        booking, _ = self.create_from_draft(3)
+
+        # Stored from the draft; the same as computing it from the rows that were written
+        self.assertEqual(booking.pricing_fingerprint, pricing_fingerprint(booking_pricing_components(booking)))
+
+        conversation, _ = find_or_create_conversation(self.pro_user, self.client_user, 'professional')
+        draft = BookingDraft.objects.create(
+            booking=booking,
+            draft_data=self.draft_data(conversation, 3),
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+        self.client.force_authenticate(user=self.pro_user)
+        url = f'/api/booking_drafts/v1/{draft.draft_id}/changes/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {
+            'has_changes': False,
+            'booking_fingerprint': booking.pricing_fingerprint,
+            'draft_fingerprint': booking.pricing_fingerprint,
+            'changes': {}
+        })
+        # Just the draft and its booking: equal fingerprints need no diff
+        self.assertEqual(len(queries), 1)
+
+        draft.draft_data['occurrences'][1]['rates']['base_rate'] = '$25'
+        draft.draft_data['occurrences'].pop()
+        draft.draft_data['pets'] = []
+        draft.save()
+        changes = self.client.get(url).json()['changes']
+        self.assertEqual(changes['pets'], {'added': [], 'removed': [self.pet.pet_id]})
+        self.assertEqual(len(changes['occurrences']['removed']), 1)
+        self.assertEqual(changes['occurrences']['added'], [])
+        [changed] = changes['occurrences']['changed']
+        self.assertEqual((changed['from']['base_rate'], changed['to']['base_rate']), ('20.00', '25.00'))
+
+    def test_deferred_scope_recomputes_once_at_exit(self):
+        booking = Booking.objects.create(
+            client=self.booking_client,
+            professional=self.professional,
+            service_id=self.service,
+            status=BookingStates.CONFIRMED
+        )
+
+        with deferred_cost_recomputation():
+            with deferred_cost_recomputation():
+                occurrences = [
+                    BookingOccurrence.objects.create(
+                        booking=booking,
+                        start_date=timezone.now().date(),
+                        end_date=timezone.now().date(),
+                        start_time=time(9, 0),
+                        end_time=time(11, 0),
+                        created_by='PROFESSIONAL',
+                        last_modified_by='PROFESSIONAL'
+                    )
+                    for _ in range(3)
+                ]
+            # The inner scope joined the outer one: nothing is recomputed yet
+            self.assertFalse(BookingSummary.objects.filter(booking=booking).exists())
+            self.assertEqual(BookingOccurrence.objects.get(pk=occurrences[0].pk).calculated_cost, Decimal('0.00'))
+
+        # Each occurrence's details were created by signal: 2 hours at $20
+        self.assertEqual(set(booking.occurrences.values_list('calculated_cost', flat=True)), {Decimal('40.00')})
+        self.assertEqual(BookingSummary.objects.get(booking=booking).subtotal, Decimal('120.00'))
+
+    def update_booking(self, occurrence_count):
+        booking = Booking.objects.create(
+            client=self.booking_client,
+            professional=self.professional,
+            service_id=self.service,
+            status=BookingStates.CONFIRMED
+        )
+        conversation, _ = find_or_create_conversation(self.pro_user, self.client_user, 'professional')
+        draft_data = self.draft_data(conversation, occurrence_count)
+        for index, occurrence in enumerate(draft_data['occurrences']):
+            occurrence['occurrence_id'] = f'draft_{index}'
+        BookingDraft.objects.create(
+            booking=booking,
+            draft_data=draft_data,
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+
+        self.client.force_authenticate(user=self.pro_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/bookings/v1/{booking.booking_id}/update/', format='json')
+        self.assertEqual(response.status_code, 200)
+        return booking, [query for query in queries if 'booking_summary' in query['sql']]
+
+    def test_update_booking_recomputes_summary_once(self):
+        _, single_summary_queries = self.update_booking(1)
+        booking, summary_queries = self.update_booking(10)
+
+        # Occurrence creates no longer re-sum the booking one by one
+        self.assertEqual(len(summary_queries), len(single_summary_queries))
+
+        # Each occurrence's details were created by signal: 1 hour at $20
+        self.assertEqual(set(booking.occurrences.values_list('calculated_cost', flat=True)), {Decimal('20.00')})
+        self.assertEqual(BookingSummary.objects.get(booking=booking).subtotal, Decimal('200.00'))
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.BookingListView.as_view(), name='booking-list'),
+    path('counts/', views.BookingCountsView.as_view(), name='booking-counts'),
     path('create/', views.CreateBookingView.as_view(), name='booking-create'),
     path('create-from-draft/', views.CreateFromDraftView.as_view(), name='booking-create-from-draft'),
     path('request_booking/', views.RequestBookingView.as_view(), name='booking-request'),
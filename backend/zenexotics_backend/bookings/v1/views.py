@@ -2,13 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
 from django.shortcuts import get_object_or_404
 from clients.models import Client
 from professionals.models import Professional
 from ..models import Booking
-from ..serializers import BookingListSerializer, BookingDetailSerializer, BookingResponseSerializer
+from ..serializers import BookingDetailSerializer, BookingResponseSerializer
+from ..draft_occurrences import create_occurrences_from_draft
+from ..booking_list import (
+    BOOKING_PAGE_SIZE,
+    MAX_BOOKING_PAGE_SIZE,
+    ROLES,
+    decode_booking_cursor,
+    encode_booking_cursor,
+    filter_bookings,
+    format_booking_row,
+    get_booking_counts,
+    get_booking_rows,
+    parse_date
+)
 from rest_framework import generics
 from booking_pets.models import BookingPets
 from pets.models import Pet
@@ -34,90 +46,84 @@ from engagement_logs.models import EngagementLog
 import traceback
 import pytz
 from core.time_utils import get_user_time_settings, format_booking_occurrence
+from core.pricing_fingerprint import pricing_components, store_booking_fingerprint
+from core.cost_recomputation import deferred_cost_recomputation
 from rest_framework.renderers import JSONRenderer
 from collections import OrderedDict
 from django.utils import timezone
 from user_messages.models import UserMessage
 from conversations.v1.views import find_or_create_conversation
-from django.core.paginator import Paginator, EmptyPage
+from conversations.utils import find_conversation, find_conversation_ids
+from django.core.paginator import Paginator
 from reviews.models import ProfessionalReview, ClientReview, ReviewRequest
 
 logger = logging.getLogger(__name__)
 
-class BookingPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class BookingListView(APIView):
+    """
+    The user's bookings, newest first (see bookings/booking_list.py).
 
-    def get_next_link(self):
-        if not self.page.has_next():
-            return None
-        return f"/api/bookings/v1/?page={self.page.next_page_number()}"
+    Query params:
+    - status: 'all' (default), 'pending', 'confirmed', 'completed', 'cancelled' or a booking status
+    - start_date / end_date: only bookings with an occurrence in this range (YYYY-MM-DD)
+    - role: 'professional' or 'client' to get one cursor-paginated list:
+      {'bookings': [...], 'next_cursor': ..., 'has_more': bool}, with page_size
+      (default 20, at most 100) and cursor (the previous page's next_cursor)
 
-class BookingListView(APIView):
+    Without role both lists are returned in full, as
+    {'bookings': {'professional_bookings': [...], 'client_bookings': [...]}, 'next_page': None}.
+    """
     permission_classes = [IsAuthenticated]
-    pagination_class = BookingPagination
 
     def get(self, request):
         user = request.user
-        
-        # Try to get client and professional profiles for the user
-        try:
-            client = Client.objects.get(user=user)
-            is_client = True
-        except Client.DoesNotExist:
-            is_client = False
-            client = None
+        role = request.query_params.get('role')
 
         try:
-            professional = Professional.objects.get(user=user)
-            is_professional = True
-        except Professional.DoesNotExist:
-            is_professional = False
-            professional = None
-
-        # Get professional bookings
-        professional_bookings = []
-        if is_professional:
-            prof_bookings = Booking.objects.filter(professional=professional).select_related(
-                'client__user',
-                'professional__user',
-                'bookingsummary'
-            ).prefetch_related(
-                'occurrences',
-                'drafts'  # Add prefetch for drafts
-            ).order_by('-created_at')
-            
-            # Serialize bookings and check for drafts
-            for booking in prof_bookings:
-                booking_data = BookingListSerializer(booking).data
-                # Check if there's a draft for this booking
-                draft = booking.drafts.first()  # Using related_name from BookingDraft model
-                if draft and draft.draft_data and 'status' in draft.draft_data:
-                    booking_data['status'] = draft.draft_data['status']
-                professional_bookings.append(booking_data)
-
-        # Get client bookings
-        client_bookings = []
-        if is_client:
-            cli_bookings = Booking.objects.filter(client=client).select_related(
-                'client__user',
-                'professional__user',
-                'bookingsummary'
-            ).prefetch_related(
-                'occurrences'
-            ).order_by('-created_at')
-            client_bookings = BookingListSerializer(cli_bookings, many=True).data
-
-        # Return response with separated bookings
+            if role is not None and role not in ROLES:
+                raise ValueError(f"role must be one of: {', '.join(ROLES)}")
+            filters = {'status': request.query_params.get('status')}
+            for name in ('start_date', 'end_date'):
+                if request.query_params.get(name):
+                    filters[name] = parse_date(request.query_params[name], name)
+            bookings = {
+                list_role: filter_bookings(user, list_role, **filters)
+                for list_role in (ROLES if role is None else [role])
+            }
+            page_size = min(max(int(request.query_params.get('page_size', BOOKING_PAGE_SIZE)), 1), MAX_BOOKING_PAGE_SIZE)
+            cursor = decode_booking_cursor(request.query_params['cursor']) if request.query_params.get('cursor') else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if role is None:
+            return Response({
+                'bookings': {
+                    f'{list_role}_bookings': [
+                        format_booking_row(row) for row in get_booking_rows(list_bookings, list_role)
+                    ]
+                    for list_role, list_bookings in bookings.items()
+                },
+                'next_page': None
+            })
+
+        # One extra row tells us whether there is another page
+        rows = get_booking_rows(bookings[role], role, limit=page_size + 1, cursor=cursor)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
         return Response({
-            'bookings': {
-                'professional_bookings': professional_bookings,
-                'client_bookings': client_bookings
-            },
-            'next_page': None  # Since we're not paginating the separated lists
+            'bookings': [format_booking_row(row) for row in rows],
+            'next_cursor': encode_booking_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more
         })
-    
+
+
+class BookingCountsView(APIView):
+    """Booking counts per role and status filter, for the bookings tab badges."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_booking_counts(request.user))
+
 class BookingUpdatePetsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -188,16 +194,19 @@ class BookingUpdatePetsView(APIView):
             ]:
                 booking.status = BookingStates.PENDING_PROFESSIONAL_CHANGES
 
-            # Save the booking first to update its status
+            # Save the booking first to update its status; its pricing fingerprint is recomputed when next needed
+            booking.pricing_fingerprint = ''
             booking.save()
 
             # Clear existing pets and add new ones
-            BookingPets.objects.filter(booking=booking).delete()
-            for pet_id in new_pet_ids:
-                BookingPets.objects.create(
-                    booking=booking,
-                    pet_id=pet_id
-                )
+            # Each pet change updates every occurrence's details; recompute their costs once
+            with deferred_cost_recomputation():
+                BookingPets.objects.filter(booking=booking).delete()
+                for pet_id in new_pet_ids:
+                    BookingPets.objects.create(
+                        booking=booking,
+                        pet_id=pet_id
+                    )
 
             return Response({
                 "status": BookingStates.get_display_state(booking.status),
@@ -282,9 +291,8 @@ class CreateBookingView(APIView):
             existing_drafts = BookingDraft.objects.filter(
                 Q(booking=None) | Q(booking__client=client, booking__professional=professional),
                 status='IN_PROGRESS',
-                draft_data__has_key='client_id',
-                draft_data__client_id=client.id,
-                draft_data__professional_id=professional.professional_id
+                client=client,
+                professional=professional
             )
             if existing_drafts.exists():
                 logger.info(f"Deleting {existing_drafts.count()} existing drafts for client {client.id} and professional {professional.professional_id}")
@@ -483,52 +491,54 @@ class RequestBookingView(APIView):
                     )
 
             # Create booking occurrences
-            for occurrence_data in occurrences:
-                try:
-                    # Parse the date and time strings
-                    start_date = datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date()
-                    end_date = datetime.strptime(occurrence_data.get('end_date', occurrence_data['start_date']), '%Y-%m-%d').date()
-                    start_time = datetime.strptime(occurrence_data['start_time'], '%H:%M').time()
-                    end_time = datetime.strptime(occurrence_data['end_time'], '%H:%M').time()
+            # Costs and the summary are computed once for all occurrences
+            with deferred_cost_recomputation():
+                for occurrence_data in occurrences:
+                    try:
+                        # Parse the date and time strings
+                        start_date = datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date()
+                        end_date = datetime.strptime(occurrence_data.get('end_date', occurrence_data['start_date']), '%Y-%m-%d').date()
+                        start_time = datetime.strptime(occurrence_data['start_time'], '%H:%M').time()
+                        end_time = datetime.strptime(occurrence_data['end_time'], '%H:%M').time()
                     
-                    # Get the user's timezone settings
-                    user_settings = get_user_time_settings(request.user.id)
-                    user_tz = pytz.timezone(user_settings['timezone'])
+                        # Get the user's timezone settings
+                        user_settings = get_user_time_settings(request.user.id)
+                        user_tz = pytz.timezone(user_settings['timezone'])
                     
-                    # Combine into datetime objects in user's timezone
-                    start_dt = datetime.combine(start_date, start_time)
-                    end_dt = datetime.combine(end_date, end_time)
+                        # Combine into datetime objects in user's timezone
+                        start_dt = datetime.combine(start_date, start_time)
+                        end_dt = datetime.combine(end_date, end_time)
                     
-                    # Make the datetime objects timezone-aware in user's timezone
-                    start_dt = user_tz.localize(start_dt)
-                    end_dt = user_tz.localize(end_dt)
+                        # Make the datetime objects timezone-aware in user's timezone
+                        start_dt = user_tz.localize(start_dt)
+                        end_dt = user_tz.localize(end_dt)
                     
-                    # Convert to UTC
-                    start_dt_utc = start_dt.astimezone(pytz.UTC)
-                    end_dt_utc = end_dt.astimezone(pytz.UTC)
+                        # Convert to UTC
+                        start_dt_utc = start_dt.astimezone(pytz.UTC)
+                        end_dt_utc = end_dt.astimezone(pytz.UTC)
                     
-                    occurrence = BookingOccurrence.objects.create(
-                        booking=booking,
-                        start_date=start_dt_utc.date(),
-                        end_date=end_dt_utc.date(),
-                        start_time=start_dt_utc.time(),
-                        end_time=end_dt_utc.time(),
-                        created_by='CLIENT',
-                        last_modified_by='CLIENT',
-                        status='PENDING'
-                    )
-                except (ValueError, KeyError) as e:
-                    ErrorLog.objects.create(
-                        user=request.user,
-                        error_message=f'Invalid occurrence data: {str(e)}',
-                        endpoint='/api/bookings/v1/request_booking/',
-                        metadata={'occurrence_data': occurrence_data}
-                    )
-                    transaction.savepoint_rollback(sid)
-                    return Response(
-                        {"error": f"Invalid occurrence data: {str(e)}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+                        occurrence = BookingOccurrence.objects.create(
+                            booking=booking,
+                            start_date=start_dt_utc.date(),
+                            end_date=end_dt_utc.date(),
+                            start_time=start_dt_utc.time(),
+                            end_time=end_dt_utc.time(),
+                            created_by='CLIENT',
+                            last_modified_by='CLIENT',
+                            status='PENDING'
+                        )
+                    except (ValueError, KeyError) as e:
+                        ErrorLog.objects.create(
+                            user=request.user,
+                            error_message=f'Invalid occurrence data: {str(e)}',
+                            endpoint='/api/bookings/v1/request_booking/',
+                            metadata={'occurrence_data': occurrence_data}
+                        )
+                        transaction.savepoint_rollback(sid)
+                        return Response(
+                            {"error": f"Invalid occurrence data: {str(e)}"},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
 
             # Create/update booking summary
             try:
@@ -633,6 +643,7 @@ class UpdateBookingServiceTypeView(APIView):
 
             # Update the service
             booking.service_id = service
+            booking.pricing_fingerprint = ''
             booking.save()
 
             # Return updated service details
@@ -969,64 +980,67 @@ class UpdateBookingView(APIView):
                     booking.save()
                     logger.info(f"MBA976asd2n2h5 Updated service to {service.service_name}")
 
-                # Update booking pets
-                # First delete existing pets
-                BookingPets.objects.filter(booking=booking).delete()
+                # Pet and occurrence writes recompute each occurrence's cost and the
+                # booking summary once, when the scope ends
+                with deferred_cost_recomputation():
+                    # Update booking pets
+                    # First delete existing pets
+                    BookingPets.objects.filter(booking=booking).delete()
                 
-                # Then add new pets
-                for pet_data in draft_data.get('pets', []):
-                    pet = get_object_or_404(Pet, pet_id=pet_data['pet_id'])
-                    BookingPets.objects.create(booking=booking, pet=pet)
-                logger.info(f"MBA976asd2n2h5 Updated booking pets: {draft_data.get('pets', [])}")
-
-                # Process occurrences
-                for occurrence_data in draft_data.get('occurrences', []):
-                    occurrence_id = occurrence_data.get('occurrence_id')
+                    # Then add new pets
+                    for pet_data in draft_data.get('pets', []):
+                        pet = get_object_or_404(Pet, pet_id=pet_data['pet_id'])
+                        BookingPets.objects.create(booking=booking, pet=pet)
+                    logger.info(f"MBA976asd2n2h5 Updated booking pets: {draft_data.get('pets', [])}")
+
+                    # Process occurrences
+                    for occurrence_data in draft_data.get('occurrences', []):
+                        occurrence_id = occurrence_data.get('occurrence_id')
                     
-                    logger.info(f"MBA7654 Processing occurrence data: {occurrence_data}")
+                        logger.info(f"MBA7654 Processing occurrence data: {occurrence_data}")
                     
-                    try:
-                        # Parse times directly from draft data (already in UTC and military time)
-                        # Store exactly as received - no timezone conversion needed
-                        start_date = datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date()
-                        end_date = datetime.strptime(occurrence_data['end_date'], '%Y-%m-%d').date()
-                        start_time = datetime.strptime(occurrence_data['start_time'], '%H:%M').time()
-                        end_time = datetime.strptime(occurrence_data['end_time'], '%H:%M').time()
-
-                        logger.info(f"MBA7654 Using exact draft times - Start: {start_date} {start_time}, End: {end_date} {end_time}")
-
-                        # Get or create occurrence
-                        if isinstance(occurrence_id, str) and occurrence_id.startswith('draft_'):
-                            # Create new occurrence - store exactly as is since times are already UTC
-                            occurrence = BookingOccurrence.objects.create(
-                                booking=booking,
-                                start_date=start_date,
-                                end_date=end_date,
-                                start_time=start_time,
-                                end_time=end_time,
-                                created_by='PROFESSIONAL',
-                                last_modified_by='PROFESSIONAL',
-                                status='PENDING'
-                            )
-                            logger.info(f"MBA7654 Created new occurrence with exact draft times - Start: {occurrence.start_date} {occurrence.start_time}, End: {occurrence.end_date} {occurrence.end_time}")
-                        else:
-                            # Update existing occurrence - store exactly as is since times are already UTC
-                            occurrence = get_object_or_404(
-                                BookingOccurrence,
-                                occurrence_id=occurrence_id,
-                                booking=booking
-                            )
-                            occurrence.start_date = start_date
-                            occurrence.end_date = end_date
-                            occurrence.start_time = start_time
-                            occurrence.end_time = end_time
-                            occurrence.last_modified_by = 'PROFESSIONAL'
-                            occurrence.save()
-                            logger.info(f"MBA7654 Updated existing occurrence with exact draft times - Start: {occurrence.start_date} {occurrence.start_time}, End: {occurrence.end_date} {occurrence.end_time}")
-                    except Exception as e:
-                        logger.error(f"MBA7654 Error processing occurrence: {str(e)}")
-                        logger.error(f"MBA7654 Full traceback: {traceback.format_exc()}")
-                        raise
+                        try:
+                            # Parse times directly from draft data (already in UTC and military time)
+                            # Store exactly as received - no timezone conversion needed
+                            start_date = datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date()
+                            end_date = datetime.strptime(occurrence_data['end_date'], '%Y-%m-%d').date()
+                            start_time = datetime.strptime(occurrence_data['start_time'], '%H:%M').time()
+                            end_time = datetime.strptime(occurrence_data['end_time'], '%H:%M').time()
+
+                            logger.info(f"MBA7654 Using exact draft times - Start: {start_date} {start_time}, End: {end_date} {end_time}")
+
+                            # Get or create occurrence
+                            if isinstance(occurrence_id, str) and occurrence_id.startswith('draft_'):
+                                # Create new occurrence - store exactly as is since times are already UTC
+                                occurrence = BookingOccurrence.objects.create(
+                                    booking=booking,
+                                    start_date=start_date,
+                                    end_date=end_date,
+                                    start_time=start_time,
+                                    end_time=end_time,
+                                    created_by='PROFESSIONAL',
+                                    last_modified_by='PROFESSIONAL',
+                                    status='PENDING'
+                                )
+                                logger.info(f"MBA7654 Created new occurrence with exact draft times - Start: {occurrence.start_date} {occurrence.start_time}, End: {occurrence.end_date} {occurrence.end_time}")
+                            else:
+                                # Update existing occurrence - store exactly as is since times are already UTC
+                                occurrence = get_object_or_404(
+                                    BookingOccurrence,
+                                    occurrence_id=occurrence_id,
+                                    booking=booking
+                                )
+                                occurrence.start_date = start_date
+                                occurrence.end_date = end_date
+                                occurrence.start_time = start_time
+                                occurrence.end_time = end_time
+                                occurrence.last_modified_by = 'PROFESSIONAL'
+                                occurrence.save()
+                                logger.info(f"MBA7654 Updated existing occurrence with exact draft times - Start: {occurrence.start_date} {occurrence.start_time}, End: {occurrence.end_date} {occurrence.end_time}")
+                        except Exception as e:
+                            logger.error(f"MBA7654 Error processing occurrence: {str(e)}")
+                            logger.error(f"MBA7654 Full traceback: {traceback.format_exc()}")
+                            raise
 
             else:
                 # Get cost summary from BookingSummary table
@@ -1084,16 +1098,11 @@ class UpdateBookingView(APIView):
                     occurrences.append(occurrence_data)
 
             # Send approval message to client
-            conversation = Conversation.objects.filter(
-                Q(participant1=booking.client.user, participant2=booking.professional.user) |
-                Q(participant1=booking.professional.user, participant2=booking.client.user)
-            ).first()
-
-            if not conversation:
-                conversation = Conversation.objects.create(
-                    participant1=booking.professional.user,
-                    participant2=booking.client.user
-                )
+            conversation, _ = find_or_create_conversation(
+                booking.professional.user,
+                booking.client.user,
+                'professional'
+            )
 
             # Check if either user is deleted - prevent messaging to deleted users
             from users.account_deletion import validate_user_not_deleted
@@ -1128,6 +1137,7 @@ class UpdateBookingView(APIView):
 
             # Update booking status to PENDING_CLIENT_APPROVAL
             booking.status = BookingStates.PENDING_CLIENT_APPROVAL
+            booking.pricing_fingerprint = ''
             booking.save()
             logger.info(f"MBA976asd2n2h5 Updated booking status to {booking.status}")
 
@@ -1249,18 +1259,19 @@ class ApproveBookingView(APIView):
                 
             booking.save()
 
+            # What the client agreed to; drafts of this booking are compared against it.
+            # Already set when the booking was written from a draft
+            if not booking.pricing_fingerprint:
+                store_booking_fingerprint(booking)
+
             # Send confirmation message
             try:
                 # Get conversation between client and professional
-                from conversations.models import Conversation
                 from user_messages.models import UserMessage
                 from django.utils import timezone
                 
                 # Find the conversation
-                conversation = Conversation.objects.filter(
-                    (Q(participant1=request.user) & Q(participant2=booking.professional.user)) |
-                    (Q(participant1=booking.professional.user) & Q(participant2=request.user))
-                ).first()
+                conversation = find_conversation(booking.professional.user, request.user, 'professional')
                 
                 if conversation:
                     # Get booking summary data for cost information
@@ -1314,13 +1325,10 @@ class ApproveBookingView(APIView):
             
             # Send booking confirmation email to professional
             try:
-                from core.email_utils import schedule_delayed_email, send_booking_confirmation_email
-                
-                # Schedule the booking confirmation email after a delay
-                def send_booking_email():
-                    send_booking_confirmation_email(booking.booking_id)
+                from user_messages.email_jobs import schedule_email_job
                 
-                schedule_delayed_email(send_booking_email, delay_seconds=0)
+                # Queue the booking confirmation email for the process_email_jobs worker
+                schedule_email_job('booking_confirmation', {'booking_id': booking.booking_id})
                 logger.info(f"Scheduled booking confirmation email for booking {booking_id}")
             except Exception as email_error:
                 logger.error(f"Error scheduling booking confirmation email: {str(email_error)}")
@@ -1647,166 +1655,38 @@ class CreateFromDraftView(APIView):
                 logger.info(f"MBA66777 Created new booking {booking.booking_id}")
                 existing_occurrences = []
             
-            # Add pets to booking
-            pet_count = 0
+            # Add pets to booking. Bulk inserted: the new occurrences' details get the pet count
+            # directly, so the per-pet signal that updates every occurrence's details isn't needed
+            booking_pets = []
             for pet_data in draft_data.get('pets', []):
                 pet_id = pet_data.get('pet_id')
                 if pet_id:
                     pet = get_object_or_404(Pet, pet_id=pet_id)
-                    BookingPets.objects.create(booking=booking, pet=pet)
-                    pet_count += 1
+                    booking_pets.append(BookingPets(booking=booking, pet=pet))
+            BookingPets.objects.bulk_create(booking_pets)
+            pet_count = len(booking_pets)
             
             logger.info(f"MBA66777 Added {pet_count} pets to booking {booking.booking_id}")
             
-            # Process occurrences
-            occurrences = []
-            new_booking_occurrences = []
-            
-            for occurrence_data in draft_data.get('occurrences', []):
-                # Parse dates and times
-                start_date = datetime.strptime(occurrence_data['start_date'], '%Y-%m-%d').date()
-                end_date = datetime.strptime(occurrence_data['end_date'], '%Y-%m-%d').date()
-                start_time = datetime.strptime(occurrence_data['start_time'], '%H:%M').time()
-                end_time = datetime.strptime(occurrence_data['end_time'], '%H:%M').time()
-                
-                # Create occurrence
-                occurrence = BookingOccurrence.objects.create(
-                    booking=booking,
-                    start_date=start_date,
-                    end_date=end_date,
-                    start_time=start_time,
-                    end_time=end_time,
-                    created_by='PROFESSIONAL',
-                    last_modified_by='PROFESSIONAL',
-                    status='PENDING',
-                    calculated_cost=Decimal(str(occurrence_data.get('calculated_cost', 0)))
-                )
-                
-                new_booking_occurrences.append(occurrence)
-                logger.info(f"MBA66777 Created occurrence {occurrence.occurrence_id} for booking {booking.booking_id}")
-                
-                # Get or create booking details
-                # Try to get unit_of_time from either occurrence_data directly or from occurrence_data.rates
-                unit_of_time = occurrence_data.get('unit_of_time')
-                if not unit_of_time and 'rates' in occurrence_data:
-                    unit_of_time = occurrence_data['rates'].get('unit_of_time')
-                if not unit_of_time:
-                    unit_of_time = 'Per Visit'  # Default if not found in either place
-                
-                logger.info(f"MBAio3htg5uohg: Unit of time: {unit_of_time}")
-                
-                multiple = occurrence_data.get('multiple', 1)
-                # Ensure multiple is a string to preserve precision (e.g., 0.33 vs 0.3)
-                if not isinstance(multiple, str):
-                    multiple = str(multiple)
-                logger.info(f"MBAio3htg5uohg: Multiple from draft: {multiple}")
-                
-                rates = occurrence_data.get('rates', {})
-                logger.info(f"MBAio3htg5uohg: Rates: {rates}")
-                
-                booking_details = BookingDetails.objects.filter(booking_occurrence=occurrence).first()
-                if booking_details:
-                    booking_details.num_pets = pet_count
-                    booking_details.base_rate = Decimal(str(rates.get('base_rate', 0)))
-                    booking_details.additional_pet_rate = Decimal(str(rates.get('additional_animal_rate', 0)))
-                    booking_details.applies_after = int(rates.get('applies_after', 1))
-                    booking_details.holiday_rate = Decimal(str(rates.get('holiday_rate', 0)))
-                    booking_details.unit_of_time = unit_of_time
-                    # Store the exact multiple value from the draft without rounding
-                    booking_details.multiple = Decimal(multiple)
-                    booking_details.nights = int(draft_data.get('nights', 0))
-                    booking_details.save()
-                    
-                    # Force update the calculated rate based on the supplied multiple
-                    base_rate = booking_details.base_rate
-                    calculated_rate = base_rate * Decimal(multiple)
-                    
-                    # Add additional pet costs if applicable
-                    if booking_details.additional_pet_rate and pet_count > booking_details.applies_after:
-                        additional_pets = pet_count - booking_details.applies_after
-                        additional_pet_cost = booking_details.additional_pet_rate * additional_pets * Decimal(multiple)
-                        calculated_rate += additional_pet_cost
-                        logger.info(f"MBA66777 Added {additional_pets} additional pets cost: ${additional_pet_cost}")
-                    
-                    # Update calculated_rate directly
-                    booking_details.calculated_rate = calculated_rate.quantize(Decimal('0.01'))
-                    booking_details.save(update_fields=['calculated_rate'])
-                    
-                    logger.info(f"MBAio3htg5uohg: Updated booking details with multiple={multiple} for occurrence {occurrence.occurrence_id}")
-                    logger.info(f"MBA66777 Forced calculated_rate to: ${booking_details.calculated_rate}")
-                
-                # Create additional rates if any
-                additional_rates = rates.get('additional_rates', [])
-                if additional_rates:
-                    occurrence_rate, created = BookingOccurrenceRate.objects.get_or_create(
-                        occurrence=occurrence,
-                        defaults={'rates': []}
-                    )
-                    
-                    rate_objects = []
-                    for rate in additional_rates:
-                        rate_objects.append({
-                            'title': rate.get('title'),
-                            'amount': str(rate.get('amount')),
-                            'description': rate.get('description', 'Additional rate')
-                        })
-                    
-                    occurrence_rate.rates = rate_objects
-                    occurrence_rate.save()
-                    
-                    logger.info(f"MBA66777 Added {len(rate_objects)} additional rates for occurrence {occurrence.occurrence_id}")
-                
-                # Force update the occurrence's calculated_cost
-                total_cost = Decimal('0.00')
-                
-                # Get the calculated_cost directly from the draft data if available
-                draft_calculated_cost = occurrence_data.get('calculated_cost')
-                if draft_calculated_cost:
-                    total_cost = Decimal(str(draft_calculated_cost))
-                    logger.info(f"MBA66777 Using draft calculated_cost: ${total_cost}")
-                else:
-                    # Add booking details calculated rate
-                    if booking_details:
-                        total_cost += booking_details.calculated_rate
-                    
-                    # Add additional rates totals
-                    additional_rates_total = Decimal('0.00')
-                    occurrence_rate = getattr(occurrence, 'rates', None)
-                    if occurrence_rate and occurrence_rate.rates:
-                        for rate in occurrence_rate.rates:
-                            amount_str = str(rate.get('amount', '0'))
-                            # Clean the amount string - remove any non-numeric characters except decimal point
-                            try:
-                                # First try to handle currency format (e.g., "$25.23")
-                                amount_str = amount_str.replace('$', '').strip()
-                                amount_value = Decimal(amount_str)
-                                additional_rates_total += amount_value
-                                logger.info(f"MBA66777 Added additional rate amount: ${amount_value}")
-                            except Exception as e:
-                                logger.error(f"MBA66777 Error parsing amount '{amount_str}': {str(e)}")
-                                # Skip this rate if we can't parse it
-                    
-                    total_cost += additional_rates_total
-                    logger.info(f"MBA66777 Calculated total cost: ${total_cost}")
-                
-                occurrence.calculated_cost = total_cost.quantize(Decimal('0.01'))
-                occurrence.save(update_fields=['calculated_cost'])
-                
-                logger.info(f"MBA66777 Updated occurrence calculated_cost to ${occurrence.calculated_cost}")
-                
-                # Add to occurrences list for message
-                occurrences.append({
+            # Occurrences, details and additional rates are inserted in bulk, without signals
+            new_booking_occurrences = create_occurrences_from_draft(booking, draft_data, pet_count)
+            occurrences = [
+                {
                     'occurrence_id': occurrence.occurrence_id,
-                    'start_date': start_date.strftime('%Y-%m-%d'),
-                    'end_date': end_date.strftime('%Y-%m-%d'),
-                    'start_time': start_time.strftime('%H:%M'),
-                    'end_time': end_time.strftime('%H:%M')
-                })
-            
+                    'start_date': occurrence.start_date.strftime('%Y-%m-%d'),
+                    'end_date': occurrence.end_date.strftime('%Y-%m-%d'),
+                    'start_time': occurrence.start_time.strftime('%H:%M'),
+                    'end_time': occurrence.end_time.strftime('%H:%M')
+                }
+                for occurrence in new_booking_occurrences
+            ]
+
             # Now it's safe to delete old occurrences since new ones are created
-            for old_occurrence in existing_occurrences:
-                old_occurrence.delete()
-                logger.info(f"MBA66777 Deleted old occurrence {old_occurrence.occurrence_id}")
+            if existing_occurrences:
+                BookingOccurrence.objects.filter(
+                    occurrence_id__in=[old_occurrence.occurrence_id for old_occurrence in existing_occurrences]
+                ).delete()
+                logger.info(f"MBA66777 Deleted {len(existing_occurrences)} old occurrences")
 
             # Get cost summary from draft data
             cost_summary = draft_data.get('cost_summary', {})
@@ -1817,6 +1697,9 @@ class CreateFromDraftView(APIView):
             # Create booking summary with platform fee data using the centralized service
             from booking_summary.services import BookingSummaryService
             summary = BookingSummaryService.create_or_update_from_draft(booking, draft_data)
+
+            # The booking now holds exactly the draft's priced content
+            store_booking_fingerprint(booking, pricing_components(draft_data))
             
             logger.info(f"MBA66777 Created/updated booking summary for booking {booking.booking_id}")
             
@@ -1889,20 +1772,47 @@ class CreateFromDraftView(APIView):
             )
 
 class ConnectionsView(APIView):
+    """
+    A professional's clients (invited or booked), one page at a time.
+
+    Query params:
+    - page: page number (default 1; past the end returns the last page)
+    - page_size: clients per page (default 20, at most 100)
+    - filter: 'all' (default), 'active_bookings', 'no_bookings' or 'past_bookings'
+    - search: matches the client's name or their pets' names and species
+
+    Booking flags are computed with conditional aggregation over the clients
+    query, so a page costs a fixed number of queries however many clients
+    the professional has.
+    """
     permission_classes = [IsAuthenticated]
 
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    FILTERS = ('all', 'active_bookings', 'no_bookings', 'past_bookings')
+
     def get(self, request):
         try:
             user = request.user
             page = request.query_params.get('page', 1)
-            
-            # Determine if user is professional or client
-            is_professional = False
-            professional = None
+            connection_filter = request.query_params.get('filter', 'all')
+            search = request.query_params.get('search', '').strip()
+
+            try:
+                page_size = min(max(int(request.query_params.get('page_size', self.PAGE_SIZE)), 1), self.MAX_PAGE_SIZE)
+            except ValueError:
+                return Response(
+                    {"error": "page_size must be an integer"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if connection_filter not in self.FILTERS:
+                return Response(
+                    {"error": f"filter must be one of: {', '.join(self.FILTERS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             try:
                 professional = Professional.objects.get(user=user)
-                is_professional = True
                 logger.info(f"MBA9452: User is a professional with ID {professional.professional_id}")
             except Professional.DoesNotExist:
                 return Response(
@@ -1910,133 +1820,89 @@ class ConnectionsView(APIView):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            if is_professional:
-                # Get the user's timezone
-                from core.time_utils import get_user_time_settings
-                user_settings = get_user_time_settings(user.id)
-                user_tz = pytz.timezone(user_settings['timezone'])
-                current_date = timezone.now().astimezone(user_tz).date()
-                
-                logger.info(f"MBA9452: Current date in user timezone: {current_date}")
-                
-                # Get all clients for this professional (both invited and with bookings)
-                # Exclude deleted users
-                clients = Client.objects.filter(
-                    Q(booking__professional=professional) |  # Clients who have bookings with this professional
-                    Q(invited_by=professional)  # Clients who were invited by this professional
-                ).filter(
-                    user__is_deleted=False,  # Exclude deleted users
-                    user__is_active=True  # Exclude inactive users
-                ).distinct().select_related('user')
-                
-                logger.info(f"MBA9452: Found {clients.count()} active clients for professional {professional.professional_id}")
-                
-                connections = []
-                for client in clients:
-                    # Skip if client user is deleted (double-check)
-                    if client.user.is_deleted or not client.user.is_active:
-                        logger.info(f"MBA9452: Skipping deleted/inactive client user: {client.user.id}")
-                        continue
-                        
-                    # Find all conversations between these users
-                    conversations = Conversation.objects.filter(
-                        (Q(participant1=request.user) & Q(participant2=client.user)) |
-                        (Q(participant1=client.user) & Q(participant2=request.user))
-                    ).order_by('last_message_time')
-                    
-                    logger.info(f"MBA9452: Found {conversations.count()} conversations between user {request.user.id} and client {client.user.id}")
-                    
-                    # Find the conversation where the requesting user is the professional
-                    conversations = Conversation.objects.filter(
-                        (Q(participant1=request.user) & Q(participant2=client.user)) |
-                        (Q(participant1=client.user) & Q(participant2=request.user))
-                    )
-                    
-                    conversation_id = None
-                    for conversation in conversations:
-                        # Check the role map to ensure the requesting user is the professional
-                        role_map = conversation.role_map
-                        logger.info(f"MBA9452: Checking conversation role map: {role_map}")
-                        
-                        # Check if any key in the role map has "professional" as its value
-                        for key, role in role_map.items():
-                            if role == "professional":
-                                # If we found a professional role, check if this is our user
-                                if key.startswith('user_') or key == str(request.user.id):
-                                    conversation_id = conversation.conversation_id
-                                    logger.info(f"MBA9452: Found conversation where user is professional: conversation_id={conversation_id}, role_map={role_map}")
-                                    break
-                        else:
-                            logger.info(f"MBA9452: Skipping conversation - user is not professional: conversation_id={conversation.conversation_id}, role_map={role_map}")
-                        
-                        if not conversation_id:
-                            logger.info(f"MBA9452: No conversation found where user is professional for client: user_id={request.user.id}, client_id={client.id}, conversations_checked={list(conversations.values_list('conversation_id', flat=True))}")
-                    
-                    # Check for active bookings (any booking that isn't completed or cancelled)
-                    has_active_booking = Booking.objects.filter(
-                        client=client,
-                        professional=professional,
-                        status__in=[
-                            BookingStates.CONFIRMED
-                        ]
-                    ).exists()
-                    
-                    # Check for past bookings - bookings with status COMPLETED and at least one occurrence with end_date < current_date
-                    has_past_booking = 0
-                    completed_bookings = Booking.objects.filter(
-                        client=client,
-                        professional=professional,
-                        status=BookingStates.COMPLETED
-                    )
-                    
-                    if completed_bookings.exists():
-                        # For each completed booking, check if any occurrence has end_date earlier than current date
-                        for booking in completed_bookings:
-                            past_occurrences = BookingOccurrence.objects.filter(
-                                booking=booking,
-                                end_date__lt=current_date
-                            )
-                            if past_occurrences.exists():
-                                has_past_booking = 1
-                                break
-                    
-                    logger.info(f"MBA9452: Client {client.id} has_active_booking={has_active_booking}, has_past_booking={has_past_booking}")
-                    
-                    # Get the client's pets
-                    pets = Pet.objects.filter(owner=client.user)
-                    
-                    # Build the connection data
-                    connection_data = {
-                        'id': client.user.id,
-                        'client_id': client.id,
-                        'name': client.user.name,
-                        'profile_image': client.user.profile_image_url if hasattr(client.user, 'profile_image_url') else None,
-                        'about_me': client.about_me,
-                        'has_past_booking': has_past_booking,
-                        'pets': [{'id': pet.pet_id, 'name': pet.name, 'species': pet.species} for pet in pets],
-                        'active_bookings_count': 1 if has_active_booking else 0,
-                        'conversation_id': conversation_id if conversation_id else None
-                    }
-                    
-                    logger.info(f"MBA9452: Built connection data for client {client.user.id}: {connection_data}")
-                    
-                    connections.append(connection_data)
-                
-                # Paginate results
-                paginator = Paginator(connections, 20)
-                try:
-                    page_obj = paginator.page(page)
-                except EmptyPage:
-                    page_obj = paginator.page(paginator.num_pages)
-                
-                return Response({
-                    'connections': page_obj.object_list,
-                    'total_count': paginator.count,
-                    'has_next': page_obj.has_next(),
-                    'has_previous': page_obj.has_previous(),
-                    'current_page': page_obj.number,
-                    'total_pages': paginator.num_pages
-                })
+            # Get the user's timezone
+            from core.time_utils import get_user_time_settings
+            user_settings = get_user_time_settings(user.id)
+            user_tz = pytz.timezone(user_settings['timezone'])
+            current_date = timezone.now().astimezone(user_tz).date()
+            
+            logger.info(f"MBA9452: Current date in user timezone: {current_date}")
+            
+            # Clients who have bookings with this professional or were invited by them,
+            # excluding deleted and inactive users. A booking is active when confirmed;
+            # a client has a past booking when a completed booking has an occurrence
+            # that ended before today.
+            clients = Client.objects.filter(
+                Q(id__in=Booking.objects.filter(professional=professional).values('client_id')) |
+                Q(invited_by=professional),
+                user__is_deleted=False,
+                user__is_active=True
+            ).annotate(
+                active_bookings_count=Count(
+                    'booking',
+                    filter=Q(booking__professional=professional, booking__status=BookingStates.CONFIRMED),
+                    distinct=True
+                ),
+                past_bookings_count=Count(
+                    'booking',
+                    filter=Q(
+                        booking__professional=professional,
+                        booking__status=BookingStates.COMPLETED,
+                        booking__occurrences__end_date__lt=current_date
+                    ),
+                    distinct=True
+                )
+            )
+
+            if connection_filter == 'active_bookings':
+                clients = clients.filter(active_bookings_count__gt=0)
+            elif connection_filter == 'no_bookings':
+                clients = clients.filter(active_bookings_count=0, past_bookings_count=0)
+            elif connection_filter == 'past_bookings':
+                clients = clients.filter(active_bookings_count=0, past_bookings_count__gt=0)
+
+            if search:
+                matching_pets = Pet.objects.filter(owner=OuterRef('user')).filter(
+                    Q(name__icontains=search) | Q(species__icontains=search)
+                )
+                clients = clients.filter(Q(user__name__icontains=search) | Exists(matching_pets))
+
+            clients = clients.select_related('user').prefetch_related(
+                Prefetch('user__owned_pets', queryset=Pet.objects.only('pet_id', 'name', 'species', 'owner'))
+            ).order_by('user__name', 'id')
+
+            paginator = Paginator(clients, page_size)
+            page_obj = paginator.get_page(page)
+            page_clients = list(page_obj.object_list)
+
+            logger.info(f"MBA9452: Found {paginator.count} clients for professional {professional.professional_id} (filter={connection_filter})")
+
+            # Conversations where the requesting user is the professional, for the whole page at once
+            conversation_ids = find_conversation_ids(user, [client.user_id for client in page_clients], 'professional')
+            
+            connections = [
+                {
+                    'id': client.user.id,
+                    'client_id': client.id,
+                    'name': client.user.name,
+                    'profile_image': client.user.profile_image_url if hasattr(client.user, 'profile_image_url') else None,
+                    'about_me': client.about_me,
+                    'has_past_booking': 1 if client.past_bookings_count else 0,
+                    'pets': [{'id': pet.pet_id, 'name': pet.name, 'species': pet.species} for pet in client.user.owned_pets.all()],
+                    'active_bookings_count': 1 if client.active_bookings_count else 0,
+                    'conversation_id': conversation_ids.get(client.user_id)
+                }
+                for client in page_clients
+            ]
+            
+            return Response({
+                'connections': connections,
+                'total_count': paginator.count,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous(),
+                'current_page': page_obj.number,
+                'total_pages': paginator.num_pages
+            })
                 
         except Exception as e:
             logger.error(f"MBA9452: Error in ConnectionsView: {str(e)}")
@@ -2301,30 +2167,16 @@ class MarkBookingCompletedView(APIView):
             logger.info(f"MBA8675309: Updated booking {booking_id} status to {booking.status}")
             
             # Update all occurrences to "COMPLETED" status
-            occurrences = BookingOccurrence.objects.filter(booking=booking)
-            for occurrence in occurrences:
-                occurrence.status = 'COMPLETED'
-                occurrence.save()
+            # Status-only saves; the summary is recomputed once afterwards
+            with deferred_cost_recomputation():
+                occurrences = BookingOccurrence.objects.filter(booking=booking)
+                for occurrence in occurrences:
+                    occurrence.status = 'COMPLETED'
+                    occurrence.save()
             logger.info(f"MBA8675309: Updated {occurrences.count()} occurrences to COMPLETED status")
             
             # Find or create conversation between professional and client
-            conversation = Conversation.objects.filter(
-                (Q(participant1=request.user) & Q(participant2=client.user)) |
-                (Q(participant1=client.user) & Q(participant2=request.user))
-            ).first()
-            
-            if not conversation:
-                logger.error(f"MBA8675309: No conversation found between professional {professional.professional_id} and client {client.id}")
-                # Create a new conversation if none exists
-                conversation = Conversation.objects.create(
-                    participant1=request.user,
-                    participant2=client.user,
-                    role_map={
-                        f"user_{request.user.id}": "professional",
-                        f"user_{client.user.id}": "client"
-                    }
-                )
-                logger.info(f"MBA8675309: Created new conversation {conversation.conversation_id}")
+            conversation, _ = find_or_create_conversation(request.user, client.user, 'professional')
             
             # Get booking summary for cost information
             booking_summary = BookingSummary.objects.filter(booking=booking).first()
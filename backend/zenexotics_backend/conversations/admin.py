@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation
+from .models import Conversation, ConversationInbox
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
@@ -31,3 +31,11 @@ class ConversationAdmin(admin.ModelAdmin):
             'description': 'Additional metadata about the conversation'
         }),
     )
+
+
+@admin.register(ConversationInbox)
+class ConversationInboxAdmin(admin.ModelAdmin):
+    list_display = ('user', 'conversation', 'other_user_name', 'role', 'activity_time')
+    search_fields = ('user__email', 'other_user_name')
+    raw_id_fields = ('user', 'conversation', 'other_user')
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,200 @@
+"""
+Conversation inbox read model.
+
+ConversationInbox keeps one row per (user, conversation) with what the
+conversation list shows: the other participant's name and picture, the last
+message and the user's role. Rows are kept current by:
+
+- sync_conversation_inbox(), on every Conversation save (signals.py), which
+  covers new conversations and every last_message or role_map update
+- refresh_other_user_profile(), when a user is saved (signals.py)
+
+Unread counts are not copied into the rows: get_inbox_entries() reads them
+from UnreadMessageCounter (user_messages/unread_counts.py), where they are
+maintained, in the same query.
+
+rebuild_conversation_inbox() recomputes rows from the source tables (see the
+rebuild_conversation_inbox command).
+"""
+import base64
+import binascii
+from datetime import datetime
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from user_messages.models import UnreadMessageCounter
+from users.models import User
+from .models import Conversation, ConversationInbox
+
+logger = logging.getLogger(__name__)
+
+INBOX_PAGE_SIZE = 20
+MAX_INBOX_PAGE_SIZE = 100
+
+REBUILD_BATCH_SIZE = 1000
+
+INBOX_FIELDS = (
+    'conversation_id',
+    'conversation__participant1_id',
+    'conversation__participant2_id',
+    'other_user_id',
+    'other_user_name',
+    'other_user_profile_picture',
+    'role',
+    'last_message',
+    'last_message_time',
+    'activity_time',
+    'unread_count',
+)
+
+
+def _profile_picture_name(user):
+    return user.profile_picture.name if user.profile_picture else ''
+
+
+def profile_picture_url(name):
+    """URL for a stored profile picture name, without loading the user."""
+    if not name:
+        return None
+    return User._meta.get_field('profile_picture').storage.url(name)
+
+
+def build_inbox_entries(conversation):
+    """Unsaved inbox rows for both participants of a conversation."""
+    role_map = conversation.role_map or {}
+    activity_time = conversation.last_message_time or timezone.now()
+    participants = [
+        (conversation.participant1, conversation.participant2),
+        (conversation.participant2, conversation.participant1),
+    ]
+    return [
+        ConversationInbox(
+            user=user,
+            conversation=conversation,
+            other_user=other_user,
+            other_user_name=other_user.name,
+            other_user_profile_picture=_profile_picture_name(other_user),
+            role=role_map.get(str(user.id), ''),
+            last_message=conversation.last_message,
+            last_message_time=conversation.last_message_time,
+            activity_time=activity_time
+        )
+        for user, other_user in participants
+    ]
+
+
+def sync_conversation_inbox(conversation):
+    """Copy the conversation's last message and roles to both inbox rows, creating them if needed."""
+    role_map = conversation.role_map or {}
+    fields = {
+        'last_message': conversation.last_message,
+        'last_message_time': conversation.last_message_time,
+        'role': Case(
+            *[
+                When(user_id=user_id, then=Value(role_map.get(str(user_id), '')))
+                for user_id in (conversation.participant1_id, conversation.participant2_id)
+            ],
+            default=F('role')
+        ),
+    }
+    if conversation.last_message_time is not None:
+        fields['activity_time'] = conversation.last_message_time
+
+    if ConversationInbox.objects.filter(conversation=conversation).update(**fields):
+        return
+    ConversationInbox.objects.bulk_create(build_inbox_entries(conversation), ignore_conflicts=True)
+
+
+def refresh_other_user_profile(user):
+    """Update the name and picture shown to everyone who has a conversation with user."""
+    picture = _profile_picture_name(user)
+    ConversationInbox.objects.filter(other_user=user).exclude(
+        other_user_name=user.name,
+        other_user_profile_picture=picture
+    ).update(other_user_name=user.name, other_user_profile_picture=picture)
+
+
+def encode_inbox_cursor(entry):
+    """Opaque cursor for an inbox row (a dict from get_inbox_entries)."""
+    raw = f"{entry['activity_time'].isoformat()}|{entry['conversation_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_inbox_cursor(cursor):
+    """Decode an inbox cursor into (activity_time, conversation_id); raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        activity_time, conversation_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(activity_time), int(conversation_id)
+    except (UnicodeError, TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid conversation cursor: {cursor}") from e
+
+
+def get_inbox_entries(user_id, limit=None, cursor=None):
+    """
+    The user's inbox rows, most recent activity first, as dicts of INBOX_FIELDS.
+    With a cursor only rows after it are returned; limit caps the row count.
+    """
+    entries = ConversationInbox.objects.filter(user_id=user_id).annotate(
+        unread_count=Coalesce(
+            Subquery(
+                UnreadMessageCounter.objects.filter(
+                    user_id=OuterRef('user_id'),
+                    conversation_id=OuterRef('conversation_id')
+                ).values('unread_count')[:1]
+            ),
+            0
+        )
+    )
+    if cursor is not None:
+        activity_time, conversation_id = cursor
+        entries = entries.filter(
+            Q(activity_time__lt=activity_time) | Q(activity_time=activity_time, conversation_id__lt=conversation_id)
+        )
+    entries = entries.order_by('-activity_time', '-conversation_id').values(*INBOX_FIELDS)
+    if limit is not None:
+        entries = entries[:limit]
+    return list(entries)
+
+
+def rebuild_conversation_inbox(user_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recompute inbox rows from conversations and users, for the given users'
+    conversations or for everyone. Returns the rows written.
+    """
+    conversations = Conversation.objects.select_related('participant1', 'participant2')
+    if user_ids is not None:
+        conversations = conversations.filter(
+            Q(participant1_id__in=user_ids) | Q(participant2_id__in=user_ids)
+        )
+
+    written = 0
+    with transaction.atomic():
+        ConversationInbox.objects.filter(conversation__in=conversations.values('conversation_id')).delete()
+
+        batch = []
+        for conversation in conversations.iterator(chunk_size=batch_size):
+            batch.append(conversation)
+            if len(batch) >= batch_size:
+                written += _write_inbox_batch(batch)
+                batch = []
+        if batch:
+            written += _write_inbox_batch(batch)
+
+    logger.info(f"Rebuilt {written} conversation inbox entries")
+    return written
+
+
+def _write_inbox_batch(conversations):
+    entries = [
+        entry
+        for conversation in conversations
+        for entry in build_inbox_entries(conversation)
+    ]
+    # A conversation with oneself yields the same (user, conversation) twice
+    ConversationInbox.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from conversations.models import Conversation
+from conversations.pair_key import BACKFILL_BATCH_SIZE, backfill_conversation_pair_keys
+from professionals.models import Professional
+
+
+class Command(BaseCommand):
+    help = 'Set the canonical participant-pair key on conversations created before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BACKFILL_BATCH_SIZE,
+            help='Conversations updated per query'
+        )
+
+    def handle(self, *args, **options):
+        keyed, duplicates = backfill_conversation_pair_keys(
+            Conversation, Professional, batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Set the pair key on {keyed} conversations"))
+        if duplicates:
+            self.stdout.write(self.style.WARNING(
+                f"{len(duplicates)} duplicate conversations are not found by pair lookups: "
+                f"{', '.join(str(conversation_id) for conversation_id in duplicates)}"
+            ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from conversations.inbox import rebuild_conversation_inbox
+
+
+class Command(BaseCommand):
+    help = 'Recompute the conversation inbox read model from conversations, users and unread counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help="Only rebuild this user's conversations (can be repeated)"
+        )
+
+    def handle(self, *args, **options):
+        entry_count = rebuild_conversation_inbox(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {entry_count} conversation inbox entries"))
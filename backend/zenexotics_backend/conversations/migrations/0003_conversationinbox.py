@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def backfill_conversation_inbox(apps, schema_editor):
+    Conversation = apps.get_model('conversations', 'Conversation')
+    ConversationInbox = apps.get_model('conversations', 'ConversationInbox')
+    UnreadMessageCounter = apps.get_model('user_messages', 'UnreadMessageCounter')
+
+    unread_counts = {
+        (user_id, conversation_id): unread_count
+        for user_id, conversation_id, unread_count in UnreadMessageCounter.objects.values_list(
+            'user_id', 'conversation_id', 'unread_count'
+        )
+    }
+    now = timezone.now()
+    entries = []
+    for conversation in Conversation.objects.select_related('participant1', 'participant2').iterator(chunk_size=1000):
+        role_map = conversation.role_map or {}
+        for user, other_user in (
+            (conversation.participant1, conversation.participant2),
+            (conversation.participant2, conversation.participant1),
+        ):
+            entries.append(ConversationInbox(
+                user_id=user.id,
+                conversation_id=conversation.conversation_id,
+                other_user_id=other_user.id,
+                other_user_name=other_user.name,
+                other_user_profile_picture=other_user.profile_picture.name if other_user.profile_picture else '',
+                role=role_map.get(str(user.id), ''),
+                last_message=conversation.last_message,
+                last_message_time=conversation.last_message_time,
+                activity_time=conversation.last_message_time or now,
+                unread_count=unread_counts.get((user.id, conversation.conversation_id), 0)
+            ))
+    ConversationInbox.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('conversations', '0002_alter_conversation_last_message_and_more'),
+        ('user_messages', '0009_unreadmessagecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('other_user_name', models.CharField(blank=True, max_length=255)),
+                ('other_user_profile_picture', models.CharField(blank=True, max_length=255)),
+                ('role', models.CharField(blank=True, max_length=20)),
+                ('last_message', models.TextField(blank=True, null=True)),
+                ('last_message_time', models.DateTimeField(blank=True, null=True)),
+                ('activity_time', models.DateTimeField()),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='conversations.conversation')),
+                ('other_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversation Inbox Entry',
+                'verbose_name_plural': 'Conversation Inbox Entries',
+                'indexes': [models.Index(fields=['user', '-activity_time', '-conversation'], name='conversation_inbox_page_idx')],
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(backfill_conversation_inbox, reverse_code=migrations.RunPython.noop),
+    ]
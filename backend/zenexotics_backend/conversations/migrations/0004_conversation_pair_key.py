@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+from conversations.pair_key import backfill_conversation_pair_keys
+
+
+def populate_pair_keys(apps, schema_editor):
+    backfill_conversation_pair_keys(apps.get_model('conversations', 'Conversation'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0003_conversationinbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='max_user_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='min_user_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='professional_user_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_pair_keys, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('min_user_id', 'max_user_id', 'professional_user_id'), name='conversation_pair_key_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from conversations.pair_key import backfill_conversation_pair_keys
+
+
+def resolve_pair_key_professionals(apps, schema_editor):
+    # Conversations whose role map named no professional were keyed with a NULL
+    # professional_user_id; key them with the participant who is a professional
+    backfill_conversation_pair_keys(
+        apps.get_model('conversations', 'Conversation'),
+        apps.get_model('professionals', 'Professional')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0004_conversation_pair_key'),
+        ('professionals', '0007_search_index_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_pair_key_professionals, reverse_code=migrations.RunPython.noop),
+    ]
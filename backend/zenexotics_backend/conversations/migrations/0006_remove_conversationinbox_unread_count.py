@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0005_resolve_pair_key_professionals'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='conversationinbox',
+            name='unread_count',
+        ),
+    ]
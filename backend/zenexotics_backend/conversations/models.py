@@ -1,5 +1,6 @@
 from django.db import models
 from users.models import User
+from .pair_key import conversation_pair_key, professional_user_id_from_role_map, sole_professional_user_id
 
 class Conversation(models.Model):
     conversation_id = models.AutoField(primary_key=True)
@@ -10,11 +11,69 @@ class Conversation(models.Model):
     last_message_time = models.DateTimeField(null=True, blank=True)
     unread_count = models.IntegerField(default=0)
     metadata = models.JSONField(null=True, blank=True)
+    # Canonical participant pair (see pair_key.py), set when the conversation is created
+    min_user_id = models.IntegerField(null=True, blank=True, editable=False)
+    max_user_id = models.IntegerField(null=True, blank=True, editable=False)
+    professional_user_id = models.IntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-last_message_time']
         verbose_name = 'Conversation'
         verbose_name_plural = 'Conversations'
+        constraints = [
+            # Also the index behind pair lookups
+            models.UniqueConstraint(
+                fields=['min_user_id', 'max_user_id', 'professional_user_id'],
+                name='conversation_pair_key_unique'
+            ),
+        ]
 
     def __str__(self):
         return f'Conversation between {self.participant1} and {self.participant2}'
+
+    def save(self, *args, **kwargs):
+        # Only new conversations are keyed here; legacy duplicates left unkeyed
+        # by the backfill must keep a NULL key when they are saved again
+        if self._state.adding and self.min_user_id is None and self.participant1_id and self.participant2_id:
+            participant_ids = (self.participant1_id, self.participant2_id)
+            professional_user_id = professional_user_id_from_role_map(self.role_map)
+            if professional_user_id is None:
+                from professionals.models import Professional
+                professional_user_id = sole_professional_user_id(
+                    participant_ids,
+                    set(Professional.objects.filter(user_id__in=participant_ids).values_list('user_id', flat=True))
+                )
+            key = conversation_pair_key(*participant_ids, professional_user_id)
+            for field, value in key.items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
+
+
+class ConversationInbox(models.Model):
+    """
+    One row per (user, conversation): everything the conversation list shows
+    for that user, kept current by conversations/inbox.py so the list is a
+    single indexed query.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_inbox')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='inbox_entries')
+    other_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    other_user_name = models.CharField(max_length=255, blank=True)
+    other_user_profile_picture = models.CharField(max_length=255, blank=True)  # Storage name of the other user's picture
+    role = models.CharField(max_length=20, blank=True)  # This user's role in the conversation (role_map)
+    last_message = models.TextField(null=True, blank=True)
+    last_message_time = models.DateTimeField(null=True, blank=True)
+    activity_time = models.DateTimeField()  # last_message_time, or when the conversation started; sort key
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Conversation Inbox Entry'
+        verbose_name_plural = 'Conversation Inbox Entries'
+        unique_together = ('user', 'conversation')
+        indexes = [
+            # Keyset pagination of a user's conversation list
+            models.Index(fields=['user', '-activity_time', '-conversation'], name='conversation_inbox_page_idx'),
+        ]
+
+    def __str__(self):
+        return f'Inbox entry for user {self.user_id} in conversation {self.conversation_id}'
@@ -0,0 +1,135 @@
+"""
+Canonical participant-pair key for conversations.
+
+A conversation between two users in given roles is identified by
+(min_user_id, max_user_id, professional_user_id): the participants' user ids
+in ascending order plus the user id of the professional side. The columns are
+covered by a unique constraint on Conversation, so finding the conversation
+for a pair is a single index probe and find-or-create can rely on the
+database to reject duplicates.
+
+When a conversation's role map names no professional, the participant with
+a Professional row is taken as the professional side; only when neither or
+both participants are professionals does the key keep a NULL
+professional_user_id, and such conversations are not found by pair lookups.
+
+This module does not import models so the backfill can be run against the
+historical models from a migration.
+"""
+import logging
+
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+PAIR_KEY_FIELDS = ('min_user_id', 'max_user_id', 'professional_user_id')
+
+
+def conversation_pair_key(user_id, other_user_id, professional_user_id):
+    """Lookup kwargs identifying the conversation between two users."""
+    return {
+        'min_user_id': min(user_id, other_user_id),
+        'max_user_id': max(user_id, other_user_id),
+        'professional_user_id': professional_user_id,
+    }
+
+
+def _parse_user_id(value):
+    value = str(value)
+    if value.startswith('user_'):
+        value = value[len('user_'):]
+    return int(value) if value.isdigit() else None
+
+
+def professional_user_id_from_role_map(role_map):
+    """
+    The professional's user id from a role map. Both {"<user id>": "professional"}
+    (optionally with a "user_" prefix) and the inverse {"professional": "<user id>"}
+    are understood; returns None when the map names no professional.
+    """
+    if not role_map:
+        return None
+    for key, role in role_map.items():
+        if role == 'professional':
+            return _parse_user_id(key)
+    if 'professional' in role_map:
+        return _parse_user_id(role_map['professional'])
+    return None
+
+
+def sole_professional_user_id(participant_ids, professional_user_ids):
+    """The one participant who is a professional, or None if neither or both are."""
+    professionals = {user_id for user_id in participant_ids if user_id in professional_user_ids}
+    return professionals.pop() if len(professionals) == 1 else None
+
+
+def backfill_conversation_pair_keys(conversation_model, professional_model=None, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Set the pair key on conversations that have none, and on keyed ones whose
+    role map named no professional when professional_model is given.
+    Legacy duplicates of a pair are left as they were: the most recently
+    active conversation of each pair gets the key, the others stay reachable
+    by id but are not found by pair lookups. Returns (keyed, duplicates).
+    """
+    taken = set(
+        conversation_model.objects.filter(professional_user_id__isnull=False).values_list(*PAIR_KEY_FIELDS)
+    )
+    pending = conversation_model.objects.filter(
+        Q(min_user_id__isnull=True) | Q(professional_user_id__isnull=True)
+    )
+    professional_user_ids = set()
+    if professional_model is not None:
+        professional_user_ids = set(professional_model.objects.filter(
+            Q(user_id__in=pending.values('participant1_id')) | Q(user_id__in=pending.values('participant2_id'))
+        ).values_list('user_id', flat=True))
+
+    conversations = pending.only(
+        'conversation_id', 'participant1_id', 'participant2_id', 'role_map', 'min_user_id'
+    ).order_by(F('last_message_time').desc(nulls_last=True), '-conversation_id')
+
+    keyed = 0
+    duplicates = []
+    unresolved = []
+    batch = []
+    for conversation in conversations.iterator(chunk_size=batch_size):
+        participant_ids = (conversation.participant1_id, conversation.participant2_id)
+        professional_user_id = professional_user_id_from_role_map(conversation.role_map)
+        if professional_user_id is None:
+            professional_user_id = sole_professional_user_id(participant_ids, professional_user_ids)
+        key = conversation_pair_key(*participant_ids, professional_user_id)
+
+        # The unique constraint ignores rows without a professional, so those are always keyed
+        if professional_user_id is not None:
+            key_tuple = tuple(key[field] for field in PAIR_KEY_FIELDS)
+            if key_tuple in taken:
+                duplicates.append(conversation.conversation_id)
+                continue
+            taken.add(key_tuple)
+        else:
+            unresolved.append(conversation.conversation_id)
+            if conversation.min_user_id is not None:
+                continue
+
+        for field, value in key.items():
+            setattr(conversation, field, value)
+        batch.append(conversation)
+        if len(batch) >= batch_size:
+            conversation_model.objects.bulk_update(batch, PAIR_KEY_FIELDS, batch_size=batch_size)
+            keyed += len(batch)
+            batch = []
+    if batch:
+        conversation_model.objects.bulk_update(batch, PAIR_KEY_FIELDS, batch_size=batch_size)
+        keyed += len(batch)
+
+    if duplicates:
+        logger.warning(
+            f"Left {len(duplicates)} duplicate conversations out of pair lookups: {duplicates}"
+        )
+    if unresolved:
+        logger.warning(
+            f"{len(unresolved)} conversations have no identifiable professional and are "
+            f"not found by pair lookups: {unresolved}"
+        )
+    return keyed, duplicates
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from user_messages.models import UserMessage
+from .inbox import sync_conversation_inbox, refresh_other_user_profile
 from .models import Conversation
 import logging
 
@@ -44,4 +46,18 @@ def update_conversation_on_message(sender, instance, created, **kwargs):
         if created:
             conversation.unread_count += 1
             
-        conversation.save() 
\ No newline at end of file
+        conversation.save() 
+
+
+@receiver(post_save, sender=Conversation)
+def update_inbox_on_conversation_save(sender, instance, **kwargs):
+    """Keep both participants' inbox rows in step with the conversation."""
+    sync_conversation_inbox(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_inbox_on_profile_change(sender, instance, created, **kwargs):
+    """Show a user's new name or picture in their partners' inboxes."""
+    if created:
+        return
+    refresh_other_user_profile(instance)
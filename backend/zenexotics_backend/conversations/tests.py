@@ -1,3 +1,203 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from conversations.inbox import rebuild_conversation_inbox
+from conversations.models import Conversation, ConversationInbox
+from conversations.utils import find_conversation
+from conversations.v1.views import find_or_create_conversation
+from core.api_test_helpers import QueryCountTestMixin
+from professionals.models import Professional
+from user_messages.models import UserMessage
+from users.models import User
+
+
+class ConversationInboxTests(QueryCountTestMixin, APITestCase):
+    """The conversation list is served from the inbox read model kept current by signals."""
+
+    url = '/api/conversations/v1/'
+
+    def setUp(self):
+        self.user = self.create_user()
+
+    def send(self, conversation, sender, content='Hello'):
+        return UserMessage.objects.create(conversation=conversation, sender=sender, content=content)
+
+    def create_conversations_with_messages(self, count):
+        for conversation in self.create_conversations(count):
+            self.send(conversation, conversation.participant1)
+
+    def test_list_reflects_messages_unread_counts_and_profiles(self):
+        first, second = self.create_conversations(2)
+        self.send(first, first.participant1, 'Older')
+        self.send(second, second.participant1, 'Newer')
+        self.send(second, second.participant1, 'Newest')
+        partner = second.participant1
+        partner.name = 'Renamed Partner'
+        partner.save()
+
+        data, _ = self.fetch()
+
+        self.assertEqual([row['conversation_id'] for row in data], [second.conversation_id, first.conversation_id])
+        self.assertEqual(data[0]['last_message'], 'Newest')
+        self.assertEqual(data[0]['unread_count'], 2)
+        self.assertEqual(data[0]['other_user_name'], 'Renamed Partner')
+        self.assertTrue(data[0]['is_professional'])
+        self.assertEqual(data[0]['participant1_id'], partner.id)
+
+        # Reading the conversation clears its unread count
+        self.client.get(f'/api/messages/v1/conversation/{second.conversation_id}/')
+        data, _ = self.fetch()
+        self.assertEqual(data[0]['unread_count'], 0)
+
+    def test_role_map_change_is_synced(self):
+        conversation, = self.create_conversations(1)
+        client = conversation.participant1
+        conversation.role_map = {str(client.id): 'professional', str(self.user.id): 'client'}
+        conversation.save()
+
+        roles = dict(ConversationInbox.objects.filter(conversation=conversation).values_list('user_id', 'role'))
+        self.assertEqual(roles, {client.id: 'professional', self.user.id: 'client'})
+        data, _ = self.fetch()
+        self.assertFalse(data[0]['is_professional'])
+
+    def test_query_count_is_constant(self):
+        data = self.assertQueryCountIsConstant(self.create_conversations_with_messages)
+        self.assertEqual(len(data), 12)
+
+    def test_keyset_pagination_walks_every_conversation_once(self):
+        conversations = self.create_conversations(5)
+        # Two conversations share an activity time to exercise the id tiebreak
+        same_time = timezone.now() - timedelta(hours=1)
+        ConversationInbox.objects.filter(conversation__in=conversations[:2]).update(activity_time=same_time)
+
+        seen = []
+        params = {'page_size': 2}
+        while True:
+            data, _ = self.fetch(**params)
+            seen.extend(row['conversation_id'] for row in data['conversations'])
+            if not data['has_more']:
+                self.assertIsNone(data['next_cursor'])
+                break
+            params = {'page_size': 2, 'cursor': data['next_cursor']}
+
+        self.assertEqual(sorted(seen), sorted(conversation.conversation_id for conversation in conversations))
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen[-2:], [conversations[1].conversation_id, conversations[0].conversation_id])
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_matches_incremental_entries(self):
+        first, second = self.create_conversations(2)
+        self.send(first, first.participant1)
+        self.send(second, self.user)
+        fields = ('user_id', 'conversation_id', 'other_user_id', 'other_user_name', 'role',
+                  'last_message', 'last_message_time')
+        expected = set(ConversationInbox.objects.values_list(*fields))
+
+        ConversationInbox.objects.all().delete()
+        self.assertEqual(rebuild_conversation_inbox(), 4)
+
+        self.assertEqual(set(ConversationInbox.objects.values_list(*fields)), expected)
+
+
+class ConversationPairKeyTests(APITestCase):
+    """Conversations are found and created through the canonical participant-pair key."""
+
+    def setUp(self):
+        self.professional = User.objects.create_user(email='pro@example.com', password='testpass123', name='Pro')
+        self.client_user = User.objects.create_user(email='client@example.com', password='testpass123', name='Client')
+
+    def test_find_or_create_never_duplicates_a_pair(self):
+        conversation, is_professional = find_or_create_conversation(self.client_user, self.professional, 'client')
+        again, _ = find_or_create_conversation(self.professional, self.client_user, 'professional')
+
+        self.assertFalse(is_professional)
+        self.assertEqual(again.conversation_id, conversation.conversation_id)
+        self.assertEqual(Conversation.objects.count(), 1)
+        self.assertEqual(
+            (conversation.min_user_id, conversation.max_user_id, conversation.professional_user_id),
+            (self.professional.id, self.client_user.id, self.professional.id)
+        )
+
+        # The same users with the roles swapped are a different conversation
+        swapped, _ = find_or_create_conversation(self.professional, self.client_user, 'client')
+        self.assertNotEqual(swapped.conversation_id, conversation.conversation_id)
+
+    def test_lookup_is_a_single_query(self):
+        conversation, _ = find_or_create_conversation(self.professional, self.client_user, 'professional')
+
+        with CaptureQueriesContext(connection) as queries:
+            found = find_conversation(self.client_user, self.professional, 'client')
+            missing, _ = find_or_create_conversation(
+                self.client_user, self.professional, 'professional', only_find_with_role=True
+            )
+
+        self.assertEqual(found.conversation_id, conversation.conversation_id)
+        self.assertIsNone(missing)
+        self.assertEqual(len(queries), 2)
+
+    def test_backfill_keys_latest_conversation_and_leaves_duplicates(self):
+        role_map = {str(self.professional.id): 'professional', str(self.client_user.id): 'client'}
+        # bulk_create skips save(), like rows created before the key existed
+        older, newer, prefixed = Conversation.objects.bulk_create([
+            Conversation(participant1=self.client_user, participant2=self.professional, role_map=role_map)
+            for _ in range(3)
+        ])
+        Conversation.objects.filter(pk=older.pk).update(last_message_time=timezone.now() - timedelta(days=1))
+        Conversation.objects.filter(pk=newer.pk).update(last_message_time=timezone.now())
+        prefixed_pro = User.objects.create_user(email='pro2@example.com', password='testpass123', name='Pro 2')
+        Conversation.objects.filter(pk=prefixed.pk).update(
+            participant2=prefixed_pro,
+            role_map={f'user_{prefixed_pro.id}': 'professional', f'user_{self.client_user.id}': 'client'}
+        )
+
+        call_command('backfill_conversation_pair_keys', stdout=StringIO())
+
+        self.assertEqual(find_conversation(self.professional, self.client_user, 'professional').pk, newer.pk)
+        self.assertEqual(find_conversation(prefixed_pro, self.client_user, 'professional').pk, prefixed.pk)
+        self.assertIsNone(Conversation.objects.get(pk=older.pk).min_user_id)
+
+        # A later save of the unkeyed duplicate leaves it unkeyed
+        older.refresh_from_db()
+        older.last_message = 'Still here'
+        older.save()
+        self.assertIsNone(Conversation.objects.get(pk=older.pk).min_user_id)
+
+    def test_professional_resolved_when_role_map_names_none(self):
+        Professional.objects.create(user=self.professional)
+        client_only = {str(self.client_user.id): 'client'}
+        # Keyed with a NULL professional before the fallback existed
+        keyed, unkeyed = Conversation.objects.bulk_create([
+            Conversation(
+                participant1=self.client_user, participant2=self.professional, role_map=client_only,
+                min_user_id=self.professional.id, max_user_id=self.client_user.id
+            ),
+            Conversation(participant1=self.client_user, participant2=self.professional, role_map={}),
+        ])
+        Conversation.objects.filter(pk=keyed.pk).update(last_message_time=timezone.now())
+
+        out = StringIO()
+        call_command('backfill_conversation_pair_keys', stdout=out)
+
+        self.assertEqual(find_conversation(self.professional, self.client_user, 'professional').pk, keyed.pk)
+        self.assertIn(f"not found by pair lookups: {unkeyed.pk}", out.getvalue())
+        self.assertEqual(
+            find_or_create_conversation(self.client_user, self.professional, 'client')[0].pk, keyed.pk
+        )
+
+    def test_new_conversation_without_professional_role_is_keyed(self):
+        Professional.objects.create(user=self.professional)
+        conversation = Conversation.objects.create(
+            participant1=self.client_user, participant2=self.professional, role_map={}
+        )
+        self.assertEqual(conversation.professional_user_id, self.professional.id)
+        self.assertEqual(find_conversation(self.client_user, self.professional, 'client').pk, conversation.pk)
@@ -1,5 +1,7 @@
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from conversations.models import Conversation
+from conversations.pair_key import conversation_pair_key
 from users.models import User
 import logging
 
@@ -78,3 +80,60 @@ def get_user_from_conversation(conversation_id, is_professional=False):
     except Exception as e:
         logger.error(f"Error getting user from conversation {conversation_id}: {str(e)}")
         return None
+
+
+def find_conversation(user, other_user, user_role):
+    """
+    The conversation between two users where user has user_role ('professional'
+    or 'client'), or None. A single probe of the pair key index.
+    """
+    professional = user if user_role == 'professional' else other_user
+    return Conversation.objects.filter(
+        **conversation_pair_key(user.id, other_user.id, professional.id)
+    ).first()
+
+
+def get_or_create_conversation(user, other_user, user_role):
+    """
+    Find the conversation between two users where user has user_role, creating
+    it if there is none. Safe under concurrent calls: the pair key's unique
+    constraint rejects a second insert and get_or_create then returns the
+    winner. Returns (conversation, created).
+    """
+    other_user_role = 'client' if user_role == 'professional' else 'professional'
+    professional = user if user_role == 'professional' else other_user
+    return Conversation.objects.get_or_create(
+        **conversation_pair_key(user.id, other_user.id, professional.id),
+        defaults={
+            'participant1': user,
+            'participant2': other_user,
+            'role_map': {
+                str(user.id): user_role,
+                str(other_user.id): other_user_role
+            }
+        }
+    )
+
+
+def find_conversation_ids(user, other_user_ids, user_role):
+    """
+    {other user id: conversation id} for user's conversations with each of
+    other_user_ids where user has user_role, in a single query.
+    """
+    other_user_ids = list(other_user_ids)
+    if not other_user_ids:
+        return {}
+    professional_ids = [user.id] if user_role == 'professional' else other_user_ids
+    rows = Conversation.objects.filter(
+        Q(min_user_id=user.id, max_user_id__in=other_user_ids) |
+        Q(max_user_id=user.id, min_user_id__in=other_user_ids),
+        professional_user_id__in=professional_ids
+    ).values_list('min_user_id', 'max_user_id', 'professional_user_id', 'conversation_id')
+
+    conversation_ids = {}
+    for min_user_id, max_user_id, professional_user_id, conversation_id in rows:
+        other_user_id = max_user_id if min_user_id == user.id else min_user_id
+        expected_professional_id = user.id if user_role == 'professional' else other_user_id
+        if professional_user_id == expected_professional_id:
+            conversation_ids[other_user_id] = conversation_id
+    return conversation_ids
@@ -4,12 +4,19 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from users.models import User
-from ..models import Conversation
+from ..utils import find_conversation, get_or_create_conversation
 from django.utils import timezone
-from django.db import models
 from professionals.models import Professional
 from clients.models import Client
-from django.core.cache import cache
+from user_messages.presence import get_online_user_ids
+from ..inbox import (
+    INBOX_PAGE_SIZE,
+    MAX_INBOX_PAGE_SIZE,
+    decode_inbox_cursor,
+    encode_inbox_cursor,
+    get_inbox_entries,
+    profile_picture_url
+)
 import logging
 from datetime import datetime
 from user_messages.models import UserMessage
@@ -20,54 +27,58 @@ logger = logging.getLogger(__name__)
 @permission_classes([IsAuthenticated])
 def get_conversations(request):
     """
-    Get all conversations for the current user
+    Get the current user's conversations, most recent first, from the
+    conversation inbox read model: one indexed query plus one bulk presence
+    lookup.
+
+    Without parameters the full list is returned. Passing page_size (default
+    20, at most 100) and/or cursor returns one page instead:
+    {'conversations': [...], 'next_cursor': ..., 'has_more': bool}, where
+    next_cursor is passed back as ?cursor= for the following page.
     """
     try:
         current_user = request.user
-        logger.info(f"MBA2314: Getting conversations for user {current_user.id}")
-        
-        conversations = Conversation.objects.filter(
-            models.Q(participant1=current_user) | 
-            models.Q(participant2=current_user)
-        ).order_by('-last_message_time')
-        
-        logger.info(f"MBA2314: Found {conversations.count()} conversations for user {current_user.id}")
+        paginated = 'page_size' in request.GET or 'cursor' in request.GET
 
-        conversations_data = []
-        for conversation in conversations:
-            # Determine the other user
-            other_user = conversation.participant2 if conversation.participant1 == current_user else conversation.participant1
-            
-            # Determine if current user is the professional
-            is_professional = conversation.role_map.get(str(current_user.id)) == 'professional'
-            
-            logger.info(f"MBA2314: Conversation {conversation.conversation_id} - role_map: {conversation.role_map}, is_professional: {is_professional}")
+        try:
+            page_size = min(max(int(request.GET.get('page_size', INBOX_PAGE_SIZE)), 1), MAX_INBOX_PAGE_SIZE)
+            cursor = decode_inbox_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if the other participant is online using cache
-            other_participant_online = cache.get(f"user_{other_user.id}_online", False)
-            
-            # Log for debugging
-            logger.debug(f"User {other_user.id} online status: {other_participant_online}")
+        # One extra row tells us whether there is another page
+        entries = get_inbox_entries(current_user.id, limit=page_size + 1 if paginated else None, cursor=cursor)
+        has_more = paginated and len(entries) > page_size
+        if paginated:
+            entries = entries[:page_size]
 
-            # Get the other user's profile picture directly from the User model
-            profile_picture = None
-            if other_user.profile_picture and hasattr(other_user.profile_picture, 'url'):
-                profile_picture = other_user.profile_picture.url
-            
-            conversations_data.append({
-                'conversation_id': conversation.conversation_id,
-                'is_professional': is_professional,
-                'last_message': conversation.last_message,
-                'last_message_time': conversation.last_message_time,
-                'other_user_name': other_user.name,
-                'other_participant_online': other_participant_online,
-                'profile_picture': profile_picture,
-                'participant1_id': conversation.participant1.id,
-                'participant2_id': conversation.participant2.id
-            })
+        # Look up presence for every other participant at once
+        online_user_ids = get_online_user_ids({entry['other_user_id'] for entry in entries})
 
-        logger.info(f"MBA2314: Returning {len(conversations_data)} conversations")
-        return Response(conversations_data)
+        conversations_data = [
+            {
+                'conversation_id': entry['conversation_id'],
+                'is_professional': entry['role'] == 'professional',
+                'last_message': entry['last_message'],
+                'last_message_time': entry['last_message_time'],
+                'other_user_name': entry['other_user_name'],
+                'other_participant_online': entry['other_user_id'] in online_user_ids,
+                'profile_picture': profile_picture_url(entry['other_user_profile_picture']),
+                'participant1_id': entry['conversation__participant1_id'],
+                'participant2_id': entry['conversation__participant2_id'],
+                'unread_count': entry['unread_count']
+            }
+            for entry in entries
+        ]
+
+        logger.info(f"MBA2314: Returning {len(conversations_data)} conversations for user {current_user.id}")
+        if not paginated:
+            return Response(conversations_data)
+        return Response({
+            'conversations': conversations_data,
+            'next_cursor': encode_inbox_cursor(entries[-1]) if has_more else None,
+            'has_more': has_more
+        })
 
     except Exception as e:
         logger.error(f"Error in get_conversations: {str(e)}")
@@ -80,6 +91,9 @@ def find_or_create_conversation(current_user, other_user, current_user_role, onl
     """
     Helper function to find or create a conversation between two users.
     
+    Conversations are looked up by their canonical participant-pair key, so
+    this is a single index probe and never creates a duplicate for a pair.
+    
     Args:
         current_user: The user making the request
         other_user: The other participant in the conversation
@@ -91,56 +105,23 @@ def find_or_create_conversation(current_user, other_user, current_user_role, onl
         tuple: (conversation object or None if only_find_with_role is True and no match, 
                boolean indicating if user is professional)
     """
-    logger = logging.getLogger(__name__)
     logger.info(f"MBA2314: Finding conversation for users {current_user.id} and {other_user.id}, where current user is a {current_user_role}")
     logger.info(f"MBA2314: only_find_with_role={only_find_with_role}")
     
-    # Determine other user's role
-    other_user_role = 'client' if current_user_role == 'professional' else 'professional'
-    
-    # Check if a conversation already exists between these users
-    existing_conversations = Conversation.objects.filter(
-        models.Q(participant1=current_user, participant2=other_user) |
-        models.Q(participant1=other_user, participant2=current_user)
-    ).order_by('-last_message_time')
-    
-    logger.info(f"MBA2314: Found {existing_conversations.count()} existing conversations between users")
-    
     # Determine if the current user is the professional
     is_professional = current_user_role == 'professional'
     
-    # If only finding with role, check each conversation's role map
     if only_find_with_role:
-        for conversation in existing_conversations:
-            role_map = conversation.role_map or {}
-            logger.info(f"MBA2314: Checking conversation {conversation.conversation_id} with role_map: {role_map}")
-            
-            # Check if current user has the specified role
-            current_user_id_str = str(current_user.id)
-            if current_user_id_str in role_map and role_map[current_user_id_str] == current_user_role:
-                logger.info(f"MBA2314: Found conversation {conversation.conversation_id} where user has role {current_user_role}")
-                return conversation, is_professional
-        
-        # No conversation found with matching roles
-        logger.info(f"MBA2314: No conversation found with user {current_user.id} having role {current_user_role}")
-        logger.info(f"MBA2314: only_find_with_role is True, returning None")
-        return None, is_professional
-    
-    # No existing conversation
-    logger.info(f"MBA2314: No existing conversations found between users")
-    
-    # Create a new conversation
-    role_map = {
-        str(current_user.id): current_user_role,
-        str(other_user.id): other_user_role
-    }
+        conversation = find_conversation(current_user, other_user, current_user_role)
+        if conversation is None:
+            logger.info(f"MBA2314: No conversation found with user {current_user.id} having role {current_user_role}")
+        return conversation, is_professional
     
-    logger.info(f"MBA2314: Creating new conversation with role_map: {role_map}")
-    conversation = Conversation.objects.create(
-        participant1=current_user,
-        participant2=other_user,
-        role_map=role_map
-    )
+    conversation, created = get_or_create_conversation(current_user, other_user, current_user_role)
+    if created:
+        logger.info(f"MBA2314: Created conversation {conversation.conversation_id} with role_map: {conversation.role_map}")
+    else:
+        logger.info(f"MBA2314: Found existing conversation {conversation.conversation_id}")
     
     return conversation, is_professional
 
@@ -0,0 +1,72 @@
+"""
+Shared fixtures for API tests that pin an endpoint's query count.
+
+Mix QueryCountTestMixin into an APITestCase, set url and self.user, and
+compare a small and a large data set with assertQueryCountIsConstant():
+
+    class ConversationInboxTests(QueryCountTestMixin, APITestCase):
+        url = '/api/conversations/v1/'
+
+        def setUp(self):
+            self.user = self.create_user()
+
+        def test_query_count_is_constant(self):
+            data = self.assertQueryCountIsConstant(self.create_conversations)
+            self.assertEqual(len(data), 12)
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from conversations.models import Conversation
+from users.models import User
+
+
+class QueryCountTestMixin:
+    """Numbered users, conversations and query-counting GET requests."""
+
+    url = None
+    user_count = 0
+
+    def create_user(self, name=None):
+        self.user_count += 1
+        return User.objects.create_user(
+            email=f'user{self.user_count}@example.com',
+            password='testpass123',
+            name=name or f'Test User {self.user_count}'
+        )
+
+    def create_conversations(self, count, user=None):
+        """count conversations between new clients and user (self.user by default) as the professional."""
+        user = user or self.user
+        conversations = []
+        for _ in range(count):
+            client = self.create_user()
+            conversations.append(Conversation.objects.create(
+                participant1=client,
+                participant2=user,
+                role_map={str(client.id): 'client', str(user.id): 'professional'}
+            ))
+        return conversations
+
+    def fetch(self, user=None, url=None, **params):
+        """GET url (the class's url by default) as user (self.user by default); returns (json, query count)."""
+        self.client.force_authenticate(user=user or self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def assertQueryCountIsConstant(self, populate, small=2, large=10, **params):
+        """
+        Call populate(small) and fetch, then populate(large) and fetch again:
+        both fetches must issue the same number of queries. Returns the data
+        of the second fetch.
+        """
+        populate(small)
+        _, small_queries = self.fetch(**params)
+
+        populate(large)
+        data, large_queries = self.fetch(**params)
+
+        self.assertEqual(small_queries, large_queries)
+        return data
@@ -8,6 +8,7 @@ from bookings.constants import BookingStates
 from services.models import Service
 from booking_occurrences.models import BookingOccurrence
 from booking_details.models import BookingDetails
+from core.pricing import PricingSnapshot, price_intervals, time_units
 from core.time_utils import convert_from_utc, get_formatted_times
 from users.models import UserSettings
 import traceback
@@ -17,123 +18,18 @@ logger = logging.getLogger(__name__)
 def calculate_time_units(start_datetime, end_datetime, unit_of_time):
     """Calculate the number of time units between two datetimes based on the unit_of_time"""
     duration_hours = (end_datetime - start_datetime).total_seconds() / 3600
-    
-    if unit_of_time == '15 Min':
-        return Decimal(str(duration_hours / 0.25)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '30 Min':
-        return Decimal(str(duration_hours / 0.5)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '45 Min':
-        return Decimal(str(duration_hours / 0.75)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '1 Hour':
-        return Decimal(str(duration_hours)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '2 Hour':
-        return Decimal(str(duration_hours / 2)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '3 Hour':
-        return Decimal(str(duration_hours / 3)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '4 Hour':
-        return Decimal(str(duration_hours / 4)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '5 Hour':
-        return Decimal(str(duration_hours / 5)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '6 Hour':
-        return Decimal(str(duration_hours / 6)).quantize(Decimal('0.00001'))
-    elif unit_of_time == '8 Hour':
-        return Decimal(str(duration_hours / 8)).quantize(Decimal('0.00001'))
-    elif unit_of_time in ['24 Hour', 'Per Day']:  # Handle both daily cases the same way
-        return Decimal(str(duration_hours / 24)).quantize(Decimal('0.00001'))
-    elif unit_of_time in ['Per Visit']:
-        return Decimal('1')
-    else:
-        return Decimal('1')
+    return time_units(duration_hours, unit_of_time)
 
 def calculate_occurrence_rates(occurrence, service, num_pets):
     """
     Calculate rates for an occurrence based on service and number of pets
     Returns base_total, rates dict, and calculated total cost
+
+    To price several occurrences of the same service, use core.pricing
+    directly so the service's rates are loaded once.
     """
     try:
-        logger.info(f"MBA7777 - Starting calculate_occurrence_rates for service: {service.service_name}")
-        logger.info(f"MBA7777 - Service rates count: {service.additional_rates.count()}")
-        logger.info(f"MBA7777 - Using unit_of_time: {service.unit_of_time}")
-        
-        # Get start and end times
-        start_datetime = datetime.combine(occurrence.start_date, occurrence.start_time)
-        end_datetime = datetime.combine(occurrence.end_date, occurrence.end_time)
-        
-        # Calculate time units based on service's unit_of_time
-        multiple = calculate_time_units(start_datetime, end_datetime, service.unit_of_time)
-        logger.info(f"MBA7777 - Time units multiple: {multiple}")
-        
-        # Get base rate from service
-        base_rate = Decimal(str(service.base_rate))
-        base_amount = base_rate * multiple
-        logger.info(f"MBA7777 - Base rate: {base_rate}, Base amount: {base_amount}")
-        
-        # Calculate additional animal rate if applicable
-        additional_animal_amount = Decimal('0')
-        additional_animal_rate_applies = 0  # Default to 0
-        applies_after = int(str(service.applies_after))  # Convert to int, handling string input
-        if num_pets > applies_after:
-            additional_animal_rate = Decimal(str(service.additional_animal_rate))
-            additional_pets = num_pets - applies_after
-            additional_animal_amount = additional_animal_rate * additional_pets
-            additional_animal_rate_applies = additional_pets  # Set to number of additional pets
-            logger.info(f"MBA7777 - Additional animal amount: {additional_animal_amount}")
-        
-        # Check for holidays (TODO: Implement holiday check)
-        is_holiday = False
-        holiday_amount = Decimal('0')
-        holiday_days = 0
-        if is_holiday:
-            holiday_rate = Decimal(str(service.holiday_rate))
-            holiday_amount = holiday_rate
-            holiday_days = 1
-        
-        # Get additional rates from service
-        additional_rates = []
-        additional_rates_total = Decimal('0')
-        
-        logger.info(f"MBA7777 - Getting additional rates for service {service.service_name}")
-        for rate in service.additional_rates.all():
-            rate_amount = Decimal(str(rate.rate))  # Changed from rate.amount to rate.rate
-            logger.info(f"MBA7777 - Found rate: {rate.title} - {rate_amount}")
-            additional_rates.append(OrderedDict([
-                ('title', rate.title),
-                ('description', rate.description or ''),
-                ('amount', str(rate_amount))
-            ]))
-            additional_rates_total += rate_amount
-        
-        # Create rates dictionary
-        rates = OrderedDict([
-            ('base_rate', str(base_rate)),
-            ('additional_animal_rate', str(service.additional_animal_rate)),  # Per-unit rate
-            ('additional_animal_rate_total', str(additional_animal_amount)),  # Total calculated amount
-            ('additional_animal_rate_applies', additional_animal_rate_applies),
-            ('applies_after', applies_after),
-            ('unit_of_time', service.unit_of_time),  # Use service's unit_of_time directly
-            ('holiday_rate', str(service.holiday_rate)),
-            ('holiday_days', holiday_days),
-            ('additional_rates', additional_rates)
-        ])
-        
-        # Calculate total cost
-        total_cost = base_amount + additional_animal_amount + holiday_amount + additional_rates_total
-        logger.info(f"MBA7777 - Total cost breakdown:")
-        logger.info(f"MBA7777 - Base amount: {base_amount}")
-        logger.info(f"MBA7777 - Additional animal amount: {additional_animal_amount}")
-        logger.info(f"MBA7777 - Holiday amount: {holiday_amount}")
-        logger.info(f"MBA7777 - Additional rates total: {additional_rates_total}")
-        logger.info(f"MBA7777 - Final total: {total_cost}")
-        
-        result = {
-            'base_total': str(base_amount),
-            'rates': rates,
-            'calculated_cost': str(total_cost),
-            'multiple': float(multiple)
-        }
-        logger.info(f"MBA7777 - Returning rate data: {result}")
-        return result
-        
+        return price_intervals(PricingSnapshot.from_service(service), [occurrence], num_pets)[0]
     except Exception as e:
         logger.error(f"MBA7777 - Error calculating occurrence rates: {e}")
         return None
@@ -0,0 +1,126 @@
+"""
+Deferred, once-per-booking recomputation of occurrence costs and booking summaries.
+
+Outside a scope, every save cascades through signals: saving a
+BookingOccurrenceRate or BookingDetails recalculates its occurrence's cost,
+and saving the occurrence recalculates the BookingSummary from all of the
+booking's occurrences. Writing N occurrences that way costs O(N^2) queries.
+
+Inside deferred_cost_recomputation() those signals only record what changed.
+When the outermost scope exits, each changed occurrence's cost is recomputed
+once, in a few queries for all of them, and then each affected booking's
+summary is recomputed once:
+
+    with deferred_cost_recomputation() as recomputation:
+        ...  # create occurrences, details and rates
+
+    @deferred_cost_recomputation()
+    def post(self, request): ...
+
+Code that assigns an occurrence's calculated_cost itself (from draft data,
+say) calls recomputation.discard_occurrence() so it is not overwritten, and
+code that rebuilds a summary itself calls recomputation.discard_booking(). If
+the scope exits with an exception nothing is recomputed; the transaction the
+writes were made in is expected to roll back.
+"""
+from contextlib import ContextDecorator
+from decimal import Decimal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def current_recomputation():
+    """The active CostRecomputation on this thread, or None outside a scope."""
+    return getattr(_local, 'recomputation', None)
+
+
+class CostRecomputation:
+    """The occurrences and bookings whose costs changed within a scope."""
+
+    def __init__(self):
+        self.occurrence_ids = set()
+        self.booking_ids = set()
+
+    def occurrence_changed(self, occurrence):
+        """The occurrence's details or rates changed: recompute its cost, then its booking's summary."""
+        self.occurrence_ids.add(occurrence.occurrence_id)
+        self.booking_ids.add(occurrence.booking_id)
+
+    def booking_changed(self, booking_id):
+        """One of the booking's occurrences changed: recompute its summary."""
+        self.booking_ids.add(booking_id)
+
+    def discard_occurrence(self, occurrence):
+        """The occurrence's cost was saved directly; keep it, but still recompute the summary."""
+        self.occurrence_ids.discard(occurrence.occurrence_id)
+        self.booking_ids.add(occurrence.booking_id)
+
+    def discard_booking(self, booking):
+        """The caller rebuilds the booking's summary itself; don't recompute it."""
+        self.booking_ids.discard(booking.booking_id)
+
+    def recompute(self):
+        """Recompute every changed occurrence's cost, then every affected booking's summary, once each."""
+        from booking_occurrences.models import BookingOccurrence
+        from booking_summary.services import BookingSummaryService
+        from bookings.models import Booking
+
+        occurrences = BookingOccurrence.objects.filter(
+            occurrence_id__in=self.occurrence_ids
+        ).select_related('rates').prefetch_related('booking_details')
+
+        changed = []
+        for occurrence in occurrences:
+            # As BookingOccurrence.update_calculated_cost(), without a query per occurrence
+            total = Decimal('0.00')
+            booking_details = min(occurrence.booking_details.all(), key=lambda details: details.pk, default=None)
+            if booking_details:
+                total += booking_details.calculate_occurrence_cost(is_prorated=True)
+            if hasattr(occurrence, 'rates'):
+                total += occurrence.rates.get_total()
+
+            if occurrence.calculated_cost != total:
+                occurrence.calculated_cost = total.quantize(Decimal('0.01'))
+                changed.append(occurrence)
+
+        # bulk_update sends no signals; the summaries below are recomputed explicitly
+        BookingOccurrence.objects.bulk_update(changed, ['calculated_cost'])
+
+        for booking in Booking.objects.filter(booking_id__in=self.booking_ids):
+            BookingSummaryService.recalculate_from_occurrence_change(booking)
+
+        logger.info(
+            f"Recomputed costs: {len(changed)} of {len(self.occurrence_ids)} occurrences changed, "
+            f"{len(self.booking_ids)} booking summaries"
+        )
+
+
+class deferred_cost_recomputation(ContextDecorator):
+    """
+    Defer occurrence cost and booking summary recomputation to the end of
+    the outermost scope. Nested scopes join the outer one.
+    """
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so the decorator is reentrant and thread safe
+        return type(self)()
+
+    def __enter__(self):
+        self.recomputation = current_recomputation()
+        self.owner = self.recomputation is None
+        if self.owner:
+            self.recomputation = _local.recomputation = CostRecomputation()
+        return self.recomputation
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.owner:
+            return False
+        # Signals fired while recomputing must not be collected into the finished scope
+        _local.recomputation = None
+        if exc_type is None:
+            self.recomputation.recompute()
+        return False
@@ -154,7 +154,10 @@ def format_date_for_email(date_obj):
 
 def schedule_delayed_email(email_function, delay_seconds=60):
     """
-    Schedule an email to be sent after a delay in a separate thread
+    Schedule an email to be sent after a delay in a separate thread.
+    The thread (and the pending email) does not survive a restart; emails that
+    can be described by data should use user_messages.email_jobs.schedule_email_job
+    instead.
     """
     def delayed_send():
         try:
@@ -182,9 +185,8 @@ def send_booking_confirmation_email(booking_id):
         from booking_details.models import BookingDetails
         from booking_summary.models import BookingSummary
         from booking_pets.models import BookingPets
-        from conversations.models import Conversation
+        from conversations.utils import find_conversation
         from users.models import UserSettings
-        from django.db.models import Q
         
         # Get booking and related data
         try:
@@ -227,10 +229,7 @@ def send_booking_confirmation_email(booking_id):
         # Get conversation for link
         conversation = None
         try:
-            conversation = Conversation.objects.filter(
-                (Q(participant1=professional_user) & Q(participant2=client_user)) |
-                (Q(participant1=client_user) & Q(participant2=professional_user))
-            ).first()
+            conversation = find_conversation(professional_user, client_user, 'professional')
         except:
             logger.warning(f"No conversation found for booking {booking_id}")
         
@@ -616,8 +615,7 @@ def send_booking_reminder_email(occurrence_id):
         # Import models here to avoid circular imports
         from booking_occurrences.models import BookingOccurrence
         from users.models import UserSettings
-        from conversations.models import Conversation
-        from django.db.models import Q
+        from conversations.utils import find_conversation
         from datetime import datetime, timedelta
         
         # Get occurrence and related data
@@ -657,10 +655,7 @@ def send_booking_reminder_email(occurrence_id):
         # Get conversation for link
         conversation = None
         try:
-            conversation = Conversation.objects.filter(
-                (Q(participant1=professional_user) & Q(participant2=client_user)) |
-                (Q(participant1=client_user) & Q(participant2=professional_user))
-            ).first()
+            conversation = find_conversation(professional_user, client_user, 'professional')
         except:
             logger.warning(f"No conversation found for booking {booking.booking_id}")
         
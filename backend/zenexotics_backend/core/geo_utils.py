@@ -0,0 +1,111 @@
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Mean earth radius used by the haversine formula
+EARTH_RADIUS_MILES = 3958.7613
+
+# Miles covered by one degree of latitude (close enough everywhere we operate)
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+# Size of a spatial index bucket in degrees. 0.25 degrees is ~17 miles of
+# latitude, so a default 30 mile search only touches ~30 buckets.
+GEO_CELL_SIZE_DEGREES = 0.25
+
+# Above this many buckets the IN (...) list stops paying for itself and callers
+# should fall back to a plain bounding-box filter instead.
+MAX_GEO_CELLS_PER_QUERY = 400
+
+
+def extract_lat_lng(coordinates) -> Optional[Tuple[float, float]]:
+    """
+    Pull a (latitude, longitude) pair out of an Address.coordinates JSON blob.
+    Returns None when the blob is missing or does not hold usable numbers.
+    """
+    if not coordinates or not isinstance(coordinates, dict):
+        return None
+
+    lat = coordinates.get('latitude')
+    lng = coordinates.get('longitude')
+    if lat in (None, '') or lng in (None, ''):
+        return None
+
+    try:
+        lat = float(lat)
+        lng = float(lng)
+    except (TypeError, ValueError):
+        return None
+
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return (lat, lng)
+
+
+def _cell_index(value: float) -> int:
+    return int(math.floor(value / GEO_CELL_SIZE_DEGREES))
+
+
+def compute_geo_cell(latitude: float, longitude: float) -> str:
+    """Return the grid bucket key ("<lat_index>:<lng_index>") for a point."""
+    return f"{_cell_index(latitude)}:{_cell_index(longitude)}"
+
+
+def bounding_box(latitude: float, longitude: float, radius_miles: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) of a box that fully contains
+    the circle of radius_miles around the given point.
+    """
+    lat_delta = radius_miles / MILES_PER_DEGREE_LATITUDE
+    # Use the latitude closest to the pole so the box never under-covers
+    widest_lat = min(abs(latitude) + lat_delta, 89.9)
+    lng_delta = radius_miles / (MILES_PER_DEGREE_LATITUDE * math.cos(math.radians(widest_lat)))
+
+    return (
+        max(latitude - lat_delta, -90.0),
+        min(latitude + lat_delta, 90.0),
+        max(longitude - lng_delta, -180.0),
+        min(longitude + lng_delta, 180.0),
+    )
+
+
+def geo_cells_for_radius(latitude: float, longitude: float, radius_miles: float) -> Optional[List[str]]:
+    """
+    List every grid bucket that intersects the search radius around a point.
+    Returns None when the radius spans more than MAX_GEO_CELLS_PER_QUERY buckets.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_miles)
+    lat_range = range(_cell_index(min_lat), _cell_index(max_lat) + 1)
+    lng_range = range(_cell_index(min_lng), _cell_index(max_lng) + 1)
+
+    if len(lat_range) * len(lng_range) > MAX_GEO_CELLS_PER_QUERY:
+        return None
+
+    return [f"{lat_idx}:{lng_idx}" for lat_idx in lat_range for lng_idx in lng_range]
+
+
+def haversine_miles(origin: Sequence[float], point: Sequence[float]) -> float:
+    """Great-circle distance in miles between two (latitude, longitude) pairs."""
+    return haversine_miles_many(origin, [point])[0]
+
+
+def haversine_miles_many(origin: Sequence[float], points: Iterable[Sequence[float]]) -> List[float]:
+    """
+    Great-circle distances in miles from origin to every point.
+    The origin's trig terms are computed once and shared by the whole batch.
+    """
+    origin_lat = math.radians(origin[0])
+    origin_lng = math.radians(origin[1])
+    cos_origin_lat = math.cos(origin_lat)
+    sin = math.sin
+    cos = math.cos
+    radians = math.radians
+    asin = math.asin
+    sqrt = math.sqrt
+
+    distances = []
+    for lat, lng in points:
+        lat_rad = radians(lat)
+        half_dlat = (lat_rad - origin_lat) / 2.0
+        half_dlng = (radians(lng) - origin_lng) / 2.0
+        a = sin(half_dlat) ** 2 + cos_origin_lat * cos(lat_rad) * sin(half_dlng) ** 2
+        distances.append(2.0 * EARTH_RADIUS_MILES * asin(min(1.0, sqrt(a))))
+    return distances
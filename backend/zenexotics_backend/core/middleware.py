@@ -2,13 +2,11 @@ import logging
 import json
 from datetime import datetime
 from django.utils.timezone import now
-from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth.models import AnonymousUser
+from users.token_auth import resolve_access_token
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
 
 class AuthenticationLoggingMiddleware:
     """
@@ -95,22 +93,22 @@ class AuthenticationLoggingMiddleware:
             user_info['token_status'] = 'token_present'
             
             try:
-                # Parse the token
-                access_token = AccessToken(token)
+                # Parse the token and load the user through the shared cache,
+                # which DRF authentication then reuses
+                access_token, user = resolve_access_token(token)
                 user_info['token_status'] = 'token_valid'
                 user_info['token_expiry'] = datetime.fromtimestamp(access_token.payload.get('exp', 0)).isoformat()
                 
                 # Get user info
                 user_id = access_token.payload.get('user_id')
                 if user_id:
-                    try:
-                        user = User.objects.get(id=user_id)
+                    if user is not None:
                         user_info.update({
                             'user_id': user_id,
                             'email': user.email,
                             'is_authenticated': True
                         })
-                    except User.DoesNotExist:
+                    else:
                         user_info['token_status'] = 'user_not_found'
                         
             except (InvalidToken, TokenError) as e:
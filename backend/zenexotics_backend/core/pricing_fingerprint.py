@@ -0,0 +1,190 @@
+"""
+Pricing fingerprints: whether a draft changes what its booking charges for.
+
+A booking's priced content is its service, its pets and, for each
+occurrence, the dates, times and rate inputs (unit of time, base, additional
+animal and holiday rates, applies-after and additional rates). The same
+content can be read from a booking's rows or from a draft's draft_data;
+pricing_components() and booking_pricing_components() reduce either one to
+the same canonical form, and pricing_fingerprint() hashes it:
+
+    booking.pricing_fingerprint          # stored when the booking is written or confirmed
+    draft.pricing_fingerprint            # kept up to date as the draft is saved
+    booking.pricing_fingerprint != draft.pricing_fingerprint  # the draft changes something
+
+Only when the fingerprints differ is it worth loading both sides and calling
+diff_pricing_components() to say what changed.
+
+Amounts are compared as numbers ('$20' and 20.00 are the same), pets by id
+and occurrences as an unordered collection.
+"""
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+import hashlib
+import json
+
+# The draft_data sections a fingerprint is computed from
+FINGERPRINT_SECTIONS = ('service_details', 'pets', 'occurrences')
+
+CENTS = Decimal('0.01')
+
+
+def _amount(value):
+    """A rate as a string with two decimal places; unparseable values are kept as given."""
+    cleaned = str(value if value is not None else 0).replace('$', '').strip()
+    try:
+        return str(Decimal(cleaned).quantize(CENTS))
+    except (InvalidOperation, ValueError):
+        return cleaned
+
+
+def _count(value):
+    try:
+        return int(str(value if value not in (None, '') else 1).strip())
+    except ValueError:
+        return str(value)
+
+
+def _additional_rates(rates):
+    return sorted([str(rate.get('title') or ''), _amount(rate.get('amount'))] for rate in rates or [])
+
+
+def _occurrence(start_date, end_date, start_time, end_time, unit_of_time, base_rate,
+                additional_animal_rate, holiday_rate, applies_after, additional_rates):
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'start_time': start_time,
+        'end_time': end_time,
+        'unit_of_time': unit_of_time,
+        'base_rate': _amount(base_rate),
+        'additional_animal_rate': _amount(additional_animal_rate),
+        'holiday_rate': _amount(holiday_rate),
+        'applies_after': _count(applies_after),
+        'additional_rates': _additional_rates(additional_rates),
+    }
+
+
+def _occurrence_key(occurrence):
+    return json.dumps(occurrence, sort_keys=True)
+
+
+def _components(service_id, pet_ids, occurrences):
+    return {
+        'service_id': service_id,
+        'pet_ids': sorted(pet_ids),
+        'occurrences': sorted(occurrences, key=_occurrence_key),
+    }
+
+
+def pricing_components(draft_data):
+    """
+    The priced content of draft_data, read the way CreateFromDraftView
+    writes it to a booking (see bookings/draft_occurrences.py).
+    """
+    draft_data = draft_data or {}
+    occurrences = []
+    for occurrence_data in draft_data.get('occurrences') or []:
+        rates = occurrence_data.get('rates') or {}
+        occurrences.append(_occurrence(
+            occurrence_data.get('start_date'),
+            occurrence_data.get('end_date'),
+            occurrence_data.get('start_time'),
+            occurrence_data.get('end_time'),
+            occurrence_data.get('unit_of_time') or rates.get('unit_of_time') or 'Per Visit',
+            rates.get('base_rate'),
+            rates.get('additional_animal_rate'),
+            rates.get('holiday_rate'),
+            rates.get('applies_after'),
+            rates.get('additional_rates'),
+        ))
+    return _components(
+        (draft_data.get('service_details') or {}).get('service_id'),
+        [pet['pet_id'] for pet in draft_data.get('pets') or [] if pet.get('pet_id')],
+        occurrences
+    )
+
+
+def booking_pricing_components(booking):
+    """The priced content of a booking, from its rows (three queries)."""
+    from booking_occurrences.models import BookingOccurrence
+
+    occurrences = []
+    queryset = BookingOccurrence.objects.filter(booking=booking).select_related('rates').prefetch_related('booking_details')
+    for occurrence in queryset:
+        booking_details = min(occurrence.booking_details.all(), key=lambda details: details.pk, default=None)
+        if booking_details is None:
+            continue
+        occurrences.append(_occurrence(
+            occurrence.start_date.strftime('%Y-%m-%d'),
+            occurrence.end_date.strftime('%Y-%m-%d'),
+            occurrence.start_time.strftime('%H:%M'),
+            occurrence.end_time.strftime('%H:%M'),
+            booking_details.unit_of_time,
+            booking_details.base_rate,
+            booking_details.additional_pet_rate,
+            booking_details.holiday_rate,
+            booking_details.applies_after,
+            occurrence.rates.rates if hasattr(occurrence, 'rates') else [],
+        ))
+    return _components(
+        booking.service_id_id,
+        list(booking.booking_pets.values_list('pet_id', flat=True)),
+        occurrences
+    )
+
+
+def pricing_fingerprint(components):
+    """A stable hash of pricing components."""
+    canonical = json.dumps(components, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def diff_pricing_components(original, draft):
+    """
+    What a draft changes relative to the original: the service, pets added
+    and removed, and occurrences added, removed or changed (an occurrence
+    whose dates and times stayed but whose rates changed).
+    """
+    changes = {}
+    if original['service_id'] != draft['service_id']:
+        changes['service'] = {'from': original['service_id'], 'to': draft['service_id']}
+
+    added_pets = sorted(set(draft['pet_ids']) - set(original['pet_ids']))
+    removed_pets = sorted(set(original['pet_ids']) - set(draft['pet_ids']))
+    if added_pets or removed_pets:
+        changes['pets'] = {'added': added_pets, 'removed': removed_pets}
+
+    original_occurrences = Counter(_occurrence_key(occurrence) for occurrence in original['occurrences'])
+    draft_occurrences = Counter(_occurrence_key(occurrence) for occurrence in draft['occurrences'])
+    removed = [json.loads(key) for key in (original_occurrences - draft_occurrences).elements()]
+    added = [json.loads(key) for key in (draft_occurrences - original_occurrences).elements()]
+
+    def slot(occurrence):
+        return (occurrence['start_date'], occurrence['end_date'], occurrence['start_time'], occurrence['end_time'])
+
+    changed = []
+    for occurrence in list(removed):
+        match = next((candidate for candidate in added if slot(candidate) == slot(occurrence)), None)
+        if match is not None:
+            changed.append({'from': occurrence, 'to': match})
+            removed.remove(occurrence)
+            added.remove(match)
+
+    if added or removed or changed:
+        changes['occurrences'] = {'added': added, 'removed': removed, 'changed': changed}
+    return changes
+
+
+def store_booking_fingerprint(booking, components=None):
+    """
+    Compute a booking's fingerprint, from its rows unless the components it
+    was just written from are given, and store it without touching other columns.
+    """
+    from bookings.models import Booking
+
+    if components is None:
+        components = booking_pricing_components(booking)
+    booking.pricing_fingerprint = pricing_fingerprint(components)
+    Booking.objects.filter(booking_id=booking.booking_id).update(pricing_fingerprint=booking.pricing_fingerprint)
+    return booking.pricing_fingerprint
@@ -0,0 +1,168 @@
+"""
+Expansion of recurring booking schedules into dates.
+
+A RecurrenceRule is the schedule a professional picks for a recurring draft:
+a date range, the days of the week (Python weekdays, Monday is 0) and a
+frequency. Dates are computed arithmetically from the rule rather than by
+walking every day of the range, and are generated lazily in date order:
+
+    rule = RecurrenceRule(start_date, end_date, days_of_week, 'bi-weekly')
+    rule.count()                  # total occurrences, without generating them
+    rule.preview(10)              # the first 10 dates
+    for date_obj in expand_recurrence(rule):  # every date, up to MAX_RECURRING_OCCURRENCES
+        ...
+
+Frequencies:
+    weekly     every selected day of every week
+    bi-weekly  every selected day of every other week, starting with the week
+               (Monday to Sunday) that contains the start date
+    monthly    every selected day in the same week of the month as the start
+               date: the first to fourth, or the last when the start date is
+               in the month's fifth week
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from itertools import islice
+
+WEEKLY = 'weekly'
+BI_WEEKLY = 'bi-weekly'
+MONTHLY = 'monthly'
+
+FREQUENCIES = (WEEKLY, BI_WEEKLY, MONTHLY)
+
+# Days between repeats of the same weekday
+PERIOD_DAYS = {
+    WEEKLY: 7,
+    BI_WEEKLY: 14,
+}
+
+# Most occurrences a single recurring draft may expand to (about two years of daily visits)
+MAX_RECURRING_OCCURRENCES = 730
+
+LAST_WEEK = 5
+
+
+class RecurrenceLimitExceeded(ValueError):
+    """Raised when a rule expands to more occurrences than allowed."""
+
+    def __init__(self, count, max_count):
+        self.count = count
+        self.max_count = max_count
+        super().__init__(
+            f"Recurring schedule has {count} occurrences; the maximum is {max_count}"
+        )
+
+
+def _nth_weekday(year, month, weekday, week):
+    """The date of the week-th (1-4, or LAST_WEEK for the last) given weekday of a month."""
+    days_in_month = monthrange(year, month)[1]
+    if week == LAST_WEEK:
+        last_day = date(year, month, days_in_month)
+        return last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+    first_day = date(year, month, 1)
+    return first_day + timedelta(days=(weekday - first_day.weekday()) % 7 + 7 * (week - 1))
+
+
+class RecurrenceRule:
+    """A recurring schedule; raises ValueError if the rule is invalid."""
+
+    def __init__(self, start_date, end_date, days_of_week, frequency):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Invalid frequency: {frequency}. Must be one of {', '.join(FREQUENCIES)}")
+        if end_date < start_date:
+            raise ValueError("End date must be on or after start date")
+        weekdays = set()
+        for day in days_of_week:
+            if isinstance(day, bool) or not isinstance(day, int) or not 0 <= day <= 6:
+                raise ValueError(f"Invalid day of week: {day}. Must be 0 (Monday) to 6 (Sunday)")
+            weekdays.add(day)
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days_of_week = sorted(weekdays)
+        self.frequency = frequency
+
+    def _week_starts(self):
+        """Monday of every week a weekly or bi-weekly rule repeats in."""
+        period = PERIOD_DAYS[self.frequency]
+        week_start = self.start_date - timedelta(days=self.start_date.weekday())
+        while week_start <= self.end_date:
+            yield week_start
+            week_start += timedelta(days=period)
+
+    def _week_of_month(self):
+        """Week of the month the start date falls in; its fifth week is the month's last."""
+        return min((self.start_date.day - 1) // 7 + 1, LAST_WEEK)
+
+    def _month_dates(self, year, month):
+        """The rule's dates in one month that fall within the range, in order."""
+        week = self._week_of_month()
+        return [
+            date_obj
+            for date_obj in sorted(_nth_weekday(year, month, weekday, week) for weekday in self.days_of_week)
+            if self.start_date <= date_obj <= self.end_date
+        ]
+
+    def _monthly_dates(self):
+        year, month = self.start_date.year, self.start_date.month
+        while (year, month) <= (self.end_date.year, self.end_date.month):
+            yield from self._month_dates(year, month)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def _monthly_count(self):
+        # Every selected weekday has exactly one date in each month, so only
+        # the first and last months can lose dates to the range
+        first = (self.start_date.year, self.start_date.month)
+        last = (self.end_date.year, self.end_date.month)
+        if first == last:
+            return len(self._month_dates(*first))
+        months_between = (last[0] - first[0]) * 12 + last[1] - first[1] - 1
+        return (
+            len(self._month_dates(*first))
+            + months_between * len(self.days_of_week)
+            + len(self._month_dates(*last))
+        )
+
+    def dates(self, limit=None):
+        """Generate the rule's dates in order, stopping after limit if given."""
+        if self.frequency == MONTHLY:
+            dates = self._monthly_dates()
+        else:
+            dates = (
+                date_obj
+                for week_start in self._week_starts()
+                for date_obj in (week_start + timedelta(days=weekday) for weekday in self.days_of_week)
+                if self.start_date <= date_obj <= self.end_date
+            )
+        return dates if limit is None else islice(dates, limit)
+
+    def count(self):
+        """Number of dates the rule expands to, counted without generating them."""
+        if self.frequency == MONTHLY:
+            return self._monthly_count()
+
+        period = PERIOD_DAYS[self.frequency]
+        week_start = self.start_date - timedelta(days=self.start_date.weekday())
+        total = 0
+        for weekday in self.days_of_week:
+            first = week_start + timedelta(days=weekday)
+            if first < self.start_date:
+                first += timedelta(days=period)
+            if first <= self.end_date:
+                total += (self.end_date - first).days // period + 1
+        return total
+
+    def preview(self, limit):
+        """The first limit dates."""
+        return list(self.dates(limit))
+
+
+def expand_recurrence(rule, max_count=MAX_RECURRING_OCCURRENCES):
+    """
+    Generate every date of a rule. Raises RecurrenceLimitExceeded up front,
+    before any date is generated, if the rule has more than max_count.
+    """
+    count = rule.count()
+    if max_count is not None and count > max_count:
+        raise RecurrenceLimitExceeded(count, max_count)
+    return rule.dates()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Location
+from .models import Location, GeocodeCacheEntry
 
 
 @admin.register(Location)
@@ -23,3 +23,14 @@ class LocationAdmin(admin.ModelAdmin):
         """Mark selected locations as unsupported (coming soon)"""
         queryset.update(supported=False)
     make_unsupported.short_description = "Mark selected locations as unsupported"
+
+
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    """Admin configuration for cached geocoding results"""
+    list_display = ('query_key', 'found', 'latitude', 'longitude', 'expires_at', 'updated_at')
+    list_filter = ('found',)
+    search_fields = ('query_key', 'query_text')
+    ordering = ('-updated_at',)
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,342 @@
+"""
+Geocoding layer used by professional search.
+
+Lookups go through three tiers: an in-process LRU, the GeocodeCacheEntry
+table (shared by every worker and survives deploys), and finally the
+configured backend. Failed lookups are cached too, so a location Nominatim
+cannot resolve (or a Nominatim outage) does not cost a network round trip
+on every search.
+
+Backend calls are throttled process-wide to the backend's
+min_request_interval (Nominatim's usage policy allows one request per
+second), and concurrent misses for the same query share a single lookup.
+
+The backend is chosen with settings.GEOCODING_BACKEND (dotted path). Tests
+and local development can point it at StaticGeocodingBackend and provide
+results through settings.GEOCODING_STATIC_RESULTS.
+"""
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEOCODING_BACKEND = 'locations.geocoding.NominatimGeocodingBackend'
+
+# How long results stay cached
+FOUND_RESULT_TTL = timedelta(days=30)
+NOT_FOUND_RESULT_TTL = timedelta(days=1)
+# Transport errors are only cached briefly so we retry once the backend recovers
+BACKEND_ERROR_TTL = timedelta(minutes=5)
+
+LRU_MAX_SIZE = 1024
+
+# GeocodeCacheEntry.query_key length; longer queries are stored truncated plus a hash
+QUERY_KEY_MAX_LENGTH = 255
+
+
+class GeocodingError(Exception):
+    """Raised by a backend when the lookup could not be completed (timeout, HTTP error, ...)."""
+
+
+class GeocodingBackend:
+    """Base class for geocoding backends."""
+
+    # Minimum seconds between two requests from this process
+    min_request_interval = 0
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """
+        Return (latitude, longitude) for the query, or None if the location
+        does not exist. Raise GeocodingError if the lookup itself failed.
+        """
+        raise NotImplementedError
+
+
+class NominatimGeocodingBackend(GeocodingBackend):
+    """Geocodes Colorado locations with the public Nominatim API."""
+
+    url = 'https://nominatim.openstreetmap.org/search'
+    timeout = 5
+    min_request_interval = 1.0
+
+    def geocode(self, query):
+        params = {
+            'q': f"{query}, Colorado, USA",
+            'format': 'json',
+            'limit': '1',
+            'countrycodes': 'us',
+            'addressdetails': '1'
+        }
+        headers = {
+            'User-Agent': 'CrittrCove/1.0 (contact@crittrcove.com)'
+        }
+
+        try:
+            response = requests.get(self.url, params=params, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(str(e)) from e
+
+        if response.status_code != 200:
+            raise GeocodingError(f"Nominatim returned HTTP {response.status_code}")
+
+        data = response.json()
+        if not data:
+            return None
+
+        result = data[0]
+        lat = float(result['lat'])
+        lng = float(result['lon'])
+
+        # Validate coordinates are within Colorado bounds
+        if 37.0 <= lat <= 41.0 and -109.0 <= lng <= -102.0:
+            return (lat, lng)
+        return None
+
+
+class StaticGeocodingBackend(GeocodingBackend):
+    """
+    Local stand-in backend that never touches the network.
+    Results come from settings.GEOCODING_STATIC_RESULTS, a dict of
+    {location string: (latitude, longitude)}; keys are normalized the same
+    way as cache keys.
+    """
+
+    def __init__(self, results=None):
+        if results is None:
+            results = getattr(settings, 'GEOCODING_STATIC_RESULTS', {})
+        self.results = {normalize_geocode_query(key): tuple(value) for key, value in results.items()}
+        self.calls = 0
+
+    def geocode(self, query):
+        self.calls += 1
+        return self.results.get(normalize_geocode_query(query))
+
+
+def normalize_geocode_query(location_string: str) -> str:
+    """
+    Normalize a free-form location so equivalent searches share a cache key:
+    "  Colorado   Springs, co " and "colorado springs, CO" both become
+    "colorado springs, co".
+    """
+    normalized = location_string.lower().strip()
+    normalized = re.sub(r'\s*,\s*', ', ', normalized)
+    normalized = re.sub(r'\s+', ' ', normalized)
+    return normalized.strip(' ,')
+
+
+def geocode_storage_key(key: str) -> str:
+    """The GeocodeCacheEntry.query_key for a normalized query, hashed when too long to store."""
+    if len(key) <= QUERY_KEY_MAX_LENGTH:
+        return key
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return f"{key[:QUERY_KEY_MAX_LENGTH - len(digest) - 1]}:{digest}"
+
+
+class _LRUCache:
+    """Small thread-safe LRU with per-entry expiry, local to one process."""
+
+    def __init__(self, max_size=LRU_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl: timedelta):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl.total_seconds())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Throttle:
+    """Spaces calls at least min_interval seconds apart across the threads of a process."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_call_at = 0.0
+
+    def wait(self):
+        if not self.min_interval:
+            return
+        with self._lock:
+            delay = self._next_call_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_call_at = time.monotonic() + self.min_interval
+
+
+class _SingleFlight:
+    """Runs one call per key at a time; concurrent callers for the key wait and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            return call.result
+        try:
+            call.result = fn()
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class GeocodingService:
+    """Caching front for a GeocodingBackend."""
+
+    def __init__(self, backend: GeocodingBackend, lru_max_size=LRU_MAX_SIZE):
+        self.backend = backend
+        self.lru = _LRUCache(lru_max_size)
+        self.throttle = _Throttle(getattr(backend, 'min_request_interval', 0))
+        self.flights = _SingleFlight()
+
+    def geocode(self, location_string: str) -> Optional[Tuple[float, float]]:
+        if not location_string or location_string.strip() == '':
+            return None
+
+        key = normalize_geocode_query(location_string)
+
+        hit, coords = self.lru.get(key)
+        if hit:
+            return coords
+
+        return self.flights.do(key, lambda: self._lookup(key, location_string))
+
+    def _lookup(self, key, location_string):
+        """Database, then backend lookup for an LRU miss; runs once per key at a time."""
+        hit, coords = self.lru.get(key)
+        if hit:
+            # Filled by a lookup that finished while this one waited to start
+            return coords
+
+        hit, coords, expires_at = self._get_from_db(key)
+        if hit:
+            self.lru.set(key, coords, expires_at - timezone.now())
+            return coords
+
+        self.throttle.wait()
+        try:
+            coords = self.backend.geocode(key)
+            ttl = FOUND_RESULT_TTL if coords else NOT_FOUND_RESULT_TTL
+        except GeocodingError as e:
+            logger.error(f"Geocoding failed for '{location_string}': {str(e)}")
+            coords = None
+            ttl = BACKEND_ERROR_TTL
+        except Exception as e:
+            logger.error(f"Unexpected geocoding error for '{location_string}': {str(e)}")
+            coords = None
+            ttl = BACKEND_ERROR_TTL
+
+        self.lru.set(key, coords, ttl)
+        self._store_in_db(key, location_string, coords, ttl)
+        return coords
+
+    def _get_from_db(self, key):
+        from .models import GeocodeCacheEntry
+
+        try:
+            entry = GeocodeCacheEntry.objects.only(
+                'latitude', 'longitude', 'found', 'expires_at'
+            ).get(query_key=geocode_storage_key(key), expires_at__gt=timezone.now())
+        except GeocodeCacheEntry.DoesNotExist:
+            return False, None, None
+        except Exception as e:
+            # A cache read failure should never break search
+            logger.error(f"Error reading geocode cache for '{key}': {str(e)}")
+            return False, None, None
+
+        coords = (entry.latitude, entry.longitude) if entry.found else None
+        return True, coords, entry.expires_at
+
+    def _store_in_db(self, key, location_string, coords, ttl):
+        from .models import GeocodeCacheEntry
+
+        try:
+            GeocodeCacheEntry.objects.update_or_create(
+                query_key=geocode_storage_key(key),
+                defaults={
+                    'query_text': location_string[:255],
+                    'latitude': coords[0] if coords else None,
+                    'longitude': coords[1] if coords else None,
+                    'found': coords is not None,
+                    'expires_at': timezone.now() + ttl,
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error writing geocode cache for '{key}': {str(e)}")
+
+    def clear_local_cache(self):
+        self.lru.clear()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_geocoding_service() -> GeocodingService:
+    """Return the process-wide GeocodingService for settings.GEOCODING_BACKEND."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                backend_path = getattr(settings, 'GEOCODING_BACKEND', DEFAULT_GEOCODING_BACKEND)
+                _service = GeocodingService(import_string(backend_path)())
+    return _service
+
+
+def reset_geocoding_service():
+    """Drop the process-wide service so the next lookup re-reads settings (used by tests)."""
+    global _service
+    with _service_lock:
+        _service = None
+
+
+def geocode_location(location_string):
+    """
+    Geocode a location string.
+    Returns (latitude, longitude) tuple or None if failed
+    """
+    return get_geocoding_service().geocode(location_string)
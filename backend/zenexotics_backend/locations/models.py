@@ -22,3 +22,28 @@ class Location(models.Model):
     def __str__(self):
         status = "Supported" if self.supported else "Coming Soon"
         return f"{self.name} ({status})"
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Persistent cache of geocoding results keyed by the normalized query.
+    Rows with found=False are negative-cache entries for lookups that failed.
+    See locations.geocoding for how entries are read and written.
+    """
+    query_key = models.CharField(max_length=255, unique=True)
+    query_text = models.CharField(max_length=255)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    found = models.BooleanField(default=False)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Geocode Cache Entry'
+        verbose_name_plural = 'Geocode Cache Entries'
+
+    def __str__(self):
+        if self.found:
+            return f"{self.query_key} -> ({self.latitude}, {self.longitude})"
+        return f"{self.query_key} -> not found"
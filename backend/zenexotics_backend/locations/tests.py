@@ -1,3 +1,136 @@
-from django.test import TestCase
+from datetime import timedelta
+import threading
+import time
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from locations.geocoding import (
+    BACKEND_ERROR_TTL, FOUND_RESULT_TTL, NOT_FOUND_RESULT_TTL, QUERY_KEY_MAX_LENGTH,
+    GeocodingBackend, GeocodingError, GeocodingService, _SingleFlight, _Throttle,
+    geocode_storage_key, normalize_geocode_query
+)
+from locations.models import GeocodeCacheEntry
+
+DENVER = (39.7392, -104.9903)
+
+
+class RecordingBackend(GeocodingBackend):
+    """Returns results from a dict, raising GeocodingError for queries in errors."""
+
+    def __init__(self, results=None, errors=()):
+        self.results = results or {}
+        self.errors = set(errors)
+        self.queries = []
+
+    def geocode(self, query):
+        self.queries.append(query)
+        if query in self.errors:
+            raise GeocodingError('backend unavailable')
+        return self.results.get(query)
+
+
+class GeocodingServiceTests(TestCase):
+    def setUp(self):
+        self.backend = RecordingBackend({'denver, co': DENVER})
+        self.service = GeocodingService(self.backend)
+
+    def assertExpiresIn(self, key, ttl):
+        entry = GeocodeCacheEntry.objects.get(query_key=key)
+        self.assertAlmostEqual((entry.expires_at - timezone.now()).total_seconds(), ttl.total_seconds(), delta=60)
+        return entry
+
+    def test_normalization(self):
+        self.assertEqual(normalize_geocode_query('  Colorado   Springs , CO '), 'colorado springs, co')
+        self.assertEqual(normalize_geocode_query('Denver,co,'), 'denver, co')
+
+        self.assertEqual(self.service.geocode('Denver,CO'), DENVER)
+        self.assertEqual(self.service.geocode('  denver ,  co '), DENVER)
+        self.assertEqual(self.backend.queries, ['denver, co'])
+
+    def test_lru_then_database_then_backend(self):
+        self.assertEqual(self.service.geocode('Denver, CO'), DENVER)
+        self.assertEqual(self.backend.queries, ['denver, co'])
+        self.assertExpiresIn('denver, co', FOUND_RESULT_TTL)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.service.geocode('Denver, CO'), DENVER)
+        self.assertEqual(len(queries), 0)
+
+        # Another process: empty LRU, shared database
+        other = GeocodingService(self.backend)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(other.geocode('Denver, CO'), DENVER)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.backend.queries, ['denver, co'])
+
+    def test_not_found_is_cached_for_a_day(self):
+        self.assertIsNone(self.service.geocode('Atlantis'))
+        entry = self.assertExpiresIn('atlantis', NOT_FOUND_RESULT_TTL)
+        self.assertFalse(entry.found)
+
+        self.service.clear_local_cache()
+        self.assertIsNone(self.service.geocode('Atlantis'))
+        self.assertEqual(self.backend.queries, ['atlantis'])
+
+    def test_backend_error_is_cached_briefly(self):
+        self.backend.errors.add('boulder')
+        self.assertIsNone(self.service.geocode('Boulder'))
+        self.assertExpiresIn('boulder', BACKEND_ERROR_TTL)
+
+        # Once the entry expires the backend is asked again
+        self.backend.errors.clear()
+        self.backend.results['boulder'] = (40.015, -105.2705)
+        GeocodeCacheEntry.objects.filter(query_key='boulder').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.service.clear_local_cache()
+        self.assertEqual(self.service.geocode('Boulder'), (40.015, -105.2705))
+        self.assertEqual(self.backend.queries, ['boulder', 'boulder'])
+
+    def test_long_query_is_stored_under_a_hashed_key(self):
+        query = 'x' * 300
+        self.service.geocode(query)
+
+        key = geocode_storage_key(query)
+        self.assertLessEqual(len(key), QUERY_KEY_MAX_LENGTH)
+        self.assertNotEqual(key, geocode_storage_key('x' * 299 + 'y'))
+        self.assertTrue(GeocodeCacheEntry.objects.filter(query_key=key).exists())
+
+        self.service.clear_local_cache()
+        self.service.geocode(query)
+        self.assertEqual(len(self.backend.queries), 1)
+
+
+class GeocodingConcurrencyTests(SimpleTestCase):
+    def test_throttle_spaces_calls(self):
+        throttle = _Throttle(0.05)
+        started = time.monotonic()
+        for _ in range(3):
+            throttle.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_single_flight_shares_one_call_per_key(self):
+        flights = _SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def lookup():
+            calls.append(1)
+            release.wait(5)
+            return DENVER
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flights.do('denver', lookup))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            time.sleep(0.01)
+        # Let the followers queue up behind the leader
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [DENVER] * 5)
@@ -4,7 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.token_auth import CachedJWTAuthentication
 from ..models import PaymentMethod
 from ..serializers import PaymentMethodSerializer
 from professional_status.models import ProfessionalStatus
@@ -13,7 +13,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 class PaymentMethodsView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -1,7 +1,7 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.token_auth import CachedJWTAuthentication
 from rest_framework.response import Response
 from ..models import ProfessionalStatus
 import logging
@@ -10,7 +10,7 @@ import json
 logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_professional_status(request):
     logger.info(f"Received professional status request for user: {request.user.email}")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Professional
+from .models import Professional, ProfessionalSearchDocument
 
 @admin.register(Professional)
 class ProfessionalAdmin(admin.ModelAdmin):
@@ -49,4 +49,11 @@ class ProfessionalAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    ) 
\ No newline at end of file
+    ) 
+
+@admin.register(ProfessionalSearchDocument)
+class ProfessionalSearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ['service', 'professional', 'name', 'service_name', 'base_rate', 'city', 'geo_cell', 'updated_at']
+    list_filter = ['is_background_checked', 'is_insured', 'is_elite_pro', 'is_overnight']
+    search_fields = ['name', 'service_name', 'city']
+    readonly_fields = [field.name for field in ProfessionalSearchDocument._meta.fields]
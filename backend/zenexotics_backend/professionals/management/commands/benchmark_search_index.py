@@ -0,0 +1,150 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from geopy.distance import geodesic
+from core.geo_utils import bounding_box, compute_geo_cell, geo_cells_for_radius, haversine_miles_many
+from user_addresses.models import Address, AddressType
+from users.models import User
+import random
+import statistics
+import time
+
+# Colorado bounds, matching the geocoder's validation in professionals.v1.views
+COLORADO_LAT_RANGE = (37.0, 41.0)
+COLORADO_LNG_RANGE = (-109.0, -102.0)
+COLORADO_CENTER = (39.0, -105.5)
+
+SEED_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the radius step of professional search against seeded SERVICE addresses: '
+        'full geodesic scan vs geo cell index + haversine. Seeded rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Numbers of seeded addresses to benchmark (default: 1000 10000 100000)'
+        )
+        parser.add_argument(
+            '--searches',
+            type=int,
+            default=50,
+            help='Searches to time per size with the spatial index (default: 50)'
+        )
+        parser.add_argument(
+            '--baseline-searches',
+            type=int,
+            default=3,
+            help='Searches to time per size with the full geodesic scan (default: 3)'
+        )
+        parser.add_argument(
+            '--radius',
+            type=float,
+            default=30,
+            help='Search radius in miles (default: 30)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for the synthetic data (default: 42)'
+        )
+
+    def random_point(self, rng):
+        return (rng.uniform(*COLORADO_LAT_RANGE), rng.uniform(*COLORADO_LNG_RANGE))
+
+    def seed_addresses(self, user, rng, count):
+        """Insert count SERVICE addresses with the spatial columns Address.save() would set."""
+        addresses = []
+        for _ in range(count):
+            lat, lng = self.random_point(rng)
+            addresses.append(Address(
+                user=user,
+                address_line_1='1 Benchmark Way',
+                city='Benchmark',
+                state='CO',
+                zip='80000',
+                country='USA',
+                coordinates={'latitude': lat, 'longitude': lng},
+                latitude=lat,
+                longitude=lng,
+                geo_cell=compute_geo_cell(lat, lng),
+                address_type=AddressType.SERVICE
+            ))
+        Address.objects.bulk_create(addresses, batch_size=SEED_BATCH_SIZE)
+
+    def geodesic_scan(self, center, radius):
+        """The search before the spatial index: every address, one geodesic call each."""
+        points = Address.objects.filter(address_type=AddressType.SERVICE).values_list('latitude', 'longitude')
+        return [point for point in points if geodesic(center, point).miles <= radius]
+
+    def indexed_search(self, center, radius):
+        """Geo cell lookup (bounding box above MAX_GEO_CELLS_PER_QUERY) and one haversine pass."""
+        addresses = Address.objects.filter(address_type=AddressType.SERVICE)
+        geo_cells = geo_cells_for_radius(center[0], center[1], radius)
+        if geo_cells is not None:
+            addresses = addresses.filter(geo_cell__in=geo_cells)
+        else:
+            min_lat, max_lat, min_lng, max_lng = bounding_box(center[0], center[1], radius)
+            addresses = addresses.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng))
+
+        candidates = list(addresses.values_list('latitude', 'longitude'))
+        distances = haversine_miles_many(center, candidates)
+        return candidates, [point for point, distance in zip(candidates, distances) if distance <= radius]
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        radius = options['radius']
+
+        if geo_cells_for_radius(COLORADO_CENTER[0], COLORADO_CENTER[1], radius) is None:
+            self.stdout.write(f"Radius: {radius} miles (too many geo cells, bounding box fallback)")
+        else:
+            self.stdout.write(f"Radius: {radius} miles")
+        self.stdout.write(f"{'addresses':>9} {'geodesic scan (ms)':>20} {'indexed (ms)':>14} {'candidates':>11} {'matches':>8}")
+        self.stdout.write("-" * 66)
+
+        with transaction.atomic():
+            user = User.objects.create_user(email='search-benchmark@example.invalid', password=None, name='Benchmark')
+            seeded = 0
+
+            for size in sorted(options['sizes']):
+                self.seed_addresses(user, rng, size - seeded)
+                seeded = size
+
+                centers = [
+                    self.random_point(rng)
+                    for _ in range(max(options['searches'], options['baseline_searches']))
+                ]
+
+                baseline_times = []
+                for center in centers[:options['baseline_searches']]:
+                    start = time.perf_counter()
+                    self.geodesic_scan(center, radius)
+                    baseline_times.append((time.perf_counter() - start) * 1000)
+
+                indexed_times = []
+                candidate_counts = []
+                match_counts = []
+                for center in centers[:options['searches']]:
+                    start = time.perf_counter()
+                    candidates, matches = self.indexed_search(center, radius)
+                    indexed_times.append((time.perf_counter() - start) * 1000)
+                    candidate_counts.append(len(candidates))
+                    match_counts.append(len(matches))
+
+                baseline_ms = statistics.median(baseline_times) if baseline_times else float('nan')
+                indexed_ms = statistics.median(indexed_times) if indexed_times else float('nan')
+                self.stdout.write(
+                    f"{size:>9} {baseline_ms:>20.2f} {indexed_ms:>14.3f} "
+                    f"{int(statistics.median(candidate_counts or [0])):>11} {int(statistics.median(match_counts or [0])):>8}"
+                )
+
+            # Leave the database as it was
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete (median per search)"))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from professionals import search_index
+from professionals.models import ProfessionalSearchDocument
+
+
+class Command(BaseCommand):
+    help = 'Compare the professional search document table with the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Refresh the professionals whose documents are missing, extra or stale'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search_index.REBUILD_BATCH_SIZE,
+            help=f'Professionals checked per batch (default: {search_index.REBUILD_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        report = search_index.check_consistency(batch_size=options['batch_size'])
+
+        self.stdout.write(f"Missing documents: {len(report['missing'])}")
+        for service_id in report['missing']:
+            self.stdout.write(f"  service {service_id}")
+
+        self.stdout.write(f"Extra documents: {len(report['extra'])}")
+        for service_id in report['extra']:
+            self.stdout.write(f"  service {service_id}")
+
+        self.stdout.write(f"Stale documents: {len(report['stale'])}")
+        for service_id, fields in report['stale'].items():
+            self.stdout.write(f"  service {service_id}: {', '.join(fields)}")
+
+        problem_service_ids = set(report['missing']) | set(report['extra']) | set(report['stale'])
+        if not problem_service_ids:
+            self.stdout.write(self.style.SUCCESS("Search index is consistent"))
+            return
+
+        if not options['repair']:
+            raise CommandError(f"Search index has {len(problem_service_ids)} inconsistent documents (run with --repair to fix)")
+
+        from services.models import Service
+        professional_ids = set(
+            Service.objects.filter(service_id__in=problem_service_ids).values_list('professional_id', flat=True)
+        ) | set(
+            ProfessionalSearchDocument.objects.filter(service_id__in=problem_service_ids).values_list('professional_id', flat=True)
+        )
+        search_index.refresh_professionals(professional_ids)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed search documents for {len(professional_ids)} professionals"))
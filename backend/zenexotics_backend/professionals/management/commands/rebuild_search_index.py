@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from professionals import search_index
+from professionals.models import ProfessionalSearchDocument
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the professional search document table from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search_index.REBUILD_BATCH_SIZE,
+            help=f'Professionals refreshed per batch (default: {search_index.REBUILD_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        professional_count = search_index.rebuild_all(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt search index for {professional_count} professionals "
+            f"({ProfessionalSearchDocument.objects.count()} documents) in {elapsed:.2f}s"
+        ))
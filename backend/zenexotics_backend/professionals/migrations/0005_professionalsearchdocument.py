@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0011_add_is_archived_field'),
+        ('professionals', '0004_add_badge_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfessionalSearchDocument',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='services.service')),
+                ('name', models.CharField(max_length=255)),
+                ('profile_picture_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('is_background_checked', models.BooleanField(default=False)),
+                ('is_insured', models.BooleanField(default=False)),
+                ('is_elite_pro', models.BooleanField(default=False)),
+                ('service_name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('animal_types', models.JSONField(default=dict)),
+                ('base_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('unit_of_time', models.CharField(max_length=50)),
+                ('is_overnight', models.BooleanField(default=False)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('geo_cell', models.CharField(max_length=32)),
+                ('average_rating', models.FloatField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('latest_review_text', models.TextField(blank=True, null=True)),
+                ('latest_review_author_profile_pic', models.CharField(blank=True, max_length=500, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('professional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='professionals.professional')),
+            ],
+            options={
+                'verbose_name': 'Professional Search Document',
+                'verbose_name_plural': 'Professional Search Documents',
+                'db_table': 'professional_search_documents',
+                'indexes': [models.Index(fields=['geo_cell', 'base_rate'], name='professiona_geo_cel_dbc1d5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:58
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('professionals', '0005_professionalsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professionalsearchdocument',
+            name='animal_type_phrases',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='professionalsearchdocument',
+            name='animal_type_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='professionalsearchdocument',
+            name='description_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='professionalsearchdocument',
+            name='name_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='professionalsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['animal_type_tokens'], name='search_doc_animal_tokens_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='professionalsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['animal_type_phrases'], name='search_doc_animal_phrases_gin'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 import logging
 
 class Professional(models.Model):
@@ -47,4 +49,100 @@ class Professional(models.Model):
         verbose_name_plural = 'Professionals'
 
     def __str__(self):
-        return f"Professional: {self.user.name}" 
\ No newline at end of file
+        return f"Professional: {self.user.name}" 
+
+class ProfessionalSearchDocument(models.Model):
+    """
+    Denormalized search row, one per searchable professional service.
+    
+    A row only exists while the service is approved/active/searchable/not archived,
+    the professional's user is active, visible and not deleted, and their SERVICE
+    address has coordinates. Rows are maintained by professionals.signals through
+    professionals.search_index; use the rebuild_search_index and
+    check_search_index management commands to rebuild or verify the table.
+    """
+    service = models.OneToOneField(
+        'services.Service',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    professional = models.ForeignKey(
+        Professional,
+        on_delete=models.CASCADE,
+        related_name='search_documents'
+    )
+
+    # Professional / user snapshot
+    name = models.CharField(max_length=255)
+    profile_picture_url = models.CharField(max_length=500, null=True, blank=True)
+    is_background_checked = models.BooleanField(default=False)
+    is_insured = models.BooleanField(default=False)
+    is_elite_pro = models.BooleanField(default=False)
+
+    # Service snapshot
+    service_name = models.CharField(max_length=255)
+    description = models.TextField()
+    animal_types = models.JSONField(default=dict)
+    base_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_of_time = models.CharField(max_length=50)
+    is_overnight = models.BooleanField(default=False)
+    animal_type_phrases = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+    animal_type_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+    name_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+    description_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True)
+
+    # SERVICE address snapshot
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geo_cell = models.CharField(max_length=32)
+
+    # Approved, visible client review aggregates
+    average_rating = models.FloatField(default=0)
+    review_count = models.IntegerField(default=0)
+    latest_review_text = models.TextField(null=True, blank=True)
+    latest_review_author_profile_pic = models.CharField(max_length=500, null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields compared by the consistency checker (everything except updated_at)
+    CONTENT_FIELDS = [
+        'professional_id', 'name', 'profile_picture_url', 'is_background_checked',
+        'is_insured', 'is_elite_pro', 'service_name', 'description', 'animal_types',
+        'base_rate', 'unit_of_time', 'is_overnight', 'animal_type_phrases',
+        'animal_type_tokens', 'name_tokens', 'description_tokens', 'city', 'state', 'latitude',
+        'longitude', 'geo_cell', 'average_rating', 'review_count',
+        'latest_review_text', 'latest_review_author_profile_pic',
+    ]
+
+    class Meta:
+        db_table = 'professional_search_documents'
+        verbose_name = 'Professional Search Document'
+        verbose_name_plural = 'Professional Search Documents'
+        indexes = [
+            models.Index(fields=['geo_cell', 'base_rate']),
+            GinIndex(fields=['animal_type_tokens'], name='search_doc_animal_tokens_gin'),
+            GinIndex(fields=['animal_type_phrases'], name='search_doc_animal_phrases_gin'),
+        ]
+
+    def __str__(self):
+        return f"Search document: {self.service_name} by {self.name}"
+
+
+class SearchIndexVersion(models.Model):
+    """
+    Single row holding the search index version (see professionals.search_index).
+    It is bumped every time search documents are refreshed, and caches derived
+    from the documents include it in their keys. Keeping it in the database
+    means every worker sees a bump at once and it never goes backwards.
+    """
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'professional_search_index_version'
+
+    def __str__(self):
+        return f"Search index version {self.version}"
@@ -0,0 +1,99 @@
+"""
+Short-lived cache of professional search results.
+
+search_professionals normalizes its parameters with normalize_search_criteria()
+and caches the candidate lists it builds (grouped by match type, before the
+per-request shuffle) under a key derived from those criteria and the rounded
+search coordinates. Repeated searches, and page 2+ of a search, are then served
+by shuffling and paginating the cached lists.
+
+The key includes the search index version, which is kept in the database (see
+professionals/search_index.py), so any Service, Address, review or profile
+change that refreshes the search documents invalidates every cached result on
+every worker immediately; the TTL only bounds how long an entry lingers unused.
+
+Entries and the hit/miss counters live in the default cache, which deployed
+environments must share between workers (the users.E001 check enforces it), so
+a worker can serve another's entries and the stats cover the whole deployment.
+A process-local cache during development only sees its own process.
+"""
+from django.core.cache import cache
+import hashlib
+import json
+
+from services.search_tokens import requested_animal_tokens, normalize_words
+
+SEARCH_RESULT_CACHE_TIMEOUT = 60
+
+# Geocoded coordinates are rounded to ~100m so nearby lookups share entries
+COORDINATE_PRECISION = 3
+
+ALL_SERVICES_QUERIES = ['all services', 'all', '']
+
+HITS_CACHE_KEY = 'search_result_cache:hits'
+MISSES_CACHE_KEY = 'search_result_cache:misses'
+
+
+def normalize_search_criteria(animal_types, service_query, overnight_service, price_min, price_max,
+                              radius_miles, filter_background_checked, filter_insured, filter_elite_pro):
+    """
+    Normalize search parameters into the criteria used both to run the search
+    and to key the cache. Equivalent searches ("Dogs" vs "dog", price 25 vs
+    25.00, badge flag missing vs false) produce identical criteria.
+    """
+    animal_phrases, animal_tokens = requested_animal_tokens(animal_types)
+    return {
+        'animal_phrases': animal_phrases,
+        'animal_tokens': animal_tokens,
+        'query_tokens': normalize_words(service_query),
+        'is_all_services': service_query.lower() in ALL_SERVICES_QUERIES,
+        'overnight_service': bool(overnight_service),
+        'price_min': round(float(price_min), 2),
+        'price_max': round(float(price_max), 2),
+        'radius_miles': float(radius_miles),
+        'filter_background_checked': bool(filter_background_checked),
+        'filter_insured': bool(filter_insured),
+        'filter_elite_pro': bool(filter_elite_pro),
+    }
+
+
+def build_search_cache_key(criteria, user_coords, index_version):
+    """Cache key for normalized criteria searched at user_coords against search index version index_version."""
+    payload = json.dumps({
+        'criteria': criteria,
+        'coords': [round(user_coords[0], COORDINATE_PRECISION), round(user_coords[1], COORDINATE_PRECISION)],
+    }, sort_keys=True)
+    digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    return f"search_results:{index_version}:{digest}"
+
+
+def _increment(counter_key):
+    # incr is atomic on the shared backend, so concurrent workers never lose counts
+    try:
+        cache.incr(counter_key)
+    except ValueError:
+        cache.add(counter_key, 0, timeout=None)
+        cache.incr(counter_key)
+
+
+def get_cached_search(cache_key):
+    """Return the cached candidates for cache_key (or None), counting the hit or miss."""
+    candidates = cache.get(cache_key)
+    _increment(HITS_CACHE_KEY if candidates is not None else MISSES_CACHE_KEY)
+    return candidates
+
+
+def set_cached_search(cache_key, candidates):
+    cache.set(cache_key, candidates, SEARCH_RESULT_CACHE_TIMEOUT)
+
+
+def get_search_cache_stats():
+    """Return {'hits': int, 'misses': int} across all workers since the counters were last reset."""
+    return {
+        'hits': cache.get(HITS_CACHE_KEY, 0),
+        'misses': cache.get(MISSES_CACHE_KEY, 0),
+    }
+
+
+def reset_search_cache_stats():
+    cache.delete_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
@@ -0,0 +1,233 @@
+"""
+Maintenance of the ProfessionalSearchDocument table used by search_professionals.
+
+Every write path funnels through refresh_professionals(), which recomputes the
+full set of documents for a batch of professionals with a constant number of
+queries and then upserts/deletes rows so the table matches.
+
+Each refresh also bumps the version in the SearchIndexVersion row. Anything
+cached from the documents (e.g. the default-region fallback set) includes the
+version in its key, so it is invalidated on every worker as soon as a service,
+address or review changes. The version lives in the database rather than the
+cache so that an evicted key can never reset it and resurface old entries.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F
+import logging
+
+from .models import Professional, ProfessionalSearchDocument, SearchIndexVersion
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 500
+
+INDEX_VERSION_ROW_ID = 1
+
+
+def get_index_version():
+    """Current search index version, used to key caches derived from the documents."""
+    version = SearchIndexVersion.objects.filter(pk=INDEX_VERSION_ROW_ID).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_index_version():
+    """Invalidate every cache keyed on the search index version."""
+    versions = SearchIndexVersion.objects.filter(pk=INDEX_VERSION_ROW_ID)
+    if versions.update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            SearchIndexVersion.objects.create(pk=INDEX_VERSION_ROW_ID, version=1)
+    except IntegrityError:
+        # Created concurrently by another refresh, bump past it
+        versions.update(version=F('version') + 1)
+
+
+def _profile_picture_url(user):
+    if user and user.profile_picture:
+        return user.profile_picture.url
+    return None
+
+
+def build_documents(professional_ids):
+    """
+    Build the expected (unsaved) search documents for the given professionals.
+    Returns {service_id: ProfessionalSearchDocument}.
+    """
+    from services.models import Service
+    from user_addresses.models import Address, AddressType
+    from reviews.models import ClientReview
+
+    professional_ids = list(professional_ids)
+    if not professional_ids:
+        return {}
+
+    services = list(
+        Service.objects.filter(
+            professional_id__in=professional_ids,
+            moderation_status='APPROVED',
+            is_active=True,
+            searchable=True,
+            is_archived=False,
+            professional__user__is_deleted=False,
+            professional__user__is_active=True,
+            professional__user__is_profile_visible=True
+        ).select_related('professional__user')
+    )
+    if not services:
+        return {}
+
+    user_ids = {service.professional.user_id for service in services}
+    addresses_by_user = {}
+    for address in Address.objects.filter(
+        user_id__in=user_ids,
+        address_type=AddressType.SERVICE,
+        latitude__isnull=False,
+        longitude__isnull=False
+    ).order_by('address_id'):
+        addresses_by_user[address.user_id] = address
+
+    searchable_ids = {service.professional_id for service in services}
+
+    reviews_by_professional = {
+        row['professional_id']: row
+        for row in ClientReview.objects.filter(
+            professional_id__in=searchable_ids,
+            status='APPROVED',
+            review_visible=True
+        ).values('professional_id').annotate(
+            avg_rating=Avg('rating'),
+            review_count=Count('review_id')
+        )
+    }
+
+    latest_reviews_by_professional = {
+        review.professional_id: review
+        for review in ClientReview.objects.filter(
+            professional_id__in=searchable_ids,
+            status='APPROVED',
+            review_visible=True,
+            rating=5
+        ).select_related('client__user').order_by('professional_id', '-created_at').distinct('professional_id')
+    }
+
+    documents = {}
+    for service in services:
+        professional = service.professional
+        address = addresses_by_user.get(professional.user_id)
+        if not address:
+            continue
+
+        review_data = reviews_by_professional.get(professional.professional_id, {})
+        latest_review = latest_reviews_by_professional.get(professional.professional_id)
+        latest_review_author = latest_review.client.user if latest_review and latest_review.client else None
+
+        documents[service.service_id] = ProfessionalSearchDocument(
+            service_id=service.service_id,
+            professional_id=professional.professional_id,
+            name=professional.user.name,
+            profile_picture_url=_profile_picture_url(professional.user),
+            is_background_checked=professional.is_background_checked,
+            is_insured=professional.is_insured,
+            is_elite_pro=professional.is_elite_pro,
+            service_name=service.service_name,
+            description=service.description,
+            animal_types=service.animal_types or {},
+            base_rate=service.base_rate,
+            unit_of_time=service.unit_of_time,
+            is_overnight=service.is_overnight,
+            animal_type_phrases=service.animal_type_phrases,
+            animal_type_tokens=service.animal_type_tokens,
+            name_tokens=service.name_tokens,
+            description_tokens=service.description_tokens,
+            city=address.city or '',
+            state=address.state or '',
+            latitude=address.latitude,
+            longitude=address.longitude,
+            geo_cell=address.geo_cell,
+            average_rating=float(review_data.get('avg_rating') or 0),
+            review_count=review_data.get('review_count', 0),
+            latest_review_text=latest_review.review_text if latest_review else None,
+            latest_review_author_profile_pic=_profile_picture_url(latest_review_author)
+        )
+
+    return documents
+
+
+def refresh_professionals(professional_ids):
+    """
+    Bring the search documents of the given professionals in line with the
+    source tables. Safe to call with professionals that are not searchable;
+    their rows are removed.
+    """
+    professional_ids = {pid for pid in professional_ids if pid is not None}
+    if not professional_ids:
+        return
+
+    documents = build_documents(professional_ids)
+
+    with transaction.atomic():
+        ProfessionalSearchDocument.objects.filter(
+            professional_id__in=professional_ids
+        ).exclude(service_id__in=list(documents.keys())).delete()
+
+        if documents:
+            ProfessionalSearchDocument.objects.bulk_create(
+                list(documents.values()),
+                update_conflicts=True,
+                unique_fields=['service'],
+                update_fields=ProfessionalSearchDocument.CONTENT_FIELDS + ['updated_at']
+            )
+
+    bump_index_version()
+
+
+def refresh_professionals_for_users(user_ids):
+    """Refresh the documents of whichever of these users are professionals."""
+    user_ids = [uid for uid in user_ids if uid is not None]
+    if not user_ids:
+        return
+    refresh_professionals(
+        Professional.objects.filter(user_id__in=user_ids).values_list('professional_id', flat=True)
+    )
+
+
+def rebuild_all(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Rebuild the whole table. Returns the number of professionals processed.
+    Rows for professionals that no longer exist are removed by the cascade.
+    """
+    professional_ids = list(Professional.objects.order_by('professional_id').values_list('professional_id', flat=True))
+    for start in range(0, len(professional_ids), batch_size):
+        refresh_professionals(professional_ids[start:start + batch_size])
+    return len(professional_ids)
+
+
+def check_consistency(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Compare the table with freshly built documents.
+    Returns {'missing': [service_id], 'extra': [service_id], 'stale': {service_id: [field, ...]}}.
+    """
+    report = {'missing': [], 'extra': [], 'stale': {}}
+
+    professional_ids = list(Professional.objects.order_by('professional_id').values_list('professional_id', flat=True))
+    for start in range(0, len(professional_ids), batch_size):
+        batch = professional_ids[start:start + batch_size]
+        expected = build_documents(batch)
+        actual = {
+            document.service_id: document
+            for document in ProfessionalSearchDocument.objects.filter(professional_id__in=batch)
+        }
+
+        report['missing'].extend(sorted(set(expected) - set(actual)))
+        report['extra'].extend(sorted(set(actual) - set(expected)))
+
+        for service_id in sorted(set(expected) & set(actual)):
+            differing = [
+                field for field in ProfessionalSearchDocument.CONTENT_FIELDS
+                if getattr(expected[service_id], field) != getattr(actual[service_id], field)
+            ]
+            if differing:
+                report['stale'][service_id] = differing
+
+    return report
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from services.models import Service
+from user_addresses.models import Address
+from reviews.models import ClientReview
+from .models import Professional
+from . import search_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+# User fields that are copied into (or decide visibility of) search documents.
+# Saves that only touch other fields, e.g. last_login, skip the refresh.
+SEARCH_DOCUMENT_USER_FIELDS = {'name', 'profile_picture', 'is_active', 'is_deleted', 'is_profile_visible'}
+
+
+def _refresh(refresh_func, ids):
+    """
+    Refresh search documents once the surrounding transaction commits, so
+    rolled-back writes never reach the index and cascading deletes have
+    finished before documents are rebuilt. Failures are logged rather than
+    raised; check_search_index / rebuild_search_index repair any drift.
+    """
+    def run():
+        try:
+            with transaction.atomic():
+                refresh_func(ids)
+        except Exception as e:
+            logger.error(f"Error refreshing professional search documents for {ids}: {str(e)}")
+
+    transaction.on_commit(run)
+
+
+@receiver([post_save, post_delete], sender=Service)
+def refresh_search_documents_on_service_change(sender, instance, **kwargs):
+    _refresh(search_index.refresh_professionals, [instance.professional_id])
+
+
+@receiver([post_save, post_delete], sender=Address)
+def refresh_search_documents_on_address_change(sender, instance, **kwargs):
+    _refresh(search_index.refresh_professionals_for_users, [instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=ClientReview)
+def refresh_search_documents_on_review_change(sender, instance, **kwargs):
+    _refresh(search_index.refresh_professionals, [instance.professional_id])
+
+
+@receiver(post_save, sender=Professional)
+def refresh_search_documents_on_professional_change(sender, instance, **kwargs):
+    _refresh(search_index.refresh_professionals, [instance.professional_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_search_documents_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        # New users have no professional profile or services yet
+        return
+    if update_fields is not None and not (set(update_fields) & SEARCH_DOCUMENT_USER_FIELDS):
+        return
+    _refresh(search_index.refresh_professionals_for_users, [instance.id])
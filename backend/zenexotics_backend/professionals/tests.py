@@ -0,0 +1,374 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from core.geo_utils import (
+    GEO_CELL_SIZE_DEGREES, MAX_GEO_CELLS_PER_QUERY, compute_geo_cell, geo_cells_for_radius,
+    haversine_miles, haversine_miles_many
+)
+from locations.geocoding import get_geocoding_service, reset_geocoding_service
+from professionals import search_cache, search_index
+from professionals.models import Professional, ProfessionalSearchDocument
+from services.models import Service
+from user_addresses.models import Address, AddressType
+
+User = get_user_model()
+
+DENVER_COORDS = (39.7392, -104.9903)
+COLORADO_SPRINGS_COORDS = (38.8339, -104.8214)
+
+
+@override_settings(
+    GEOCODING_BACKEND='locations.geocoding.StaticGeocodingBackend',
+    GEOCODING_STATIC_RESULTS={'Denver': DENVER_COORDS}
+)
+class SearchTestCase(APITestCase):
+    """Helpers to create searchable professionals and run searches."""
+
+    def setUp(self):
+        cache.clear()
+        reset_geocoding_service()
+        self.professional_count = 0
+
+    def tearDown(self):
+        reset_geocoding_service()
+
+    def create_professionals(self, count, coords):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                self.professional_count += 1
+                user = User.objects.create_user(
+                    email=f'pro{self.professional_count}@example.com',
+                    password='testpass123',
+                    name=f'Test Pro {self.professional_count}'
+                )
+                professional = Professional.objects.create(user=user)
+
+                address = Address.objects.get(user=user, address_type=AddressType.SERVICE)
+                address.address_line_1 = '1 Main St'
+                address.city = 'Colorado Springs'
+                address.state = 'CO'
+                address.coordinates = {'latitude': coords[0], 'longitude': coords[1]}
+                address.save()
+
+                Service.objects.create(
+                    professional=professional,
+                    service_name='Dog Walking',
+                    description='Walks around the block',
+                    animal_types={'Dogs': 'Domestic'},
+                    base_rate=25.00,
+                    additional_animal_rate=5.00,
+                    holiday_rate=10.00,
+                    unit_of_time='Per Visit'
+                )
+
+    def search(self, **params):
+        params.setdefault('skip_logging', True)
+        # Warm the persistent geocode cache so every search pays the same single lookup
+        if params.get('location'):
+            get_geocoding_service().geocode(params['location'])
+            get_geocoding_service().clear_local_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/professionals/v1/search/', params, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+
+class SearchFallbackQueryCountTests(SearchTestCase):
+    """The no-results fallback must not issue queries per professional."""
+
+    def assert_fallback_query_count_is_constant(self, **params):
+        self.create_professionals(2, COLORADO_SPRINGS_COORDS)
+        cache.clear()
+        small_data, small_queries = self.search(**params)
+
+        self.create_professionals(10, COLORADO_SPRINGS_COORDS)
+        cache.clear()
+        large_data, large_queries = self.search(**params)
+
+        self.assertIsNotNone(small_data['fallback_message'])
+        self.assertEqual(small_data['total_count'], 2)
+        self.assertEqual(large_data['total_count'], 12)
+        self.assertEqual(small_queries, large_queries)
+        return large_queries
+
+    def test_fallback_in_default_region_reuses_primary_pass(self):
+        """Fallback from the default region adds no queries"""
+        queries = self.assert_fallback_query_count_is_constant(service_query='Underwater Basket Weaving')
+        # Index version lookup and primary document scan only
+        self.assertEqual(queries, 2)
+
+    def test_fallback_from_other_region_is_constant(self):
+        """Fallback from another region is O(1) in queries"""
+        self.create_professionals(3, DENVER_COORDS)
+        queries = self.assert_fallback_query_count_is_constant(
+            service_query='Underwater Basket Weaving',
+            location='Denver'
+        )
+        # Geocode cache lookup, index version lookup, primary document scan, default-region document scan
+        self.assertEqual(queries, 4)
+
+    def test_fallback_default_region_is_cached(self):
+        """Warm default-region fallback does not rescan the documents"""
+        self.create_professionals(3, COLORADO_SPRINGS_COORDS)
+        self.create_professionals(1, DENVER_COORDS)
+
+        cold_data, cold_queries = self.search(service_query='Underwater Basket Weaving', location='Denver')
+        # A different query misses the result cache but shares the default-region set
+        warm_data, warm_queries = self.search(service_query='Competitive Llama Grooming', location='Denver')
+
+        self.assertEqual(cold_data['total_count'], 3)
+        self.assertEqual(warm_data['total_count'], 3)
+        # Geocode cache lookup, index version lookup and primary document scan only
+        self.assertEqual(cold_queries, 4)
+        self.assertEqual(warm_queries, 3)
+
+    def test_fallback_cache_invalidated_on_service_change(self):
+        """Service changes invalidate the cached default-region set"""
+        self.create_professionals(2, COLORADO_SPRINGS_COORDS)
+        params = {'service_query': 'Underwater Basket Weaving', 'location': 'Denver'}
+
+        data, _ = self.search(**params)
+        self.assertEqual(data['total_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(service_name='Dog Walking').first().delete()
+
+        data, _ = self.search(**params)
+        self.assertEqual(data['total_count'], 1)
+
+
+
+class SearchResultCacheTests(SearchTestCase):
+    """Repeated searches and later pages are served from the search result cache."""
+
+    def setUp(self):
+        super().setUp()
+        search_cache.reset_search_cache_stats()
+
+    def test_repeated_search_is_served_from_cache(self):
+        """A repeated search only pays for geocoding"""
+        self.create_professionals(3, DENVER_COORDS)
+        params = {'service_query': 'dog walking', 'location': 'Denver'}
+
+        cold_data, cold_queries = self.search(**params)
+        warm_data, warm_queries = self.search(**params)
+
+        self.assertEqual(cold_data['total_count'], 3)
+        self.assertEqual(warm_data['total_count'], 3)
+        self.assertEqual(
+            {pro['professional_id'] for pro in cold_data['professionals']},
+            {pro['professional_id'] for pro in warm_data['professionals']}
+        )
+        # Geocode cache lookup and index version lookup only
+        self.assertEqual(warm_queries, 2)
+        self.assertEqual(search_cache.get_search_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_equivalent_parameters_share_an_entry(self):
+        """Case, plurals and number formatting do not split the cache"""
+        self.create_professionals(1, COLORADO_SPRINGS_COORDS)
+
+        self.search(service_query='Dog Walking', animal_types=['Dogs'], price_max=100)
+        _, queries = self.search(service_query='dog walkings', animal_types=['dog'], price_max='100.00')
+
+        # Index version lookup only
+        self.assertEqual(queries, 1)
+        self.assertEqual(search_cache.get_search_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_later_pages_paginate_cached_results(self):
+        """Page 2 is cut from the cached list without searching again"""
+        self.create_professionals(5, COLORADO_SPRINGS_COORDS)
+
+        first_page, _ = self.search(page=1, page_size=3)
+        second_page, queries = self.search(page=2, page_size=3)
+
+        # Index version lookup only
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(first_page['professionals']), 3)
+        self.assertEqual(len(second_page['professionals']), 2)
+        self.assertFalse(second_page['has_more'])
+        self.assertNotIn('match_type', second_page['professionals'][0])
+
+    def test_cache_invalidated_on_service_change(self):
+        """Service changes invalidate cached results"""
+        self.create_professionals(2, COLORADO_SPRINGS_COORDS)
+
+        data, _ = self.search(service_query='dog walking')
+        self.assertEqual(data['total_count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(service_name='Dog Walking').first().delete()
+
+        data, _ = self.search(service_query='dog walking')
+        self.assertEqual(data['total_count'], 1)
+        self.assertEqual(search_cache.get_search_cache_stats(), {'hits': 0, 'misses': 2})
+
+
+class SearchDocumentSyncTests(SearchTestCase):
+    """Saving a source row refreshes the professional's search documents on commit."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_professionals(1, COLORADO_SPRINGS_COORDS)
+        self.service = Service.objects.get()
+        self.professional = self.service.professional
+
+    def document(self):
+        return ProfessionalSearchDocument.objects.get(service=self.service)
+
+    def test_service_save_refreshes_document_on_commit(self):
+        self.service.service_name = 'Cat Sitting'
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.service.save()
+        # Nothing changes until the transaction commits
+        self.assertEqual(self.document().service_name, 'Dog Walking')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.document().service_name, 'Cat Sitting')
+
+    def test_address_save_refreshes_document_on_commit(self):
+        address = Address.objects.get(user=self.professional.user, address_type=AddressType.SERVICE)
+        address.city = 'Denver'
+        address.coordinates = {'latitude': DENVER_COORDS[0], 'longitude': DENVER_COORDS[1]}
+        with self.captureOnCommitCallbacks(execute=True):
+            address.save()
+
+        document = self.document()
+        self.assertEqual(document.city, 'Denver')
+        self.assertAlmostEqual(document.latitude, DENVER_COORDS[0])
+        self.assertEqual(document.geo_cell, compute_geo_cell(*DENVER_COORDS))
+
+    def test_professional_save_refreshes_document_on_commit(self):
+        self.professional.is_insured = not self.document().is_insured
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professional.save()
+        self.assertEqual(self.document().is_insured, self.professional.is_insured)
+
+    def test_unsearchable_service_document_is_removed(self):
+        self.service.searchable = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+        self.assertFalse(ProfessionalSearchDocument.objects.exists())
+
+
+class SearchIndexCommandTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_professionals(2, COLORADO_SPRINGS_COORDS)
+        self.services = list(Service.objects.order_by('service_id'))
+
+    def introduce_drift(self):
+        """A missing document and a stale one, as if refreshes had failed."""
+        ProfessionalSearchDocument.objects.filter(service=self.services[0]).delete()
+        ProfessionalSearchDocument.objects.filter(service=self.services[1]).update(service_name='Outdated')
+
+    def check(self, **options):
+        out = StringIO()
+        call_command('check_search_index', stdout=out, **options)
+        return out.getvalue()
+
+    def test_check_reports_consistent_index(self):
+        self.assertIn('Search index is consistent', self.check())
+
+    def test_check_detects_drift(self):
+        self.introduce_drift()
+        with self.assertRaises(CommandError):
+            self.check()
+
+        report = search_index.check_consistency()
+        self.assertEqual(report['missing'], [self.services[0].service_id])
+        self.assertEqual(report['stale'], {self.services[1].service_id: ['service_name']})
+
+    def test_check_repairs_drift(self):
+        self.introduce_drift()
+        output = self.check(repair=True)
+
+        self.assertIn('Refreshed search documents for 2 professionals', output)
+        self.assertIn('Search index is consistent', self.check())
+
+    def test_rebuild_fixes_drift(self):
+        self.introduce_drift()
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+
+        self.assertIn('Rebuilt search index for 2 professionals (2 documents)', out.getvalue())
+        self.assertEqual(search_index.check_consistency(), {'missing': [], 'extra': [], 'stale': {}})
+        self.assertEqual(
+            ProfessionalSearchDocument.objects.get(service=self.services[1]).service_name, 'Dog Walking'
+        )
+
+
+class SearchIndexVersionTests(TestCase):
+    def test_bump_increments_version(self):
+        before = search_index.get_index_version()
+        search_index.bump_index_version()
+        search_index.bump_index_version()
+        self.assertEqual(search_index.get_index_version(), before + 2)
+
+    def test_version_survives_cache_clear(self):
+        """Evicting the cache cannot reset the version and resurface old entries"""
+        search_index.bump_index_version()
+        version = search_index.get_index_version()
+        cache.clear()
+        self.assertEqual(search_index.get_index_version(), version)
+
+
+class GeoUtilsTests(SimpleTestCase):
+    def test_compute_geo_cell(self):
+        self.assertEqual(compute_geo_cell(38.8339, -104.8214), '155:-420')
+        # Cells are floored, so negative coordinates and cell edges land in the lower cell
+        self.assertEqual(compute_geo_cell(0.0, 0.0), '0:0')
+        self.assertEqual(compute_geo_cell(-0.01, -0.01), '-1:-1')
+        self.assertEqual(compute_geo_cell(GEO_CELL_SIZE_DEGREES, -GEO_CELL_SIZE_DEGREES), '1:-1')
+
+    def test_geo_cells_for_radius_covers_the_point(self):
+        cells = geo_cells_for_radius(*COLORADO_SPRINGS_COORDS, 30)
+        self.assertIn(compute_geo_cell(*COLORADO_SPRINGS_COORDS), cells)
+        self.assertEqual(len(cells), len(set(cells)))
+        # A point 25 miles north is inside the radius, so its cell is covered
+        self.assertIn(compute_geo_cell(COLORADO_SPRINGS_COORDS[0] + 25 / 69.0, COLORADO_SPRINGS_COORDS[1]), cells)
+
+    def test_geo_cells_for_radius_edge_cases(self):
+        self.assertEqual(geo_cells_for_radius(*COLORADO_SPRINGS_COORDS, 0), [compute_geo_cell(*COLORADO_SPRINGS_COORDS)])
+        # Cells far from the equator are narrower, so the same radius spans more of them
+        self.assertGreater(len(geo_cells_for_radius(70.0, 0.0, 50)), len(geo_cells_for_radius(0.0, 0.0, 50)))
+        # Too many cells: callers fall back to a bounding box
+        self.assertIsNone(geo_cells_for_radius(*COLORADO_SPRINGS_COORDS, 300))
+        self.assertLessEqual(len(geo_cells_for_radius(*COLORADO_SPRINGS_COORDS, 100)), MAX_GEO_CELLS_PER_QUERY)
+
+    def test_haversine_miles_many(self):
+        self.assertEqual(haversine_miles_many(DENVER_COORDS, []), [])
+        distances = haversine_miles_many(COLORADO_SPRINGS_COORDS, [COLORADO_SPRINGS_COORDS, DENVER_COORDS])
+        self.assertAlmostEqual(distances[0], 0.0)
+        # Colorado Springs to Denver is about 63 miles
+        self.assertAlmostEqual(distances[1], 63.0, delta=1.5)
+        self.assertAlmostEqual(distances[1], haversine_miles(DENVER_COORDS, COLORADO_SPRINGS_COORDS))
+        # Antipodal points are half the earth's circumference apart
+        self.assertAlmostEqual(haversine_miles_many((0.0, 0.0), [(0.0, 180.0)])[0], 12436.1, delta=1)
+
+
+class BenchmarkSearchIndexCommandTests(TestCase):
+    def benchmark(self, radius):
+        out = StringIO()
+        call_command(
+            'benchmark_search_index', sizes=[20, 50], searches=2, baseline_searches=1, radius=radius, stdout=out
+        )
+        return out.getvalue()
+
+    def test_benchmark_runs_against_seeded_rows_and_rolls_back(self):
+        output = self.benchmark(30)
+        self.assertIn('Benchmark complete', output)
+        self.assertFalse(Address.objects.exists())
+
+    def test_benchmark_falls_back_to_bounding_box_for_large_radius(self):
+        output = self.benchmark(300)
+        self.assertIn('bounding box fallback', output)
+        rows = [line.split() for line in output.splitlines() if line.split()[:1] in (['20'], ['50'])]
+        self.assertEqual(len(rows), 2)
+        self.assertFalse(Address.objects.exists())
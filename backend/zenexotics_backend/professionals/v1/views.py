@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from rest_framework import status, serializers
 from django.utils import timezone
 from datetime import date
-from ..models import Professional
+from ..models import Professional, ProfessionalSearchDocument
+from .. import search_index, search_cache
 from ..serializers import ProfessionalDashboardSerializer, BookingOccurrenceSerializer, ClientProfessionalProfileSerializer
 from bookings.models import Booking
 from booking_occurrences.models import BookingOccurrence
@@ -12,16 +13,16 @@ import logging
 from pets.models import Pet
 from bookings.constants import BookingStates
 from services.models import Service
+from services.search_tokens import animal_type_filter, animal_types_match, query_relevance
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
 from payment_methods.models import PaymentMethod
-from django.db.models import Q, Count
-from user_addresses.models import Address, AddressType
-from geopy.distance import geodesic
-import requests
+from django.db.models import Q
+from core.geo_utils import geo_cells_for_radius, bounding_box, haversine_miles_many
+from locations.geocoding import geocode_location
 import random
 from django.contrib.postgres.search import TrigramSimilarity
-from django.db.models import Case, When, Value, IntegerField, Avg
-from reviews.models import ClientReview
+from django.db.models import Case, When, Value, IntegerField
 from logs.models import SearchLog, GetMatchedLog
 
 # Configure logging to print to console
@@ -33,60 +34,142 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.setLevel(logging.DEBUG)
 
+# Where search falls back to when no location is given or a search has no results
+DEFAULT_SEARCH_COORDS = (38.8339, -104.8214)  # Colorado Springs coordinates
+DEFAULT_SEARCH_LOCATION = "Colorado Springs, Colorado"
+
+# How long the unfiltered default-region document set is cached. Entries are
+# also keyed on the search index version, so any document refresh invalidates them.
+DEFAULT_REGION_CACHE_TIMEOUT = 60 * 10
+
 class SimplePetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = ['pet_id', 'name', 'species', 'breed']
 
-def geocode_location(location_string):
+def find_search_documents_within_radius(search_documents, user_coords, radius_miles):
     """
-    Geocode a location string using Nominatim API
-    Returns (latitude, longitude) tuple or None if failed
+    Narrow a ProfessionalSearchDocument queryset to rows within radius_miles of
+    user_coords, grouped by professional.
+    Returns {professional_id: {'documents': [...], 'distance': miles}}.
+    
+    Only rows in the geo cells covering the radius are loaded (indexed on
+    geo_cell), and distances are computed in a single haversine pass over
+    those candidates instead of one geodesic call per professional.
     """
-    if not location_string or location_string.strip() == '':
-        return None
-        
-    try:
-        url = 'https://nominatim.openstreetmap.org/search'
-        params = {
-            'q': f"{location_string}, Colorado, USA",
-            'format': 'json',
-            'limit': '1',
-            'countrycodes': 'us',
-            'addressdetails': '1'
-        }
-        
-        headers = {
-            'User-Agent': 'CrittrCove/1.0 (contact@crittrcove.com)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                result = data[0]
-                lat = float(result['lat'])
-                lng = float(result['lon'])
-                
-                # Validate coordinates are within Colorado bounds
-                if 37.0 <= lat <= 41.0 and -109.0 <= lng <= -102.0:
-                    return (lat, lng)
-                    
-        return None
-    except Exception as e:
-        logger.error(f"Geocoding failed for '{location_string}': {str(e)}")
-        return None
+    geo_cells = geo_cells_for_radius(user_coords[0], user_coords[1], radius_miles)
+    if geo_cells is not None:
+        search_documents = search_documents.filter(geo_cell__in=geo_cells)
+    else:
+        # Radius too large for the cell list, fall back to a bounding box
+        min_lat, max_lat, min_lng, max_lng = bounding_box(user_coords[0], user_coords[1], radius_miles)
+        search_documents = search_documents.filter(
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng)
+        )
+    
+    candidates = list(search_documents)
+    distances = haversine_miles_many(
+        user_coords,
+        [(document.latitude, document.longitude) for document in candidates]
+    )
+    
+    professionals_in_radius = {}
+    for document, distance in zip(candidates, distances):
+        if distance > radius_miles:
+            continue
+        prof_data = professionals_in_radius.setdefault(
+            document.professional_id,
+            {'documents': [], 'distance': distance}
+        )
+        prof_data['documents'].append(document)
+    
+    return professionals_in_radius
 
-def calculate_distance(coord1, coord2):
+def get_default_region_professionals(radius_miles, index_version):
     """
-    Calculate distance between two coordinate pairs using geopy
-    Returns distance in miles
+    Cached find_search_documents_within_radius() over every search document
+    around DEFAULT_SEARCH_COORDS, used by the no-results fallback. Callers apply
+    their own price/badge filters with filter_professionals_in_radius().
     """
-    try:
-        return geodesic(coord1, coord2).miles
-    except Exception:
-        return float('inf')
+    cache_key = f"search_default_region:{index_version}:{radius_miles}"
+    professionals_in_radius = cache.get(cache_key)
+    if professionals_in_radius is None:
+        professionals_in_radius = find_search_documents_within_radius(
+            ProfessionalSearchDocument.objects.all(), DEFAULT_SEARCH_COORDS, radius_miles
+        )
+        cache.set(cache_key, professionals_in_radius, DEFAULT_REGION_CACHE_TIMEOUT)
+    return professionals_in_radius
+
+def filter_professionals_in_radius(professionals_in_radius, price_min, price_max,
+                                   filter_background_checked, filter_insured, filter_elite_pro,
+                                   requested_animal_phrases, requested_animal_token_list):
+    """
+    Apply the search's price, badge and animal type filters in memory to a
+    find_search_documents_within_radius() result, dropping professionals left
+    with no documents.
+    """
+    filtered = {}
+    for professional_id, prof_data in professionals_in_radius.items():
+        documents = [
+            document for document in prof_data['documents']
+            if price_min <= document.base_rate <= price_max
+            and (not filter_background_checked or document.is_background_checked)
+            and (not filter_insured or document.is_insured)
+            and (not filter_elite_pro or document.is_elite_pro)
+            and (not requested_animal_phrases or animal_types_match(
+                requested_animal_phrases, requested_animal_token_list,
+                document.animal_type_phrases, document.animal_type_tokens
+            ))
+        ]
+        if documents:
+            filtered[professional_id] = {'documents': documents, 'distance': prof_data['distance']}
+    return filtered
+
+def build_search_result(document, match_type, distance):
+    """Format a search result from the search document of the service to display."""
+    # Format location string
+    location_parts = []
+    if document.city:
+        location_parts.append(document.city)
+    if document.state:
+        location_parts.append(document.state)
+    location_str = ', '.join(location_parts)
+    
+    # Format the average rating (5.0 if >= 4.995, otherwise round to 2 decimal places)
+    avg_rating = document.average_rating
+    formatted_avg_rating = 5.0 if avg_rating >= 4.995 else round(avg_rating, 2)
+    
+    return {
+        'professional_id': document.professional_id,
+        'name': document.name,
+        'profile_picture_url': document.profile_picture_url,
+        'location': location_str,
+        'coordinates': {
+            'latitude': document.latitude,
+            'longitude': document.longitude
+        },
+        'primary_service': {
+            'service_id': document.service_id,
+            'service_name': document.service_name,
+            'price_per_visit': float(document.base_rate),
+            'unit_of_time': document.unit_of_time,
+            'is_overnight': document.is_overnight
+        },
+        'match_type': match_type,
+        'distance': distance,
+        'reviews': {
+            'average_rating': formatted_avg_rating,
+            'review_count': document.review_count,
+            'latest_highest_review_text': document.latest_review_text,
+            'latest_review_author_profile_pic': document.latest_review_author_profile_pic
+        },
+        'badges': {
+            'is_background_checked': document.is_background_checked,
+            'is_insured': document.is_insured,
+            'is_elite_pro': document.is_elite_pro
+        }
+    }
 
 def select_best_service_for_display(services):
     """
@@ -102,6 +185,151 @@ def select_best_service_for_display(services):
                            reverse=True)
     return sorted_services[0]
 
+def compute_search_candidates(criteria, user_coords, index_version):
+    """
+    Run a search for normalized criteria (see search_cache.normalize_search_criteria)
+    around user_coords, against search index version index_version. Returns the candidate results grouped by match type,
+    unshuffled so they can be cached:
+    {'exact': [...], 'fuzzy': [...], 'fallback': [...], 'is_fallback': bool}
+    """
+    is_all_services = criteria['is_all_services']
+    query_tokens = criteria['query_tokens']
+    overnight_service = criteria['overnight_service']
+    radius_miles = criteria['radius_miles']
+    requested_animal_phrases = criteria['animal_phrases']
+    requested_animal_token_list = criteria['animal_tokens']
+    
+    # Search documents hold one row per searchable professional service: approved,
+    # active, searchable and non-archived services of visible, active, non-deleted
+    # users with a located SERVICE address, plus their review aggregates
+    search_documents = ProfessionalSearchDocument.objects.filter(
+        base_rate__gte=criteria['price_min'],
+        base_rate__lte=criteria['price_max']
+    )
+    
+    # Apply badge filters
+    if criteria['filter_background_checked']:
+        search_documents = search_documents.filter(is_background_checked=True)
+    if criteria['filter_insured']:
+        search_documents = search_documents.filter(is_insured=True)
+    if criteria['filter_elite_pro']:
+        search_documents = search_documents.filter(is_elite_pro=True)
+    
+    # Filter by animal types if specified (GIN-indexed token overlap, lizards
+    # also match bearded dragons and leopard geckos; see services/search_tokens.py)
+    if requested_animal_phrases:
+        logger.debug(f"Requested animal tokens: {requested_animal_token_list}")
+        search_documents = search_documents.filter(
+            animal_type_filter(requested_animal_phrases, requested_animal_token_list)
+        )
+    
+    # Filter professionals by location using the geo cell index
+    professionals_in_radius = find_search_documents_within_radius(
+        search_documents, user_coords, radius_miles
+    )
+    
+    logger.debug(f"Found {len(professionals_in_radius)} professionals within {radius_miles} miles")
+    
+    # Now filter services for each professional
+    results = []
+    
+    for professional_id, prof_data in professionals_in_radius.items():
+        # Each search document is one of the professional's services, already
+        # filtered by price, badges and animal types
+        services = prof_data['documents']
+        
+        # Separate services by overnight requirement and service query relevance
+        exact_matches = []
+        fuzzy_matches = []
+        
+        for service in services:
+            # Check overnight requirement
+            if overnight_service and not service.is_overnight:
+                # If overnight is required but service doesn't offer it, it's a fuzzy match
+                is_exact_match = False
+            else:
+                # If overnight not required, or service offers overnight, it could be exact
+                is_exact_match = True
+            
+            # Check service query relevance
+            relevance_score = 0
+            if not is_all_services:
+                # Set comparison against the service's pre-tokenized name and description
+                relevance_score = query_relevance(query_tokens, service.name_tokens, service.description_tokens)
+                
+                # If no relevance and we have a specific service query, skip this service
+                if relevance_score == 0:
+                    continue
+            else:
+                # For "All Services", include all services with high relevance
+                relevance_score = 3
+            
+            service_data = {
+                'service': service,
+                'relevance_score': relevance_score,
+                'is_overnight_match': service.is_overnight if overnight_service else True
+            }
+            
+            # Categorize as exact or fuzzy match
+            if is_exact_match and (is_all_services or relevance_score >= 2):
+                exact_matches.append(service_data)
+            else:
+                fuzzy_matches.append(service_data)
+
+        # Select the best service for this professional
+        best_service = None
+        if exact_matches:
+            # Sort exact matches by relevance score, then by price
+            exact_matches.sort(key=lambda x: (-x['relevance_score'], x['service'].base_rate))
+            best_service = exact_matches[0]['service']
+            match_type = 'exact'
+        elif fuzzy_matches:
+            # Sort fuzzy matches by relevance score, then by price
+            fuzzy_matches.sort(key=lambda x: (-x['relevance_score'], x['service'].base_rate))
+            best_service = fuzzy_matches[0]['service']
+            match_type = 'fuzzy'
+        
+        if best_service:
+            results.append(build_search_result(best_service, match_type, prof_data['distance']))
+    
+    logger.debug(f"Found {len(results)} professionals with matching services")
+    
+    # Check if we need to fallback due to no results
+    is_fallback = len(results) == 0 and not is_all_services
+    if is_fallback:
+        logger.warning(f"No professionals found for service query tokens {query_tokens} near {user_coords}")
+        logger.info(f"Performing fallback search for all services in Colorado Springs")
+        
+        # Reset search to Colorado Springs with all services. The fallback never
+        # queries per professional: if the search already ran in the default
+        # region the primary pass's documents are reused as-is, otherwise the
+        # cached default-region set is filtered in memory.
+        if tuple(user_coords) == DEFAULT_SEARCH_COORDS:
+            fallback_professionals = professionals_in_radius
+        else:
+            fallback_professionals = filter_professionals_in_radius(
+                get_default_region_professionals(radius_miles, index_version),
+                criteria['price_min'], criteria['price_max'],
+                criteria['filter_background_checked'], criteria['filter_insured'], criteria['filter_elite_pro'],
+                requested_animal_phrases, requested_animal_token_list
+            )
+        
+        # Re-run service filtering for fallback (all services)
+        results = []
+        for professional_id, prof_data in fallback_professionals.items():
+            services = prof_data['documents']
+            
+            # For fallback, select the best service for display (highest price first)
+            best_service = select_best_service_for_display(services)
+            results.append(build_search_result(best_service, 'fallback', prof_data['distance']))
+    
+    return {
+        'exact': [r for r in results if r['match_type'] == 'exact'],
+        'fuzzy': [r for r in results if r['match_type'] == 'fuzzy'],
+        'fallback': [r for r in results if r['match_type'] == 'fallback'],
+        'is_fallback': is_fallback
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_professional_dashboard(request):
@@ -233,15 +461,14 @@ def search_professionals(request):
     Search for professionals based on various criteria
     
     Performance optimizations:
-    - Uses select_related and prefetch_related to minimize database queries
-    - Batch fetches services, addresses, and reviews to avoid N+1 queries
-    - Pre-aggregates review data to avoid individual calculations
-    
-    Recommended database indexes for optimal performance:
-    - (professional_id, moderation_status, is_active, searchable, is_archived) on services table
-    - (user_id, address_type) on addresses table
-    - (professional_id, status, review_visible, rating) on reviews table
-    - Coordinates field should be indexed for geospatial queries
+    - Reads the denormalized ProfessionalSearchDocument table (see
+      professionals/search_index.py) instead of joining professionals, users,
+      services, addresses and review aggregates on every request
+    - Prefilters by geo cell (indexed with base_rate) and computes distances
+      in one haversine pass over the candidates
+    - Caches the unshuffled candidates for a short time keyed on the normalized
+      parameters (see professionals/search_cache.py); repeated searches and
+      later pages only reshuffle and paginate the cached lists
     """
     try:
         # Get search parameters
@@ -265,33 +492,10 @@ def search_professionals(request):
         logger.debug(f"Search parameters: {data}")
         logger.debug(f"Current user: {request.user if request.user.is_authenticated else 'Anonymous'}")
         
-        # Check if service_query is "All Services" or similar
-        is_all_services = service_query.lower() in ['all services', 'all', '']
-        original_service_query = service_query  # Store original for fallback messaging
-        
-        # Start with all professionals who have approved services - optimized with select_related
-        # Exclude deleted and inactive users
-        professionals_query = Professional.objects.select_related('user').prefetch_related(
-            'service_set'
-        ).filter(
-            service__moderation_status='APPROVED',
-            service__is_active=True,
-            service__searchable=True,
-            service__is_archived=False,
-            user__is_deleted=False,  # Exclude deleted users
-            user__is_active=True,  # Exclude inactive users
-            user__is_profile_visible=True  # Exclude users with profile visibility off
-        ).distinct()
-        
-        # Apply badge filters
-        if filter_background_checked:
-            professionals_query = professionals_query.filter(is_background_checked=True)
-        if filter_insured:
-            professionals_query = professionals_query.filter(is_insured=True)
-        if filter_elite_pro:
-            professionals_query = professionals_query.filter(is_elite_pro=True)
-        
-        logger.debug(f"Found {professionals_query.count()} professionals with approved services")
+        criteria = search_cache.normalize_search_criteria(
+            animal_types, service_query, overnight_service, price_min, price_max, radius_miles,
+            filter_background_checked, filter_insured, filter_elite_pro
+        )
         
         # Get user coordinates if location is provided and not empty
         user_coords = None
@@ -305,485 +509,23 @@ def search_professionals(request):
         
         # If no location provided or geocoding failed, default to Colorado Springs
         if not user_coords:
-            user_coords = (38.8339, -104.8214)  # Colorado Springs coordinates
-            used_location = "Colorado Springs, Colorado"
-        
-        # Filter professionals by location (must have coordinates) - optimized batch query
-        professionals_with_location = []
-        
-        # Pre-fetch all addresses in a single query
-        addresses_dict = {}
-        addresses = Address.objects.filter(
-            user__in=[p.user for p in professionals_query],
-            address_type=AddressType.SERVICE
-        ).select_related('user')
-        
-        for address in addresses:
-            addresses_dict[address.user.id] = address
-        
-        for professional in professionals_query:
-            address = addresses_dict.get(professional.user.id)
-            if not address:
-                continue
-                
-            if address.coordinates and isinstance(address.coordinates, dict):
-                prof_lat = address.coordinates.get('latitude')
-                prof_lng = address.coordinates.get('longitude')
-                
-                if prof_lat and prof_lng:
-                    prof_coords = (float(prof_lat), float(prof_lng))
-                    distance = calculate_distance(user_coords, prof_coords)
-                    
-                    if distance <= radius_miles:
-                        professionals_with_location.append({
-                            'professional': professional,
-                            'address': address,
-                            'distance': distance,
-                            'coordinates': prof_coords
-                        })
-        
-        logger.debug(f"Found {len(professionals_with_location)} professionals within {radius_miles} miles")
-        
-        # Pre-fetch all services and reviews in batch queries to avoid N+1 queries
-        professional_ids = [prof_data['professional'].professional_id for prof_data in professionals_with_location]
-        
-        # Batch fetch all services
-        all_services = Service.objects.filter(
-            professional__professional_id__in=professional_ids,
-            moderation_status='APPROVED',
-            is_active=True,
-            searchable=True,
-            is_archived=False
-        ).select_related('professional')
-        
-        # Group services by professional
-        services_by_professional = {}
-        for service in all_services:
-            prof_id = service.professional.professional_id
-            if prof_id not in services_by_professional:
-                services_by_professional[prof_id] = []
-            services_by_professional[prof_id].append(service)
-        
-        # Batch fetch all reviews with aggregation
-        reviews_data = ClientReview.objects.filter(
-            professional__professional_id__in=professional_ids,
-            status='APPROVED',
-            review_visible=True
-        ).values('professional__professional_id').annotate(
-            avg_rating=Avg('rating'),
-            review_count=Count('review_id')
-        )
-        
-        # Create reviews lookup dict
-        reviews_by_professional = {}
-        for review_data in reviews_data:
-            reviews_by_professional[review_data['professional__professional_id']] = {
-                'avg_rating': review_data['avg_rating'] or 0,
-                'review_count': review_data['review_count']
-            }
-        
-        # Batch fetch latest highest reviews
-        latest_reviews = ClientReview.objects.filter(
-            professional__professional_id__in=professional_ids,
-            status='APPROVED',
-            review_visible=True,
-            rating=5
-        ).select_related('client__user').order_by('professional__professional_id', '-created_at').distinct('professional__professional_id')
-        
-        latest_reviews_by_professional = {}
-        for review in latest_reviews:
-            prof_id = review.professional.professional_id
-            latest_reviews_by_professional[prof_id] = {
-                'text': review.review_text,
-                'author_profile_pic': review.client.user.profile_picture.url if (
-                    review.client and 
-                    review.client.user and 
-                    hasattr(review.client.user, 'profile_picture') and 
-                    review.client.user.profile_picture
-                ) else None
-            }
-
-        # Now filter services for each professional
-        results = []
-        
-        for prof_data in professionals_with_location:
-            professional = prof_data['professional']
-            address = prof_data['address']
-            
-            # Get services from pre-fetched data
-            services = services_by_professional.get(professional.professional_id, [])
-            
-            # Filter by animal types if specified
-            if animal_types:
-                # Expand animal types to include related species
-                expanded_animal_types = []
-                for animal in animal_types:
-                    expanded_animal_types.append(animal)
-                    # If searching for lizards (singular or plural), also include bearded dragons and leopard geckos
-                    if animal.lower() in ['lizard', 'lizards']:
-                        expanded_animal_types.extend(['bearded dragons', 'leopard geckos'])
-                
-                logger.debug(f"Original animal_types: {animal_types}")
-                logger.debug(f"Expanded animal_types: {expanded_animal_types}")
-                
-                animal_filtered_services = []
-                for service in services:
-                    if service.animal_types and isinstance(service.animal_types, dict):
-                        # Check if any of the requested animal types are in the service's animal_types
-                        service_animals = list(service.animal_types.keys())
-                        logger.debug(f"Service {service.service_id} animals: {service_animals}")
-                        
-                        # More flexible matching logic
-                        service_matched = False
-                        for requested_animal in expanded_animal_types:
-                            for service_animal in service_animals:
-                                # Check for partial matches (ignoring case and plural/singular differences)
-                                requested_lower = requested_animal.lower().strip()
-                                service_lower = service_animal.lower().strip()
-                                
-                                # Direct substring match (both ways)
-                                if requested_lower in service_lower or service_lower in requested_lower:
-                                    service_matched = True
-                                    break
-                                
-                                # Handle plurals by removing 's' for comparison
-                                requested_singular = requested_lower.rstrip('s')
-                                service_singular = service_lower.rstrip('s')
-                                if requested_singular in service_singular or service_singular in requested_singular:
-                                    service_matched = True
-                                    break
-                            
-                            if service_matched:
-                                break
-                        
-                        if service_matched:
-                            logger.debug(f"Service {service.service_id} matched!")
-                            animal_filtered_services.append(service)
-                        
-                services = animal_filtered_services
-            
-            # Filter by price range
-            price_filtered_services = [
-                service for service in services
-                if price_min <= float(service.base_rate) <= price_max
-            ]
-            services = price_filtered_services
-            
-            if not services:
-                continue
-            
-            # Separate services by overnight requirement and service query relevance
-            exact_matches = []
-            fuzzy_matches = []
-            
-            for service in services:
-                # Check overnight requirement
-                if overnight_service and not service.is_overnight:
-                    # If overnight is required but service doesn't offer it, it's a fuzzy match
-                    is_exact_match = False
-                else:
-                    # If overnight not required, or service offers overnight, it could be exact
-                    is_exact_match = True
-                
-                # Check service query relevance
-                relevance_score = 0
-                if service_query and not is_all_services:
-                    service_name_lower = service.service_name.lower()
-                    service_desc_lower = service.description.lower()
-                    query_lower = service_query.lower()
-                    
-                    # Exact match in name gets highest score
-                    if query_lower in service_name_lower:
-                        relevance_score = 3
-                    # Exact match in description gets medium score
-                    elif query_lower in service_desc_lower:
-                        relevance_score = 2
-                    # Partial word matches get lower score
-                    elif any(word in service_name_lower or word in service_desc_lower 
-                            for word in query_lower.split()):
-                        relevance_score = 1
-                    
-                    # If no relevance and we have a specific service query, skip this service
-                    if relevance_score == 0:
-                        continue
-                elif is_all_services:
-                    # For "All Services", include all services with high relevance
-                    relevance_score = 3
-                
-                service_data = {
-                    'service': service,
-                    'relevance_score': relevance_score,
-                    'is_overnight_match': service.is_overnight if overnight_service else True
-                }
-                
-                # Categorize as exact or fuzzy match
-                if is_exact_match and (is_all_services or relevance_score >= 2):
-                    exact_matches.append(service_data)
-                else:
-                    fuzzy_matches.append(service_data)
-
-            # Select the best service for this professional
-            best_service = None
-            if exact_matches:
-                # Sort exact matches by relevance score, then by price
-                exact_matches.sort(key=lambda x: (-x['relevance_score'], x['service'].base_rate))
-                best_service = exact_matches[0]['service']
-                match_type = 'exact'
-            elif fuzzy_matches:
-                # Sort fuzzy matches by relevance score, then by price
-                fuzzy_matches.sort(key=lambda x: (-x['relevance_score'], x['service'].base_rate))
-                best_service = fuzzy_matches[0]['service']
-                match_type = 'fuzzy'
-            
-            if best_service:
-                # Format location string
-                location_parts = []
-                if address.city:
-                    location_parts.append(address.city)
-                if address.state:
-                    location_parts.append(address.state)
-                location_str = ', '.join(location_parts)
-                
-                # Get profile picture URL
-                profile_picture_url = None
-                if professional.user.profile_picture:
-                    profile_picture_url = professional.user.profile_picture.url
-                
-                # Ensure coordinates are valid before including in result
-                coord_lat = address.coordinates.get('latitude')
-                coord_lng = address.coordinates.get('longitude')
-                
-                if coord_lat is None or coord_lng is None:
-                    continue  # Skip this professional if coordinates are invalid
-                
-                # Get review data from pre-fetched data
-                review_data = reviews_by_professional.get(professional.professional_id, {'avg_rating': 0, 'review_count': 0})
-                avg_rating = review_data['avg_rating']
-                review_count = review_data['review_count']
-                
-                # Format the average rating (5.0 if >= 4.995, otherwise round to 2 decimal places)
-                formatted_avg_rating = 5.0 if avg_rating >= 4.995 else round(avg_rating, 2)
-                
-                # Get the latest highest-rated review text from pre-fetched data
-                latest_review_data = latest_reviews_by_professional.get(professional.professional_id, {'text': None, 'author_profile_pic': None})
-                latest_review_text = latest_review_data['text']
-                latest_review_author_profile_pic = latest_review_data['author_profile_pic']
-                
-                result = {
-                    'professional_id': professional.professional_id,
-                    'name': professional.user.name,
-                    'profile_picture_url': profile_picture_url,
-                    'location': location_str,
-                    'coordinates': {
-                        'latitude': float(coord_lat),
-                        'longitude': float(coord_lng)
-                    },
-                    'primary_service': {
-                        'service_id': best_service.service_id,
-                        'service_name': best_service.service_name,
-                        'price_per_visit': float(best_service.base_rate),
-                        'unit_of_time': best_service.unit_of_time,
-                        'is_overnight': best_service.is_overnight
-                    },
-                    'match_type': match_type,
-                    'distance': prof_data['distance'],
-                    'reviews': {
-                        'average_rating': formatted_avg_rating,
-                        'review_count': review_count,
-                        'latest_highest_review_text': latest_review_text,
-                        'latest_review_author_profile_pic': latest_review_author_profile_pic
-                    },
-                    'badges': {
-                        'is_background_checked': professional.is_background_checked,
-                        'is_insured': professional.is_insured,
-                        'is_elite_pro': professional.is_elite_pro
-                    }
-                }
-                results.append(result)
-        
-        logger.debug(f"Found {len(results)} professionals with matching services")
+            user_coords = DEFAULT_SEARCH_COORDS
+            used_location = DEFAULT_SEARCH_LOCATION
+        
+        # Repeated searches and later pages reuse the cached, unshuffled candidates
+        index_version = search_index.get_index_version()
+        cache_key = search_cache.build_search_cache_key(criteria, user_coords, index_version)
+        candidates = search_cache.get_cached_search(cache_key)
+        if candidates is None:
+            candidates = compute_search_candidates(criteria, user_coords, index_version)
+            search_cache.set_cached_search(cache_key, candidates)
+        else:
+            logger.debug(f"Search results served from cache: {cache_key}")
         
-        # Check if we need to fallback due to no results
         fallback_message = None
-        if len(results) == 0 and not is_all_services and original_service_query:
-            # Log the failed search
-            logger.warning(f"No professionals found for service query: '{original_service_query}' in location: '{used_location}'")
-            
-            # Perform fallback search with "All Services" in default location (Colorado Springs)
-            fallback_message = f"No professionals found for '{original_service_query}'"
-            logger.info(f"Performing fallback search for all services in Colorado Springs")
-            
-            # Reset search to Colorado Springs with all services
-            user_coords = (38.8339, -104.8214)  # Colorado Springs coordinates
-            used_location = "Colorado Springs, Colorado"
-            
-            # Re-run the location filtering for fallback
-            professionals_with_location = []
-            for professional in professionals_query:
-                try:
-                    address = Address.objects.get(
-                        user=professional.user,
-                        address_type=AddressType.SERVICE
-                    )
-                    
-                    if address.coordinates and isinstance(address.coordinates, dict):
-                        prof_lat = address.coordinates.get('latitude')
-                        prof_lng = address.coordinates.get('longitude')
-                        
-                        if prof_lat and prof_lng:
-                            prof_coords = (float(prof_lat), float(prof_lng))
-                            distance = calculate_distance(user_coords, prof_coords)
-                            
-                            if distance <= radius_miles:
-                                professionals_with_location.append({
-                                    'professional': professional,
-                                    'address': address,
-                                    'distance': distance,
-                                    'coordinates': prof_coords
-                                })
-                except Address.DoesNotExist:
-                    continue
-            
-            # Re-run service filtering for fallback (all services)
-            results = []
-            for prof_data in professionals_with_location:
-                professional = prof_data['professional']
-                address = prof_data['address']
-                
-                # Get all approved services for this professional
-                services = Service.objects.filter(
-                    professional=professional,
-                    moderation_status='APPROVED',
-                    is_active=True,
-                    searchable=True,
-                    is_archived=False
-                )
-                
-                # Filter by animal types if specified
-                if animal_types:
-                    # Expand animal types to include related species
-                    expanded_animal_types = []
-                    for animal in animal_types:
-                        expanded_animal_types.append(animal)
-                        # If searching for lizards (singular or plural), also include bearded dragons and leopard geckos
-                        if animal.lower() in ['lizard', 'lizards']:
-                            expanded_animal_types.extend(['bearded dragons', 'leopard geckos'])
-                    
-                    animal_filtered_services = []
-                    for service in services:
-                        if service.animal_types and isinstance(service.animal_types, dict):
-                            service_animals = list(service.animal_types.keys())
-                            
-                            # More flexible matching logic
-                            service_matched = False
-                            for requested_animal in expanded_animal_types:
-                                for service_animal in service_animals:
-                                    # Check for partial matches (ignoring case and plural/singular differences)
-                                    requested_lower = requested_animal.lower().strip()
-                                    service_lower = service_animal.lower().strip()
-                                    
-                                    # Direct substring match (both ways)
-                                    if requested_lower in service_lower or service_lower in requested_lower:
-                                        service_matched = True
-                                        break
-                                    
-                                    # Handle plurals by removing 's' for comparison
-                                    requested_singular = requested_lower.rstrip('s')
-                                    service_singular = service_lower.rstrip('s')
-                                    if requested_singular in service_singular or service_singular in requested_singular:
-                                        service_matched = True
-                                        break
-                                
-                                if service_matched:
-                                    break
-                            
-                            if service_matched:
-                                animal_filtered_services.append(service)
-                    
-                    services = animal_filtered_services
-                
-                # Filter by price range
-                price_filtered_services = [
-                    service for service in services
-                    if price_min <= float(service.base_rate) <= price_max
-                ]
-                services = price_filtered_services
-                
-                if not services:
-                    continue
-                
-                # For fallback, select the best service for display (highest price first)
-                best_service = select_best_service_for_display(services)
-                
-                # Format location string
-                location_parts = []
-                if address.city:
-                    location_parts.append(address.city)
-                if address.state:
-                    location_parts.append(address.state)
-                location_str = ', '.join(location_parts)
-                
-                # Get profile picture URL
-                profile_picture_url = None
-                if professional.user.profile_picture:
-                    profile_picture_url = professional.user.profile_picture.url
-                
-                # Ensure coordinates are valid before including in result
-                coord_lat = address.coordinates.get('latitude')
-                coord_lng = address.coordinates.get('longitude')
-                
-                if coord_lat is None or coord_lng is None:
-                    continue  # Skip this professional if coordinates are invalid
-                
-                # Get review data from pre-fetched data (fallback section)
-                review_data = reviews_by_professional.get(professional.professional_id, {'avg_rating': 0, 'review_count': 0})
-                avg_rating = review_data['avg_rating']
-                review_count = review_data['review_count']
-                
-                # Format the average rating
-                formatted_avg_rating = 5.0 if avg_rating >= 4.995 else round(avg_rating, 2)
-                
-                # Get the latest highest-rated review text from pre-fetched data
-                latest_review_data = latest_reviews_by_professional.get(professional.professional_id, {'text': None, 'author_profile_pic': None})
-                latest_review_text = latest_review_data['text']
-                latest_review_author_profile_pic = latest_review_data['author_profile_pic']
-                
-                result = {
-                    'professional_id': professional.professional_id,
-                    'name': professional.user.name,
-                    'profile_picture_url': profile_picture_url,
-                    'location': location_str,
-                    'coordinates': {
-                        'latitude': float(coord_lat),
-                        'longitude': float(coord_lng)
-                    },
-                    'primary_service': {
-                        'service_id': best_service.service_id,
-                        'service_name': best_service.service_name,
-                        'price_per_visit': float(best_service.base_rate),
-                        'unit_of_time': best_service.unit_of_time,
-                        'is_overnight': best_service.is_overnight
-                    },
-                    'match_type': 'fallback',
-                    'distance': prof_data['distance'],
-                    'reviews': {
-                        'average_rating': formatted_avg_rating,
-                        'review_count': review_count,
-                        'latest_highest_review_text': latest_review_text,
-                        'latest_review_author_profile_pic': latest_review_author_profile_pic
-                    },
-                    'badges': {
-                        'is_background_checked': professional.is_background_checked,
-                        'is_insured': professional.is_insured,
-                        'is_elite_pro': professional.is_elite_pro
-                    }
-                }
-                results.append(result)
-        
-        # Separate exact and fuzzy matches for badge-aware sorting
-        exact_results = [r for r in results if r['match_type'] == 'exact']
-        fuzzy_results = [r for r in results if r['match_type'] == 'fuzzy']
-        fallback_results = [r for r in results if r['match_type'] == 'fallback']
+        if candidates['is_fallback']:
+            fallback_message = f"No professionals found for '{service_query}'"
+            used_location = DEFAULT_SEARCH_LOCATION
         
         # Helper function to check if professional has any badges
         def has_badges(result):
@@ -803,9 +545,9 @@ def search_professionals(request):
             return with_badges + without_badges
         
         # Apply badge-aware sorting to each match type group
-        sorted_exact_results = sort_by_badges_and_randomize(exact_results)
-        sorted_fuzzy_results = sort_by_badges_and_randomize(fuzzy_results)
-        sorted_fallback_results = sort_by_badges_and_randomize(fallback_results)
+        sorted_exact_results = sort_by_badges_and_randomize(candidates['exact'])
+        sorted_fuzzy_results = sort_by_badges_and_randomize(candidates['fuzzy'])
+        sorted_fallback_results = sort_by_badges_and_randomize(candidates['fallback'])
         
         # Combine with exact matches first, then fuzzy, then fallback
         final_results = sorted_exact_results + sorted_fuzzy_results + sorted_fallback_results
@@ -813,12 +555,13 @@ def search_professionals(request):
         # Apply pagination
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
-        paginated_results = final_results[start_idx:end_idx]
         
-        # Remove match_type from final response (internal use only)
-        for result in paginated_results:
-            del result['match_type']
-            del result['distance']  # Remove distance for now as requested
+        # Remove match_type and distance from final response (internal use only).
+        # Copies keep the candidate dicts intact for the cache.
+        paginated_results = [
+            {key: value for key, value in result.items() if key not in ('match_type', 'distance')}
+            for result in final_results[start_idx:end_idx]
+        ]
         
         response_data = {
             'professionals': paginated_results,
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:58
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+from services.search_tokens import service_animal_tokens, service_text_tokens
+
+
+def populate_search_tokens(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    to_update = []
+    for service in Service.objects.only('service_id', 'animal_types', 'service_name', 'description'):
+        service.animal_type_phrases, service.animal_type_tokens = service_animal_tokens(service.animal_types)
+        service.name_tokens = service_text_tokens(service.service_name)
+        service.description_tokens = service_text_tokens(service.description)
+        to_update.append(service)
+    Service.objects.bulk_update(
+        to_update,
+        ['animal_type_phrases', 'animal_type_tokens', 'name_tokens', 'description_tokens'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0011_add_is_archived_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='animal_type_phrases',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='animal_type_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='description_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='name_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(populate_search_tokens, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
 from django.db.models import JSONField
+from .search_tokens import service_animal_tokens, service_text_tokens
 
 class Service(models.Model):
     MODERATION_STATUS_CHOICES = [
@@ -63,9 +64,30 @@ class Service(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     searchable = models.BooleanField(default=True)
 
+    # Normalized search tokens derived on save (see services/search_tokens.py)
+    animal_type_phrases = ArrayField(models.CharField(max_length=255), default=list, blank=True, editable=False)
+    animal_type_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True, editable=False)
+    name_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True, editable=False)
+    description_tokens = ArrayField(models.CharField(max_length=255), default=list, blank=True, editable=False)
+
     def __str__(self):
         return f"{self.service_name} by {self.professional}"
 
+    def update_search_tokens(self):
+        """Refresh the normalized animal type and text tokens used by search."""
+        self.animal_type_phrases, self.animal_type_tokens = service_animal_tokens(self.animal_types)
+        self.name_tokens = service_text_tokens(self.service_name)
+        self.description_tokens = service_text_tokens(self.description)
+
+    def save(self, *args, **kwargs):
+        self.update_search_tokens()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'animal_types', 'service_name', 'description'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {
+                'animal_type_phrases', 'animal_type_tokens', 'name_tokens', 'description_tokens'
+            }
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'services'
         ordering = ['-created_at']
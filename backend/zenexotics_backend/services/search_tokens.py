@@ -0,0 +1,124 @@
+"""
+Normalization rules used by professional search to match animal types and
+service text.
+
+Service tokens are computed once in Service.save() and copied into the
+professional search documents, so a search only has to normalize its own
+parameters and compare sets.
+"""
+import re
+from django.db.models import Q
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Requested animal types that should also match related species
+ANIMAL_TYPE_EXPANSIONS = {
+    'lizard': ['bearded dragon', 'leopard gecko'],
+}
+
+
+def singularize(word):
+    """Drop trailing 's' the same way search always has ("dogs" -> "dog")."""
+    return word.rstrip('s') or word
+
+
+def normalize_words(text):
+    """Lowercase, split on anything that is not a letter or digit, and singularize."""
+    if not text:
+        return []
+    return [singularize(word) for word in _WORD_RE.findall(text.lower())]
+
+
+def normalize_phrase(text):
+    """Normalized multi-word form of a term: "Bearded  Dragons" -> "bearded dragon"."""
+    return ' '.join(normalize_words(text))
+
+
+def _phrases_and_tokens(terms):
+    phrases = set()
+    tokens = set()
+    for term in terms:
+        phrase = normalize_phrase(term)
+        if not phrase:
+            continue
+        phrases.add(phrase)
+        tokens.add(phrase)
+        tokens.update(phrase.split(' '))
+    return phrases, tokens
+
+
+def service_animal_tokens(animal_types):
+    """
+    Return (phrases, tokens) for a Service.animal_types mapping, as sorted lists.
+    phrases holds each normalized animal type; tokens holds the phrases plus
+    their individual words.
+    """
+    if not animal_types or not isinstance(animal_types, dict):
+        return [], []
+    phrases, tokens = _phrases_and_tokens(animal_types.keys())
+    return sorted(phrases), sorted(tokens)
+
+
+def requested_animal_tokens(animal_types):
+    """
+    Return (phrases, tokens) for the animal types of a search request,
+    applying ANIMAL_TYPE_EXPANSIONS (lizards also match bearded dragons and
+    leopard geckos).
+    """
+    terms = []
+    for animal in animal_types or []:
+        terms.append(animal)
+        terms.extend(ANIMAL_TYPE_EXPANSIONS.get(normalize_phrase(animal), []))
+    phrases, tokens = _phrases_and_tokens(terms)
+    return sorted(phrases), sorted(tokens)
+
+
+def animal_types_match(requested_phrases, requested_tokens, service_phrases, service_tokens):
+    """
+    A service matches when a requested animal equals one of the service's
+    animals or one of their words ("dragon" matches "Bearded Dragons"), or the
+    other way around ("bearded dragon" matches "Dragons").
+    Mirrors the DB filter built by animal_type_filter().
+    """
+    return bool(
+        set(requested_phrases) & set(service_tokens)
+        or set(requested_tokens) & set(service_phrases)
+    )
+
+
+def animal_type_filter(requested_phrases, requested_tokens, prefix=''):
+    """
+    Q object equivalent of animal_types_match() for models that store
+    animal_type_phrases / animal_type_tokens array fields.
+    """
+    return (
+        Q(**{f'{prefix}animal_type_tokens__overlap': list(requested_phrases)})
+        | Q(**{f'{prefix}animal_type_phrases__overlap': list(requested_tokens)})
+    )
+
+
+def service_text_tokens(text):
+    """Sorted distinct normalized words of a service name or description."""
+    return sorted(set(normalize_words(text)))
+
+
+def query_relevance(query_tokens, name_tokens, description_tokens):
+    """
+    Score a service against a search query:
+    3 - every query word is in the service name
+    2 - every query word is in the description
+    1 - at least one query word is in the name or description
+    0 - no overlap
+    """
+    query_tokens = set(query_tokens)
+    if not query_tokens:
+        return 0
+    name_tokens = set(name_tokens)
+    description_tokens = set(description_tokens)
+    if query_tokens <= name_tokens:
+        return 3
+    if query_tokens <= description_tokens:
+        return 2
+    if query_tokens & (name_tokens | description_tokens):
+        return 1
+    return 0
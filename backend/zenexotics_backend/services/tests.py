@@ -1,3 +1,53 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from services.search_tokens import (
+    service_animal_tokens, requested_animal_tokens, animal_types_match,
+    service_text_tokens, normalize_words, query_relevance
+)
 
-# Create your tests here.
+
+class AnimalTypeMatchingTests(SimpleTestCase):
+    """Animal type matching rules used by professional search."""
+
+    def matches(self, requested, service_animal_types):
+        return animal_types_match(
+            *requested_animal_tokens(requested),
+            *service_animal_tokens(service_animal_types)
+        )
+
+    def test_plural_and_case_insensitive(self):
+        """Plurals and casing are ignored"""
+        self.assertTrue(self.matches(['dog'], {'Dogs': 'Domestic'}))
+        self.assertTrue(self.matches(['DOGS'], {'dog': 'Domestic'}))
+
+    def test_word_within_service_animal(self):
+        """A requested word matches a multi-word service animal"""
+        self.assertTrue(self.matches(['dragon'], {'Bearded Dragons': 'Reptiles'}))
+
+    def test_service_animal_within_request(self):
+        """A multi-word request matches a broader service animal"""
+        self.assertTrue(self.matches(['bearded dragon'], {'Dragons': 'Reptiles'}))
+
+    def test_lizard_expansion(self):
+        """Lizards also match bearded dragons and leopard geckos"""
+        self.assertTrue(self.matches(['lizards'], {'Bearded Dragons': 'Reptiles'}))
+        self.assertTrue(self.matches(['Lizard'], {'Leopard Gecko': 'Reptiles'}))
+
+    def test_unrelated_animals_do_not_match(self):
+        """Sharing a generic word is not a match"""
+        self.assertFalse(self.matches(['cat'], {'Dogs': 'Domestic'}))
+        self.assertFalse(self.matches(['small mammals'], {'Small Dogs': 'Domestic'}))
+        self.assertFalse(self.matches(['dog'], {}))
+
+
+class QueryRelevanceTests(SimpleTestCase):
+    """Service query relevance scoring."""
+
+    def score(self, query, name, description):
+        return query_relevance(normalize_words(query), service_text_tokens(name), service_text_tokens(description))
+
+    def test_scores(self):
+        """Name beats description beats partial word match"""
+        self.assertEqual(self.score('dog walking', 'Dog Walking', 'Walks'), 3)
+        self.assertEqual(self.score('drop in', 'Pet Sitting', 'Drop-in visits'), 2)
+        self.assertEqual(self.score('cat grooming', 'Dog Grooming', 'Baths'), 1)
+        self.assertEqual(self.score('boarding', 'Dog Walking', 'Walks'), 0)
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:51
+
+from django.db import migrations, models
+from core.geo_utils import extract_lat_lng, compute_geo_cell
+
+
+def populate_spatial_index(apps, schema_editor):
+    Address = apps.get_model('user_addresses', 'Address')
+    to_update = []
+    for address in Address.objects.exclude(coordinates__isnull=True).only('address_id', 'coordinates'):
+        lat_lng = extract_lat_lng(address.coordinates)
+        if not lat_lng:
+            continue
+        address.latitude, address.longitude = lat_lng
+        address.geo_cell = compute_geo_cell(*lat_lng)
+        to_update.append(address)
+    Address.objects.bulk_update(to_update, ['latitude', 'longitude', 'geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_addresses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='geo_cell',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['address_type', 'geo_cell'], name='user_addres_address_a6aba3_idx'),
+        ),
+        migrations.RunPython(populate_spatial_index, reverse_code=migrations.RunPython.noop),
+    ]
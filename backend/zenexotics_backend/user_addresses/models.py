@@ -1,5 +1,6 @@
 from django.db import models
 from users.models import User
+from core.geo_utils import extract_lat_lng, compute_geo_cell
 
 class AddressType(models.TextChoices):
     SERVICE = 'SERVICE', 'Service'
@@ -15,6 +16,10 @@ class Address(models.Model):
     zip = models.CharField(max_length=20)
     country = models.CharField(max_length=100)
     coordinates = models.JSONField(null=True, blank=True)
+    # Spatial index derived from coordinates on save (see core.geo_utils)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.CharField(max_length=32, null=True, blank=True, editable=False)
     address_type = models.CharField(
         max_length=20,
         choices=AddressType.choices,
@@ -24,4 +29,25 @@ class Address(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        verbose_name_plural = 'Addresses' 
\ No newline at end of file
+        verbose_name_plural = 'Addresses'
+        indexes = [
+            models.Index(fields=['address_type', 'geo_cell']),
+        ]
+
+    def update_spatial_index(self):
+        """Refresh latitude/longitude/geo_cell from the coordinates JSON."""
+        lat_lng = extract_lat_lng(self.coordinates)
+        if lat_lng:
+            self.latitude, self.longitude = lat_lng
+            self.geo_cell = compute_geo_cell(*lat_lng)
+        else:
+            self.latitude = None
+            self.longitude = None
+            self.geo_cell = None
+
+    def save(self, *args, **kwargs):
+        self.update_spatial_index()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'coordinates' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude', 'geo_cell'}
+        super().save(*args, **kwargs)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserMessage
+from .models import UserMessage, UnreadMessageCounter, ScheduledEmailJob, MessageOutboxEvent
 import pytz
 from django.utils import timezone
 from django.utils.html import format_html
@@ -56,3 +56,27 @@ class UserMessageAdmin(admin.ModelAdmin):
         if obj:  # editing an existing object
             return ('timestamp',)
         return ()
+
+
+@admin.register(UnreadMessageCounter)
+class UnreadMessageCounterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'conversation', 'unread_count', 'updated_at')
+    search_fields = ('user__email', 'conversation__conversation_id')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(ScheduledEmailJob)
+class ScheduledEmailJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'job_type', 'status', 'coalesce_key', 'run_at', 'attempts', 'completed_at')
+    list_filter = ('status', 'job_type')
+    search_fields = ('coalesce_key', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'completed_at')
+
+
+@admin.register(MessageOutboxEvent)
+class MessageOutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'message', 'status', 'attempts', 'available_at', 'delivered_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('last_error',)
+    raw_id_fields = ('message',)
+    readonly_fields = ('created_at', 'locked_at', 'delivered_at')
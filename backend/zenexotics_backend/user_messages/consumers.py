@@ -2,9 +2,11 @@ import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.core.cache import cache
 from asgiref.sync import sync_to_async
 
+from .presence import get_presence_backend
+from .presence_fanout import get_presence_fanout
+
 logger = logging.getLogger(__name__)
 
 class MessageConsumer(AsyncWebsocketConsumer):
@@ -37,7 +39,7 @@ class MessageConsumer(AsyncWebsocketConsumer):
         await self.accept()
         logger.info(f"WebSocket connection accepted for user {user.id}")
         
-        # Set user as online in cache and send status update
+        # Register the connection in the presence registry (status updates are sent by the fan-out stage)
         await self.set_user_online(user.id)
         
         # Send connection established message with connection ID
@@ -51,9 +53,6 @@ class MessageConsumer(AsyncWebsocketConsumer):
         }))
         
         logger.info(f"User {user.id} connected via WebSocket, channel: {self.channel_name}")
-        
-        # Send a direct status update to all relevant participants
-        await database_sync_to_async(self._broadcast_status_update)(user.id, True)
     
     async def disconnect(self, close_code):
         """
@@ -155,130 +154,27 @@ class MessageConsumer(AsyncWebsocketConsumer):
             'is_online': event['is_online']
         }))
     
-    @database_sync_to_async
-    def set_user_online(self, user_id):
+    async def set_user_online(self, user_id):
         """
-        Set user as online in cache and notify connections
+        Register (or refresh) this connection in the presence registry and
+        queue a status update if the user just came online
         """
-        # Get the current connections for this user
-        connections = cache.get(f"user_{user_id}_connections", set())
-        
-        # Convert to set if it's not already (for backward compatibility)
-        if not isinstance(connections, set):
-            connections = set([connections]) if connections else set()
-        
-        # Add this connection
-        connections.add(self.channel_name)
-        
-        # Update the connections cache with 24h expiry
-        cache.set(f"user_{user_id}_connections", connections, 86400)
-        
-        # Set the user as online with 5 minute expiry (if connections disappear)
-        was_online = cache.get(f"user_{user_id}_online", False)
-        cache.set(f"user_{user_id}_online", True, 300)
-        
-        # MBA3210:logger.info(f"User {user_id} marked as online (was_online={was_online}), connections={len(connections)}")
+        became_online = await sync_to_async(get_presence_backend().add_connection)(user_id, self.channel_name)
         
         # Only broadcast status change if it's a change
-        if not was_online:
-            result = self._notify_user_status_change(user_id, True)
-            # MBA3210:logger.info(f"Online status notification result: {result}")
+        if became_online:
+            get_presence_fanout().schedule(user_id, True)
     
-    @database_sync_to_async
-    def remove_user_connection(self, user_id, channel_name):
+    async def remove_user_connection(self, user_id, channel_name):
         """
-        Remove a connection from user's connections and set offline if no connections left
+        Remove a connection from the presence registry and queue a status
+        update if it was the user's last one
         """
-        # Get the current connections for this user
-        connections = cache.get(f"user_{user_id}_connections", set())
-        
-        # Convert to set if it's not already
-        if not isinstance(connections, set):
-            connections = set([connections]) if connections else set()
-        
-        # Remove this connection
-        if channel_name in connections:
-            connections.remove(channel_name)
-        
-        # MBA3210: logger.info(f"Removed connection for user {user_id}, remaining connections: {len(connections)}")
-        
-        # If there are still connections, update the cache
-        if connections:
-            cache.set(f"user_{user_id}_connections", connections, 86400)
-            return
-        
-        # No connections left, set user as offline
-        was_online = cache.get(f"user_{user_id}_online", False)
-        cache.delete(f"user_{user_id}_online")
-        
-        # MBA3210: logger.info(f"No connections left for user {user_id}, marking as offline (was_online={was_online})")
+        went_offline = await sync_to_async(get_presence_backend().remove_connection)(user_id, channel_name)
         
         # Only broadcast status change if it's a change
-        if was_online:
-            result = self._notify_user_status_change(user_id, False)
-            # MBA3210: logger.info(f"Offline status notification result: {result}")
-    
-    def _notify_user_status_change(self, user_id, is_online):
-        """
-        Notify relevant users about a user's status change
-        """
-        from asgiref.sync import async_to_sync
-        from channels.layers import get_channel_layer
-        from conversations.models import Conversation
-        from django.db.models import Q
-        
-        try:
-            # Find all conversations this user participates in
-            conversations = Conversation.objects.filter(
-                Q(participant1_id=user_id) | Q(participant2_id=user_id)
-            )
-            
-            if not conversations.exists():
-                logger.warning(f"No conversations found for user {user_id}")
-                return "No conversations found"
-            
-            channel_layer = get_channel_layer()
-            
-            # For each conversation, notify the other participant
-            notified_count = 0
-            for conversation in conversations:
-                # Determine the other participant
-                other_user_id = conversation.participant2_id if conversation.participant1_id == user_id else conversation.participant1_id
-                
-                # Get the notification group for the other user
-                other_user_group = f"user_{other_user_id}_notifications"
-                
-                # Send the status update to the other user
-                async_to_sync(channel_layer.group_send)(
-                    other_user_group,
-                    {
-                        "type": "user_status_update",
-                        "user_id": user_id,
-                        "is_online": is_online
-                    }
-                )
-                
-                notified_count += 1
-                # MBA3210: logger.info(f"Sent status update for user {user_id} (online: {is_online}) to user {other_user_id}")
-            
-            return f"Notified {notified_count} users"
-        
-        except Exception as e:
-            logger.error(f"Error notifying status change: {str(e)}")
-            return f"Error: {str(e)}"
-    
-    def _broadcast_status_update(self, user_id, is_online):
-        """
-        Immediately broadcast status update to all relevant users
-        """
-        try:
-            # logger.info(f"Broadcasting status update for user {user_id}, online={is_online}")
-            result = self._notify_user_status_change(user_id, is_online)
-            # logger.info(f"Broadcast result: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error in _broadcast_status_update: {str(e)}")
-            return f"Error: {str(e)}"
+        if went_offline:
+            get_presence_fanout().schedule(user_id, False)
     
     @database_sync_to_async
     def mark_messages_as_read(self, user_id, conversation_id, message_ids):
@@ -286,16 +182,21 @@ class MessageConsumer(AsyncWebsocketConsumer):
         Mark messages as read in the database
         """
         from user_messages.models import UserMessage
+        from user_messages.unread_counts import decrement_unread
         from django.db.models import Q
         
         try:
-            # Update messages to 'read' status
+            # Update unread messages to 'read' status
             updated = UserMessage.objects.filter(
                 Q(~Q(sender_id=user_id)),  # Put the Q object first as a positional argument
                 conversation_id=conversation_id,
-                message_id__in=message_ids
+                message_id__in=message_ids,
+                status='sent'
             ).update(status='read')
             
+            # Only the messages this UPDATE changed leave the unread count
+            decrement_unread(user_id, conversation_id, updated)
+            
             logger.debug(f"Marked {updated} messages as read for user {user_id} in conversation {conversation_id}")
             
             # Could send a confirmation back to the client if needed
@@ -0,0 +1,428 @@
+"""
+Durable queue for delayed emails.
+
+schedule_email_job() stores a ScheduledEmailJob row instead of starting a
+sleeping thread, so pending emails survive deploys and restarts and the web
+process does no extra work per message. The process_email_jobs management
+command polls for due jobs in batches and hands them to the handler
+registered for their job_type.
+
+Jobs with the same coalesce_key that are due are claimed and handled
+together, which turns a burst of messages to one recipient into a single
+digest email. Jobs that are not due yet, such as retries still backing off,
+wait for their own run_at. A handler that raises is retried with exponential
+backoff until max_attempts.
+"""
+from datetime import timedelta
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.email_utils import (
+    get_common_email_headers,
+    build_email_html,
+    send_email_with_retry,
+    check_user_email_settings,
+    format_date_for_email
+)
+from .models import ScheduledEmailJob, UserMessage, MessageMetrics
+
+logger = logging.getLogger(__name__)
+
+JOB_BATCH_SIZE = 50
+
+# Retry delays double from RETRY_BASE_DELAY up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# A job left 'processing' this long belongs to a worker that died
+STALE_LOCK_TIMEOUT = timedelta(minutes=10)
+
+# Give recipients a chance to read a message before emailing them about it
+MESSAGE_NOTIFICATION_DELAY_SECONDS = 20
+
+DIGEST_PREVIEW_LIMIT = 5
+
+
+class EmailJobError(Exception):
+    """Raised by a handler when its email could not be sent and should be retried."""
+
+
+_handlers = {}
+
+
+def register_job_handler(job_type):
+    """
+    Register the handler for a job type. Handlers receive the list of jobs
+    claimed together (one job, or all jobs sharing a coalesce_key) and return
+    True if an email was sent or False if there was nothing to send.
+    """
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def schedule_email_job(job_type, payload, delay_seconds=0, coalesce_key=''):
+    """Queue an email job to run after delay_seconds."""
+    return ScheduledEmailJob.objects.create(
+        job_type=job_type,
+        payload=payload,
+        coalesce_key=coalesce_key,
+        run_at=timezone.now() + timedelta(seconds=delay_seconds)
+    )
+
+
+def get_retry_delay(attempts):
+    """Backoff before the next attempt after `attempts` failures."""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+
+def claim_due_jobs(batch_size=JOB_BATCH_SIZE, now=None):
+    """
+    Lock up to batch_size due jobs (plus the other due jobs of their coalesced
+    groups) and mark them processing. Rows locked by another worker are skipped, so
+    several workers can poll concurrently.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        jobs = list(
+            ScheduledEmailJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', run_at__lte=now)
+                | Q(status='processing', locked_at__lt=now - STALE_LOCK_TIMEOUT)
+            ).order_by('run_at')[:batch_size]
+        )
+
+        coalesce_keys = {job.coalesce_key for job in jobs if job.coalesce_key}
+        if coalesce_keys:
+            jobs.extend(
+                ScheduledEmailJob.objects.select_for_update(skip_locked=True).filter(
+                    status='pending',
+                    run_at__lte=now,
+                    coalesce_key__in=coalesce_keys
+                ).exclude(job_id__in=[job.job_id for job in jobs])
+            )
+
+        ScheduledEmailJob.objects.filter(
+            job_id__in=[job.job_id for job in jobs]
+        ).update(status='processing', locked_at=now)
+
+    return jobs
+
+
+def group_jobs(jobs):
+    """Group claimed jobs by (job_type, coalesce_key); jobs without a key stay alone."""
+    groups = {}
+    for job in jobs:
+        key = (job.job_type, job.coalesce_key or f'job:{job.job_id}')
+        groups.setdefault(key, []).append(job)
+    return list(groups.values())
+
+
+def _finish(jobs, status):
+    ScheduledEmailJob.objects.filter(job_id__in=[job.job_id for job in jobs]).update(
+        status=status,
+        locked_at=None,
+        completed_at=timezone.now()
+    )
+
+
+def _retry_or_fail(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = str(error)
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.completed_at = now
+        else:
+            job.status = 'pending'
+            job.run_at = now + get_retry_delay(job.attempts)
+    ScheduledEmailJob.objects.bulk_update(
+        jobs, ['attempts', 'last_error', 'locked_at', 'status', 'completed_at', 'run_at']
+    )
+
+
+def process_due_jobs(batch_size=JOB_BATCH_SIZE):
+    """
+    Claim and run one batch of due jobs.
+    Returns {'sent': n, 'skipped': n, 'retried': n, 'failed': n} counted in jobs.
+    """
+    results = {'sent': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+
+    for group in group_jobs(claim_due_jobs(batch_size)):
+        job_type = group[0].job_type
+        handler = _handlers.get(job_type)
+        try:
+            if handler is None:
+                raise EmailJobError(f"No handler registered for job type '{job_type}'")
+            sent = handler(group)
+        except Exception as e:
+            logger.error(f"Email job(s) {[job.job_id for job in group]} failed: {str(e)}")
+            _retry_or_fail(group, e)
+            for job in group:
+                results['failed' if job.status == 'failed' else 'retried'] += 1
+            continue
+
+        status = 'sent' if sent else 'skipped'
+        _finish(group, status)
+        results[status] += len(group)
+
+    return results
+
+
+def run_worker(batch_size=JOB_BATCH_SIZE, poll_interval=5, once=False):
+    """Process jobs until interrupted, sleeping poll_interval seconds when idle."""
+    while True:
+        results = process_due_jobs(batch_size)
+        if any(results.values()):
+            logger.info(f"Processed email jobs: {results}")
+        if once:
+            return results
+        if not any(results.values()):
+            time.sleep(poll_interval)
+
+
+# Message notifications
+
+def schedule_message_notification(message, recipient_user):
+    """Queue the unread-message email for a new message, coalesced per recipient."""
+    return schedule_email_job(
+        'message_notification',
+        {'message_id': message.message_id, 'recipient_id': recipient_user.id},
+        delay_seconds=MESSAGE_NOTIFICATION_DELAY_SECONDS,
+        coalesce_key=f'message_notification:{recipient_user.id}'
+    )
+
+
+def _message_preview(message):
+    return message.content[:100] + ('...' if len(message.content) > 100 else '')
+
+
+def _message_email_content(message, recipient_user):
+    """Subject, HTML body and plain body for a single unread message."""
+    conversation = message.conversation
+    sender_user = message.sender
+    message_preview = _message_preview(message)
+    email_date = format_date_for_email(timezone.now())
+    conversation_url = f"{settings.FRONTEND_BASE_URL}/messages?conversationId={conversation.conversation_id}"
+
+    # Keep subject line personal but clear
+    subject = f"Message from {sender_user.name} on CrittrCove"
+
+    content_html = f"""
+        <h1 style="margin-top: 0; color: #333333; font-size: 24px;">Hi {recipient_user.name},</h1>
+        <p>You've received a {message.type_of_message.lower()} from {sender_user.name} on {email_date}.</p>
+
+        <div style="background-color: #f5f5f5; padding: 15px; border-radius: 4px; margin: 20px 0;">
+            <p style="margin: 0; font-style: italic;">"{message_preview}"</p>
+        </div>
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{conversation_url}"
+            style="display: inline-block; background-color: #008080; color: white; padding: 12px 25px; text-decoration: none; border-radius: 4px; font-weight: bold; font-size: 16px;">
+            View Full Message
+            </a>
+        </div>
+
+        <p>If you're having trouble with the button above, you can also copy and paste this link into your browser:</p>
+        <p style="word-break: break-all; background-color: #f5f5f5; padding: 10px; border-radius: 4px; font-size: 14px;">
+            {conversation_url}
+        </p>
+
+        <p>We hope you enjoy using CrittrCove for all your pet care needs!</p>
+
+        <p>Best regards,<br>The CrittrCove Team</p>
+        """
+
+    plain_message = f"""
+Hi {recipient_user.name},
+
+You've received a {message.type_of_message.lower()} from {sender_user.name} on {email_date}.
+
+"{message_preview}"
+
+To view the full message, please visit:
+{conversation_url}
+
+We hope you enjoy using CrittrCove for all your pet care needs!
+
+Best regards,
+The CrittrCove Team
+
+---
+You're receiving this email because you have an account on CrittrCove and have enabled message notifications.
+Manage your notification preferences: {settings.FRONTEND_BASE_URL}/settings/notifications
+CrittrCove, Inc. • 123 Pet Street • San Francisco, CA 94103
+© 2025 CrittrCove. All rights reserved.
+            """
+
+    return subject, content_html, plain_message
+
+
+def _digest_email_content(messages, recipient_user):
+    """Subject, HTML body and plain body for several unread messages."""
+    sender_names = []
+    for message in messages:
+        if message.sender.name not in sender_names:
+            sender_names.append(message.sender.name)
+
+    if len(sender_names) == 1:
+        subject = f"{len(messages)} new messages from {sender_names[0]} on CrittrCove"
+    else:
+        subject = f"{len(messages)} new messages on CrittrCove"
+
+    messages_url = f"{settings.FRONTEND_BASE_URL}/messages"
+    shown = messages[-DIGEST_PREVIEW_LIMIT:]
+    hidden_count = len(messages) - len(shown)
+
+    previews_html = ''.join(
+        f"""
+        <div style="background-color: #f5f5f5; padding: 15px; border-radius: 4px; margin: 10px 0;">
+            <p style="margin: 0 0 5px 0; font-weight: bold;">{message.sender.name}</p>
+            <p style="margin: 0; font-style: italic;">"{_message_preview(message)}"</p>
+        </div>
+        """
+        for message in shown
+    )
+    previews_plain = '\n\n'.join(f'{message.sender.name}: "{_message_preview(message)}"' for message in shown)
+    more_html = f"<p>...and {hidden_count} more.</p>" if hidden_count else ''
+    more_plain = f"\n\n...and {hidden_count} more." if hidden_count else ''
+
+    content_html = f"""
+        <h1 style="margin-top: 0; color: #333333; font-size: 24px;">Hi {recipient_user.name},</h1>
+        <p>You have {len(messages)} unread messages from {', '.join(sender_names)}.</p>
+
+        {previews_html}
+        {more_html}
+
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{messages_url}"
+            style="display: inline-block; background-color: #008080; color: white; padding: 12px 25px; text-decoration: none; border-radius: 4px; font-weight: bold; font-size: 16px;">
+            View Messages
+            </a>
+        </div>
+
+        <p>Best regards,<br>The CrittrCove Team</p>
+        """
+
+    plain_message = f"""
+Hi {recipient_user.name},
+
+You have {len(messages)} unread messages from {', '.join(sender_names)}.
+
+{previews_plain}{more_plain}
+
+To view your messages, please visit:
+{messages_url}
+
+Best regards,
+The CrittrCove Team
+
+---
+You're receiving this email because you have an account on CrittrCove and have enabled message notifications.
+Manage your notification preferences: {settings.FRONTEND_BASE_URL}/settings/notifications
+            """
+
+    return subject, content_html, plain_message
+
+
+@register_job_handler('message_notification')
+def send_message_notifications(jobs):
+    """
+    Email a recipient about their still-unread messages: the usual single
+    message email for one, a digest for several.
+    """
+    from users.models import User
+
+    message_ids = [job.payload.get('message_id') for job in jobs]
+    messages = [
+        message for message in UserMessage.objects.filter(
+            message_id__in=message_ids,
+            status='sent'
+        ).select_related('sender', 'conversation').order_by('timestamp', 'message_id')
+        # Skip email notification for booking_confirmed messages
+        if message.type_of_message.lower() != 'booking_confirmed'
+    ]
+    if not messages:
+        logger.info(f"Messages {message_ids} already read or not emailed, skipping notification")
+        return False
+
+    try:
+        recipient_user = User.objects.get(id=jobs[0].payload.get('recipient_id'))
+    except User.DoesNotExist:
+        return False
+
+    # Check if user has email notifications enabled
+    if not check_user_email_settings(recipient_user):
+        logger.info(f"User {recipient_user.id} has email notifications disabled")
+        return False
+
+    email_start_time = time.time()
+
+    latest_message = messages[-1]
+    if len(messages) == 1:
+        subject, content_html, plain_message = _message_email_content(latest_message, recipient_user)
+    else:
+        subject, content_html, plain_message = _digest_email_content(messages, recipient_user)
+
+    # Get common headers using centralized function
+    headers = get_common_email_headers(
+        latest_message.message_id,
+        'user_message',
+        latest_message.conversation_id if len(messages) == 1 else None
+    )
+    headers['X-Message-Type'] = latest_message.type_of_message
+
+    success = send_email_with_retry(
+        subject=subject,
+        html_content=build_email_html(content_html, recipient_user.name),
+        plain_content=plain_message,
+        recipient_email=recipient_user.email,
+        headers=headers
+    )
+
+    # Log email metric. A failed job is retried, so a message only gets its
+    # 'failed' metric on the first failed attempt.
+    email_latency = (time.time() - email_start_time) * 1000  # in milliseconds
+    metric_messages = messages
+    if not success:
+        already_failed = set(MessageMetrics.objects.filter(
+            message__in=messages,
+            recipient=recipient_user,
+            delivery_status='failed'
+        ).values_list('message_id', flat=True))
+        metric_messages = [message for message in messages if message.message_id not in already_failed]
+    MessageMetrics.objects.bulk_create([
+        MessageMetrics(
+            message=message,
+            recipient=recipient_user,
+            delivery_status='email_sent' if success else 'failed',
+            delivery_latency=email_latency,
+            is_recipient_online=False  # We don't check online status for delayed emails
+        )
+        for message in metric_messages
+    ])
+
+    if not success:
+        raise EmailJobError(f"Failed to send message notification to {recipient_user.email}")
+
+    logger.info(f"Sent notification email to {recipient_user.email} for {len(messages)} message(s)")
+    return True
+
+
+# Booking confirmations
+
+@register_job_handler('booking_confirmation')
+def send_booking_confirmations(jobs):
+    from core.email_utils import send_booking_confirmation_email
+
+    for booking_id in {job.payload.get('booking_id') for job in jobs}:
+        send_booking_confirmation_email(booking_id)
+    return True
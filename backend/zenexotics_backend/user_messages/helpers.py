@@ -1,7 +1,9 @@
 import os
 import base64
+import binascii
 import uuid
 import logging
+from datetime import datetime
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
@@ -66,4 +68,26 @@ def process_base64_image(base64_data, conversation_id=None):
     
     except Exception as e:
         logger.error(f"Error processing base64 image for conversation {conversation_id}: {str(e)}")
-        raise ValidationError("Invalid image data. Please upload a valid image.") 
\ No newline at end of file
+        raise ValidationError("Invalid image data. Please upload a valid image.")
+
+
+def encode_message_cursor(message):
+    """
+    Opaque pagination cursor for a message: its (timestamp, message_id) key,
+    base64 encoded so clients treat it as a token.
+    """
+    raw = f"{message.timestamp.isoformat()}|{message.message_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_message_cursor(cursor):
+    """
+    Decode a cursor from encode_message_cursor() into (timestamp, message_id).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, message_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except (UnicodeError, TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid message cursor: {cursor}") from e
@@ -0,0 +1,43 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+from user_messages import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver new-message notifications, unread updates, metrics and emails from the message outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=outbox.DISPATCH_BATCH_SIZE,
+            help=f'Events claimed per poll (default: {outbox.DISPATCH_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0.5,
+            help='Seconds to sleep when the outbox is empty (default: 0.5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Dispatch a single batch and exit'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = asyncio.run(outbox.run_dispatcher(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once']
+            ))
+        except KeyboardInterrupt:
+            self.stdout.write('Message outbox dispatcher stopped')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dispatched message outbox: {results['delivered']} delivered, "
+            f"{results['retried']} retried, {results['failed']} failed"
+        ))
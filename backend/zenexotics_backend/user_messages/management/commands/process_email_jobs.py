@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from user_messages import email_jobs
+
+
+class Command(BaseCommand):
+    help = 'Send due scheduled emails (message notifications, booking confirmations) from the email job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=email_jobs.JOB_BATCH_SIZE,
+            help=f'Jobs claimed per poll (default: {email_jobs.JOB_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when no jobs are due (default: 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process a single batch and exit (e.g. from cron)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = email_jobs.run_worker(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once']
+            )
+        except KeyboardInterrupt:
+            self.stdout.write('Email job worker stopped')
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed email jobs: {results['sent']} sent, {results['skipped']} skipped, "
+            f"{results['retried']} retried, {results['failed']} failed"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from user_messages.unread_counts import rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-conversation unread message counters from the messages table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild counters for this user (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        counter_count = rebuild_unread_counts(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {counter_count} unread message counters"))
@@ -1,14 +1,12 @@
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.contrib.auth import get_user_model
+from users.token_auth import resolve_access_token
 from urllib.parse import parse_qs
 import logging
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
 
 @database_sync_to_async
 def get_user_from_token(token_key):
@@ -17,21 +15,19 @@ def get_user_from_token(token_key):
     """
     logger.info(f"WebSocket JWT: Attempting to validate token: {token_key[:20]}...")
     try:
-        # Verify the token
-        access_token = AccessToken(token_key)
+        # Verify the token and load the user through the shared token user cache
+        access_token, user = resolve_access_token(token_key)
         user_id = access_token.payload.get('user_id')
         logger.info(f"WebSocket JWT: Token valid, user_id: {user_id}")
         
-        # Get user from database
-        user = User.objects.get(id=user_id)
+        if user is None:
+            logger.error(f"WebSocket JWT: User not found for token with user_id: {user_id}")
+            return AnonymousUser()
         logger.info(f"WebSocket JWT: User found: {user.email}")
         return user
     except (InvalidToken, TokenError) as e:
         logger.error(f"WebSocket JWT: Invalid token: {str(e)}")
         return AnonymousUser()
-    except User.DoesNotExist:
-        logger.error(f"WebSocket JWT: User not found for token with user_id: {user_id}")
-        return AnonymousUser()
     except Exception as e:
         logger.error(f"WebSocket JWT: Unexpected error in JWT token validation: {str(e)}")
         return AnonymousUser()
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from user_messages.unread_counts import unread_message_totals
+
+
+def populate_unread_counters(apps, schema_editor):
+    UserMessage = apps.get_model('user_messages', 'UserMessage')
+    UnreadMessageCounter = apps.get_model('user_messages', 'UnreadMessageCounter')
+    UnreadMessageCounter.objects.bulk_create(
+        [
+            UnreadMessageCounter(user_id=user_id, conversation_id=conversation_id, unread_count=count)
+            for (user_id, conversation_id), count in unread_message_totals(UserMessage.objects.all()).items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('conversations', '0002_alter_conversation_last_message_and_more'),
+        ('user_messages', '0008_usermessage_is_sender_deleted_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadMessageCounter',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='conversations.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_message_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Unread Message Counter',
+                'verbose_name_plural': 'Unread Message Counters',
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(populate_unread_counters, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0009_unreadmessagecounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usermessage',
+            index=models.Index(fields=['conversation', 'timestamp', 'message_id'], name='user_messag_convers_732f5c_idx'),
+        ),
+    ]
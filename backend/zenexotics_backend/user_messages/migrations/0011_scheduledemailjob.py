@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0010_usermessage_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledEmailJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('job_type', models.CharField(choices=[('message_notification', 'Message Notification'), ('booking_confirmation', 'Booking Confirmation')], max_length=30)),
+                ('payload', models.JSONField(default=dict)),
+                ('coalesce_key', models.CharField(blank=True, default='', max_length=100)),
+                ('run_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('sent', 'Sent'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Scheduled Email Job',
+                'verbose_name_plural': 'Scheduled Email Jobs',
+                'ordering': ['run_at'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='user_messag_status_a031c1_idx'), models.Index(fields=['coalesce_key', 'status'], name='user_messag_coalesc_82451d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_messages', '0011_scheduledemailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageOutboxEvent',
+            fields=[
+                ('event_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('message_created', 'Message Created')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='user_messages.usermessage')),
+            ],
+            options={
+                'verbose_name': 'Message Outbox Event',
+                'verbose_name_plural': 'Message Outbox Events',
+                'ordering': ['event_id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='user_messag_status_623dc0_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 from users.models import User
 from bookings.models import Booking
@@ -55,6 +56,10 @@ class UserMessage(models.Model):
         ordering = ['-timestamp']
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
+        indexes = [
+            # Keyset pagination of a conversation's history by (timestamp, message_id)
+            models.Index(fields=['conversation', 'timestamp', 'message_id']),
+        ]
 
     def __str__(self):
         return f'Message from {self.sender} at {self.timestamp}'
@@ -90,3 +95,117 @@ class MessageMetrics(models.Model):
         
     def __str__(self):
         return f'Metric for message {self.message_id} - {self.delivery_status}'
+
+
+class UnreadMessageCounter(models.Model):
+    """
+    Number of unread messages a user has in a conversation, i.e. messages from
+    the other participant still in 'sent' status. Maintained incrementally by
+    user_messages/unread_counts.py so unread totals are a single lookup.
+    """
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='unread_message_counters')
+    conversation = models.ForeignKey('conversations.Conversation', on_delete=models.CASCADE, related_name='unread_counters')
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'conversation')
+        verbose_name = 'Unread Message Counter'
+        verbose_name_plural = 'Unread Message Counters'
+
+    def __str__(self):
+        return f'{self.unread_count} unread for {self.user} in conversation {self.conversation_id}'
+
+
+class ScheduledEmailJob(models.Model):
+    """
+    An email to send at or after run_at, processed by the process_email_jobs
+    worker (see user_messages/email_jobs.py). Jobs sharing a coalesce_key are
+    handled together, e.g. unread message notifications for one recipient are
+    sent as a single digest.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    JOB_TYPE_CHOICES = [
+        ('message_notification', 'Message Notification'), # Unread message email, coalesced per recipient
+        ('booking_confirmation', 'Booking Confirmation'), # Booking confirmation email to both participants
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    job_type = models.CharField(max_length=30, choices=JOB_TYPE_CHOICES)
+    payload = models.JSONField(default=dict)
+    coalesce_key = models.CharField(max_length=100, blank=True, default='')
+    run_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = 'Scheduled Email Job'
+        verbose_name_plural = 'Scheduled Email Jobs'
+        indexes = [
+            # Due job polling
+            models.Index(fields=['status', 'run_at']),
+            # Pulling in the rest of a coalesced group
+            models.Index(fields=['coalesce_key', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.job_type} job {self.job_id} ({self.status})'
+
+
+class MessageOutboxEvent(models.Model):
+    """
+    A side effect of a message change, written in the same transaction as the
+    message and delivered afterwards by the dispatch_message_outbox worker
+    (see user_messages/outbox.py). Delivery is at-least-once: an event stays
+    pending until its websocket notifications were sent and its metrics and
+    email job were recorded.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    EVENT_TYPE_CHOICES = [
+        ('message_created', 'Message Created'), # Notify the recipient, push unread counts, queue the email
+    ]
+
+    event_id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPE_CHOICES)
+    message = models.ForeignKey(UserMessage, on_delete=models.CASCADE, related_name='outbox_events')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['event_id']
+        verbose_name = 'Message Outbox Event'
+        verbose_name_plural = 'Message Outbox Events'
+        indexes = [
+            # Dispatcher polling
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} event {self.event_id} ({self.status})'
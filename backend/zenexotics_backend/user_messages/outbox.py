@@ -0,0 +1,259 @@
+"""
+Transactional outbox for message side effects.
+
+Saving a UserMessage only inserts a MessageOutboxEvent in the same transaction
+(see signals.py), so sending a message costs two inserts and nothing happens
+for messages whose transaction rolls back. The dispatch_message_outbox
+worker drains the outbox in batches:
+
+1. claim pending events (skip-locked, so several dispatchers can run)
+2. load their messages, recipients, presence and unread counts in bulk
+3. send the websocket message notifications and one unread update per
+   recipient concurrently
+4. in one transaction, write MessageMetrics, queue the unread-message emails
+   and mark the events delivered
+
+Delivery is at-least-once: an event whose sends fail is retried with backoff,
+and an event claimed by a dispatcher that died is reclaimed after
+STALE_LOCK_TIMEOUT, so clients may occasionally see a notification twice.
+
+In development the channel layer is in-memory, so a separate dispatcher
+process could not reach any websocket; with MESSAGE_OUTBOX_DISPATCH_ON_COMMIT
+the web process dispatches right after the message transaction commits.
+"""
+import asyncio
+from datetime import timedelta
+import logging
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .email_jobs import get_retry_delay, schedule_message_notification
+from .models import MessageOutboxEvent, MessageMetrics, UserMessage
+from .presence import get_online_user_ids
+from .unread_counts import get_unread_counts
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 100
+
+# Websocket sends in flight at once
+SEND_CONCURRENCY = 20
+
+# An event left 'processing' this long belongs to a dispatcher that died
+STALE_LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+def record_message_created(message):
+    """Add the side effects of a new message to the outbox (call inside its transaction)."""
+    event = MessageOutboxEvent.objects.create(event_type='message_created', message=message)
+    if getattr(settings, 'MESSAGE_OUTBOX_DISPATCH_ON_COMMIT', False):
+        transaction.on_commit(dispatch_pending_events)
+    return event
+
+
+def claim_pending_events(batch_size=DISPATCH_BATCH_SIZE, now=None):
+    """Lock up to batch_size available events and mark them processing."""
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            MessageOutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending', available_at__lte=now)
+                | Q(status='processing', locked_at__lt=now - STALE_LOCK_TIMEOUT)
+            ).order_by('event_id')[:batch_size]
+        )
+        MessageOutboxEvent.objects.filter(
+            event_id__in=[event.event_id for event in events]
+        ).update(status='processing', locked_at=now)
+
+    return events
+
+
+def build_message_notification(message, recipient_user):
+    """The websocket payload announcing message to recipient_user."""
+    conversation = message.conversation
+
+    # The conversation is professional for the recipient if their role is 'professional'
+    role_map = conversation.role_map or {}
+    is_professional = role_map.get(str(recipient_user.id)) == 'professional'
+
+    return {
+        'message_id': message.message_id,
+        'content': message.content,
+        'conversation_id': conversation.conversation_id,
+        'sender_id': message.sender_id,
+        'sender_name': message.sender.name,
+        'timestamp': message.timestamp.isoformat(),
+        'status': message.status,
+        'type_of_message': message.type_of_message,
+        'is_clickable': message.is_clickable,
+        'metadata': message.metadata,
+        'sent_by_other_user': True,  # From recipient's perspective, this is sent by the other user
+        'is_professional': is_professional  # Include is_professional flag for the recipient
+    }
+
+
+def load_deliveries(events):
+    """
+    Resolve claimed events into deliveries, keyed by event_id:
+    {'message', 'recipient', 'is_online', 'notification'}, plus the unread
+    counts to push per recipient id. Events whose message is gone are omitted.
+    """
+    messages = UserMessage.objects.select_related(
+        'sender', 'conversation__participant1', 'conversation__participant2'
+    ).in_bulk([event.message_id for event in events])
+
+    deliveries = {}
+    for event in events:
+        message = messages.get(event.message_id)
+        if message is None:
+            continue
+        conversation = message.conversation
+        recipient = conversation.participant2 if conversation.participant1_id == message.sender_id else conversation.participant1
+        deliveries[event.event_id] = {
+            'message': message,
+            'recipient': recipient,
+            'notification': build_message_notification(message, recipient),
+        }
+
+    recipient_ids = {delivery['recipient'].id for delivery in deliveries.values()}
+    online_user_ids = get_online_user_ids(recipient_ids)
+    for delivery in deliveries.values():
+        delivery['is_online'] = delivery['recipient'].id in online_user_ids
+
+    # Counts are read now rather than per message, so one update per recipient
+    # reflects every message in the batch
+    unread_counts = {recipient_id: get_unread_counts(recipient_id) for recipient_id in recipient_ids}
+    return deliveries, unread_counts
+
+
+async def send_deliveries(deliveries, unread_counts, concurrency=SEND_CONCURRENCY):
+    """Send notifications and unread updates. Returns {event_id: error} for failed events."""
+    channel_layer = get_channel_layer()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(user_id, event_type, data):
+        async with semaphore:
+            try:
+                await channel_layer.group_send(f"user_{user_id}_notifications", {"type": event_type, "data": data})
+            except Exception as e:
+                logger.error(f"Error sending {event_type} to user {user_id}: {str(e)}")
+                return e
+
+    event_ids = list(deliveries)
+    results = await asyncio.gather(*(
+        send(deliveries[event_id]['recipient'].id, 'message_notification', deliveries[event_id]['notification'])
+        for event_id in event_ids
+    ))
+    recipient_ids = list(unread_counts)
+    unread_results = await asyncio.gather(*(
+        send(recipient_id, 'unread_update', unread_counts[recipient_id]) for recipient_id in recipient_ids
+    ))
+
+    errors = {event_id: error for event_id, error in zip(event_ids, results) if error}
+    failed_recipients = {recipient_id: error for recipient_id, error in zip(recipient_ids, unread_results) if error}
+    for event_id in event_ids:
+        recipient_id = deliveries[event_id]['recipient'].id
+        if event_id not in errors and recipient_id in failed_recipients:
+            errors[event_id] = failed_recipients[recipient_id]
+    return errors
+
+
+def complete_events(events, deliveries, errors):
+    """
+    Record the outcome of a dispatched batch in one transaction.
+    Returns {'delivered': n, 'retried': n, 'failed': n}.
+    """
+    now = timezone.now()
+    results = {'delivered': 0, 'retried': 0, 'failed': 0}
+    metrics = []
+
+    with transaction.atomic():
+        for event in events:
+            delivery = deliveries.get(event.event_id)
+            error = errors.get(event.event_id)
+            event.locked_at = None
+
+            if error is not None:
+                event.attempts += 1
+                event.last_error = str(error)
+                if event.attempts < event.max_attempts:
+                    event.status = 'pending'
+                    event.available_at = now + get_retry_delay(event.attempts)
+                    results['retried'] += 1
+                    continue
+                event.status = 'failed'
+            else:
+                event.status = 'delivered'
+            event.delivered_at = now
+            results[event.status] += 1
+
+            if delivery is None:
+                continue
+            message = delivery['message']
+            if error is None:
+                metrics.append(MessageMetrics(
+                    message=message,
+                    recipient=delivery['recipient'],
+                    delivery_status='websocket_sent',
+                    delivery_latency=(now - message.timestamp).total_seconds() * 1000,  # in milliseconds
+                    is_recipient_online=delivery['is_online']
+                ))
+            else:
+                metrics.append(MessageMetrics(
+                    message=message,
+                    recipient=delivery['recipient'],
+                    delivery_status='failed',
+                    is_recipient_online=delivery['is_online'],
+                    client_info={'error': str(error), 'type': 'websocket'}
+                ))
+
+            # Queue the delayed email notification; the process_email_jobs
+            # worker sends it if the message is still unread
+            schedule_message_notification(message, delivery['recipient'])
+
+        MessageMetrics.objects.bulk_create(metrics)
+        MessageOutboxEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'last_error', 'available_at', 'locked_at', 'delivered_at']
+        )
+
+    return results
+
+
+async def dispatch_batch(batch_size=DISPATCH_BATCH_SIZE, concurrency=SEND_CONCURRENCY):
+    """Claim and deliver one batch of outbox events."""
+    events = await sync_to_async(claim_pending_events)(batch_size)
+    if not events:
+        return {'delivered': 0, 'retried': 0, 'failed': 0}
+
+    deliveries, unread_counts = await sync_to_async(load_deliveries)(events)
+    errors = await send_deliveries(deliveries, unread_counts, concurrency)
+    return await sync_to_async(complete_events)(events, deliveries, errors)
+
+
+def dispatch_pending_events(batch_size=DISPATCH_BATCH_SIZE):
+    """Deliver one batch from synchronous code (on_commit hook, tests)."""
+    try:
+        return async_to_sync(dispatch_batch)(batch_size)
+    except Exception as e:
+        # Events stay in the outbox and are picked up again once their lock is stale
+        logger.error(f"Error dispatching message outbox: {str(e)}")
+        logger.exception("Full exception details:")
+
+
+async def run_dispatcher(batch_size=DISPATCH_BATCH_SIZE, poll_interval=0.5, once=False):
+    """Dispatch batches until interrupted, sleeping poll_interval seconds when idle."""
+    while True:
+        await sync_to_async(close_old_connections)()
+        results = await dispatch_batch(batch_size)
+        if any(results.values()):
+            logger.info(f"Dispatched message outbox events: {results}")
+        if once:
+            return results
+        if not any(results.values()):
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,276 @@
+"""
+Presence registry for websocket connections.
+
+Each open websocket is registered as a connection of its user with an expiry
+time; heartbeats push the expiry forward, so a worker that dies without
+running disconnect() only keeps its users online until their connections
+time out. A user is online while at least one connection has not expired.
+
+Adding and removing a connection is atomic and reports whether the user
+went online/offline, so exactly one worker broadcasts each transition even
+when the user's connections live on different workers.
+
+The backend is chosen with settings.PRESENCE_BACKEND (dotted path):
+
+- RedisPresenceBackend: shared by every worker, used in production
+- SQLitePresenceBackend: shared through a local SQLite file, for multi-process
+  development and tests without Redis
+- InMemoryPresenceBackend: single process only
+"""
+from contextlib import contextmanager
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_PRESENCE_BACKEND = 'user_messages.presence.InMemoryPresenceBackend'
+
+# How long a connection counts as alive without a heartbeat
+CONNECTION_TTL_SECONDS = 300
+
+
+class PresenceBackend:
+    """Base class for presence backends."""
+
+    def add_connection(self, user_id, connection_id, ttl=CONNECTION_TTL_SECONDS):
+        """
+        Register (or refresh) a connection for ttl seconds.
+        Returns True if the user was offline before this call.
+        """
+        raise NotImplementedError
+
+    def remove_connection(self, user_id, connection_id):
+        """
+        Remove a connection. Returns True if the user is now offline and was
+        online (through this or an expired connection) before the call.
+        """
+        raise NotImplementedError
+
+    def online_user_ids(self, user_ids):
+        """Return the subset of user_ids that are online."""
+        raise NotImplementedError
+
+    def is_online(self, user_id):
+        return user_id in self.online_user_ids([user_id])
+
+
+class InMemoryPresenceBackend(PresenceBackend):
+    """Presence kept in this process only; fine for a single worker and tests."""
+
+    def __init__(self):
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, user_id, now):
+        connections = self._connections.get(user_id, {})
+        expired = [connection_id for connection_id, expires_at in connections.items() if expires_at <= now]
+        for connection_id in expired:
+            del connections[connection_id]
+        return len(expired)
+
+    def add_connection(self, user_id, connection_id, ttl=CONNECTION_TTL_SECONDS):
+        now = time.time()
+        with self._lock:
+            self._prune(user_id, now)
+            connections = self._connections.setdefault(user_id, {})
+            was_offline = not connections
+            connections[connection_id] = now + ttl
+            return was_offline
+
+    def remove_connection(self, user_id, connection_id):
+        now = time.time()
+        with self._lock:
+            expired = self._prune(user_id, now)
+            connections = self._connections.get(user_id, {})
+            removed = connections.pop(connection_id, None) is not None
+            if connections:
+                return False
+            self._connections.pop(user_id, None)
+            return removed or expired > 0
+
+    def online_user_ids(self, user_ids):
+        now = time.time()
+        with self._lock:
+            return {
+                user_id for user_id in user_ids
+                if any(expires_at > now for expires_at in self._connections.get(user_id, {}).values())
+            }
+
+
+class SQLitePresenceBackend(PresenceBackend):
+    """
+    Presence shared by every process on this machine through a SQLite file
+    (settings.PRESENCE_SQLITE_PATH). Each operation runs in an immediate
+    transaction, which serializes writers across processes.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = getattr(
+                settings, 'PRESENCE_SQLITE_PATH',
+                os.path.join(tempfile.gettempdir(), 'crittrcove_presence.sqlite3')
+            )
+        self.path = path
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS presence_connections ('
+                ' user_id INTEGER NOT NULL,'
+                ' connection_id TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL,'
+                ' PRIMARY KEY (user_id, connection_id))'
+            )
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _prune(self, conn, user_id, now):
+        return conn.execute(
+            'DELETE FROM presence_connections WHERE user_id = ? AND expires_at <= ?', (user_id, now)
+        ).rowcount
+
+    def _count(self, conn, user_id):
+        return conn.execute(
+            'SELECT COUNT(*) FROM presence_connections WHERE user_id = ?', (user_id,)
+        ).fetchone()[0]
+
+    def add_connection(self, user_id, connection_id, ttl=CONNECTION_TTL_SECONDS):
+        now = time.time()
+        with self._transaction() as conn:
+            self._prune(conn, user_id, now)
+            was_offline = self._count(conn, user_id) == 0
+            conn.execute(
+                'INSERT OR REPLACE INTO presence_connections (user_id, connection_id, expires_at) VALUES (?, ?, ?)',
+                (user_id, connection_id, now + ttl)
+            )
+            return was_offline
+
+    def remove_connection(self, user_id, connection_id):
+        now = time.time()
+        with self._transaction() as conn:
+            expired = self._prune(conn, user_id, now)
+            removed = conn.execute(
+                'DELETE FROM presence_connections WHERE user_id = ? AND connection_id = ?', (user_id, connection_id)
+            ).rowcount
+            return self._count(conn, user_id) == 0 and (removed + expired) > 0
+
+    def online_user_ids(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        placeholders = ', '.join('?' * len(user_ids))
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            rows = conn.execute(
+                f'SELECT DISTINCT user_id FROM presence_connections WHERE user_id IN ({placeholders}) AND expires_at > ?',
+                (*user_ids, time.time())
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+
+
+class RedisPresenceBackend(PresenceBackend):
+    """
+    Presence in Redis (settings.PRESENCE_REDIS_URL, defaulting to REDIS_URL).
+    Each user has a sorted set of connection ids scored by expiry time;
+    add/remove run as Lua scripts so the online/offline transition is decided
+    atomically.
+    """
+
+    key_prefix = 'presence:user:'
+
+    # KEYS[1] user key; ARGV now, expires_at, connection_id, key ttl.
+    # Returns the number of live connections before the add.
+    ADD_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+        local before = redis.call('ZCARD', KEYS[1])
+        redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+        redis.call('EXPIRE', KEYS[1], ARGV[4])
+        return before
+    """
+
+    # KEYS[1] user key; ARGV now, connection_id.
+    # Returns {expired + removed, remaining}.
+    REMOVE_SCRIPT = """
+        local expired = redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+        local removed = redis.call('ZREM', KEYS[1], ARGV[2])
+        local remaining = redis.call('ZCARD', KEYS[1])
+        return {expired + removed, remaining}
+    """
+
+    def __init__(self, url=None):
+        import redis
+
+        if url is None:
+            url = getattr(settings, 'PRESENCE_REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+        self.client = redis.Redis.from_url(url)
+        self._add = self.client.register_script(self.ADD_SCRIPT)
+        self._remove = self.client.register_script(self.REMOVE_SCRIPT)
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}{user_id}'
+
+    def add_connection(self, user_id, connection_id, ttl=CONNECTION_TTL_SECONDS):
+        now = time.time()
+        before = self._add(keys=[self._key(user_id)], args=[now, now + ttl, connection_id, int(ttl) + 1])
+        return int(before) == 0
+
+    def remove_connection(self, user_id, connection_id):
+        gone, remaining = self._remove(keys=[self._key(user_id)], args=[time.time(), connection_id])
+        return int(remaining) == 0 and int(gone) > 0
+
+    def online_user_ids(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        now = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipeline.zcount(self._key(user_id), f'({now}', '+inf')
+        return {user_id for user_id, count in zip(user_ids, pipeline.execute()) if count}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_presence_backend() -> PresenceBackend:
+    """Return the process-wide backend for settings.PRESENCE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_path = getattr(settings, 'PRESENCE_BACKEND', DEFAULT_PRESENCE_BACKEND)
+                _backend = import_string(backend_path)()
+    return _backend
+
+
+def reset_presence_backend():
+    """Drop the process-wide backend so the next call re-reads settings (used by tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def is_user_online(user_id):
+    return get_presence_backend().is_online(user_id)
+
+
+def get_online_user_ids(user_ids):
+    """Which of these users are online, in one backend round trip."""
+    return get_presence_backend().online_user_ids(user_ids)
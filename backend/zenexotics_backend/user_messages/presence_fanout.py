@@ -0,0 +1,134 @@
+"""
+Debounced, batched delivery of presence changes to conversation partners.
+
+The consumer reports online/offline transitions (as decided by the presence
+registry) with PresenceFanout.schedule(), which returns immediately. Changes
+are collected for settings.PRESENCE_FANOUT_WINDOW seconds and then flushed
+together:
+
+- each user's current state is re-read from the registry in one bulk call,
+  and users who flapped back to the state they had before the window are
+  skipped, so a reconnecting mobile client causes no traffic at all
+- conversation partners of every changed user are loaded with one query and
+  deduplicated, so two conversations with the same person give one update
+- updates are sent with group_send, at most settings.PRESENCE_FANOUT_CONCURRENCY
+  at a time
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import Q
+
+from conversations.models import Conversation
+from .presence import get_online_user_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FANOUT_WINDOW = 2.0
+DEFAULT_FANOUT_CONCURRENCY = 20
+
+
+def get_conversation_partner_ids(user_ids):
+    """Return {user_id: set of user ids they share a conversation with} in one query."""
+    user_ids = set(user_ids)
+    partners = {user_id: set() for user_id in user_ids}
+    rows = Conversation.objects.filter(
+        Q(participant1_id__in=user_ids) | Q(participant2_id__in=user_ids)
+    ).values_list('participant1_id', 'participant2_id')
+    for participant1_id, participant2_id in rows:
+        if participant1_id in partners:
+            partners[participant1_id].add(participant2_id)
+        if participant2_id in partners:
+            partners[participant2_id].add(participant1_id)
+    return partners
+
+
+class PresenceFanout:
+    """Collects presence transitions in this process and fans them out in batches."""
+
+    def __init__(self, window=None, concurrency=None):
+        self.window = window if window is not None else getattr(settings, 'PRESENCE_FANOUT_WINDOW', DEFAULT_FANOUT_WINDOW)
+        self.concurrency = concurrency or getattr(settings, 'PRESENCE_FANOUT_CONCURRENCY', DEFAULT_FANOUT_CONCURRENCY)
+        # user_id -> online state before the first transition seen in this window
+        self._pending = {}
+        self._flush_task = None
+
+    def schedule(self, user_id, is_online):
+        """Record that user_id went online/offline; must be called from the event loop."""
+        self._pending.setdefault(user_id, not is_online)
+        loop = asyncio.get_running_loop()
+        if self._flush_task is None or self._flush_task.done() or self._flush_task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        # Transitions arriving while this batch is sent start the next window
+        self._flush_task = None
+        await self.flush()
+
+    def _resolve_changes(self, pending):
+        online_user_ids = get_online_user_ids(pending.keys())
+        changes = {
+            user_id: user_id in online_user_ids
+            for user_id, was_online in pending.items()
+            if (user_id in online_user_ids) != was_online
+        }
+        if not changes:
+            return changes, {}
+        return changes, get_conversation_partner_ids(changes.keys())
+
+    async def flush(self):
+        """Send every pending change now. Returns the number of updates sent."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        changes, partners = await database_sync_to_async(self._resolve_changes)(pending)
+        updates = [
+            (recipient_id, user_id, is_online)
+            for user_id, is_online in changes.items()
+            for recipient_id in partners.get(user_id, ())
+        ]
+        if not updates:
+            return 0
+
+        channel_layer = get_channel_layer()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(recipient_id, user_id, is_online):
+            async with semaphore:
+                try:
+                    await channel_layer.group_send(
+                        f"user_{recipient_id}_notifications",
+                        {
+                            "type": "user_status_update",
+                            "user_id": user_id,
+                            "is_online": is_online
+                        }
+                    )
+                except Exception as e:
+                    logger.error(f"Error sending status update for user {user_id} to user {recipient_id}: {str(e)}")
+
+        await asyncio.gather(*(send(*update) for update in updates))
+        logger.debug(f"Sent {len(updates)} presence updates for {len(changes)} users")
+        return len(updates)
+
+
+_fanout = None
+
+
+def get_presence_fanout() -> PresenceFanout:
+    """Return this process's fan-out stage."""
+    global _fanout
+    if _fanout is None:
+        _fanout = PresenceFanout()
+    return _fanout
+
+
+def reset_presence_fanout():
+    """Drop the process-wide fan-out stage so the next call re-reads settings (used by tests)."""
+    global _fanout
+    _fanout = None
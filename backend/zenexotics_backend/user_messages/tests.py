@@ -1,3 +1,686 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, time, timedelta
+import multiprocessing
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection, transaction
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+from booking_drafts.models import BookingDraft
+from booking_occurrences.models import BookingOccurrence
+from bookings.models import Booking
+from conversations.inbox import get_inbox_entries
+from conversations.models import Conversation
+from core.api_test_helpers import QueryCountTestMixin
+from professionals.models import Professional
+from user_messages import email_jobs, outbox, presence, presence_fanout
+from user_messages.models import UserMessage, UnreadMessageCounter, ScheduledEmailJob, MessageMetrics, MessageOutboxEvent
+from user_messages.unread_counts import decrement_unread, get_unread_counts, rebuild_unread_counts
+
+User = get_user_model()
+
+
+class UnreadMessageCounterTests(QueryCountTestMixin, APITestCase):
+    """Unread counts come from counters maintained as messages are sent and read."""
+
+    url = '/api/messages/v1/unread-count/'
+
+    def setUp(self):
+        self.user = self.create_user()
+
+    def send(self, conversation, sender, count=1):
+        for _ in range(count):
+            UserMessage.objects.create(conversation=conversation, sender=sender, content='Hello')
+
+    def create_conversations_with_messages(self, count):
+        for conversation in self.create_conversations(count):
+            self.send(conversation, conversation.participant1)
+
+    def test_messages_from_other_participant_are_counted(self):
+        first, second = self.create_conversations(2)
+        self.send(first, first.participant1, count=3)
+        self.send(second, second.participant1)
+        self.send(second, self.user)
+
+        data, _ = self.fetch()
+
+        self.assertEqual(data, {
+            'unread_count': 4,
+            'unread_conversations': 2,
+            'conversation_counts': {str(first.conversation_id): 3, str(second.conversation_id): 1}
+        })
+        self.assertEqual(get_unread_counts(first.participant1_id)['unread_count'], 0)
+
+    def test_endpoint_query_count_is_constant(self):
+        data = self.assertQueryCountIsConstant(self.create_conversations_with_messages)
+        self.assertEqual(data['unread_conversations'], 12)
+
+    def test_new_message_push_query_count_is_constant(self):
+        conversations = self.create_conversations(12)
+        for conversation in conversations[:2]:
+            self.send(conversation, conversation.participant1)
+        outbox.dispatch_pending_events()
+
+        self.send(conversations[0], conversations[0].participant1)
+        with CaptureQueriesContext(connection) as small:
+            outbox.dispatch_pending_events()
+
+        for conversation in conversations[2:]:
+            self.send(conversation, conversation.participant1)
+        outbox.dispatch_pending_events()
+
+        self.send(conversations[0], conversations[0].participant1)
+        with CaptureQueriesContext(connection) as large:
+            outbox.dispatch_pending_events()
+
+        self.assertEqual(len(small), len(large))
+
+    def test_reading_conversation_resets_counter(self):
+        conversation, other = self.create_conversations(2)
+        self.send(conversation, conversation.participant1, count=2)
+        self.send(other, other.participant1)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.get(f'/api/messages/v1/conversation/{conversation.conversation_id}/')
+
+        data, _ = self.fetch()
+        self.assertEqual(data['conversation_counts'], {str(other.conversation_id): 1})
+
+    def test_message_sent_while_reading_stays_unread(self):
+        conversation, = self.create_conversations(1)
+        self.send(conversation, conversation.participant1, count=2)
+
+        read_count = UserMessage.objects.filter(conversation=conversation, status='sent').update(status='read')
+        # A message arrives between marking messages read and updating the counter
+        self.send(conversation, conversation.participant1)
+        decrement_unread(self.user.id, conversation.conversation_id, read_count)
+
+        self.assertEqual(get_unread_counts(self.user.id)['unread_count'], 1)
+        inbox_entry, = get_inbox_entries(self.user.id)
+        self.assertEqual(inbox_entry['unread_count'], 1)
+
+    def test_deleting_unread_message_decrements(self):
+        conversation, = self.create_conversations(1)
+        self.send(conversation, conversation.participant1, count=2)
+
+        UserMessage.objects.filter(conversation=conversation).first().delete()
+
+        self.assertEqual(get_unread_counts(self.user.id)['unread_count'], 1)
+
+    def test_rebuild_matches_incremental_counters(self):
+        first, second = self.create_conversations(2)
+        self.send(first, first.participant1, count=2)
+        self.send(first, self.user, count=3)
+        self.send(second, second.participant1)
+        expected = {
+            user.id: get_unread_counts(user.id)
+            for user in [self.user, first.participant1, second.participant1]
+        }
+
+        UnreadMessageCounter.objects.all().delete()
+        rebuild_unread_counts(user_ids=[first.participant1_id])
+        self.assertEqual(get_unread_counts(first.participant1_id), expected[first.participant1_id])
+        self.assertEqual(get_unread_counts(self.user.id)['unread_count'], 0)
+
+        self.assertEqual(rebuild_unread_counts(), 3)
+        for user_id, counts in expected.items():
+            self.assertEqual(get_unread_counts(user_id), counts)
+
+
+class ConversationMessagesQueryCountTests(APITestCase):
+    """Loading a page of messages costs the same number of queries whatever it contains."""
+
+    def setUp(self):
+        self.professional_user = User.objects.create_user(
+            email='pro@example.com', password='testpass123', name='Test Pro'
+        )
+        self.professional = Professional.objects.create(user=self.professional_user)
+        self.client_user = User.objects.create_user(
+            email='client@example.com', password='testpass123', name='Test Client'
+        )
+        self.conversation = Conversation.objects.create(
+            participant1=self.client_user,
+            participant2=self.professional_user,
+            role_map={str(self.client_user.id): 'client', str(self.professional_user.id): 'professional'}
+        )
+        BookingDraft.objects.create(
+            draft_data={'client_id': self.client_user.client_profile.id, 'professional_id': self.professional.professional_id},
+            last_modified_by='PROFESSIONAL',
+            status='IN_PROGRESS'
+        )
+
+    def send_booking_requests(self, count):
+        for _ in range(count):
+            booking = Booking.objects.create(
+                client=self.client_user.client_profile,
+                professional=self.professional,
+                status='Pending initial Professional Changes'
+            )
+            for day in range(3):
+                BookingOccurrence.objects.create(
+                    booking=booking,
+                    start_date=date(2025, 1, 1) + timedelta(days=day),
+                    end_date=date(2025, 1, 1) + timedelta(days=day),
+                    start_time=time(9, 0),
+                    end_time=time(10, 0),
+                    created_by='CLIENT',
+                    last_modified_by='CLIENT'
+                )
+            UserMessage.objects.create(
+                conversation=self.conversation,
+                sender=self.client_user,
+                content='Booking request',
+                type_of_message='initial_booking_request',
+                metadata={'booking_id': booking.booking_id}
+            )
+            UserMessage.objects.create(conversation=self.conversation, sender=self.client_user, content='Hello')
+
+    def fetch_page(self, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/messages/v1/conversation/{self.conversation.conversation_id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_is_constant(self):
+        self.send_booking_requests(2)
+        small_data, small_queries = self.fetch_page(self.professional_user)
+
+        self.send_booking_requests(8)
+        large_data, large_queries = self.fetch_page(self.professional_user)
+
+        booking_messages = [m for m in large_data['messages'] if m['type_of_message'] == 'initial_booking_request']
+        self.assertEqual(len(booking_messages), 10)
+        self.assertEqual(len(booking_messages[0]['metadata']['occurrences']), 3)
+        self.assertTrue(large_data['has_draft'])
+        # Conversation, messages, bookings, occurrences, time settings, mark read,
+        # unread counter decrement, professional ids, client ids, draft
+        self.assertEqual(small_queries, 10)
+        self.assertEqual(large_queries, 10)
+
+    def test_client_sees_draft(self):
+        self.send_booking_requests(1)
+        data, _ = self.fetch_page(self.client_user)
+
+        self.assertTrue(data['has_draft'])
+        self.assertEqual(len(data['messages']), 2)
+
+
+class MessageKeysetPaginationTests(APITestCase):
+    """Cursor pagination walks the whole history exactly once in either direction."""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(email='sender@example.com', password='testpass123', name='Sender')
+        self.reader = User.objects.create_user(email='reader@example.com', password='testpass123', name='Reader')
+        self.conversation = Conversation.objects.create(
+            participant1=self.sender,
+            participant2=self.reader,
+            role_map={}
+        )
+        self.client.force_authenticate(user=self.reader)
+
+    def send(self, count):
+        return [
+            UserMessage.objects.create(conversation=self.conversation, sender=self.sender, content=f'Message {i}').message_id
+            for i in range(count)
+        ]
+
+    def fetch(self, **params):
+        response = self.client.get(f'/api/messages/v1/conversation/{self.conversation.conversation_id}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_scrollback_with_cursor(self):
+        message_ids = self.send(25)
+        # Shared timestamps must not make pages skip or repeat messages
+        UserMessage.objects.filter(message_id__in=message_ids[5:15]).update(
+            timestamp=UserMessage.objects.get(message_id=message_ids[5]).timestamp
+        )
+
+        pages = [self.fetch(page_size=10)]
+        while pages[-1]['has_more']:
+            pages.append(self.fetch(page_size=10, before=pages[-1]['next_cursor']))
+
+        self.assertEqual([len(page['messages']) for page in pages], [10, 10, 5])
+        seen = [message['message_id'] for page in pages for message in page['messages']]
+        self.assertEqual(seen, sorted(message_ids, reverse=True))
+
+    def test_has_more_is_exact(self):
+        self.send(20)
+        data = self.fetch()
+
+        self.assertEqual(len(data['messages']), 20)
+        self.assertFalse(data['has_more'])
+
+    def test_fetch_newer_than_cursor(self):
+        self.send(5)
+        newest_cursor = self.fetch()['newest_cursor']
+
+        new_ids = self.send(3)
+        data = self.fetch(after=newest_cursor, page_size=2)
+        self.assertEqual([message['message_id'] for message in data['messages']], new_ids[:2])
+        self.assertTrue(data['has_more'])
+
+        data = self.fetch(after=data['newest_cursor'], page_size=2)
+        self.assertEqual([message['message_id'] for message in data['messages']], new_ids[2:])
+        self.assertFalse(data['has_more'])
+
+        data = self.fetch(after=data['newest_cursor'])
+        self.assertEqual(data['messages'], [])
+        self.assertIsNotNone(data['newest_cursor'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            f'/api/messages/v1/conversation/{self.conversation.conversation_id}/', {'before': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class EmailJobQueueTests(APITestCase):
+    """Message emails are queued in the database and sent by the worker."""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(email='sender@example.com', password='testpass123', name='Sender')
+        self.recipient = User.objects.create_user(email='recipient@example.com', password='testpass123', name='Recipient')
+        self.conversation = Conversation.objects.create(
+            participant1=self.sender,
+            participant2=self.recipient,
+            role_map={}
+        )
+
+    def send(self, count):
+        messages = [
+            UserMessage.objects.create(conversation=self.conversation, sender=self.sender, content=f'Message {i}')
+            for i in range(count)
+        ]
+        outbox.dispatch_pending_events()
+        return messages
+
+    def make_due(self):
+        ScheduledEmailJob.objects.filter(status='pending').update(run_at=timezone.now())
+
+    def test_messages_are_queued_without_threads(self):
+        # The first dispatch may start asgiref's long-lived executor thread
+        self.send(1)
+        threads_before = threading.active_count()
+        self.send(29)
+
+        self.assertEqual(threading.active_count(), threads_before)
+        self.assertEqual(
+            ScheduledEmailJob.objects.filter(
+                status='pending',
+                coalesce_key=f'message_notification:{self.recipient.id}'
+            ).count(),
+            30
+        )
+        # Not due yet
+        self.assertEqual(email_jobs.process_due_jobs()['sent'], 0)
+
+    def test_unread_messages_are_coalesced_into_one_digest(self):
+        self.send(3)
+        self.make_due()
+
+        results = email_jobs.process_due_jobs()
+
+        self.assertEqual(results['sent'], 3)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.recipient.email])
+        self.assertIn('3 new messages', mail.outbox[0].subject)
+        self.assertFalse(ScheduledEmailJob.objects.exclude(status='sent').exists())
+
+    def test_jobs_not_yet_due_are_not_coalesced(self):
+        self.send(2)
+        first_job, backing_off = ScheduledEmailJob.objects.order_by('job_id')
+        ScheduledEmailJob.objects.filter(job_id=first_job.job_id).update(run_at=timezone.now())
+        ScheduledEmailJob.objects.filter(job_id=backing_off.job_id).update(
+            run_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertEqual(email_jobs.process_due_jobs()['sent'], 1)
+        backing_off.refresh_from_db()
+        self.assertEqual(backing_off.status, 'pending')
+
+    def test_single_message_email(self):
+        self.send(1)
+        self.make_due()
+
+        email_jobs.process_due_jobs()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Message from Sender on CrittrCove')
+
+    def test_read_messages_are_skipped(self):
+        self.send(2)
+        UserMessage.objects.update(status='read')
+        self.make_due()
+
+        results = email_jobs.process_due_jobs()
+
+        self.assertEqual(results['skipped'], 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.send(1)
+        self.make_due()
+        job = ScheduledEmailJob.objects.get()
+
+        with mock.patch('user_messages.email_jobs.send_email_with_retry', return_value=False):
+            for attempt in range(1, job.max_attempts + 1):
+                before = timezone.now()
+                results = email_jobs.process_due_jobs()
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                if attempt < job.max_attempts:
+                    self.assertEqual(results['retried'], 1)
+                    self.assertEqual(job.status, 'pending')
+                    self.assertGreaterEqual(job.run_at, before + email_jobs.get_retry_delay(attempt))
+                    self.make_due()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(results['failed'], 1)
+        # Recorded once for the job, not once per attempt
+        self.assertEqual(MessageMetrics.objects.filter(delivery_status='failed').count(), 1)
+
+    def test_stale_processing_jobs_are_reclaimed(self):
+        self.send(1)
+        ScheduledEmailJob.objects.update(
+            status='processing',
+            locked_at=timezone.now() - email_jobs.STALE_LOCK_TIMEOUT - timedelta(minutes=1),
+            run_at=timezone.now()
+        )
+
+        self.assertEqual(email_jobs.process_due_jobs()['sent'], 1)
+
+
+def _connect_in_worker(path, connection_id, user_ids, results):
+    """Runs in a separate process: register a connection for each user."""
+    backend = presence.SQLitePresenceBackend(path)
+    results.put([(user_id, backend.add_connection(user_id, connection_id)) for user_id in user_ids])
+
+
+def _disconnect_in_worker(path, connection_id, user_ids, results):
+    backend = presence.SQLitePresenceBackend(path)
+    results.put([(user_id, backend.remove_connection(user_id, connection_id)) for user_id in user_ids])
+
+
+class PresenceRegistryTests(SimpleTestCase):
+    """Presence is tracked per connection and reports online/offline transitions once."""
+
+    def test_user_goes_offline_with_last_connection(self):
+        backend = presence.InMemoryPresenceBackend()
+
+        self.assertTrue(backend.add_connection(1, 'tab-1'))
+        self.assertFalse(backend.add_connection(1, 'tab-2'))
+        self.assertFalse(backend.remove_connection(1, 'tab-1'))
+        self.assertTrue(backend.is_online(1))
+        self.assertTrue(backend.remove_connection(1, 'tab-2'))
+        self.assertFalse(backend.is_online(1))
+        self.assertFalse(backend.remove_connection(1, 'tab-2'))
+
+    def test_connections_expire_unless_refreshed_by_heartbeat(self):
+        backend = presence.InMemoryPresenceBackend()
+
+        with mock.patch('user_messages.presence.time.time', return_value=1000):
+            backend.add_connection(1, 'tab-1', ttl=300)
+            backend.add_connection(2, 'tab-1', ttl=300)
+        with mock.patch('user_messages.presence.time.time', return_value=1200):
+            self.assertFalse(backend.add_connection(1, 'tab-1', ttl=300))
+        with mock.patch('user_messages.presence.time.time', return_value=1400):
+            self.assertEqual(backend.online_user_ids([1, 2, 3]), {1})
+            # The expired connection still counts as an offline transition
+            self.assertTrue(backend.remove_connection(2, 'tab-1'))
+        with mock.patch('user_messages.presence.time.time', return_value=1600):
+            self.assertEqual(backend.online_user_ids([1, 2]), set())
+            self.assertTrue(backend.add_connection(1, 'tab-1', ttl=300))
+
+    def test_presence_is_consistent_across_worker_processes(self):
+        path = os.path.join(tempfile.mkdtemp(), 'presence.sqlite3')
+        backend = presence.SQLitePresenceBackend(path)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = 4
+
+        def run(target):
+            processes = [
+                context.Process(target=target, args=(path, f'worker-{index}', [1, 100 + index], results))
+                for index in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            outcomes = [outcome for _ in processes for outcome in results.get(timeout=30)]
+            for process in processes:
+                process.join(timeout=30)
+                self.assertEqual(process.exitcode, 0)
+            return outcomes
+
+        outcomes = run(_connect_in_worker)
+        # Every worker connected user 1 concurrently, only one saw them come online
+        self.assertEqual([user_id for user_id, changed in outcomes if changed].count(1), 1)
+        self.assertEqual(
+            backend.online_user_ids([1, 2, 100, 101, 102, 103]),
+            {1, 100, 101, 102, 103}
+        )
+
+        outcomes = run(_disconnect_in_worker)
+        self.assertEqual([user_id for user_id, changed in outcomes if changed].count(1), 1)
+        self.assertEqual(backend.online_user_ids([1, 100, 101, 102, 103]), set())
+
+
+@override_settings(PRESENCE_BACKEND='user_messages.presence.InMemoryPresenceBackend')
+class ConversationPresenceTests(APITestCase):
+    """The conversation list reports presence from the registry in one lookup."""
+
+    def setUp(self):
+        presence.reset_presence_backend()
+        self.addCleanup(presence.reset_presence_backend)
+        self.user = User.objects.create_user(email='me@example.com', password='testpass123', name='Me')
+        self.online_user = User.objects.create_user(email='on@example.com', password='testpass123', name='On')
+        self.offline_user = User.objects.create_user(email='off@example.com', password='testpass123', name='Off')
+        for other in (self.online_user, self.offline_user):
+            Conversation.objects.create(
+                participant1=other,
+                participant2=self.user,
+                role_map={str(other.id): 'client', str(self.user.id): 'professional'}
+            )
+        presence.get_presence_backend().add_connection(self.online_user.id, 'tab-1')
+
+    def test_other_participant_online(self):
+        self.client.force_authenticate(user=self.user)
+        with mock.patch.object(
+            presence.InMemoryPresenceBackend, 'online_user_ids', autospec=True,
+            side_effect=presence.InMemoryPresenceBackend.online_user_ids
+        ) as online_user_ids:
+            response = self.client.get('/api/conversations/v1/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(online_user_ids.call_count, 1)
+        online = {row['other_user_name']: row['other_participant_online'] for row in response.json()}
+        self.assertEqual(online, {'On': True, 'Off': False})
+
+
+class RecordingChannelLayer:
+    """Channel layer stand-in that records group sends and peak concurrency."""
+
+    def __init__(self):
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def group_send(self, group, message):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.sent.append((group, message['user_id'], message['is_online']))
+        self.in_flight -= 1
+
+
+@override_settings(PRESENCE_BACKEND='user_messages.presence.InMemoryPresenceBackend')
+class PresenceFanoutTests(APITransactionTestCase):
+    """Presence changes are debounced, deduplicated and sent with bounded concurrency."""
+
+    def setUp(self):
+        presence.reset_presence_backend()
+        self.addCleanup(presence.reset_presence_backend)
+        self.channel_layer = RecordingChannelLayer()
+        patcher = mock.patch.object(presence_fanout, 'get_channel_layer', return_value=self.channel_layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(email='me@example.com', password='testpass123', name='Me')
+        self.partners = [
+            User.objects.create_user(email=f'partner{i}@example.com', password='testpass123', name=f'Partner {i}')
+            for i in range(5)
+        ]
+        for partner in self.partners:
+            Conversation.objects.create(participant1=partner, participant2=self.user, role_map={})
+        # A second conversation with the same person must not produce a second update
+        Conversation.objects.create(participant1=self.user, participant2=self.partners[0], role_map={})
+
+    async def test_online_change_reaches_each_partner_once(self):
+        fanout = presence_fanout.PresenceFanout(window=0, concurrency=2)
+        presence.get_presence_backend().add_connection(self.user.id, 'tab-1')
+        fanout.schedule(self.user.id, True)
+
+        self.assertEqual(await fanout.flush(), 5)
+        self.assertEqual(
+            sorted(self.channel_layer.sent),
+            sorted((f'user_{partner.id}_notifications', self.user.id, True) for partner in self.partners)
+        )
+        self.assertEqual(self.channel_layer.max_in_flight, 2)
+
+    async def test_flapping_connection_sends_nothing(self):
+        fanout = presence_fanout.PresenceFanout(window=60)
+        backend = presence.get_presence_backend()
+        for _ in range(3):
+            backend.add_connection(self.user.id, 'tab-1')
+            fanout.schedule(self.user.id, True)
+            backend.remove_connection(self.user.id, 'tab-1')
+            fanout.schedule(self.user.id, False)
+
+        self.assertEqual(await fanout.flush(), 0)
+        self.assertEqual(self.channel_layer.sent, [])
+
+    async def test_changes_within_window_are_sent_together(self):
+        fanout = presence_fanout.PresenceFanout(window=0.01)
+        for user in [self.user] + self.partners:
+            presence.get_presence_backend().add_connection(user.id, 'tab-1')
+            fanout.schedule(user.id, True)
+
+        await asyncio.sleep(0.05)
+        # 5 partners hear about the user, the user hears about 5 partners, partner 0 counted once
+        self.assertEqual(len(self.channel_layer.sent), 10)
+        self.assertIsNone(fanout._flush_task)
+
+    def test_partner_ids_are_loaded_in_one_query(self):
+        user_ids = [self.user.id] + [partner.id for partner in self.partners]
+        with CaptureQueriesContext(connection) as queries:
+            partners = presence_fanout.get_conversation_partner_ids(user_ids)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(partners[self.user.id], {partner.id for partner in self.partners})
+        self.assertEqual(partners[self.partners[0].id], {self.user.id})
+
+
+class MessageOutboxTests(APITestCase):
+    """Sending a message only writes the outbox; the dispatcher delivers its side effects."""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(email='sender@example.com', password='testpass123', name='Sender')
+        self.recipient = User.objects.create_user(email='recipient@example.com', password='testpass123', name='Recipient')
+        self.conversation = Conversation.objects.create(
+            participant1=self.sender,
+            participant2=self.recipient,
+            role_map={str(self.sender.id): 'client', str(self.recipient.id): 'professional'}
+        )
+        self.channel_layer = mock.Mock()
+        self.channel_layer.group_send = mock.AsyncMock()
+        patcher = mock.patch.object(outbox, 'get_channel_layer', return_value=self.channel_layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, count=1):
+        return [
+            UserMessage.objects.create(conversation=self.conversation, sender=self.sender, content=f'Message {i}')
+            for i in range(count)
+        ]
+
+    def sent(self, event_type):
+        return [call.args for call in self.channel_layer.group_send.call_args_list if call.args[1]['type'] == event_type]
+
+    def test_send_only_writes_the_outbox(self):
+        self.send()
+
+        self.channel_layer.group_send.assert_not_called()
+        self.assertEqual(MessageOutboxEvent.objects.get().status, 'pending')
+        self.assertFalse(MessageMetrics.objects.exists())
+        self.assertFalse(ScheduledEmailJob.objects.exists())
+
+    def test_rolled_back_message_has_no_side_effects(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.send()
+                raise RuntimeError('rollback')
+
+        self.assertFalse(MessageOutboxEvent.objects.exists())
+        self.assertEqual(outbox.dispatch_pending_events(), {'delivered': 0, 'retried': 0, 'failed': 0})
+        self.channel_layer.group_send.assert_not_called()
+
+    def test_dispatch_delivers_batch(self):
+        messages = self.send(3)
+
+        self.assertEqual(outbox.dispatch_pending_events()['delivered'], 3)
+
+        notifications = self.sent('message_notification')
+        self.assertEqual(len(notifications), 3)
+        group, event = notifications[0]
+        self.assertEqual(group, f'user_{self.recipient.id}_notifications')
+        self.assertTrue(event['data']['is_professional'])
+        # One unread update per recipient, covering the whole batch
+        unread_updates = self.sent('unread_update')
+        self.assertEqual(len(unread_updates), 1)
+        self.assertEqual(unread_updates[0][1]['data']['unread_count'], 3)
+
+        self.assertEqual(
+            set(MessageMetrics.objects.values_list('message_id', 'delivery_status')),
+            {(message.message_id, 'websocket_sent') for message in messages}
+        )
+        self.assertEqual(ScheduledEmailJob.objects.filter(job_type='message_notification').count(), 3)
+        self.assertFalse(MessageOutboxEvent.objects.exclude(status='delivered').exists())
+        # Nothing left to deliver
+        self.assertEqual(outbox.dispatch_pending_events()['delivered'], 0)
+
+    def test_failed_send_is_retried_then_recorded(self):
+        self.send()
+        self.channel_layer.group_send.side_effect = ConnectionError('channel layer down')
+        event = MessageOutboxEvent.objects.get()
+
+        for attempt in range(1, event.max_attempts + 1):
+            results = outbox.dispatch_pending_events()
+            event.refresh_from_db()
+            self.assertEqual(event.attempts, attempt)
+            if attempt < event.max_attempts:
+                self.assertEqual(results['retried'], 1)
+                self.assertEqual(event.status, 'pending')
+                self.assertGreater(event.available_at, timezone.now())
+                self.assertFalse(MessageMetrics.objects.exists())
+                MessageOutboxEvent.objects.update(available_at=timezone.now())
+
+        self.assertEqual(event.status, 'failed')
+        self.assertEqual(MessageMetrics.objects.get().delivery_status, 'failed')
+        self.assertEqual(ScheduledEmailJob.objects.count(), 1)
+
+    def test_events_of_dead_dispatcher_are_redelivered(self):
+        self.send()
+        outbox.claim_pending_events()
+        self.assertEqual(outbox.dispatch_pending_events()['delivered'], 0)
+
+        MessageOutboxEvent.objects.update(locked_at=timezone.now() - outbox.STALE_LOCK_TIMEOUT - timedelta(minutes=1))
+
+        self.assertEqual(outbox.dispatch_pending_events()['delivered'], 1)
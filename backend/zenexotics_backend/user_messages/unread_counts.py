@@ -0,0 +1,145 @@
+"""
+Per-(user, conversation) unread message counters.
+
+A message is unread for the conversation participant who did not send it
+while its status is 'sent'. Counters are kept in UnreadMessageCounter:
+
+- increment_unread() runs when a message is created (see signals.py)
+- decrement_unread() runs when messages are marked read, by the messages
+  endpoint and the websocket mark_read handler, with the number of messages
+  the read UPDATE changed
+- rebuild_unread_counts() recomputes counters with one grouped aggregate and
+  repairs any drift (e.g. messages updated outside these paths)
+
+These counters are the only copy of the counts; the conversation list reads
+them too (see conversations/inbox.py). get_unread_counts() answers "how many
+unread messages does this user have, and where" with a single query.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, When
+from django.db.models.functions import Greatest
+import logging
+
+from .models import UserMessage, UnreadMessageCounter
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def get_recipient_id(conversation, sender_id):
+    """Id of the participant who receives a message sent by sender_id."""
+    if conversation.participant1_id == sender_id:
+        return conversation.participant2_id
+    return conversation.participant1_id
+
+
+def increment_unread(user_id, conversation_id, amount=1):
+    """Add amount unread messages to the user's counter for the conversation."""
+    counters = UnreadMessageCounter.objects.filter(user_id=user_id, conversation_id=conversation_id)
+    if counters.update(unread_count=F('unread_count') + amount):
+        return
+
+    try:
+        with transaction.atomic():
+            UnreadMessageCounter.objects.create(
+                user_id=user_id,
+                conversation_id=conversation_id,
+                unread_count=amount
+            )
+    except IntegrityError:
+        # Created concurrently by another message, increment that row instead
+        counters.update(unread_count=F('unread_count') + amount)
+
+
+def discard_unread_message(conversation_id, sender_id):
+    """
+    An unread message was deleted: decrement the recipient's counter (anyone in
+    the conversation but the sender), never going below zero.
+    """
+    UnreadMessageCounter.objects.filter(
+        conversation_id=conversation_id
+    ).exclude(user_id=sender_id).update(unread_count=Greatest(F('unread_count') - 1, 0))
+
+
+def decrement_unread(user_id, conversation_id, amount):
+    """
+    The user read amount of the conversation's unread messages (the row count
+    of the UPDATE that marked them read). Decrementing rather than resetting
+    keeps messages that arrived after that UPDATE counted; never goes below zero.
+    """
+    if not amount:
+        return
+    UnreadMessageCounter.objects.filter(
+        user_id=user_id,
+        conversation_id=conversation_id
+    ).update(unread_count=Greatest(F('unread_count') - amount, 0))
+
+
+def get_unread_counts(user_id):
+    """
+    Return the unread summary for a user:
+    {'unread_count': total, 'unread_conversations': n, 'conversation_counts': {conversation_id: count}}
+    """
+    conversation_counts = {
+        str(conversation_id): unread_count
+        for conversation_id, unread_count in UnreadMessageCounter.objects.filter(
+            user_id=user_id,
+            unread_count__gt=0
+        ).values_list('conversation_id', 'unread_count')
+    }
+    return {
+        'unread_count': sum(conversation_counts.values()),
+        'unread_conversations': len(conversation_counts),
+        'conversation_counts': conversation_counts
+    }
+
+
+def unread_message_totals(message_queryset):
+    """
+    Group unread messages by (recipient, conversation) in one query.
+    Returns {(recipient_id, conversation_id): count}.
+    """
+    rows = message_queryset.filter(
+        Q(sender_id=F('conversation__participant1_id')) | Q(sender_id=F('conversation__participant2_id')),
+        status='sent'
+    ).annotate(
+        recipient_id=Case(
+            When(sender_id=F('conversation__participant1_id'), then=F('conversation__participant2_id')),
+            default=F('conversation__participant1_id')
+        )
+    ).values('recipient_id', 'conversation_id').annotate(unread=Count('message_id')).order_by()
+
+    return {(row['recipient_id'], row['conversation_id']): row['unread'] for row in rows}
+
+
+def rebuild_unread_counts(user_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recompute counters from the messages table, for the given users or for
+    everyone. Returns the number of non-zero counters written.
+    """
+    messages = UserMessage.objects.all()
+    counters = UnreadMessageCounter.objects.all()
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        messages = messages.filter(
+            Q(conversation__participant1_id__in=user_ids) | Q(conversation__participant2_id__in=user_ids)
+        )
+        counters = counters.filter(user_id__in=user_ids)
+
+    totals = unread_message_totals(messages)
+    if user_ids is not None:
+        totals = {key: count for key, count in totals.items() if key[0] in user_ids}
+
+    with transaction.atomic():
+        counters.delete()
+        UnreadMessageCounter.objects.bulk_create(
+            [
+                UnreadMessageCounter(user_id=user_id, conversation_id=conversation_id, unread_count=count)
+                for (user_id, conversation_id), count in totals.items()
+            ],
+            batch_size=batch_size
+        )
+
+    logger.info(f"Rebuilt {len(totals)} unread message counters")
+    return len(totals)
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from ..models import UserMessage
+from ..unread_counts import decrement_unread, get_unread_counts
 from conversations.models import Conversation
 from django.utils import timezone
 from clients.models import Client
@@ -27,39 +28,160 @@ import pytz
 from decimal import Decimal
 import traceback
 from django.core.exceptions import ValidationError
-from user_messages.helpers import validate_message_image, process_base64_image
+from user_messages.helpers import (
+    validate_message_image,
+    process_base64_image,
+    encode_message_cursor,
+    decode_message_cursor
+)
 
 logger = logging.getLogger(__name__)
 
+# Message history page sizes (?page_size=)
+MESSAGE_PAGE_SIZE = 20
+MAX_MESSAGE_PAGE_SIZE = 100
+
+def load_request_bookings(messages):
+    """
+    Load the bookings referenced by initial booking request messages in one
+    query, with their occurrences prefetched.
+    Returns {booking_id: Booking}.
+    """
+    booking_ids = set()
+    for message in messages:
+        if message.type_of_message == 'initial_booking_request' and message.metadata:
+            try:
+                booking_ids.add(int(message.metadata.get('booking_id')))
+            except (TypeError, ValueError):
+                continue
+
+    if not booking_ids:
+        return {}
+
+    return Booking.objects.prefetch_related('occurrences').in_bulk(booking_ids)
+
+def format_request_occurrences(booking, user_id, time_settings):
+    """Format a booking's prefetched occurrences with the viewer's (already loaded) time settings."""
+    formatted_occurrences = []
+    for occurrence in booking.occurrences.all():
+        try:
+            # Create timezone-aware datetime objects
+            start_dt = datetime.combine(occurrence.start_date, occurrence.start_time)
+            end_dt = datetime.combine(occurrence.end_date, occurrence.end_time)
+            
+            # Make datetimes timezone-aware in UTC
+            start_dt = pytz.UTC.localize(start_dt)
+            end_dt = pytz.UTC.localize(end_dt)
+            
+            # Format the times according to user preferences
+            formatted_occurrences.append(
+                format_booking_occurrence(start_dt, end_dt, user_id, time_settings=time_settings)
+            )
+        except Exception as e:
+            logger.error(f"Error formatting occurrence: {str(e)}")
+            continue
+    return formatted_occurrences
+
+def find_conversation_draft(current_user_id, other_user_id):
+    """
+    Find the in-progress booking draft between the two participants of a
+    conversation, whichever of them is the professional.
+    """
+    professional_ids = dict(
+        Professional.objects.filter(user_id__in=[current_user_id, other_user_id]).values_list('user_id', 'professional_id')
+    )
+    client_ids = dict(
+        Client.objects.filter(user_id__in=[current_user_id, other_user_id]).values_list('user_id', 'id')
+    )
+
+    if current_user_id in professional_ids:
+        # For professionals, check for drafts where they are the professional and other user is client
+        professional_user_id, client_user_id = current_user_id, other_user_id
+    else:
+        # For clients, check for drafts where they are the client and other user is professional
+        professional_user_id, client_user_id = other_user_id, current_user_id
+
+    if professional_user_id not in professional_ids or client_user_id not in client_ids:
+        return None
+
+    # A probe of the (professional, client, status) index on BookingDraft
+    return BookingDraft.objects.filter(
+        Q(booking=None) | Q(booking__client__user_id=client_user_id),
+        professional_id=professional_ids[professional_user_id],
+        client_id=client_ids[client_user_id],
+        status='IN_PROGRESS'
+    ).first()
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_conversation_messages(request, conversation_id):
     """
-    Get messages for a specific conversation.
-    Messages are paginated with a fixed page size of 20, ordered by most recent first.
-    Page number can be specified in the query params, defaults to 1.
+    Get messages for a specific conversation, ordered by most recent first.
+    
+    Query params:
+    - page_size: messages per page (default 20, at most 100)
+    - before: cursor; returns the page of messages older than it (scrollback)
+    - after: cursor; returns messages newer than it, oldest first, so a client
+      can catch up after a websocket reconnect without reloading page 1
+    - page: legacy offset pagination, used when no cursor is given
+    
+    Cursor pages are keyset queries on (timestamp, message_id) served by the
+    (conversation, timestamp, message_id) index, so deep scrollback costs the
+    same as the first page. Responses include next_cursor (the oldest message
+    returned, for the next "before" request) and newest_cursor (the newest
+    message returned, for a later "after" request). has_more says whether
+    more messages exist in the requested direction.
+    
+    The number of queries does not depend on the page contents: bookings and
+    occurrences of booking request messages are loaded in bulk and the viewer's
+    time settings are read once.
     """
     try:
         # Get the conversation and verify the user is a participant
         conversation = get_object_or_404(Conversation, conversation_id=conversation_id)
         current_user = request.user
 
-        if current_user not in [conversation.participant1, conversation.participant2]:
+        if current_user.id not in [conversation.participant1_id, conversation.participant2_id]:
             return Response(
                 {'error': 'You are not a participant in this conversation'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
+        
+        other_user_id = conversation.participant2_id if conversation.participant1_id == current_user.id else conversation.participant1_id
 
-        # Get page number from query params, default to 1
-        page = int(request.GET.get('page', 1))
-        page_size = 20
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
+        try:
+            page_size = min(max(int(request.GET.get('page_size', MESSAGE_PAGE_SIZE)), 1), MAX_MESSAGE_PAGE_SIZE)
+            before = request.GET.get('before')
+            after = request.GET.get('after')
+            cursor = decode_message_cursor(after or before) if (after or before) else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        messages = UserMessage.objects.filter(conversation=conversation)
+        if after:
+            # Newer than the cursor, oldest first
+            cursor_timestamp, cursor_message_id = cursor
+            messages = messages.filter(
+                Q(timestamp__gt=cursor_timestamp) | Q(timestamp=cursor_timestamp, message_id__gt=cursor_message_id)
+            ).order_by('timestamp', 'message_id')[:page_size + 1]
+        elif before:
+            cursor_timestamp, cursor_message_id = cursor
+            messages = messages.filter(
+                Q(timestamp__lt=cursor_timestamp) | Q(timestamp=cursor_timestamp, message_id__lt=cursor_message_id)
+            ).order_by('-timestamp', '-message_id')[:page_size + 1]
+        else:
+            # Get page number from query params, default to 1
+            page = int(request.GET.get('page', 1))
+            start_idx = (page - 1) * page_size
+            messages = messages.order_by('-timestamp', '-message_id')[start_idx:start_idx + page_size + 1]
 
-        # Get messages for this conversation
-        messages = UserMessage.objects.filter(
-            conversation=conversation
-        ).order_by('-timestamp')[start_idx:end_idx]
+        # One extra row tells us whether there is more in this direction
+        messages = list(messages)
+        has_more = len(messages) > page_size
+        messages = messages[:page_size]
+
+        bookings = load_request_bookings(messages)
+        time_settings = get_user_time_settings(current_user.id) if bookings else None
 
         messages_data = []
         
@@ -67,7 +189,7 @@ def get_conversation_messages(request, conversation_id):
             # Initialize message data with common fields
             message_data = {
                 'message_id': message.message_id,
-                'sent_by_other_user': message.sender != current_user,
+                'sent_by_other_user': message.sender_id != current_user.id,
                 'content': message.content,
                 'timestamp': message.timestamp,
                 'status': message.status,
@@ -92,36 +214,18 @@ def get_conversation_messages(request, conversation_id):
                 
                 if booking_id:
                     try:
-                        booking = Booking.objects.get(booking_id=booking_id)
+                        booking = bookings.get(int(booking_id))
+                    except (TypeError, ValueError):
+                        booking = None
+
+                    if booking:
                         message_data['is_deleted'] = booking.status in ['CANCELLED', 'DECLINED']
                         message_data['booking_id'] = booking_id
 
-                        # Get the booking occurrences from the database
+                        # Format the prefetched booking occurrences
                         if not message_data['is_deleted']:
-                            formatted_occurrences = []
-                            for occurrence in booking.occurrences.all():
-                                try:
-                                    # Create timezone-aware datetime objects
-                                    start_dt = datetime.combine(occurrence.start_date, occurrence.start_time)
-                                    end_dt = datetime.combine(occurrence.end_date, occurrence.end_time)
-                                    
-                                    # Make datetimes timezone-aware in UTC
-                                    start_dt = pytz.UTC.localize(start_dt)
-                                    end_dt = pytz.UTC.localize(end_dt)
-                                    
-                                    # Format the times according to user preferences
-                                    formatted_times = format_booking_occurrence(
-                                        start_dt,
-                                        end_dt,
-                                        current_user.id
-                                    )
-                                    formatted_occurrences.append(formatted_times)
-                                except Exception as e:
-                                    logger.error(f"Error formatting occurrence: {str(e)}")
-                                    continue
-                            
-                            message_data['metadata']['occurrences'] = formatted_occurrences
-                    except Booking.DoesNotExist:
+                            message_data['metadata']['occurrences'] = format_request_occurrences(booking, current_user.id, time_settings)
+                    else:
                         message_data['is_deleted'] = True
                 else:
                     message_data['is_deleted'] = True
@@ -129,46 +233,24 @@ def get_conversation_messages(request, conversation_id):
             messages_data.append(message_data)
 
         # Mark unread messages as read
-        UserMessage.objects.filter(
+        read_count = UserMessage.objects.filter(
             conversation=conversation,
-            sender=conversation.participant2 if conversation.participant1 == current_user else conversation.participant1,
+            sender_id=other_user_id,
             status='sent'
         ).update(status='read')
+        decrement_unread(current_user.id, conversation.conversation_id, read_count)
 
         # Check for existing draft
         has_draft = False
         draft_data = None
         try:
-            # Get the other participant
-            other_user = conversation.participant2 if conversation.participant1 == current_user else conversation.participant1
-            
-            # Determine if current user is professional
-            is_professional = Professional.objects.filter(user=current_user).exists()
-            
-            if is_professional:
-                # For professionals, check for drafts where they are the professional and other user is client
-                draft = BookingDraft.objects.filter(
-                    Q(booking=None) | Q(booking__client__user=other_user),
-                    draft_data__has_key='client_id',
-                    draft_data__client_id=Client.objects.get(user=other_user).id,
-                    draft_data__professional_id=Professional.objects.get(user=current_user).professional_id,
-                    status='IN_PROGRESS'
-                ).first()
-            else:
-                # For clients, check for drafts where they are the client and other user is professional
-                draft = BookingDraft.objects.filter(
-                    Q(booking=None) | Q(booking__client__user=current_user),
-                    draft_data__has_key='client_id',
-                    draft_data__client_id=Client.objects.get(user=current_user).id,
-                    draft_data__professional_id=Professional.objects.get(user=other_user).professional_id,
-                    status='IN_PROGRESS'
-                ).first()
+            draft = find_conversation_draft(current_user.id, other_user_id)
             
             if draft:
                 has_draft = True
                 draft_data = {
                     'draft_id': draft.draft_id,
-                    'booking_id': draft.booking.booking_id if draft.booking else None,
+                    'booking_id': draft.booking_id,
                     'status': draft.status,
                     'last_modified_by': draft.last_modified_by
                 }
@@ -176,9 +258,16 @@ def get_conversation_messages(request, conversation_id):
             logger.error(f"Error checking for draft: {str(e)}")
             logger.error(f"Full traceback: {traceback.format_exc()}")
 
+        if after:
+            oldest_message, newest_message = (messages[0], messages[-1]) if messages else (None, None)
+        else:
+            newest_message, oldest_message = (messages[0], messages[-1]) if messages else (None, None)
+
         return Response({
             'messages': messages_data,
-            'has_more': len(messages) == page_size,
+            'has_more': has_more,
+            'next_cursor': encode_message_cursor(oldest_message) if oldest_message else before,
+            'newest_cursor': encode_message_cursor(newest_message) if newest_message else after,
             'has_draft': has_draft,
             'draft_data': draft_data
         })
@@ -645,47 +734,13 @@ def get_unread_message_count(request):
         current_user = request.user
         logger.info(f"Fetching unread message count for user: {current_user.id}")
         
-        # Get all conversations where the user is a participant
-        conversations = Conversation.objects.filter(
-            Q(participant1=current_user) | Q(participant2=current_user)
-        )
+        # Per-conversation counters are maintained as messages are sent and
+        # read (see user_messages/unread_counts.py), so this is a single query
+        unread_counts = get_unread_counts(current_user.id)
         
-        if not conversations.exists():
-            logger.info(f"No conversations found for user {current_user.id}")
-            return Response({
-                'unread_count': 0,
-                'unread_conversations': 0,
-                'conversation_counts': {}
-            })
-        
-        # Calculate total unread messages and conversations with unread messages
-        total_unread = 0
-        conversations_with_unread = 0
-        conversation_counts = {}
-        
-        for conversation in conversations:
-            # Only count messages where:
-            # 1. Current user is not the sender (sent by other participant)
-            # 2. Status is 'sent' (not 'read')
-            other_participant = conversation.participant2 if conversation.participant1 == current_user else conversation.participant1
-            unread_count = UserMessage.objects.filter(
-                conversation=conversation,
-                sender=other_participant,
-                status='sent'
-            ).count()
-            
-            if unread_count > 0:
-                total_unread += unread_count
-                conversations_with_unread += 1
-                conversation_counts[str(conversation.conversation_id)] = unread_count
-                
-        logger.info(f"User {current_user.id} has {total_unread} unread messages in {conversations_with_unread} conversations")
+        logger.info(f"User {current_user.id} has {unread_counts['unread_count']} unread messages in {unread_counts['unread_conversations']} conversations")
         
-        return Response({
-            'unread_count': total_unread,
-            'unread_conversations': conversations_with_unread,
-            'conversation_counts': conversation_counts
-        })
+        return Response(unread_counts)
         
     except Exception as e:
         logger.error(f"Error getting unread message count: {str(e)}")
@@ -480,7 +480,9 @@ def request_account_deletion(request):
         user.deletion_requested_at = timezone.now()
         user.deletion_confirmation_token = token
         user.deletion_token_expires_at = timezone.now() + timedelta(days=7)  # 7 days to confirm
-        user.save()
+        user.save(update_fields=[
+            'is_deletion_requested', 'deletion_requested_at', 'deletion_confirmation_token', 'deletion_token_expires_at'
+        ])
         
         # Send confirmation email
         send_deletion_confirmation_email(user, token, future_bookings, request)
@@ -617,7 +619,9 @@ def cancel_account_deletion(request):
     user.deletion_requested_at = None
     user.deletion_confirmation_token = ''
     user.deletion_token_expires_at = None
-    user.save()
+    user.save(update_fields=[
+        'is_deletion_requested', 'deletion_requested_at', 'deletion_confirmation_token', 'deletion_token_expires_at'
+    ])
     
     logger.info(f'Account deletion cancelled for user {user.email}')
     
@@ -7,3 +7,4 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import users.signals  # Import the signals
+        import users.checks  # Register the system checks
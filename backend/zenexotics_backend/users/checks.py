@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries live in a single process
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Deployed environments run several workers, and cached JWT users are only
+    invalidated, and search cache stats only counted, for all of them through a
+    shared cache.
+    """
+    if not (settings.IS_PRODUCTION or settings.IS_STAGING):
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [Error(
+            f"The default cache ({backend}) is process-local.",
+            hint="Configure a shared cache such as django.core.cache.backends.redis.RedisCache (REDIS_CACHE_URL).",
+            id='users.E001',
+        )]
+    return []
@@ -325,22 +325,28 @@ def update_user_profile(user, data):
     try:
         # Create response dictionary to store updated fields
         response_data = {}
+        # User columns changed here; only these are written, so concurrent writes to others survive
+        user_fields = []
         
         # Update User model fields
         if 'name' in data:
             user.name = data['name']
+            user_fields.append('name')
             response_data['name'] = data['name']
         if 'email' in data:
             user.email = data['email']
+            user_fields.append('email')
             response_data['email'] = data['email']
         if 'phone' in data:
             user.phone_number = data['phone']
+            user_fields.append('phone_number')
             response_data['phone'] = data['phone']
         
         # Handle settings toggle fields from SettingsPaymentsTab
         if 'profile_visibility' in data:
             logger.debug(f"helpers.py: Updating profile visibility for user {user.id} from {user.is_profile_visible} to {data['profile_visibility']}")
             user.is_profile_visible = data['profile_visibility']
+            user_fields.append('is_profile_visible')
             response_data['profile_visibility'] = user.is_active and user.is_profile_visible
             logger.debug(f"helpers.py: Updated profile visibility for user {user.id} to {user.is_profile_visible}. Final visibility: {response_data['profile_visibility']} (is_active: {user.is_active}, is_profile_visible: {user.is_profile_visible})")
         
@@ -456,14 +462,17 @@ def update_user_profile(user, data):
         # Handle profile photo upload if included - check for either key name
         if 'profile_picture' in data:
             user.profile_picture = data['profile_picture']
+            user_fields.append('profile_picture')
             response_data['profile_photo'] = user.profile_picture.url if user.profile_picture else None
         elif 'profilePhoto' in data:
             user.profile_picture = data['profilePhoto']
+            user_fields.append('profile_picture')
             response_data['profile_photo'] = user.profile_picture.url if user.profile_picture else None
         
         # Save user model changes
         logger.debug(f"helpers.py: Saving user model changes for user {user.id}. is_profile_visible will be saved as: {user.is_profile_visible}")
-        user.save()
+        if user_fields:
+            user.save(update_fields=user_fields)
         logger.debug(f"helpers.py: User model saved successfully for user {user.id}")
         
         # Update Client model if it exists
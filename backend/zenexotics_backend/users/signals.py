@@ -1,5 +1,5 @@
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
 from django.db import transaction
@@ -7,6 +7,7 @@ from clients.models import Client
 from professional_status.models import ProfessionalStatus
 from user_addresses.models import Address, AddressType
 from .email_helpers import send_new_user_notification, send_welcome_email
+from .token_auth import invalidate_token_user
 
 logger = logging.getLogger(__name__)
 
@@ -99,4 +100,17 @@ def send_welcome_email_on_signup(sender, instance, created, **kwargs):
         
         # Send welcome email asynchronously to avoid delaying the registration response
         transaction.on_commit(send_welcome)
-        
\ No newline at end of file
+        
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_token_user(sender, instance, **kwargs):
+    """
+    Drop the user from the token user cache so requests never authenticate
+    against a stale copy (e.g. after deactivation). Dropped again on commit in
+    case a concurrent request re-cached the old row in between.
+    """
+    user_id = instance.pk
+    invalidate_token_user(user_id)
+    transaction.on_commit(lambda: invalidate_token_user(user_id))
@@ -1,3 +1,81 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from users.checks import check_shared_cache
+from users.models import User
+from users.token_auth import resolve_access_token
+
+
+class TokenUserCacheTests(APITestCase):
+    """Bearer tokens resolve their user at most once per request, and not at all when warm."""
+
+    url = '/api/messages/v1/unread-count/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='me@example.com', password='testpass123', name='Me')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        user_queries = [query for query in queries if 'FROM "users_user"' in query['sql']]
+        return response, len(user_queries)
+
+    def test_cold_request_loads_user_once_and_warm_request_not_at_all(self):
+        response, cold_queries = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cold_queries, 1)
+
+        response, warm_queries = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(warm_queries, 0)
+
+    def test_saving_user_invalidates_cache(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+
+        response, _ = self.get()
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleting_user_invalidates_cache(self):
+        self.get()
+        user_id = self.user.id
+        User.objects.filter(id=user_id).first().delete()
+
+        response, _ = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertIsNone(resolve_access_token(self.token)[1])
+
+    def test_websocket_resolution_shares_cache(self):
+        self.get()
+        with CaptureQueriesContext(connection) as queries:
+            access_token, user = resolve_access_token(self.token)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(access_token.payload['user_id'], self.user.id)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+
+    @override_settings(IS_PRODUCTION=True, IS_STAGING=False, CACHES=LOCMEM)
+    def test_process_local_cache_fails_in_production(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['users.E001'])
+
+    @override_settings(IS_PRODUCTION=False, IS_STAGING=True, CACHES=REDIS)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(IS_PRODUCTION=False, IS_STAGING=False, CACHES=LOCMEM)
+    def test_process_local_cache_allowed_in_development(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,86 @@
+"""
+JWT access token to user resolution, shared by every place that authenticates
+a bearer token: core.middleware.AuthenticationLoggingMiddleware, DRF (through
+CachedJWTAuthentication) and the websocket JWTAuthMiddleware.
+
+Users are cached by id for USER_CACHE_TIMEOUT seconds, so a request costs at
+most one user query (the logging middleware's cache miss) and none once the
+cache is warm. The entry is dropped when the user is saved or deleted (see
+users/signals.py); bulk .update() calls bypass the signals and are bounded by
+the timeout. Deployed environments must use a cache shared by every worker
+(the users.E001 check enforces it), otherwise a deactivated user or a changed
+password would keep authenticating on the other workers until the timeout.
+
+Cached users can be stale by the time a view writes them, so views save
+request.user with update_fields rather than rewriting every column.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_TIMEOUT = 60
+
+
+def _user_cache_key(user_id):
+    return f"jwt_user:{user_id}"
+
+
+def get_token_user(user_id):
+    """Return the user for a token's user_id claim (cached), or None if there is none."""
+    if user_id is None:
+        return None
+
+    cache_key = _user_cache_key(user_id)
+    user = cache.get(cache_key)
+    if user is None:
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None:
+            return None
+        cache.set(cache_key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_token_user(user_id):
+    cache.delete(_user_cache_key(user_id))
+
+
+def resolve_access_token(raw_token):
+    """
+    Validate a raw access token and return (access_token, user), where user
+    is None if the token's user no longer exists. Raises TokenError for an
+    invalid or expired token.
+    """
+    access_token = AccessToken(raw_token)
+    return access_token, get_token_user(access_token.payload.get(api_settings.USER_ID_CLAIM))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that loads the user through the token user cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_token_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -14,7 +14,7 @@ from ..serializers import RegisterSerializer
 import logging
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.token_auth import CachedJWTAuthentication
 from django.contrib.auth import authenticate
 from professional_status.models import ProfessionalStatus
 import pytz
@@ -109,7 +109,7 @@ class SitterStatusView(APIView):
         })
 
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_user_name(request):
     user = request.user
@@ -158,7 +158,7 @@ class ChangePasswordView(APIView):
             return Response({'error': 'Current password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
 
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         logger.info(f"Password changed successfully for user: {user.email}")
         return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
 
@@ -483,7 +483,7 @@ def upload_profile_picture(request):
                     # Save to user profile
                     try:
                         user.profile_picture = image_file
-                        user.save()
+                        user.save(update_fields=['profile_picture'])
                         logger.debug(f"upload_profile_picture: Base64 image saved successfully for user {user.id}")
                     except Exception as e:
                         logger.error(f"upload_profile_picture: Failed to save base64 image: {str(e)}")
@@ -571,7 +571,7 @@ def upload_profile_picture(request):
             # Save the file to the user's profile
             try:
                 user.profile_picture = profile_picture
-                user.save()
+                user.save(update_fields=['profile_picture'])
                 logger.debug(f"upload_profile_picture: File saved successfully for user {user.id}")
             except Exception as e:
                 logger.error(f"upload_profile_picture: Failed to save file: {str(e)}")
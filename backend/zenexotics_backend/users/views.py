@@ -14,7 +14,7 @@ from .serializers import RegisterSerializer
 import logging
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.token_auth import CachedJWTAuthentication
 from django.contrib.auth import authenticate
 from professional_status.models import ProfessionalStatus
 from rest_framework import viewsets
@@ -104,7 +104,7 @@ class SitterStatusView(APIView):
         })
 
 @api_view(['GET'])
-@authentication_classes([JWTAuthentication])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_user_name(request):
     user = request.user
@@ -271,7 +271,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.token_auth.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -474,6 +474,47 @@ else:
         },
     }
 
+# Cache. JWT users (users/token_auth.py) and professional search results and
+# their hit/miss counters (professionals/search_cache.py) live in it, so
+# deployed environments share one Redis cache across workers; a process-local
+# cache there fails the users.E001 system check.
+if IS_PRODUCTION or IS_STAGING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_CACHE_URL", os.environ.get("REDIS_URL", "redis://localhost:6379/0")),
+            "KEY_PREFIX": "crittrcove",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# Websocket presence registry (see user_messages/presence.py). It must be shared
+# by every ASGI worker, so deployed environments keep it in Redis; running
+# several local workers needs 'user_messages.presence.SQLitePresenceBackend'.
+if IS_PRODUCTION or IS_STAGING:
+    PRESENCE_BACKEND = os.environ.get('PRESENCE_BACKEND', 'user_messages.presence.RedisPresenceBackend')
+else:
+    PRESENCE_BACKEND = os.environ.get('PRESENCE_BACKEND', 'user_messages.presence.InMemoryPresenceBackend')
+
+# Online/offline changes are debounced for this many seconds before being sent
+# to conversation partners, with at most PRESENCE_FANOUT_CONCURRENCY sends in flight
+PRESENCE_FANOUT_WINDOW = float(os.environ.get('PRESENCE_FANOUT_WINDOW', '2'))
+PRESENCE_FANOUT_CONCURRENCY = int(os.environ.get('PRESENCE_FANOUT_CONCURRENCY', '20'))
+
+# Message notifications are delivered from the outbox (user_messages/outbox.py) by
+# the dispatch_message_outbox worker. The in-memory channel layer used in
+# development is per-process, so there the web process dispatches on commit.
+MESSAGE_OUTBOX_DISPATCH_ON_COMMIT = not (IS_PRODUCTION or IS_STAGING)
+
+# Geocoding (see locations/geocoding.py). Tests can switch to
+# 'locations.geocoding.StaticGeocodingBackend' with GEOCODING_STATIC_RESULTS.
+GEOCODING_BACKEND = os.environ.get('GEOCODING_BACKEND', 'locations.geocoding.NominatimGeocodingBackend')
+
 # Security settings
 SECURE_HSTS_SECONDS = 31536000 if (not IS_DEVELOPMENT) else 0
 SECURE_HSTS_INCLUDE_SUBDOMAINS = not IS_DEVELOPMENT